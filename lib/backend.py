@@ -87,6 +87,7 @@ from ganeti import ht
 from ganeti.storage.base import BlockDev
 from ganeti.storage.drbd import DRBD8
 from ganeti import hooksmaster
+from ganeti.impexpd import delta
 import ganeti.metad as metad
 
 
@@ -103,6 +104,10 @@ _X509_CERT_FILE = "cert"
 _IES_STATUS_FILE = "status"
 _IES_PID_FILE = "pid"
 _IES_CA_FILE = "ca"
+_IES_DELTA_BASE_FILE = "delta-base"
+
+#: Suffix for the chunk manifest stored next to an exported disk image
+_EXPORT_MANIFEST_SUFFIX = ".manifest"
 
 #: Valid LVS output line regex
 _LVSLINE_REGEX = re.compile(r"^ *([^|]+)\|([^|]+)\|([0-9.]+)\|([^|]{6,})\|?$")
@@ -4533,6 +4538,187 @@ def BlockdevSetInfo(disk, info):
     _Fail("Failed to set information on block device: %s", err, exc=True)
 
 
+def _ReadExportManifests(export_dir):
+  """Reads the chunk manifests of an export's disk images.
+
+  @type export_dir: string
+  @param export_dir: Directory containing the export
+  @rtype: list of tuples; (string, dict or None)
+  @return: For every disk, the path of the disk image and its manifest, or
+    C{None} if the disk has no (usable) manifest
+
+  """
+  config = objects.SerializableConfigParser()
+  config.read(utils.PathJoin(export_dir, constants.EXPORT_CONF_FILE))
+
+  if not config.has_option(constants.INISECT_INS, "disk_count"):
+    return []
+
+  result = []
+
+  for idx in range(config.getint(constants.INISECT_INS, "disk_count")):
+    option = "disk%d_dump" % idx
+    if not config.has_option(constants.INISECT_INS, option):
+      result.append((None, None))
+      continue
+
+    image = utils.PathJoin(export_dir, config.get(constants.INISECT_INS,
+                                                  option))
+    try:
+      manifest = serializer.LoadJson(utils.ReadFile(image +
+                                                    _EXPORT_MANIFEST_SUFFIX))
+    except EnvironmentError, err:
+      if err.errno != errno.ENOENT:
+        logging.warning("Can't read manifest for %s: %s", image, err)
+      manifest = None
+    except ValueError, err:
+      logging.warning("Can't parse manifest for %s: %s", image, err)
+      manifest = None
+
+    if not (manifest is None or delta.CheckManifest(manifest)):
+      logging.warning("Ignoring malformed manifest for %s", image)
+      manifest = None
+
+    result.append((image, manifest))
+
+  return result
+
+
+def GetExportManifests(instance_name):
+  """Returns the chunk manifests of an instance's export on this node.
+
+  @type instance_name: string
+  @param instance_name: Name of the exported instance
+  @rtype: list of dict or None
+  @return: Manifest for every disk, C{None} for disks without manifest; an
+    empty list if there is no export
+
+  """
+  export_dir = utils.PathJoin(pathutils.EXPORT_DIR, instance_name)
+
+  if not os.path.isdir(export_dir):
+    return []
+
+  return [manifest for (_, manifest) in _ReadExportManifests(export_dir)]
+
+
+def _WriteExportManifest(image, manifest):
+  """Writes the chunk manifest of an exported disk image.
+
+  @type image: string
+  @param image: Path of the disk image
+  @type manifest: dict
+  @param manifest: Manifest of the disk image
+
+  """
+  utils.WriteFile(image + _EXPORT_MANIFEST_SUFFIX,
+                  data=serializer.DumpJson(manifest))
+
+
+def _RebuildExportImage(image, base_image, base):
+  """Rebuilds a complete disk image from a received delta stream.
+
+  The delta stream is applied to a copy of the base image, so the previous
+  export stays intact until the new one has been completed. The copy is
+  made using reflinks where the file system supports them.
+
+  @type image: string
+  @param image: Path of the received delta stream, which will be replaced
+    by the complete disk image
+  @type base_image: string or None
+  @param base_image: Path to the disk image of the previous export
+  @type base: dict or None
+  @param base: Manifest of the base image
+
+  """
+  if base is None or not os.path.isfile(base_image):
+    base = None
+    base_id = None
+  else:
+    base_id = base["id"]
+
+  delta_file = image + ".delta"
+
+  try:
+    os.rename(image, delta_file)
+
+    # Verify before copying the previous export
+    src = open(delta_file, "rb")
+    try:
+      delta_base_id = delta.GetDeltaBase(src)
+    finally:
+      src.close()
+
+    if delta_base_id is None:
+      # The delta contains all chunks, e.g. because the exporting node could
+      # not use the base manifest
+      base = None
+    elif delta_base_id != base_id:
+      _Fail("Delta for '%s' was made against base '%s', but base is '%s'",
+            image, delta_base_id, base_id)
+
+    if base is None:
+      utils.WriteFile(image, data="")
+    else:
+      result = utils.RunCmd(["cp", "--reflink=auto", "--sparse=always",
+                             base_image, image])
+      if result.failed:
+        _Fail("Can't copy base image '%s': %s - %s", base_image,
+              result.fail_reason, result.output)
+
+    src = open(delta_file, "rb")
+    try:
+      dst = open(image, "r+b")
+      try:
+        manifest = delta.ApplyDelta(src, dst, base=base)
+      finally:
+        dst.close()
+    finally:
+      src.close()
+  except (EnvironmentError, errors.GenericError), err:
+    _Fail("Can't rebuild image '%s' from delta: %s", image, err, exc=True)
+
+  utils.RemoveFile(delta_file)
+  _WriteExportManifest(image, manifest)
+
+
+def RebuildExportDisks(instance_name, snap_disks):
+  """Rebuilds the disk images of an incremental export.
+
+  The disks of an incremental export are received as delta streams, which
+  are applied to copies of the disk images of the previous export. As this
+  reads and writes the complete images, it is not done as part of
+  L{FinalizeExport}.
+
+  @type instance_name: string
+  @param instance_name: Name of the exported instance
+  @type snap_disks: list of L{objects.Disk}
+  @param snap_disks: list of snapshot block devices, which
+      will be used to get the actual name of the dump file
+
+  @rtype: None
+
+  """
+  destdir = utils.PathJoin(pathutils.EXPORT_DIR, instance_name + ".new")
+  finaldestdir = utils.PathJoin(pathutils.EXPORT_DIR, instance_name)
+
+  if os.path.isdir(finaldestdir):
+    bases = _ReadExportManifests(finaldestdir)
+  else:
+    bases = []
+
+  for idx, disk in enumerate(snap_disks):
+    if not disk:
+      continue
+
+    if idx < len(bases):
+      (base_image, base) = bases[idx]
+    else:
+      (base_image, base) = (None, None)
+
+    _RebuildExportImage(utils.PathJoin(destdir, disk.uuid), base_image, base)
+
+
 def FinalizeExport(instance, snap_disks):
   """Write out the export configuration information.
 
@@ -5413,9 +5599,32 @@ def StartImportExportDaemon(mode, opts, host, port, instance, component,
     else:
       cmd.append("--ipv4")
 
+    if opts.incremental:
+      if mode != constants.IEM_EXPORT or not cmd_prefix:
+        _Fail("Incremental transfers are only supported for exporting disks")
+
+      delta_cmd = [pathutils.EXPORT_DELTA]
+
+      if opts.delta_base:
+        delta_base_file = utils.PathJoin(status_dir, _IES_DELTA_BASE_FILE)
+        utils.WriteFile(delta_base_file,
+                        data=serializer.DumpJson(opts.delta_base), mode=0400)
+        delta_cmd.append("--base=%s" % delta_base_file)
+
+      cmd_prefix = "%s %s |" % (cmd_prefix, utils.ShellQuoteArgs(delta_cmd))
+
+      # The size of the delta stream is not known in advance
+      if exp_size != constants.IE_CUSTOM_SIZE:
+        exp_size = None
+
     if opts.compress:
       cmd.append("--compress=%s" % opts.compress)
 
+    if opts.native_transfer:
+      if opts.compress != constants.IEC_NONE:
+        _Fail("Native transfers can only be used without compression")
+      cmd.append("--native-transfer")
+
     if opts.magic:
       cmd.append("--magic=%s" % opts.magic)
 
@@ -46,13 +46,9 @@ from optparse import (OptionParser, TitledHelpFormatter)
 from ganeti import utils
 from ganeti import errors
 from ganeti import constants
-from ganeti import opcodes
 import ganeti.rpc.errors as rpcerr
-from ganeti import ssh
 from ganeti import compat
 from ganeti import netutils
-from ganeti import qlang
-from ganeti import objects
 from ganeti import pathutils
 from ganeti import serializer
 import ganeti.cli_opts
@@ -61,6 +57,12 @@ from ganeti.cli_opts import *  # pylint: disable=W0401,W0614
 
 from ganeti.runtime import (GetClient)
 
+# Only needed by some commands, therefore imported on first use
+opcodes = utils.LazyModule("ganeti.opcodes")
+ssh = utils.LazyModule("ganeti.ssh")
+qlang = utils.LazyModule("ganeti.qlang")
+objects = utils.LazyModule("ganeti.objects")
+
 
 __all__ = [
   # Generic functions for CLI programs
@@ -136,8 +138,23 @@ __all__ = [
  QR_UNKNOWN,
  QR_INCOMPLETE) = range(3)
 
-#: Maximum batch size for ChooseJob
-_CHOOSE_BATCH = 25
+#: Job fields needed to evaluate the result of a finished job
+_JOB_RESULT_FIELDS = ["status", "opstatus", "opresult"]
+
+#: Number of rows used to compute the column widths of tables printed while
+#: their rows are still being retrieved
+_TABLE_SAMPLE_ROWS = 1000
+
+#: Resources for which L{GenericList} retrieves the items in pages
+_PAGED_QUERY_RESOURCES = compat.UniqueFrozenset([
+  constants.QR_INSTANCE,
+  constants.QR_JOB,
+  constants.QR_NODE,
+  ])
+
+#: Number of items retrieved per query by L{GenericList}; results with at
+#: most this many items are retrieved using a single query
+_QUERY_PAGE_SIZE = 1000
 
 
 # constants used to create InstancePolicy dictionary
@@ -765,11 +782,31 @@ def GenericPollJob(job_id, cbs, report_cbs, cancel_fn=None,
 
     prev_job_info = job_info
 
-  jobs = cbs.QueryJobs([job_id], ["status", "opstatus", "opresult"])
+  jobs = cbs.QueryJobs([job_id], _JOB_RESULT_FIELDS)
   if not jobs:
     raise errors.JobLost("Job with id %s lost" % job_id)
 
-  status, opstatus, result = jobs[0]
+  return _EvaluateJobResult(job_id, jobs[0])
+
+
+def _EvaluateJobResult(job_id, job_data):
+  """Returns the result of a finished job or raises its error.
+
+  @type job_id: number
+  @param job_id: Job ID
+  @type job_data: list or None
+  @param job_data: Values of the fields in L{_JOB_RESULT_FIELDS} as returned
+    by L{JobPollCbBase.QueryJobs}
+  @return: the opresult of the job
+  @raise errors.JobLost: If job can't be found
+  @raise errors.JobCanceled: If job is canceled
+  @raise errors.OpExecError: If job didn't succeed
+
+  """
+  if job_data is None:
+    raise errors.JobLost("Job with id %s lost" % job_id)
+
+  status, opstatus, result = job_data
 
   if status == constants.JOB_STATUS_SUCCESS:
     return result
@@ -794,6 +831,89 @@ def GenericPollJob(job_id, cbs, report_cbs, cancel_fn=None,
   raise errors.OpExecError(result)
 
 
+def GenericPollJobs(job_ids, cbs, report_cbs,
+                    update_freq=constants.DEFAULT_WFJC_TIMEOUT):
+  """Generic function polling several jobs at once.
+
+  Unlike L{GenericPollJob}, changes of all jobs are waited for using a
+  single L{JobPollCbBase.WaitForJobsChangeOnce} call per round, so that log
+  messages are reported as soon as any of the jobs produces them.
+
+  @type job_ids: list of numbers
+  @param job_ids: Job IDs
+  @type cbs: Instance of L{JobPollCbBase}
+  @param cbs: Data callbacks
+  @type report_cbs: Instance of L{JobPollReportCbBase}
+  @param report_cbs: Reporting callbacks
+  @type update_freq: int/long
+  @param update_freq: number of seconds between each WFJC reports
+  @rtype: generator
+  @return: Yields a tuple of job ID, success and the opresult of the job (or
+    the exception describing why it failed) for each job as it finishes
+
+  """
+  if update_freq <= 0:
+    raise errors.ParameterError("Update frequency must be a positive number")
+
+  # Previously received job information, highest log serial and status
+  pending = dict((job_id, (None, None, None)) for job_id in job_ids)
+
+  while pending:
+    changes = cbs.WaitForJobsChangeOnce(
+      [(job_id, prev_job_info, prev_logmsg_serial)
+       for (job_id, (prev_job_info, prev_logmsg_serial, _))
+         in pending.items()],
+      ["status"], timeout=update_freq)
+
+    if not changes:
+      for (job_id, (_, _, status)) in sorted(pending.items()):
+        report_cbs.ReportNotChanged(job_id, status)
+      continue
+
+    finished = []
+
+    for (job_id, result) in sorted(changes.items()):
+      if job_id not in pending:
+        continue
+
+      if not result:
+        del pending[job_id]
+        yield (job_id, False,
+               errors.JobLost("Job with id %s lost" % job_id))
+        continue
+
+      (_, prev_logmsg_serial, _) = pending[job_id]
+
+      # Split result, a tuple of (field values, log entries)
+      (job_info, log_entries) = result
+      (status, ) = job_info
+
+      if log_entries:
+        for log_entry in log_entries:
+          (serial, timestamp, log_type, message) = log_entry
+          report_cbs.ReportLogMessage(job_id, serial, timestamp,
+                                      log_type, message)
+          prev_logmsg_serial = max(prev_logmsg_serial, serial)
+
+      elif status in (constants.JOB_STATUS_SUCCESS,
+                      constants.JOB_STATUS_ERROR,
+                      constants.JOB_STATUS_CANCELING,
+                      constants.JOB_STATUS_CANCELED):
+        del pending[job_id]
+        finished.append(job_id)
+        continue
+
+      pending[job_id] = (job_info, prev_logmsg_serial, status)
+
+    if finished:
+      jobs = cbs.QueryJobs(finished, _JOB_RESULT_FIELDS)
+      for (job_id, job_data) in zip(finished, jobs):
+        try:
+          yield (job_id, True, _EvaluateJobResult(job_id, job_data))
+        except errors.GenericError, err:
+          yield (job_id, False, err)
+
+
 class JobPollCbBase(object):
   """Base class for L{GenericPollJob} callbacks.
 
@@ -811,6 +931,20 @@ class JobPollCbBase(object):
     """
     raise NotImplementedError()
 
+  def WaitForJobsChangeOnce(self, jobs, fields,
+                            timeout=constants.DEFAULT_WFJC_TIMEOUT):
+    """Waits for changes on any of several jobs.
+
+    @type jobs: list of tuples
+    @param jobs: Tuples of job ID, previously received job information and
+      highest log serial number previously received
+    @rtype: dict
+    @return: Dictionary mapping the IDs of the jobs which changed to the
+      same value L{WaitForJobChangeOnce} returns for a changed job
+
+    """
+    raise NotImplementedError()
+
   def QueryJobs(self, job_ids, fields):
     """Returns the selected fields for the selected job IDs.
 
@@ -877,6 +1011,13 @@ class _LuxiJobPollCb(JobPollCbBase):
                                         prev_job_info, prev_log_serial,
                                         timeout=timeout)
 
+  def WaitForJobsChangeOnce(self, jobs, fields,
+                            timeout=constants.DEFAULT_WFJC_TIMEOUT):
+    """Waits for changes on any of several jobs.
+
+    """
+    return self.cl.WaitForJobsChangeOnce(jobs, fields, timeout=timeout)
+
   def QueryJobs(self, job_ids, fields):
     """Returns the selected fields for the selected job IDs.
 
@@ -987,6 +1128,32 @@ def PollJob(job_id, cl=None, feedback_fn=None, reporter=None, cancel_fn=None,
                         cancel_fn=cancel_fn, update_freq=update_freq)
 
 
+def PollJobs(job_ids, cl=None, reporter=None,
+             update_freq=constants.DEFAULT_WFJC_TIMEOUT):
+  """Function to poll for the results of several jobs at once.
+
+  @type job_ids: list
+  @param job_ids: the jobs to poll for results
+  @type cl: luxi.Client
+  @param cl: the luxi client to use for communicating with the master;
+             if None, a new client will be created
+  @type reporter: L{JobPollReportCbBase}
+  @param reporter: Reporting callbacks; if None, messages are printed
+  @type update_freq: int/long
+  @param update_freq: number of seconds between each WFJC report
+  @see: L{GenericPollJobs}
+
+  """
+  if cl is None:
+    cl = GetClient()
+
+  if reporter is None:
+    reporter = StdioJobPollReportCb()
+
+  return GenericPollJobs(job_ids, _LuxiJobPollCb(cl), reporter,
+                         update_freq=update_freq)
+
+
 def SubmitOpCode(op, cl=None, feedback_fn=None, opts=None, reporter=None):
   """Legacy function to submit an opcode.
 
@@ -1912,6 +2079,24 @@ def FormatQueryResult(result, unit=None, format_override=None, separator=None,
   @type verbose: boolean
   @param verbose: whether to use verbose field descriptions or not
 
+  """
+  (columns, stats) = _GetQueryColumns(result.fields, unit, format_override,
+                                      separator, verbose)
+
+  table = FormatTable(result.data, columns, header, separator)
+
+  return (_GetQueryStatus(stats, result.fields), table)
+
+
+def _GetQueryColumns(fdefs, unit, format_override, separator, verbose):
+  """Builds the table columns for formatting a query result.
+
+  @type fdefs: list of L{objects.QueryFieldDefinition}
+  @param fdefs: Field definitions
+  @rtype: tuple; (list of L{TableColumn}, dict)
+  @return: The columns and a dictionary counting, for each result status, the
+    number of values formatted so far; see L{_GetQueryStatus}
+
   """
   if unit is None:
     if separator:
@@ -1929,7 +2114,7 @@ def FormatQueryResult(result, unit=None, format_override=None, separator=None,
       stats[status] += 1
 
   columns = []
-  for fdef in result.fields:
+  for fdef in fdefs:
     assert fdef.title and fdef.name
     (fn, align_right) = _GetColumnFormatter(fdef, format_override, unit)
     columns.append(TableColumn(fdef.title,
@@ -1937,24 +2122,33 @@ def FormatQueryResult(result, unit=None, format_override=None, separator=None,
                                                      verbose),
                                align_right))
 
-  table = FormatTable(result.data, columns, header, separator)
+  return (columns, stats)
+
+
+def _GetQueryStatus(stats, fdefs):
+  """Determines the overall status of a formatted query result.
+
+  @type stats: dict
+  @param stats: Value statistics as collected by the columns returned by
+    L{_GetQueryColumns}
+  @type fdefs: list of L{objects.QueryFieldDefinition}
+  @param fdefs: Field definitions
+  @return: One of L{QR_NORMAL}, L{QR_UNKNOWN} or L{QR_INCOMPLETE}
 
-  # Collect statistics
+  """
   assert len(stats) == len(constants.RS_ALL)
   assert compat.all(count >= 0 for count in stats.values())
 
-  # Determine overall status. If there was no data, unknown fields must be
-  # detected via the field definitions.
+  # If there was no data, unknown fields must be detected via the field
+  # definitions
   if (stats[constants.RS_UNKNOWN] or
-      (not result.data and _GetUnknownFields(result.fields))):
-    status = QR_UNKNOWN
+      (not compat.any(stats.values()) and _GetUnknownFields(fdefs))):
+    return QR_UNKNOWN
   elif compat.any(count > 0 for key, count in stats.items()
                   if key != constants.RS_NORMAL):
-    status = QR_INCOMPLETE
+    return QR_INCOMPLETE
   else:
-    status = QR_NORMAL
-
-  return (status, table)
+    return QR_NORMAL
 
 
 def _GetUnknownFields(fdefs):
@@ -1984,7 +2178,8 @@ def _WarnUnknownFields(fdefs):
 
 def GenericList(resource, fields, names, unit, separator, header, cl=None,
                 format_override=None, verbose=False, force_filter=False,
-                namefield=None, qfilter=None, isnumeric=False):
+                namefield=None, qfilter=None, isnumeric=False,
+                live_max_age=None):
   """Generic implementation for listing all items of a resource.
 
   @param resource: One of L{constants.QR_VIA_LUXI}
@@ -2016,6 +2211,9 @@ def GenericList(resource, fields, names, unit, separator, header, cl=None,
   @param isnumeric: Whether the namefield's type is numeric, and therefore
     any simple filters built by namefield should use integer values to
     reflect that
+  @type live_max_age: int or None
+  @param live_max_age: Maximum age in seconds of reused live data, see
+    L{luxi.Client.Query}
 
   """
   if not names:
@@ -2032,18 +2230,28 @@ def GenericList(resource, fields, names, unit, separator, header, cl=None,
   if cl is None:
     cl = GetClient()
 
-  response = cl.Query(resource, fields, qfilter)
+  if namefield is None:
+    namefield = "name"
 
-  found_unknown = _WarnUnknownFields(response.fields)
+  if resource in _PAGED_QUERY_RESOURCES and fields != [namefield]:
+    (fdefs, rows) = _QueryPaged(cl, resource, fields, qfilter, namefield,
+                                _QUERY_PAGE_SIZE, live_max_age)
+  else:
+    response = cl.Query(resource, fields, qfilter, live_max_age=live_max_age)
+    (fdefs, rows) = (response.fields, response.data)
 
-  (status, data) = FormatQueryResult(response, unit=unit, separator=separator,
-                                     header=header,
-                                     format_override=format_override,
-                                     verbose=verbose)
+  found_unknown = _WarnUnknownFields(fdefs)
 
-  for line in data:
+  (columns, stats) = _GetQueryColumns(fdefs, unit, format_override, separator,
+                                      verbose)
+
+  # Lines are printed as soon as they are formatted
+  for line in _FormatTableLines(rows, columns, header, separator,
+                                _TABLE_SAMPLE_ROWS):
     ToStdout(line)
 
+  status = _GetQueryStatus(stats, fdefs)
+
   assert ((found_unknown and status == QR_UNKNOWN) or
           (not found_unknown and status != QR_UNKNOWN))
 
@@ -2054,6 +2262,63 @@ def GenericList(resource, fields, names, unit, separator, header, cl=None,
   return constants.EXIT_SUCCESS
 
 
+def _QueryPaged(cl, resource, fields, qfilter, namefield, page_size,
+                live_max_age):
+  """Queries a resource, retrieving the items' fields in pages.
+
+  The names of all matching items are queried first. If there are more than
+  C{page_size} items, the requested fields are retrieved for at most
+  C{page_size} items at a time while the rows are consumed, so only a single
+  page of results is held in memory. Otherwise all fields are retrieved with
+  a single query. Every page is selected by both the query filter and the
+  names of its items, so items which changed or were removed between the
+  queries are left out.
+
+  Live data is collected separately for every page, i.e. the nodes of a
+  page's items are contacted once per page.
+
+  @param cl: Luxi client
+  @param resource: One of L{constants.QR_VIA_LUXI}
+  @type fields: list of strings
+  @param fields: List of fields to query for
+  @type qfilter: list or None
+  @param qfilter: Query filter
+  @type namefield: string
+  @param namefield: Name of field uniquely identifying an item
+  @type page_size: int
+  @param page_size: Maximum number of items per query
+  @type live_max_age: int or None
+  @param live_max_age: Maximum age in seconds of reused live data
+  @rtype: tuple; (list of L{objects.QueryFieldDefinition}, iterator)
+  @return: The field definitions and an iterator over the result rows
+
+  """
+  names = [value
+           for ((status, value), ) in cl.Query(resource, [namefield], qfilter,
+                                               live_max_age=live_max_age).data
+           if status == constants.RS_NORMAL]
+
+  if len(names) <= page_size:
+    response = cl.Query(resource, fields, qfilter, live_max_age=live_max_age)
+    return (response.fields, response.data)
+
+  fdefs = cl.QueryFields(resource, fields).fields
+
+  def _GetRows():
+    for start in range(0, len(names), page_size):
+      page_filter = qlang.MakeSimpleFilter(namefield,
+                                           names[start:(start + page_size)])
+      if qfilter is not None:
+        page_filter = [qlang.OP_AND, qfilter, page_filter]
+
+      response = cl.Query(resource, fields, page_filter,
+                          live_max_age=live_max_age)
+      for row in response.data:
+        yield row
+
+  return (fdefs, _GetRows())
+
+
 def _FieldDescValues(fdef):
   """Helper function for L{GenericListFields} to get query field description.
 
@@ -2154,30 +2419,64 @@ def FormatTable(rows, columns, header, separator):
   @param separator: String used to separate columns
 
   """
+  return list(_FormatTableLines(rows, columns, header, separator, None))
+
+
+def _FormatTableLines(rows, columns, header, separator, sample_size):
+  """Formats data as a table, generating one line at a time.
+
+  Without a separator, the column widths are computed from the first
+  C{sample_size} rows, which are held back until then; all following rows
+  are formatted and returned as they are read. Values wider than the width
+  of their column are not truncated.
+
+  @type rows: iterable of lists
+  @param rows: Row data, one list per row
+  @type columns: list of L{TableColumn}
+  @param columns: Column descriptions
+  @type header: bool
+  @param header: Whether to show header row
+  @type separator: string or None
+  @param separator: String used to separate columns
+  @type sample_size: int or None
+  @param sample_size: Number of rows used to compute the column widths,
+    C{None} to use all rows
+
+  """
+  def _FormatRow(row):
+    assert len(row) == len(columns)
+    return [col.format(value) for value, col in zip(row, columns)]
+
+  if separator is not None:
+    # No column widths needed
+    if header:
+      yield separator.join(col.title for col in columns)
+
+    for row in rows:
+      yield separator.join(_FormatRow(row))
+
+    return
+
   if header:
-    data = [[col.title for col in columns]]
     colwidth = [len(col.title) for col in columns]
   else:
-    data = []
     colwidth = [0 for _ in columns]
 
-  # Format row data
-  for row in rows:
-    assert len(row) == len(columns)
+  rows = iter(rows)
+  sample = []
 
-    formatted = [col.format(value) for value, col in zip(row, columns)]
+  for row in rows:
+    formatted = _FormatRow(row)
 
-    if separator is None:
-      # Update column widths
-      for idx, (oldwidth, value) in enumerate(zip(colwidth, formatted)):
-        # Modifying a list's items while iterating is fine
-        colwidth[idx] = max(oldwidth, len(value))
+    # Update column widths
+    for idx, (oldwidth, value) in enumerate(zip(colwidth, formatted)):
+      # Modifying a list's items while iterating is fine
+      colwidth[idx] = max(oldwidth, len(value))
 
-    data.append(formatted)
+    sample.append(formatted)
 
-  if separator is not None:
-    # Return early if a separator is used
-    return [separator.join(row) for row in data]
+    if sample_size is not None and len(sample) >= sample_size:
+      break
 
   if columns and not columns[-1].align_right:
     # Avoid unnecessary spaces at end of line
@@ -2187,7 +2486,17 @@ def FormatTable(rows, columns, header, separator):
   fmt = " ".join([_GetColFormatString(width, col.align_right)
                   for col, width in zip(columns, colwidth)])
 
-  return [fmt % tuple(row) for row in data]
+  if header:
+    yield fmt % tuple(col.title for col in columns)
+
+  for formatted in sample:
+    yield fmt % tuple(formatted)
+
+  sample = None
+
+  # Rows after the sample
+  for row in rows:
+    yield fmt % tuple(_FormatRow(row))
 
 
 def FormatTimestamp(ts):
@@ -2417,6 +2726,47 @@ def ToStderr(txt, *args):
   _ToStream(sys.stderr, txt, *args)
 
 
+class _JobSetReportCb(JobPollReportCbBase):
+  """Reporting callbacks for several jobs polled at once.
+
+  Before reporting a log message of a job different from the one whose
+  message was reported last, the job is announced.
+
+  """
+  def __init__(self, reporter, names):
+    """Initializes this class.
+
+    @type reporter: L{JobPollReportCbBase}
+    @param reporter: Reporting callbacks to pass messages to
+    @type names: dict
+    @param names: Suffixes describing the jobs, keyed by job ID
+
+    """
+    JobPollReportCbBase.__init__(self)
+
+    self._reporter = reporter
+    self._names = names
+    self._last_job_id = None
+
+  def ReportLogMessage(self, job_id, serial, timestamp, log_type, log_msg):
+    """Handles a log message.
+
+    """
+    if job_id != self._last_job_id:
+      ToStdout("Waiting for job %s%s ...", job_id,
+               self._names.get(job_id, ""))
+      self._last_job_id = job_id
+
+    self._reporter.ReportLogMessage(job_id, serial, timestamp,
+                                    log_type, log_msg)
+
+  def ReportNotChanged(self, job_id, status):
+    """Called if a job hasn't changed in a while.
+
+    """
+    self._reporter.ReportNotChanged(job_id, status)
+
+
 class JobExecutor(object):
   """Class which manages the submission and execution of multiple jobs.
 
@@ -2476,30 +2826,6 @@ class JobExecutor(object):
     for ((status, data), (idx, name, _)) in zip(results, self.queue):
       self.jobs.append((idx, status, data, name))
 
-  def _ChooseJob(self):
-    """Choose a non-waiting/queued job to poll next.
-
-    """
-    assert self.jobs, "_ChooseJob called with empty job list"
-
-    result = self.cl.QueryJobs([i[2] for i in self.jobs[:_CHOOSE_BATCH]],
-                               ["status"])
-    assert result
-
-    for job_data, status in zip(self.jobs, result):
-      if (isinstance(status, list) and status and
-          status[0] in (constants.JOB_STATUS_QUEUED,
-                        constants.JOB_STATUS_WAITING,
-                        constants.JOB_STATUS_CANCELING)):
-        # job is still present and waiting
-        continue
-      # good candidate found (either running job or lost job)
-      self.jobs.remove(job_data)
-      return job_data
-
-    # no job found
-    return self.jobs.pop(0)
-
   def GetResults(self):
     """Wait for and return the results of all jobs.
 
@@ -2523,25 +2849,40 @@ class JobExecutor(object):
       ToStderr("Failed to submit job%s: %s", self._IfName(name, " for %s"), jid)
       results.append((idx, False, jid))
 
-    while self.jobs:
-      (idx, _, jid, name) = self._ChooseJob()
-      ToStdout("Waiting for job %s%s ...", jid, self._IfName(name, " for %s"))
-      try:
-        job_result = PollJob(jid, cl=self.cl, feedback_fn=self.feedback_fn)
-        success = True
-      except errors.JobLost, err:
-        _, job_result = FormatError(err)
-        ToStderr("Job %s%s has been archived, cannot check its result",
-                 jid, self._IfName(name, " for %s"))
-        success = False
-      except (errors.GenericError, rpcerr.ProtocolError), err:
-        _, job_result = FormatError(err)
-        success = False
-        # the error message will always be shown, verbose or not
+    jobs = dict((jid, (idx, name)) for (idx, _, jid, name) in self.jobs)
+    self.jobs = []
+
+    if self.feedback_fn:
+      reporter = FeedbackFnJobPollReportCb(self.feedback_fn)
+    else:
+      reporter = StdioJobPollReportCb()
+    names = dict((jid, self._IfName(name, " for %s"))
+                 for (jid, (_, name)) in jobs.items())
+    reporter = _JobSetReportCb(reporter, names)
+
+    try:
+      for (jid, success, job_result) in PollJobs(jobs.keys(), cl=self.cl,
+                                                 reporter=reporter):
+        (idx, name) = jobs.pop(jid)
+        if not success:
+          err = job_result
+          _, job_result = FormatError(err)
+          if isinstance(err, errors.JobLost):
+            ToStderr("Job %s%s has been archived, cannot check its result",
+                     jid, self._IfName(name, " for %s"))
+          else:
+            # the error message will always be shown, verbose or not
+            ToStderr("Job %s%s has failed: %s",
+                     jid, self._IfName(name, " for %s"), job_result)
+
+        results.append((idx, success, job_result))
+    except (errors.GenericError, rpcerr.ProtocolError), err:
+      # Polling failed, the remaining jobs' results can't be determined
+      _, job_result = FormatError(err)
+      for (jid, (idx, name)) in sorted(jobs.items()):
         ToStderr("Job %s%s has failed: %s",
                  jid, self._IfName(name, " for %s"), job_result)
-
-      results.append((idx, success, job_result))
+        results.append((idx, False, job_result))
 
     # sort based on the index, then drop it
     results.sort()
@@ -128,6 +128,7 @@ __all__ = [
   "IGNORE_SOFT_ERRORS_OPT",
   "IGNORE_SIZE_OPT",
   "INCLUDEDEFAULTS_OPT",
+  "INCREMENTAL_OPT",
   "INPUT_OPT",
   "INSTALL_IMAGE_OPT",
   "INSTANCE_COMMUNICATION_NETWORK_OPT",
@@ -141,6 +142,7 @@ __all__ = [
   "IPOLICY_STD_SPECS_STR",
   "IPOLICY_VCPU_RATIO",
   "IPOLICY_MEMORY_RATIO",
+  "LIVE_MAX_AGE_OPT",
   "LONG_SLEEP_OPT",
   "MAC_PREFIX_OPT",
   "MAINT_BALANCE_OPT",
@@ -1494,6 +1496,12 @@ FORCE_FILTER_OPT = cli_option("-F", "--filter", dest="force_filter",
                               help=("Whether command argument should be treated"
                                     " as filter"))
 
+LIVE_MAX_AGE_OPT = cli_option("--live-max-age", dest="live_max_age",
+                              type="int", default=None, metavar="<seconds>",
+                              help=("Maximum age of reused live data, e.g."
+                                    " the run state of instances (by default"
+                                    " it is always collected from the nodes)"))
+
 NO_REMEMBER_OPT = cli_option("--no-remember",
                              dest="no_remember",
                              action="store_true", default=False,
@@ -1683,6 +1691,11 @@ LONG_SLEEP_OPT = cli_option(
     "--long-sleep", default=False, dest="long_sleep",
     help="Allow long shutdowns when backing up instances", action="store_true")
 
+INCREMENTAL_OPT = cli_option(
+    "--incremental", default=False, dest="incremental",
+    help="Only transfer the disk chunks changed since the previous export",
+    action="store_true")
+
 INPUT_OPT = cli_option("--input", dest="input", default=None,
                        help=("input to be passed as stdin"
                              " to the repair command"),
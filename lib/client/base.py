@@ -32,7 +32,22 @@
 
 from ganeti import cli
 from ganeti import constants
-from ganeti import ht
+from ganeti import utils
+
+ht = utils.LazyModule("ganeti.ht")
+rpc = utils.LazyModule("ganeti.rpc.node")
+
+
+def RunWithRPC(fn):
+  """RPC-wrapper decorator importing the RPC module on first use.
+
+  Same as L{ganeti.rpc.node.RunWithRPC}, but commands not talking to nodes
+  directly don't pay for loading the RPC layer.
+
+  """
+  def wrapper(*args, **kwargs):
+    return rpc.RunWithRPC(fn)(*args, **kwargs)
+  return wrapper
 
 
 def GetResult(cl, opts, result):
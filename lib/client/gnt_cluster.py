@@ -42,28 +42,27 @@ import tempfile
 
 from cStringIO import StringIO
 
-import OpenSSL
-
 from ganeti.cli import *
-from ganeti import bootstrap
 from ganeti import compat
 from ganeti import constants
-from ganeti import config
 from ganeti import errors
 from ganeti import netutils
-from ganeti import objects
-from ganeti import opcodes
 from ganeti import pathutils
-from ganeti import qlang
-from ganeti.rpc.node import RunWithRPC
 from ganeti import serializer
 from ganeti import ssconf
-from ganeti import ssh
-from ganeti import uidpool
 from ganeti import utils
 from ganeti import wconfd
 from ganeti.client import base
 
+OpenSSL = utils.LazyModule("OpenSSL")
+bootstrap = utils.LazyModule("ganeti.bootstrap")
+config = utils.LazyModule("ganeti.config")
+objects = utils.LazyModule("ganeti.objects")
+opcodes = utils.LazyModule("ganeti.opcodes")
+qlang = utils.LazyModule("ganeti.qlang")
+ssh = utils.LazyModule("ganeti.ssh")
+uidpool = utils.LazyModule("ganeti.uidpool")
+
 
 ON_OPT = cli_option("--on", default=False,
                     action="store_true", dest="on",
@@ -159,7 +158,7 @@ def _InitDrbdHelper(opts, enabled_disk_templates, feedback_fn=ToStdout):
   return opts.drbd_helper
 
 
-@RunWithRPC
+@base.RunWithRPC
 def InitCluster(opts, args):
   """Initialize the cluster.
 
@@ -365,7 +364,7 @@ def InitCluster(opts, args):
   return 0
 
 
-@RunWithRPC
+@base.RunWithRPC
 def DestroyCluster(opts, args):
   """Destroy the cluster.
 
@@ -887,7 +886,7 @@ def RepairDiskSizes(opts, args):
   SubmitOpCode(op, opts=opts)
 
 
-@RunWithRPC
+@base.RunWithRPC
 def MasterFailover(opts, args):
   """Failover the master node.
 
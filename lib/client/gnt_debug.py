@@ -34,6 +34,7 @@
 # W0614: Unused import %s from wildcard import (since we need cli)
 # C0103: Invalid name gnt-backup
 
+import bisect
 import logging
 import socket
 import time
@@ -43,14 +44,15 @@ import simplejson
 from ganeti.cli import *
 from ganeti import cli
 from ganeti import constants
-from ganeti import opcodes
 from ganeti import utils
 from ganeti import errors
 from ganeti import compat
-from ganeti import ht
-from ganeti import metad
 from ganeti import wconfd
 
+opcodes = utils.LazyModule("ganeti.opcodes")
+ht = utils.LazyModule("ganeti.ht")
+metad = utils.LazyModule("ganeti.metad")
+
 
 #: Default fields for L{ListLocks}
 _LIST_LOCKS_DEF_FIELDS = [
@@ -593,6 +595,116 @@ def TestOsParams(opts, _):
   return 0
 
 
+#: Upper bounds in seconds of the buckets for the lock wait histogram
+_LOCK_WAIT_BUCKETS = [1, 10, 60, 600]
+
+
+def _AggregateLockStats(jobs):
+  """Aggregates the lock acquisition statistics of jobs.
+
+  @type jobs: list
+  @param jobs: list of (job ID, per-opcode lock acquisition statistics)
+  @rtype: tuple
+  @return: two dictionaries, one keyed by lock level and one by the owner
+      blocking the requests; values are dictionaries with the number of
+      C{attempts} and C{timeouts}, the C{total} and C{max} wait time and the
+      number of attempts per bucket of L{_LOCK_WAIT_BUCKETS} in C{buckets}
+
+  """
+  def _Add(container, key, stats):
+    entry = container.setdefault(key, {
+      "attempts": 0,
+      "timeouts": 0,
+      "total": 0.0,
+      "max": 0.0,
+      "buckets": [0] * (len(_LOCK_WAIT_BUCKETS) + 1),
+      })
+
+    wait = stats.get("wait", 0.0)
+
+    entry["attempts"] += 1
+    if not stats.get("granted"):
+      entry["timeouts"] += 1
+    entry["total"] += wait
+    entry["max"] = max(entry["max"], wait)
+    entry["buckets"][bisect.bisect_left(_LOCK_WAIT_BUCKETS, wait)] += 1
+
+  levels = {}
+  blockers = {}
+
+  for (_, oplocks) in jobs:
+    for op_stats in oplocks or []:
+      for stats in op_stats:
+        for level in stats.get("levels", []):
+          _Add(levels, level, stats)
+        for owner in stats.get("blockers", []):
+          _Add(blockers, str(owner), stats)
+
+  return (levels, blockers)
+
+
+def _ShowLockHistogram(opts):
+  """Shows where jobs spent their time waiting for locks.
+
+  The statistics are aggregated over all jobs still in the queue, once per
+  lock level and once per owner that blocked a request. For the latter, the
+  opcodes of the blocking job are shown.
+
+  @param opts: the command line options selected by the user
+  @rtype: int
+  @return: the desired exit code
+
+  """
+  jobs = GetClient().QueryJobs(None, ["id", "summary", "oplocks"])
+  summaries = dict((str(job_id), summary)
+                   for (job_id, summary, _) in jobs)
+  (levels, blockers) = \
+    _AggregateLockStats([(job_id, oplocks)
+                         for (job_id, _, oplocks) in jobs])
+
+  bucket_fields = ["le%s" % limit for limit in _LOCK_WAIT_BUCKETS] + ["more"]
+  bucket_headers = ["<=%ss" % limit for limit in _LOCK_WAIT_BUCKETS] + \
+                   [">%ss" % _LOCK_WAIT_BUCKETS[-1]]
+
+  def _Rows(aggregated, extra_fn):
+    rows = []
+    for (key, entry) in sorted(aggregated.items(),
+                               key=lambda (_, entry): entry["total"],
+                               reverse=True):
+      rows.append([key] + extra_fn(key) +
+                  [entry["attempts"], entry["timeouts"],
+                   "%.3f" % entry["total"], "%.3f" % entry["max"]] +
+                  entry["buckets"])
+    return rows
+
+  numfields = ["attempts", "timeouts", "total", "max"] + bucket_fields
+
+  for (title, aggregated, keyfield, extra_fields, extra_fn) in [
+    ("Level", levels, "level", [], lambda _: []),
+    ("Blocked by", blockers, "owner", [("opcodes", "Opcodes")],
+     lambda owner: [utils.CommaJoin(summaries.get(owner, ["-"]))]),
+    ]:
+    fields = [keyfield] + [name for (name, _) in extra_fields] + \
+             ["attempts", "timeouts", "total", "max"] + bucket_fields
+
+    if opts.no_headers:
+      headers = None
+    else:
+      headers = dict(zip(fields,
+                         [title] + [hdr for (_, hdr) in extra_fields] +
+                         ["Attempts", "Timeouts", "Total/s", "Max/s"] +
+                         bucket_headers))
+
+    for line in GenerateTable(headers, fields, opts.separator,
+                              _Rows(aggregated, extra_fn),
+                              numfields=numfields):
+      ToStdout(line)
+
+    ToStdout("")
+
+  return constants.EXIT_SUCCESS
+
+
 def ListLocks(opts, args): # pylint: disable=W0613
   """List all locks.
 
@@ -603,6 +715,9 @@ def ListLocks(opts, args): # pylint: disable=W0613
   @return: the desired exit code
 
   """
+  if opts.histogram:
+    return _ShowLockHistogram(opts)
+
   selected_fields = ParseFields(opts.output, _LIST_LOCKS_DEF_FIELDS)
 
   def _DashIfNone(fn):
@@ -801,8 +916,13 @@ commands = {
     "Test secret os parameter transmission"),
   "locks": (
     ListLocks, ARGS_NONE,
-    [NOHDR_OPT, SEP_OPT, FIELDS_OPT, INTERVAL_OPT, VERBOSE_OPT],
-    "[--interval N]", "Show a list of locks in the master daemon"),
+    [NOHDR_OPT, SEP_OPT, FIELDS_OPT, INTERVAL_OPT, VERBOSE_OPT,
+     cli_option("--histogram", default=False, action="store_true",
+                dest="histogram",
+                help="Show statistics about the time jobs in the queue"
+                " waited for locks, per lock level and per blocking job")],
+    "[--interval N] [--histogram]",
+    "Show a list of locks in the master daemon"),
   "wconfd": (
     Wconfd, [ArgUnknown(min=1)], [],
     "<cmd> <args...>", "Directly talk to WConfD"),
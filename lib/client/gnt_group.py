@@ -37,11 +37,12 @@ from cStringIO import StringIO
 
 from ganeti.cli import *
 from ganeti import constants
-from ganeti import opcodes
 from ganeti import utils
 from ganeti import compat
 from ganeti.client import base
 
+opcodes = utils.LazyModule("ganeti.opcodes")
+
 
 #: default list of fields for L{ListGroups}
 _LIST_DEF_FIELDS = ["name", "node_cnt", "pinst_cnt", "alloc_policy", "ndparams"]
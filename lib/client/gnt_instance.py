@@ -41,15 +41,16 @@ import logging
 import simplejson
 
 from ganeti.cli import *
-from ganeti import opcodes
 from ganeti import constants
 from ganeti import compat
 from ganeti import utils
 from ganeti import errors
 from ganeti import netutils
-from ganeti import ssh
-from ganeti import objects
-from ganeti import ht
+
+opcodes = utils.LazyModule("ganeti.opcodes")
+ssh = utils.LazyModule("ganeti.ssh")
+objects = utils.LazyModule("ganeti.objects")
+ht = utils.LazyModule("ganeti.ht")
 
 
 _EXPAND_CLUSTER = "cluster"
@@ -76,8 +77,6 @@ _LIST_DEF_FIELDS = [
 _MISSING = object()
 _ENV_OVERRIDE = compat.UniqueFrozenset(["list"])
 
-_INST_DATA_VAL = ht.TListOf(ht.TDict)
-
 
 def _ExpandMultiNames(mode, names, client=None):
   """Expand the given names using the passed mode.
@@ -237,7 +236,8 @@ def ListInstances(opts, args):
   return GenericList(constants.QR_INSTANCE, selected_fields, args, opts.units,
                      opts.separator, not opts.no_headers,
                      format_override=fmtoverride, verbose=opts.verbose,
-                     force_filter=opts.force_filter, cl=cl)
+                     force_filter=opts.force_filter,
+                     live_max_age=opts.live_max_age, cl=cl)
 
 
 def ListInstanceFields(opts, args):
@@ -285,8 +285,9 @@ def BatchCreate(opts, args):
     ToStderr("Can't parse the instance definition file: %s" % str(err))
     return 1
 
-  if not _INST_DATA_VAL(instance_data):
-    ToStderr("The instance definition file is not %s" % _INST_DATA_VAL)
+  inst_data_val = ht.TListOf(ht.TDict)
+  if not inst_data_val(instance_data):
+    ToStderr("The instance definition file is not %s" % inst_data_val)
     return 1
 
   instances = []
@@ -1661,7 +1662,7 @@ commands = {
   "list": (
     ListInstances, ARGS_MANY_INSTANCES,
     [NOHDR_OPT, SEP_OPT, USEUNITS_OPT, FIELDS_OPT, VERBOSE_OPT,
-     FORCE_FILTER_OPT],
+     FORCE_FILTER_OPT, LIVE_MAX_AGE_OPT],
     "[<instance>...]",
     "Lists the instances and their status. The available fields can be shown"
     " using the \"list-fields\" command (see the man page for details)."
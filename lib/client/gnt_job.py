@@ -40,7 +40,8 @@ from ganeti import constants
 from ganeti import errors
 from ganeti import utils
 from ganeti import cli
-from ganeti import qlang
+
+qlang = utils.LazyModule("ganeti.qlang")
 
 
 #: default list of fields for L{ListJobs}
@@ -303,6 +304,29 @@ def _ListOpcodeTimestamp(name, ts, container):
     container.append((name, "N/A", "opcode_timestamp"))
 
 
+def _FormatLockStats(stats):
+  """Formats the statistics about an attempt to acquire locks.
+
+  @type stats: dict
+  @param stats: the statistics as recorded by the processor
+  @rtype: list
+
+  """
+  if stats.get("granted"):
+    granted = FormatTimestamp(stats["granted"])
+  else:
+    granted = "not granted (timeout)"
+
+  return [
+    ("Levels", utils.CommaJoin(stats.get("levels", []))),
+    ("Locks", stats.get("count", 0)),
+    ("Requested", FormatTimestamp(stats["requested"])),
+    ("Granted", granted),
+    ("Waited", "%.6f seconds" % stats.get("wait", 0)),
+    ("Blocked by", utils.CommaJoin(stats.get("blockers", [])) or "-"),
+    ]
+
+
 def _CalcDelta(from_ts, to_ts):
   """ Calculates the delta between two timestamps.
 
@@ -339,7 +363,8 @@ def ShowJobs(opts, args):
   """
   selected_fields = [
     "id", "status", "ops", "opresult", "opstatus", "oplog",
-    "opstart", "opexec", "opend", "received_ts", "start_ts", "end_ts",
+    "opstart", "opexec", "opend", "oplocks", "received_ts", "start_ts",
+    "end_ts",
     ]
 
   qfilter = qlang.MakeSimpleFilter("id", _ParseJobIds(args))
@@ -350,8 +375,8 @@ def ShowJobs(opts, args):
 
   for entry in result:
     ((_, job_id), (rs_status, status), (_, ops), (_, opresult), (_, opstatus),
-     (_, oplog), (_, opstart), (_, opexec), (_, opend), (_, recv_ts),
-     (_, start_ts), (_, end_ts)) = entry
+     (_, oplog), (_, opstart), (_, opexec), (_, opend), (_, oplocks),
+     (_, recv_ts), (_, start_ts), (_, end_ts)) = entry
 
     # Detect non-normal results
     if rs_status != constants.RS_NORMAL:
@@ -379,8 +404,9 @@ def ShowJobs(opts, args):
       job_info.append(("Total processing time", "N/A"))
 
     opcode_container = []
-    for (opcode, result, status, log, s_ts, x_ts, e_ts) in \
-            zip(ops, opresult, opstatus, oplog, opstart, opexec, opend):
+    for (opcode, result, status, log, s_ts, x_ts, e_ts, lock_stats) in \
+            zip(ops, opresult, opstatus, oplog, opstart, opexec, opend,
+                oplocks):
       opcode_info = []
       opcode_info.append(("Opcode", opcode["OP_ID"]))
       opcode_info.append(("Status", status))
@@ -391,6 +417,8 @@ def ShowJobs(opts, args):
 
       opcode_info.append(("Input fields", opcode))
       opcode_info.append(("Result", result))
+      opcode_info.append(("Lock acquisition attempts",
+                          map(_FormatLockStats, lock_stats)))
 
       exec_log_container = []
       for serial, log_ts, log_type, log_msg in log:
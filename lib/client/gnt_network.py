@@ -38,10 +38,11 @@ import itertools
 
 from ganeti.cli import *
 from ganeti import constants
-from ganeti import opcodes
 from ganeti import utils
 from ganeti import errors
-from ganeti import objects
+
+opcodes = utils.LazyModule("ganeti.opcodes")
+objects = utils.LazyModule("ganeti.objects")
 
 
 #: default list of fields for L{ListNetworks}
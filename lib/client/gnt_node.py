@@ -40,19 +40,20 @@ import errno
 
 from ganeti.cli import *
 from ganeti import cli
-from ganeti import bootstrap
-from ganeti import opcodes
 from ganeti import utils
 from ganeti import constants
 from ganeti import errors
 from ganeti import netutils
 from ganeti import pathutils
-from ganeti.rpc.node import RunWithRPC
-from ganeti import ssh
 from ganeti import compat
+from ganeti.client import base
+
+bootstrap = utils.LazyModule("ganeti.bootstrap")
+opcodes = utils.LazyModule("ganeti.opcodes")
+ssh = utils.LazyModule("ganeti.ssh")
+confd = utils.LazyModule("ganeti.confd")
+confd_client = utils.LazyModule("ganeti.confd.client")
 
-from ganeti import confd
-from ganeti.confd import client as confd_client
 
 #: default list of field for L{ListNodes}
 _LIST_DEF_FIELDS = [
@@ -260,7 +261,7 @@ def _SetupSSH(options, cluster_name, node, ssh_port, cl):
   ssh.AddPublicKey(node, pub_key)
 
 
-@RunWithRPC
+@base.RunWithRPC
 def AddNode(opts, args):
   """Add a node to the cluster.
 
@@ -384,7 +385,8 @@ def ListNodes(opts, args):
   return GenericList(constants.QR_NODE, selected_fields, args, opts.units,
                      opts.separator, not opts.no_headers,
                      format_override=fmtoverride, verbose=opts.verbose,
-                     force_filter=opts.force_filter, cl=cl)
+                     force_filter=opts.force_filter,
+                     live_max_age=opts.live_max_age, cl=cl)
 
 
 def ListNodeFields(opts, args):
@@ -1209,7 +1211,7 @@ commands = {
   "list": (
     ListNodes, ARGS_MANY_NODES,
     [NOHDR_OPT, SEP_OPT, USEUNITS_OPT, FIELDS_OPT, VERBOSE_OPT,
-     FORCE_FILTER_OPT],
+     FORCE_FILTER_OPT, LIVE_MAX_AGE_OPT],
     "[nodes...]",
     "Lists the nodes in the cluster. The available fields can be shown using"
     " the \"list-fields\" command (see the man page for details)."
@@ -37,9 +37,10 @@
 
 from ganeti.cli import *
 from ganeti import constants
-from ganeti import opcodes
 from ganeti import utils
 
+opcodes = utils.LazyModule("ganeti.opcodes")
+
 
 def ListOS(opts, args):
   """List the valid OSes in the cluster.
@@ -36,9 +36,10 @@
 # C0103: Invalid name gnt-storage
 
 from ganeti.cli import *
-from ganeti import opcodes
 from ganeti import utils
 
+opcodes = utils.LazyModule("ganeti.opcodes")
+
 
 def ShowExtStorageInfo(opts, args):
   """List detailed information about ExtStorage providers.
@@ -132,6 +132,11 @@ class LUBackupExport(LogicalUnit):
       raise errors.OpPrereqError("Unless the instance is shut down, zeroing "
                                  "cannot be used.")
 
+    if (self.op.incremental and
+        self.op.mode != constants.EXPORT_MODE_LOCAL):
+      raise errors.OpPrereqError("Incremental exports are only supported in"
+                                 " local mode", errors.ECODE_INVAL)
+
   def ExpandNames(self):
     self._ExpandAndLockInstance()
 
@@ -467,8 +472,9 @@ class LUBackupExport(LogicalUnit):
         if self.DoReboot() and snapshots_available:
           self.StartInstance(feedback_fn, src_node_uuid)
         if self.op.mode == constants.EXPORT_MODE_LOCAL:
-          (fin_resu, dresults) = helper.LocalExport(self.dst_node,
-                                                    self.op.compress)
+          (fin_resu, dresults) = \
+            helper.LocalExport(self.dst_node, self.op.compress,
+                               incremental=self.op.incremental)
         elif self.op.mode == constants.EXPORT_MODE_REMOTE:
           connect_timeout = constants.RIE_CONNECT_TIMEOUT
           timeouts = masterd.instance.ImportExportTimeouts(connect_timeout)
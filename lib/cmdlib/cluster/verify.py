@@ -2090,28 +2090,29 @@ class LUClusterVerifyGroup(LogicalUnit, _VerifyErrors):
       cluster_name = self.cfg.GetClusterName()
       hvparams = self.cfg.GetClusterInfo().hvparams
 
-      all_nvinfo = self.rpc.call_node_verify(self.my_node_uuids,
-                                             node_verify_param,
-                                             cluster_name,
-                                             hvparams)
-      nvinfo_endtime = time.time()
+      # All node verify calls are independent of each other, so they are
+      # sent concurrently
+      batch = self.rpc.Batch()
+
+      all_nvinfo_fut = batch.call_node_verify(self.my_node_uuids,
+                                              node_verify_param,
+                                              cluster_name,
+                                              hvparams)
 
       if self.extra_lv_nodes and vg_name is not None:
         feedback_fn("* Gathering information about extra nodes (%s nodes)" %
                     len(self.extra_lv_nodes))
-        extra_lv_nvinfo = \
-            self.rpc.call_node_verify(self.extra_lv_nodes,
-                                      {constants.NV_LVLIST: vg_name},
-                                      self.cfg.GetClusterName(),
-                                      self.cfg.GetClusterInfo().hvparams)
+        extra_lv_nvinfo_fut = \
+            batch.call_node_verify(self.extra_lv_nodes,
+                                   {constants.NV_LVLIST: vg_name},
+                                   cluster_name, hvparams)
       else:
-        extra_lv_nvinfo = {}
+        extra_lv_nvinfo_fut = None
 
       # If not all nodes are being checked, we need to make sure the master
       # node and a non-checked vm_capable node are in the list.
       absent_node_uuids = set(self.all_node_info).difference(self.my_node_info)
       if absent_node_uuids:
-        vf_nvinfo = all_nvinfo.copy()
         vf_node_info = list(self.my_node_info.values())
         additional_node_uuids = []
         if master_node_uuid not in self.my_node_info:
@@ -2129,13 +2130,29 @@ class LUClusterVerifyGroup(LogicalUnit, _VerifyErrors):
         key = constants.NV_FILELIST
 
         feedback_fn("* Gathering information about the master node")
-        vf_nvinfo.update(self.rpc.call_node_verify(
+        additional_nvinfo_fut = batch.call_node_verify(
            additional_node_uuids, {key: node_verify_param[key]},
-           self.cfg.GetClusterName(), self.cfg.GetClusterInfo().hvparams))
+           cluster_name, hvparams)
       else:
-        vf_nvinfo = all_nvinfo
+        additional_nvinfo_fut = None
         vf_node_info = self.my_node_info.values()
 
+      batch.Run()
+      nvinfo_endtime = time.time()
+
+      all_nvinfo = all_nvinfo_fut.GetResult()
+
+      if extra_lv_nvinfo_fut is not None:
+        extra_lv_nvinfo = extra_lv_nvinfo_fut.GetResult()
+      else:
+        extra_lv_nvinfo = {}
+
+      if additional_nvinfo_fut is not None:
+        vf_nvinfo = all_nvinfo.copy()
+        vf_nvinfo.update(additional_nvinfo_fut.GetResult())
+      else:
+        vf_nvinfo = all_nvinfo
+
     all_drbd_map = self.cfg.ComputeDRBDMap()
 
     feedback_fn("* Gathering disk information (%s nodes)" %
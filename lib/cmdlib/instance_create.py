@@ -339,6 +339,7 @@ class LUInstanceCreate(LogicalUnit):
 
     """
     self.needed_locks = {}
+    self._plan_node_locks = False
 
     if self.op.commit:
       (uuid, name) = self.cfg.ExpandInstanceName(self.op.instance_name)
@@ -377,6 +378,10 @@ class LUInstanceCreate(LogicalUnit):
         if self.op.disk_template == constants.DT_DRBD8:
           self.opportunistic_locks_count[locking.LEVEL_NODE] = 2
           self.opportunistic_locks_count[locking.LEVEL_NODE_RES] = 2
+      else:
+        # The nodes are chosen in DeclareLocks, right before acquiring the
+        # node locks
+        self._plan_node_locks = self.op.node_lock_planning
     else:
       (self.op.pnode_uuid, self.op.pnode) = \
         ExpandNodeUuidAndName(self.cfg, self.op.pnode_uuid, self.op.pnode)
@@ -397,6 +402,7 @@ class LUInstanceCreate(LogicalUnit):
 
       if src_node is None:
         self.needed_locks[locking.LEVEL_NODE] = locking.ALL_SET
+        self._plan_node_locks = False
         self.op.src_node = None
         if os.path.isabs(src_path):
           raise errors.OpPrereqError("Importing an instance from a path"
@@ -431,16 +437,87 @@ class LUInstanceCreate(LogicalUnit):
     self.share_locks[locking.LEVEL_NODEGROUP] = 1
 
   def DeclareLocks(self, level):
-    if level == locking.LEVEL_NODE_RES:
+    if level == locking.LEVEL_NODE:
+      if self._plan_node_locks:
+        planned_nodes = self._PlanNodeLocks()
+        if planned_nodes is None:
+          self._plan_node_locks = False
+        else:
+          if self.op.src_node_uuid is not None:
+            planned_nodes.append(self.op.src_node_uuid)
+          self.needed_locks[locking.LEVEL_NODE] = planned_nodes
+          # The node locks may not be held yet when the node resource locks
+          # are declared, as the acquisition of both levels can be collated
+          self.needed_locks[locking.LEVEL_NODE_RES] = \
+            CopyLockList(planned_nodes)
+    elif level == locking.LEVEL_NODE_RES:
       if self.op.opportunistic_locking:
         self.needed_locks[locking.LEVEL_NODE_RES] = \
           CopyLockList(list(self.owned_locks(locking.LEVEL_NODE)))
 
+  def _PlanNodeLocks(self):
+    """Chooses the nodes for the new instance before locking them.
+
+    The iallocator is run on the current state of the cluster without holding
+    any node locks, so that only the chosen nodes need to be locked instead of
+    all nodes. As the state may change until the locks are acquired,
+    L{_RunAllocator} runs the iallocator again restricted to the locked nodes
+    and requests a retry with all nodes locked if that fails.
+
+    @rtype: list or None
+    @return: the UUIDs of the chosen nodes, or C{None} if no nodes could be
+        chosen
+
+    """
+    cluster = self.cfg.GetClusterInfo()
+
+    try:
+      # NICs are built without reserving MACs or IPs, as their only purpose
+      # is to describe the instance to the iallocator
+      nics = [objects.NIC(mac=nic.get(constants.INIC_MAC, None),
+                          ip=nic.get(constants.INIC_IP, None),
+                          network=self.cfg.LookupNetwork(
+                            nic.get(constants.INIC_NETWORK, None)),
+                          nicparams={})
+              for nic in self.op.nics]
+
+      req = CreateInstanceAllocRequest(self.op,
+                                       ComputeDisks(self.op.disks,
+                                                    self.op.disk_template,
+                                                    self.cfg.GetVGName()),
+                                       nics,
+                                       ComputeFullBeParams(self.op, cluster),
+                                       None)
+      ial = iallocator.IAllocator(self.cfg, self.rpc, req)
+      ial.Run(self.op.iallocator)
+    except errors.OpPrereqError, err:
+      logging.debug("Can't plan node locks, locking all nodes: %s", err)
+      return None
+
+    if not ial.success:
+      logging.debug("Can't plan node locks, iallocator '%s' failed: %s",
+                    self.op.iallocator, ial.info)
+      return None
+
+    node_uuids = []
+    for node_name in ial.result: # pylint: disable=E1133
+      (node_uuid, _) = self.cfg.ExpandNodeName(node_name)
+      if node_uuid is None:
+        return None
+      node_uuids.append(node_uuid)
+
+    logging.debug("Planned to lock nodes %s for instance %s",
+                  utils.CommaJoin(ial.result), self.op.instance_name)
+
+    return node_uuids
+
   def _RunAllocator(self):
     """Run the allocator based on input opcode.
 
     """
-    if self.op.opportunistic_locking:
+    restricted = self.op.opportunistic_locking or self._plan_node_locks
+
+    if restricted:
       # Only consider nodes for which a lock is held
       node_name_whitelist = self.cfg.GetNodeNames(
         set(self.owned_locks(locking.LEVEL_NODE)) &
@@ -457,11 +534,15 @@ class LUInstanceCreate(LogicalUnit):
     ial.Run(self.op.iallocator)
 
     if not ial.success:
-      # When opportunistic locks are used only a temporary failure is generated
-      if self.op.opportunistic_locking:
+      # When only some nodes are locked only a temporary failure is generated
+      if restricted:
         ecode = errors.ECODE_TEMP_NORES
-        self.LogInfo("IAllocator '%s' failed on opportunistically acquired"
-                     " nodes: %s", self.op.iallocator, ial.info)
+        if self.op.opportunistic_locking:
+          kind = "opportunistically acquired"
+        else:
+          kind = "planned"
+        self.LogInfo("IAllocator '%s' failed on %s nodes: %s",
+                     self.op.iallocator, kind, ial.info)
       else:
         ecode = errors.ECODE_NORES
 
@@ -1615,10 +1696,11 @@ class LUInstanceCreate(LogicalUnit):
 
   def PrepareRetry(self, feedback_fn):
     # A temporary lack of resources can only happen if opportunistic locking
-    # is used.
-    assert self.op.opportunistic_locking
+    # or node lock planning is used.
+    assert self.op.opportunistic_locking or self._plan_node_locks
 
-    logging.info("Opportunistic locking did not suceed, falling back to"
-                 " full lock allocation")
+    logging.info("Allocation on the locked nodes did not suceed, falling back"
+                 " to full lock allocation")
     feedback_fn("* falling back to full lock allocation")
     self.op.opportunistic_locking = False
+    self.op.node_lock_planning = False
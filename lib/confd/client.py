@@ -52,6 +52,10 @@ You can use the provided ConfdFilterCallback to act as a filter, only passing
 "newer" answer to your callback, and filtering out outdated ones, or ones
 confirming what you already got.
 
+Many queries can be batched into few datagrams with L{MakeMultiRequests}; the
+synchronous L{ConfdBatchClient} does so and can reuse recent answers from a
+L{ConfdReplyCache}.
+
 """
 
 # pylint: disable=E0203
@@ -471,6 +475,141 @@ class ConfdClientRequest(objects.ConfdRequest):
       raise errors.ConfdClientError("Invalid request type")
 
 
+def MakeMultiRequests(queries, max_queries=constants.CONFD_MAX_MULTI_QUERIES):
+  """Batches queries into multi-query requests.
+
+  The size of the replies can't be known in advance. If confd refuses a
+  request with C{CONFD_ERROR_TOO_LARGE}, its queries need to be sent in
+  smaller requests, as done by L{ConfdBatchClient}.
+
+  @type queries: list of tuples
+  @param queries: list of (request type, query) tuples
+  @type max_queries: int
+  @param max_queries: maximum number of queries per request
+  @rtype: list of L{ConfdClientRequest}
+  @return: the requests, each holding up to C{max_queries} consecutive
+      queries
+
+  """
+  for (rtype, _) in queries:
+    if rtype == constants.CONFD_REQ_MULTI or rtype not in constants.CONFD_REQS:
+      raise errors.ConfdClientError("Invalid request type %s in multi-query"
+                                    " request" % rtype)
+
+  return [ConfdClientRequest(type=constants.CONFD_REQ_MULTI,
+                             query=[[rtype, query] for (rtype, query)
+                                    in queries[i:i + max_queries]])
+          for i in range(0, len(queries), max_queries)]
+
+
+def SplitMultiReply(reply):
+  """Splits the reply to a multi-query request.
+
+  @type reply: L{objects.ConfdReply}
+  @param reply: the reply to a request created by L{MakeMultiRequests}
+  @rtype: list of L{objects.ConfdReply}
+  @return: the replies to the single queries, in the order of the request
+
+  """
+  if reply.status != constants.CONFD_REPL_STATUS_OK:
+    raise errors.ConfdClientError("Multi-query request failed: %s" %
+                                  (reply.answer, ))
+
+  return [objects.ConfdReply(protocol=reply.protocol, status=status,
+                             answer=answer, serial=serial)
+          for (status, answer, serial) in reply.answer]
+
+
+def _IsReplyTooLarge(reply):
+  """Checks whether confd refused a request because of the reply size.
+
+  @type reply: L{objects.ConfdReply}
+
+  """
+  return (reply.status == constants.CONFD_REPL_STATUS_ERROR and
+          reply.answer == constants.CONFD_ERROR_TOO_LARGE)
+
+
+def _FreezeQuery(query):
+  """Converts a query into a hashable value.
+
+  """
+  if isinstance(query, dict):
+    return tuple(sorted((key, _FreezeQuery(value))
+                        for (key, value) in query.items()))
+  elif isinstance(query, (list, tuple)):
+    return tuple(_FreezeQuery(value) for value in query)
+  else:
+    return query
+
+
+class ConfdReplyCache(object):
+  """Cache of confd replies, keyed by request type and query.
+
+  Entries expire after a fixed time. In addition, the cache is emptied
+  whenever a reply based on a newer configuration is seen, as any of the
+  cached answers may have been changed by it.
+
+  """
+  def __init__(self, ttl=constants.CONFD_CLIENT_CACHE_TTL, _time_fn=None):
+    """Constructor for ConfdReplyCache
+
+    @type ttl: number
+    @param ttl: time in seconds for which replies are cached
+
+    """
+    self._ttl = ttl
+    self._time_fn = _time_fn
+    self._serial = None
+    self._entries = {}
+
+  def _Now(self):
+    if self._time_fn is None:
+      return time.time()
+    return self._time_fn()
+
+  def Get(self, rtype, query):
+    """Returns a cached reply.
+
+    @rtype: L{objects.ConfdReply} or None
+    @return: the cached reply, or C{None} if there is no current one
+
+    """
+    key = (rtype, _FreezeQuery(query))
+    entry = self._entries.get(key, None)
+    if entry is None:
+      return None
+
+    (expiry, reply) = entry
+    if self._Now() >= expiry:
+      del self._entries[key]
+      return None
+
+    return reply
+
+  def Put(self, rtype, query, reply, serial):
+    """Caches a reply.
+
+    Only successful replies are cached; replies based on a configuration
+    older than the one of the cached entries are ignored.
+
+    @type reply: L{objects.ConfdReply}
+    @param reply: the reply to the query
+    @type serial: int
+    @param serial: serial number of the configuration the reply is based on
+
+    """
+    if self._serial is None or serial > self._serial:
+      self._entries.clear()
+      self._serial = serial
+    elif serial < self._serial:
+      return
+
+    if reply.status == constants.CONFD_REPL_STATUS_OK:
+      self._entries[(rtype, _FreezeQuery(query))] = \
+        (self._Now() + self._ttl, reply)
+
+
 class ConfdFilterCallback(object):
   """Callback that calls another callback, but filters duplicate results.
 
@@ -685,6 +824,103 @@ class StoreResultCallback(object):
       self._HandleExpire(up)
 
 
+class ConfdBatchClient(object):
+  """Synchronous client answering many queries with few requests.
+
+  The queries are batched into multi-query requests, which are all sent
+  before waiting for any of the replies. The underlying L{ConfdClient} is
+  kept for the lifetime of this object, and answers can be reused for a
+  short time through a L{ConfdReplyCache}.
+
+  """
+  def __init__(self, cache=None, coverage=0,
+               timeout=constants.CONFD_CLIENT_EXPIRE_TIMEOUT,
+               _client_fn=None):
+    """Constructor for ConfdBatchClient
+
+    @type cache: L{ConfdReplyCache} or None
+    @param cache: cache for the replies, if any
+    @type coverage: integer
+    @param coverage: number of remote nodes to contact, see
+        L{ConfdClient.SendRequest}
+    @type timeout: number
+    @param timeout: maximum time in seconds to wait for the replies to
+        all the queries of a call to L{Query}
+
+    """
+    if _client_fn is None:
+      _client_fn = GetConfdClient
+
+    self._store_cb = StoreResultCallback()
+    self._client = _client_fn(ConfdFilterCallback(self._store_cb))
+    self._cache = cache
+    self._coverage = coverage
+    self._timeout = timeout
+
+  def _SendRequests(self, requests):
+    """Sends requests without waiting for their replies.
+
+    """
+    for req in requests:
+      self._client.SendRequest(req, coverage=self._coverage, async=False)
+
+  def Query(self, queries):
+    """Answers a list of queries.
+
+    @type queries: list of tuples
+    @param queries: list of (request type, query) tuples
+    @rtype: list
+    @return: for each query, the L{objects.ConfdReply} answering it, or
+        C{None} if no answer was received in time
+
+    """
+    results = [None] * len(queries)
+    pending = []
+    indices = {}
+
+    for (idx, (rtype, query)) in enumerate(queries):
+      if self._cache:
+        results[idx] = self._cache.Get(rtype, query)
+      if results[idx] is None:
+        key = (rtype, _FreezeQuery(query))
+        if key not in indices:
+          pending.append((rtype, query))
+        indices.setdefault(key, []).append(idx)
+
+    requests = MakeMultiRequests(pending)
+    self._SendRequests(requests)
+
+    deadline = time.time() + self._timeout
+    while requests:
+      req = requests.pop(0)
+      self._client.WaitForReply(req.rsalt,
+                                timeout=max(0, deadline - time.time()))
+      (have_answer, up) = self._store_cb.GetResponse(req.rsalt)
+      if not have_answer:
+        continue
+
+      if _IsReplyTooLarge(up.server_reply) and len(req.query) > 1:
+        # The answers to fewer queries fit into a datagram
+        smaller = MakeMultiRequests(req.query,
+                                    max_queries=(len(req.query) + 1) // 2)
+        self._SendRequests(smaller)
+        requests.extend(smaller)
+        continue
+
+      try:
+        replies = SplitMultiReply(up.server_reply)
+      except errors.ConfdClientError:
+        continue
+
+      for ((rtype, query), reply) in zip(req.query, replies):
+        if self._cache:
+          self._cache.Put(rtype, query, reply, up.server_reply.serial)
+        for idx in indices[(rtype, _FreezeQuery(query))]:
+          results[idx] = reply
+
+    return results
+
+
 def GetConfdClient(callback):
   """Return a client configured using the given callback.
 
@@ -60,6 +60,7 @@ from ganeti.config.verify import (VerifyType, VerifyNic, VerifyIpolicy,
                                   ValidateConfig)
 
 from ganeti import errors
+from ganeti import jstats
 from ganeti import utils
 from ganeti import constants
 import ganeti.wconfd as wc
@@ -2676,31 +2677,32 @@ class ConfigWriter(object):
       # Upgrade configuration if needed
       self._UpgradeConfig(saveafter=True)
     else:
-      if shared and not force:
-        if self._config_data is None:
-          logging.debug("Requesting config, as I have no up-to-date copy")
-          dict_data = self._wconfd.ReadConfig()
-          logging.debug("Configuration received")
+      with jstats.Measure("config-read"):
+        if shared and not force:
+          if self._config_data is None:
+            logging.debug("Requesting config, as I have no up-to-date copy")
+            dict_data = self._wconfd.ReadConfig()
+            logging.debug("Configuration received")
+          else:
+            dict_data = None
         else:
-          dict_data = None
-      else:
-        # poll until we acquire the lock
-        while True:
-          logging.debug("Receiving config from WConfd.LockConfig [shared=%s]",
-                        bool(shared))
-          dict_data = \
-              self._wconfd.LockConfig(self._GetWConfdContext(), bool(shared))
-          if dict_data is not None:
-            logging.debug("Received config from WConfd.LockConfig")
-            break
-          time.sleep(random.random())
+          # poll until we acquire the lock
+          while True:
+            logging.debug("Receiving config from WConfd.LockConfig [shared=%s]",
+                          bool(shared))
+            dict_data = \
+                self._wconfd.LockConfig(self._GetWConfdContext(), bool(shared))
+            if dict_data is not None:
+              logging.debug("Received config from WConfd.LockConfig")
+              break
+            time.sleep(random.random())
 
-      try:
-        if dict_data is not None:
-          self._SetConfigData(objects.ConfigData.FromDict(dict_data))
-          self._UpgradeConfig()
-      except Exception, err:
-        raise errors.ConfigurationError(err)
+        try:
+          if dict_data is not None:
+            self._SetConfigData(objects.ConfigData.FromDict(dict_data))
+            self._UpgradeConfig()
+        except Exception, err:
+          raise errors.ConfigurationError(err)
 
   def _CloseConfig(self, save):
     """Release resources relating the config data.
@@ -2711,7 +2713,8 @@ class ConfigWriter(object):
     if save:
       try:
         logging.debug("Writing configuration and unlocking it")
-        self._WriteConfig(releaselock=True)
+        with jstats.Measure("config-write"):
+          self._WriteConfig(releaselock=True)
         logging.debug("Configuration write, unlock finished")
       except Exception, err:
         logging.critical("Can't write the configuration: %s", str(err))
@@ -68,6 +68,9 @@ HTTP_DATE = "Date"
 HTTP_USER_AGENT = "User-Agent"
 HTTP_CONTENT_TYPE = "Content-Type"
 HTTP_CONTENT_LENGTH = "Content-Length"
+HTTP_CONTENT_ENCODING = "Content-Encoding"
+HTTP_ACCEPT_ENCODING = "Accept-Encoding"
+HTTP_IF_NONE_MATCH = "If-None-Match"
 HTTP_CONNECTION = "Connection"
 HTTP_KEEP_ALIVE = "Keep-Alive"
 HTTP_WWW_AUTHENTICATE = "WWW-Authenticate"
@@ -133,6 +136,18 @@ class HttpException(Exception):
     self.headers = headers
 
 
+class HttpNotModified(HttpException):
+  """304 Not Modified
+
+  RFC2616, section 10.3.5: If the client has performed a conditional GET
+  request and access is allowed, but the document has not been modified,
+  the server SHOULD respond with this status code. The 304 response MUST
+  NOT contain a message-body.
+
+  """
+  code = 304
+
+
 class HttpBadRequest(HttpException):
   """400 Bad Request
 
@@ -342,6 +357,74 @@ def ParseHeaders(buf):
   return mimetools.Message(buf, 0)
 
 
+def ParseContentCodings(value):
+  """Parses a list of content codings.
+
+  Used for the C{Accept-Encoding} and C{Content-Encoding} headers. Quality
+  values are ignored, except that codings with a quality of zero are left
+  out.
+
+  @type value: string or None
+  @param value: Header value
+  @rtype: frozenset
+  @return: Lowercase names of the content codings
+
+  """
+  if not value:
+    return frozenset()
+
+  result = set()
+
+  for item in value.split(","):
+    parts = [i.strip() for i in item.split(";")]
+    coding = parts[0].lower()
+
+    if not coding:
+      continue
+
+    rejected = False
+    for param in parts[1:]:
+      (name, _, qvalue) = param.partition("=")
+      if name.strip().lower() == "q":
+        try:
+          rejected = (float(qvalue) == 0)
+        except ValueError:
+          rejected = True
+
+    if not rejected:
+      result.add(coding)
+
+  return frozenset(result)
+
+
+def ETagMatches(value, etag):
+  """Checks whether an C{If-None-Match} header matches an entity tag.
+
+  Uses the weak comparison function, as required for C{If-None-Match}.
+
+  @type value: string or None
+  @param value: Header value
+  @type etag: string
+  @param etag: Quoted entity tag of the current representation
+  @rtype: bool
+
+  """
+  if not value:
+    return False
+
+  def _Opaque(tag):
+    if tag.startswith("W/"):
+      return tag[2:]
+    return tag
+
+  for item in value.split(","):
+    item = item.strip()
+    if item == "*" or _Opaque(item) == _Opaque(etag):
+      return True
+
+  return False
+
+
 def SocketOperation(sock, op, arg1, timeout):
   """Wrapper around socket functions.
 
@@ -109,6 +109,7 @@ class HttpClientRequest(object):
 
     # Response attributes
     self.resp_status_code = None
+    self.resp_headers = None
     self.resp_body = None
 
   def __repr__(self):
@@ -154,8 +155,9 @@ def _StartRequest(curl, req):
   assert isinstance(post_data, str)
   assert compat.all(isinstance(i, str) for i in headers)
 
-  # Buffer for response
+  # Buffers for response
   resp_buffer = StringIO()
+  resp_header_lines = []
 
   # Configure client for request
   curl.setopt(pycurl.VERBOSE, False)
@@ -177,16 +179,39 @@ def _StartRequest(curl, req):
     curl.setopt(pycurl.SSL_SESSIONID_CACHE, False)
 
   curl.setopt(pycurl.WRITEFUNCTION, resp_buffer.write)
+  curl.setopt(pycurl.HEADERFUNCTION, resp_header_lines.append)
 
   # Pass cURL object to external config function
   if req.curl_config_fn:
     req.curl_config_fn(curl)
 
-  return _PendingRequest(curl, req, resp_buffer.getvalue)
+  return _PendingRequest(curl, req, resp_buffer.getvalue,
+                         compat.partial(_ParseResponseHeaders,
+                                        resp_header_lines))
+
+
+def _ParseResponseHeaders(lines):
+  """Parses the response headers received by cURL.
+
+  cURL passes the headers of all responses, including interim ones (e.g.
+  "100 Continue"), so only the lines following the last status line are
+  used.
+
+  @type lines: list of strings
+  @param lines: Header lines including line endings
+  @rtype: C{mimetools.Message}
+
+  """
+  start = 0
+  for (idx, line) in enumerate(lines):
+    if line.startswith("HTTP/"):
+      start = idx + 1
+
+  return http.ParseHeaders(StringIO("".join(lines[start:])))
 
 
 class _PendingRequest(object):
-  def __init__(self, curl, req, resp_buffer_read):
+  def __init__(self, curl, req, resp_buffer_read, resp_headers_fn):
     """Initializes this class.
 
     @type curl: pycurl.Curl
@@ -195,6 +220,8 @@ class _PendingRequest(object):
     @param req: HTTP request
     @type resp_buffer_read: callable
     @param resp_buffer_read: Function to read response body
+    @type resp_headers_fn: callable
+    @param resp_headers_fn: Function returning the parsed response headers
 
     """
     assert req.success is None
@@ -202,6 +229,7 @@ class _PendingRequest(object):
     self._curl = curl
     self._req = req
     self._resp_buffer_read = resp_buffer_read
+    self._resp_headers_fn = resp_headers_fn
 
   def GetCurlHandle(self):
     """Returns the cURL object.
@@ -242,11 +270,13 @@ class _PendingRequest(object):
 
     # Get HTTP response code
     req.resp_status_code = curl.getinfo(pycurl.RESPONSE_CODE)
+    req.resp_headers = self._resp_headers_fn()
     req.resp_body = self._resp_buffer_read()
 
     # Ensure no potentially large variables are referenced
     curl.setopt(pycurl.POSTFIELDS, "")
     curl.setopt(pycurl.WRITEFUNCTION, lambda _: None)
+    curl.setopt(pycurl.HEADERFUNCTION, lambda _: None)
 
     if req.completion_cb:
       req.completion_cb(req)
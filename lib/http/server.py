@@ -35,7 +35,9 @@ import BaseHTTPServer
 import cgi
 import logging
 import os
+import select
 import socket
+import threading
 import time
 import signal
 import asyncore
@@ -45,6 +47,7 @@ from ganeti import utils
 from ganeti import netutils
 from ganeti import compat
 from ganeti import errors
+from ganeti import workerpool
 
 
 WEEKDAYNAME = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
@@ -225,6 +228,34 @@ class _HttpClientToServerMessageReader(http.HttpMessageReader):
 
     return http.HttpClientToServerStartLine(method, path, version)
 
+  def _ParseHeaders(self):
+    """Parses the headers.
+
+    Also determines whether the client wants to keep the connection open.
+
+    """
+    http.HttpMessageReader._ParseHeaders(self)
+
+    # Unlike for responses, a request without a Content-Length header has no
+    # body, hence the peer_will_close attribute doesn't apply
+    self.keep_alive = not self._WillPeerCloseConnection()
+
+
+def _CanKeepAlive(keep_alive, force_close, req_msg_reader):
+  """Returns whether a connection is kept open after a response.
+
+  @type keep_alive: bool
+  @param keep_alive: Whether the server allows keeping the connection open
+  @type force_close: bool
+  @param force_close: Whether the connection must be closed (e.g. because of
+    an error)
+  @param req_msg_reader: Request message reader
+
+  """
+  return bool(keep_alive and not force_close and
+              req_msg_reader is not None and
+              getattr(req_msg_reader, "keep_alive", False))
+
 
 def _HandleServerRequestInner(handler, req_msg, reader):
   """Calls the handler function for the current request.
@@ -279,13 +310,16 @@ class HttpResponder(object):
     """
     self._handler = handler
 
-  def __call__(self, fn):
+  def __call__(self, fn, keep_alive=False):
     """Handles a request.
 
     @type fn: callable
     @param fn: Callback for retrieving HTTP request, must return a tuple
       containing request message (L{http.HttpMessage}) and C{None} or the
       message reader (L{_HttpClientToServerMessageReader})
+    @type keep_alive: bool
+    @param keep_alive: Whether the connection may be kept open for further
+      requests if the client asks for it
 
     """
     response_msg = http.HttpMessage()
@@ -294,6 +328,9 @@ class HttpResponder(object):
                                        code=None, reason=None)
 
     force_close = True
+    request_msg = None
+    req_msg_reader = None
+    start = time.time()
 
     try:
       (request_msg, req_msg_reader) = fn()
@@ -317,8 +354,16 @@ class HttpResponder(object):
       # Only wait for client to close if we didn't have any exception.
       force_close = False
 
+    if request_msg is not None:
+      self._handler.RequestFinished(request_msg.start_line.method,
+                                    response_msg.start_line.code,
+                                    time.time() - start)
+
+    keep_alive = _CanKeepAlive(keep_alive, force_close, req_msg_reader)
+
     return (request_msg, req_msg_reader, force_close,
-            self._Finalize(self.responses, response_msg))
+            self._Finalize(self.responses, response_msg,
+                           keep_alive=keep_alive))
 
   @staticmethod
   def _SetError(responses, handler, response_msg, err):
@@ -358,15 +403,26 @@ class HttpResponder(object):
     response_msg.body = body
 
   @staticmethod
-  def _Finalize(responses, msg):
+  def _Finalize(responses, msg, keep_alive=False):
     assert msg.start_line.reason is None
 
     if not msg.headers:
       msg.headers = {}
 
+    if keep_alive:
+      connection = "keep-alive"
+
+      # Without closing the connection, the client can only tell where the
+      # response ends from its length
+      if not (msg.body or
+              msg.start_line.code in (http.HTTP_NO_CONTENT,
+                                      http.HTTP_NOT_MODIFIED)):
+        msg.headers[http.HTTP_CONTENT_LENGTH] = 0
+    else:
+      connection = "close"
+
     msg.headers.update({
-      # TODO: Keep-alive is not supported
-      http.HTTP_CONNECTION: "close",
+      http.HTTP_CONNECTION: connection,
       http.HTTP_DATE: _DateTimeHeader(),
       http.HTTP_SERVER: http.HTTP_GANETI_VERSION,
       })
@@ -389,8 +445,9 @@ class HttpServerRequestExecutor(object):
 
   This class implements the server side of HTTP. It's based on code of
   Python's BaseHTTPServer, from both version 2.4 and 3k. It does not
-  support non-ASCII character encodings. Keep-alive connections are
-  not supported.
+  support non-ASCII character encodings. If the server allows it,
+  connections are kept open for further requests (keep-alive); pipelined
+  requests are not supported.
 
   """
   # Timeouts in seconds for socket layer
@@ -398,6 +455,15 @@ class HttpServerRequestExecutor(object):
   READ_TIMEOUT = 10
   CLOSE_TIMEOUT = 1
 
+  #: How long an idle connection is kept open, in seconds
+  KEEPALIVE_TIMEOUT = 5
+
+  #: Maximum number of requests per connection
+  KEEPALIVE_MAX_REQUESTS = 100
+
+  #: How often to check for connections waiting for a worker while idle
+  _IDLE_CHECK_INTERVAL = 0.5
+
   def __init__(self, server, handler, sock, client_addr):
     """Initializes this class.
 
@@ -428,16 +494,43 @@ class HttpServerRequestExecutor(object):
             # Ignore rest
             return
 
-        (request_msg, request_msg_reader, force_close, response_msg) = \
-          responder(compat.partial(self._ReadRequest, sock, self.READ_TIMEOUT))
-        if response_msg:
-          # HttpMessage.start_line can be of different types
-          # Instance of 'HttpClientToServerStartLine' has no 'code' member
-          # pylint: disable=E1103,E1101
-          logging.info("%s:%s %s %s", client_addr[0], client_addr[1],
-                       request_msg.start_line, response_msg.start_line.code)
-          self._SendResponse(sock, request_msg, response_msg,
-                             self.WRITE_TIMEOUT)
+        count = 0
+        while True:
+          count += 1
+          keep_alive = (server.keep_alive and
+                        count < self.KEEPALIVE_MAX_REQUESTS)
+
+          try:
+            (request_msg, request_msg_reader, force_close, response_msg) = \
+              responder(compat.partial(self._ReadRequest, sock,
+                                       self.READ_TIMEOUT),
+                        keep_alive=keep_alive)
+          except http.HttpError, err:
+            if count == 1:
+              raise
+            # The client closed the connection instead of sending another
+            # request
+            logging.debug("Not reading further requests from %s:%s: %s",
+                          client_addr[0], client_addr[1], err)
+            force_close = True
+            break
+
+          if response_msg:
+            # HttpMessage.start_line can be of different types
+            # Instance of 'HttpClientToServerStartLine' has no 'code' member
+            # pylint: disable=E1103,E1101
+            logging.info("%s:%s %s %s", client_addr[0], client_addr[1],
+                         request_msg.start_line, response_msg.start_line.code)
+            self._SendResponse(sock, request_msg, response_msg,
+                               self.WRITE_TIMEOUT)
+
+          if not (response_msg and
+                  _CanKeepAlive(keep_alive, force_close, request_msg_reader)):
+            break
+
+          if not self._WaitForRequest(server, sock):
+            force_close = True
+            break
       finally:
         http.ShutdownConnection(sock, self.CLOSE_TIMEOUT, self.WRITE_TIMEOUT,
                                 request_msg_reader, force_close)
@@ -446,6 +539,34 @@ class HttpServerRequestExecutor(object):
     finally:
       logging.debug("Disconnected %s:%s", client_addr[0], client_addr[1])
 
+  def _WaitForRequest(self, server, sock):
+    """Waits for the client to send another request on the connection.
+
+    Gives up after L{KEEPALIVE_TIMEOUT} seconds, or earlier if other
+    connections are waiting for the server.
+
+    @rtype: bool
+    @return: Whether data has arrived
+
+    """
+    # Data might already be buffered by OpenSSL
+    if getattr(sock, "pending", None) and sock.pending():
+      return True
+
+    end = time.time() + self.KEEPALIVE_TIMEOUT
+    while True:
+      if server.HasWaitingConnections():
+        return False
+
+      remaining = end - time.time()
+      if remaining <= 0:
+        return False
+
+      if utils.WaitForFdCondition(sock, select.POLLIN,
+                                  min(remaining,
+                                      self._IDLE_CHECK_INTERVAL)) is not None:
+        return True
+
   @staticmethod
   def _ReadRequest(sock, timeout):
     """Reads a request sent by client.
@@ -475,14 +596,41 @@ class HttpServerRequestExecutor(object):
       raise http.HttpError("Error sending response: %s" % err)
 
 
+class _HttpServerWorker(workerpool.BaseWorker):
+  """Worker thread handling the connections of a threaded L{HttpServer}.
+
+  """
+  def RunTask(self, server, connection, client_addr, t_start):
+    """Handles one client connection.
+
+    """
+    # pylint: disable=W0212
+    server._ConnectionStarted()
+    try:
+      server._HandleConnection(connection, client_addr, t_start)
+    except Exception: # pylint: disable=W0703
+      logging.exception("Error while handling request from %s:%s",
+                        client_addr[0], client_addr[1])
+      try:
+        connection.close()
+      except socket.error:
+        pass
+
+
 class HttpServer(http.HttpBase, asyncore.dispatcher):
   """Generic HTTP server class
 
+  By default every connection is handled in a child process of its own.
+  A threaded server instead handles connections in a pool of worker
+  threads, which avoids the cost of forking and allows state, such as
+  connections to other daemons, to be shared between requests.
+
   """
 
   def __init__(self, mainloop, local_address, port, max_clients, handler,
                ssl_params=None, ssl_verify_peer=False,
-               request_executor_class=None, ssl_verify_callback=None):
+               request_executor_class=None, ssl_verify_callback=None,
+               threaded=False, keep_alive=False):
     """Initializes the HTTP server
 
     @type mainloop: ganeti.daemon.Mainloop
@@ -504,6 +652,12 @@ class HttpServer(http.HttpBase, asyncore.dispatcher):
     @type request_executor_class: class
     @param request_executor_class: a class derived from the
         HttpServerRequestExecutor class
+    @type threaded: bool
+    @param threaded: whether to handle connections in C{max_clients} worker
+        threads instead of child processes
+    @type keep_alive: bool
+    @param keep_alive: whether to keep connections open for further requests
+        if clients ask for it
 
     """
     http.HttpBase.__init__(self)
@@ -529,14 +683,43 @@ class HttpServer(http.HttpBase, asyncore.dispatcher):
     self.set_socket(self.socket)
     self.accepting = True
     self.max_clients = max_clients
+    self.keep_alive = keep_alive
     mainloop.RegisterSignal(self)
 
+    self._waiting_lock = threading.Lock()
+    self._waiting = 0
+    if threaded:
+      self._pool = workerpool.WorkerPool("HttpServer", max_clients,
+                                         _HttpServerWorker)
+    else:
+      self._pool = None
+
   def Start(self):
     self.socket.bind((self.local_address, self.port))
     self.socket.listen(1024)
 
   def Stop(self):
     self.socket.close()
+    if self._pool is not None:
+      self._pool.TerminateWorkers()
+
+  def HasWaitingConnections(self):
+    """Returns whether accepted connections are waiting for a worker thread.
+
+    Always C{False} for servers forking a child process per connection.
+
+    """
+    return self._waiting > 0
+
+  def _ConnectionStarted(self):
+    """Called by a worker thread when it starts handling a connection.
+
+    """
+    self._waiting_lock.acquire()
+    try:
+      self._waiting -= 1
+    finally:
+      self._waiting_lock.release()
 
   def handle_accept(self):
     self._IncomingConnection()
@@ -582,6 +765,15 @@ class HttpServer(http.HttpBase, asyncore.dispatcher):
     t_start = time.time()
     (connection, client_addr) = self.socket.accept()
 
+    if self._pool is not None:
+      self._waiting_lock.acquire()
+      try:
+        self._waiting += 1
+      finally:
+        self._waiting_lock.release()
+      self._pool.AddTask((self, connection, client_addr, t_start))
+      return
+
     self._CollectChildren(False)
 
     try:
@@ -612,12 +804,7 @@ class HttpServer(http.HttpBase, asyncore.dispatcher):
         # In case the handler code uses temporary files
         utils.ResetTempfileModule()
 
-        t_setup = time.time()
-        self.request_executor(self, self.handler, connection, client_addr)
-        t_end = time.time()
-        logging.debug("Request from %s:%s executed in: %.4f [setup: %.4f] "
-                      "[workers: %d]", client_addr[0], client_addr[1],
-                      t_end - t_start, t_setup - t_start, len(self._children))
+        self._HandleConnection(connection, client_addr, t_start)
 
       except Exception: # pylint: disable=W0703
         logging.exception("Error while handling request from %s:%s",
@@ -627,6 +814,21 @@ class HttpServer(http.HttpBase, asyncore.dispatcher):
     else:
       self._children.append(pid)
 
+  def _HandleConnection(self, connection, client_addr, t_start):
+    """Handles the requests sent over a client connection.
+
+    """
+    t_setup = time.time()
+    self.request_executor(self, self.handler, connection, client_addr)
+    t_end = time.time()
+    if self._pool is None:
+      workers = len(self._children)
+    else:
+      workers = self.max_clients
+    logging.debug("Request from %s:%s executed in: %.4f [setup: %.4f] "
+                  "[workers: %d]", client_addr[0], client_addr[1],
+                  t_end - t_start, t_setup - t_start, workers)
+
 
 class HttpServerHandler(object):
   """Base class for handling HTTP server requests.
@@ -650,6 +852,20 @@ class HttpServerHandler(object):
     """
     raise NotImplementedError()
 
+  def RequestFinished(self, method, code, duration):
+    """Called once the response to a request has been determined.
+
+    Can be overridden by a subclass, e.g. to collect statistics.
+
+    @type method: string
+    @param method: Request method
+    @type code: int
+    @param code: Response status code
+    @type duration: float
+    @param duration: Time taken to handle the request, in seconds
+
+    """
+
   @staticmethod
   def FormatErrorMessage(values):
     """Formats the body of an error message.
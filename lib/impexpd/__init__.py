@@ -39,8 +39,15 @@ import logging
 import signal
 import errno
 import time
+import select
 from cStringIO import StringIO
 
+try:
+  # pylint: disable=F0401
+  import ctypes
+except ImportError:
+  ctypes = None
+
 from ganeti import constants
 from ganeti import errors
 from ganeti import utils
@@ -98,6 +105,11 @@ if constants.SOCAT_USE_COMPRESS:
 
 SOCAT_OPTION_MAXLEN = 400
 
+# Flags for splice(2) (from bits/fcntl-linux.h)
+_SPLICE_F_MOVE = 1
+_SPLICE_F_NONBLOCK = 2
+_SPLICE_F_MORE = 4
+
 (PROG_OTHER,
  PROG_SOCAT,
  PROG_DD,
@@ -114,7 +126,8 @@ PROG_ALL = compat.UniqueFrozenset([
 
 
 class CommandBuilder(object):
-  def __init__(self, mode, opts, socat_stderr_fd, dd_stderr_fd, dd_pid_fd):
+  def __init__(self, mode, opts, socat_stderr_fd, dd_stderr_fd, dd_pid_fd,
+               relay_fds=None):
     """Initializes this class.
 
     @param mode: Daemon mode (import or export)
@@ -125,6 +138,10 @@ class CommandBuilder(object):
     @param dd_stderr_fd: File descriptor dd should write its stderr to
     @type dd_pid_fd: int
     @param dd_pid_fd: File descriptor the child should write dd's PID to
+    @type relay_fds: tuple of (int, int) or None
+    @param relay_fds: For native transfers, the child's ends of the pipes to
+      the daemon's L{DataRelay}, as a tuple of the file descriptor for the
+      disk I/O command and the one for socat
 
     """
     self._opts = opts
@@ -132,6 +149,10 @@ class CommandBuilder(object):
     self._socat_stderr_fd = socat_stderr_fd
     self._dd_stderr_fd = dd_stderr_fd
     self._dd_pid_fd = dd_pid_fd
+    self._relay_fds = relay_fds
+
+    assert not (self._opts.native_transfer and relay_fds is None), \
+      "Native transfers need the relay file descriptors"
 
     assert (self._opts.magic is None or
             constants.IE_MAGIC_RE.match(self._opts.magic))
@@ -341,10 +362,82 @@ class CommandBuilder(object):
     # in the future.
     return self.GetBashCommand(" | ".join(parts))
 
+  def _GetNativeIoCommand(self):
+    """Returns the disk I/O command for a native transfer.
+
+    The command prefix and suffix are built for the shell pipeline used by
+    L{_GetTransportCommand}. For native transfers they are turned into a
+    standalone command whose output (on export) or input (on import) is
+    connected to the daemon's relay.
+
+    """
+    prefix = (self._opts.cmd_prefix or "").strip()
+    suffix = (self._opts.cmd_suffix or "").strip()
+
+    if self._mode == constants.IEM_IMPORT:
+      if prefix:
+        raise errors.GenericError("Command prefix not supported for native"
+                                  " imports")
+      if suffix.startswith("|"):
+        return "{ %s; }" % suffix[1:].lstrip()
+      elif suffix.startswith(">"):
+        return "cat %s" % suffix
+
+    elif self._mode == constants.IEM_EXPORT:
+      if prefix.endswith("|") and not suffix:
+        return "{ %s; }" % prefix[:-1].rstrip()
+      elif suffix.startswith("<") and not prefix:
+        return "cat %s" % suffix
+
+    else:
+      raise errors.GenericError("Invalid mode '%s'" % self._mode)
+
+    raise errors.GenericError("Unsupported command prefix %r and suffix %r for"
+                              " native transfer" %
+                              (self._opts.cmd_prefix, self._opts.cmd_suffix))
+
+  def _GetNativeTransportCommand(self):
+    """Returns the transport command for a native transfer.
+
+    Neither dd(1) nor a compression utility are used. The disk I/O command
+    and socat are started side by side, each connected to one end of the
+    daemon's L{DataRelay}. All other copies of the relay file descriptors
+    must be closed, otherwise the relay would never see end-of-file.
+
+    """
+    if self._opts.compress not in (None, constants.IEC_NONE):
+      raise errors.GenericError("Native transfers can not be compressed")
+
+    (io_fd, net_fd) = self._relay_fds
+    io_cmd = self._GetNativeIoCommand()
+    socat_cmd = utils.ShellQuoteArgs(self._GetSocatCommand())
+
+    if self._mode == constants.IEM_IMPORT:
+      io_redir = "<&%d" % io_fd
+      socat_redir = ">&%d" % net_fd
+    else:
+      io_redir = ">&%d" % io_fd
+      socat_redir = "<&%d" % net_fd
+
+    close_fds = "%d>&- %d>&-" % (io_fd, net_fd)
+
+    return self.GetBashCommand("; ".join([
+      "%s %s %s & io_pid=${!}" % (io_cmd, io_redir, close_fds),
+      "%s %s 2>&%d %s & net_pid=${!}" %
+      (socat_cmd, socat_redir, self._socat_stderr_fd, close_fds),
+      "exec %s" % close_fds,
+      "wait $io_pid",
+      "wait $net_pid",
+      ]))
+
   def GetCommand(self):
     """Returns the complete child process command.
 
     """
+    if self._opts.native_transfer:
+      # The disk I/O command is already part of the transport command
+      return self._GetNativeTransportCommand()
+
     transport_cmd = self._GetTransportCommand()
 
     buf = StringIO()
@@ -456,6 +549,18 @@ class ChildIOProcessor(object):
 
     return True
 
+  def SetRelayProgress(self, seconds, nbytes):
+    """Reports progress of a transfer done by the daemon itself.
+
+    @type seconds: float
+    @param seconds: Number of seconds since the transfer started
+    @type nbytes: int
+    @param nbytes: Total number of bytes transferred so far
+
+    """
+    self._UpdateDdProgress(seconds, utils.BytesToMebibyte(nbytes))
+    self._status_file.Update(True)
+
   def _ProcessOutput(self, line, prog):
     """Takes care of child process output.
 
@@ -616,3 +721,225 @@ def _CalcThroughput(samples):
   (end_time, end_mbytes) = samples[-1]
 
   return (float(end_mbytes) - start_mbytes) / (float(end_time) - start_time)
+
+
+def _LoadSplice(_ctypes=ctypes):
+  """Loads the splice(2) function from the C library.
+
+  @return: Function with the signature C{(fd_in, fd_out, length, flags)}
+    returning the number of transferred bytes, or C{None} if splice(2) is
+    not available
+
+  """
+  if _ctypes is None:
+    return None
+
+  try:
+    libc = _ctypes.CDLL("libc.so.6", use_errno=True)
+    fn = libc.splice
+  except (EnvironmentError, AttributeError), err:
+    logging.debug("Can't load splice(2) from libc: %s", err)
+    return None
+
+  fn.restype = _ctypes.c_ssize_t
+  fn.argtypes = [
+    _ctypes.c_int, _ctypes.c_void_p,
+    _ctypes.c_int, _ctypes.c_void_p,
+    _ctypes.c_size_t, _ctypes.c_uint,
+    ]
+
+  def _Splice(fd_in, fd_out, length, flags):
+    result = fn(fd_in, None, fd_out, None, length, flags)
+    if result < 0:
+      err = _ctypes.get_errno()
+      raise OSError(err, os.strerror(err))
+    return result
+
+  return _Splice
+
+
+class DataRelay(object):
+  """Moves data between two pipes inside the import/export daemon.
+
+  Used for native transfers, where the daemon itself sits between the disk
+  I/O command and socat. With splice(2) the data never leaves the kernel;
+  if splice(2) is unavailable, the relay falls back to read(2)/write(2).
+  The daemon takes care of the magic value and the number of transferred
+  bytes is known at any time, so neither dd(1) nor parsing its output is
+  needed.
+
+  Both file descriptors are owned by the relay and are closed once all data
+  has been transferred or the relay is aborted.
+
+  """
+  def __init__(self, src_fd, dst_fd, preamble=None, expect=None,
+               _splice_fn=NotImplemented):
+    """Initializes this class.
+
+    @type src_fd: int
+    @param src_fd: File descriptor to read from
+    @type dst_fd: int
+    @param dst_fd: File descriptor to write to
+    @type preamble: string
+    @param preamble: Data to write before relaying (e.g. the magic value)
+    @type expect: string
+    @param expect: Data which must be received before anything is relayed
+
+    """
+    if _splice_fn is NotImplemented:
+      _splice_fn = _LoadSplice()
+
+    self._src_fd = src_fd
+    self._dst_fd = dst_fd
+    self._splice_fn = _splice_fn
+    self._pending = preamble or ""
+    self._expect = expect
+    self._received = ""
+    self._wait_output = bool(self._pending)
+    self._eof = False
+    self._done = False
+    self._start = None
+    self.transferred = 0
+
+    for fd in [src_fd, dst_fd]:
+      utils.SetNonblockFlag(fd, True)
+
+  def IsDone(self):
+    """Returns whether the relay has finished.
+
+    """
+    return self._done
+
+  def GetElapsedTime(self):
+    """Returns the number of seconds since the first byte was relayed.
+
+    """
+    if self._start is None:
+      return 0.0
+    return time.time() - self._start
+
+  def GetPollEvent(self):
+    """Returns the file descriptor and event the relay is waiting for.
+
+    @rtype: tuple of (int, int) or None
+
+    """
+    if self._done:
+      return None
+    elif self._wait_output:
+      return (self._dst_fd, select.POLLOUT)
+    else:
+      return (self._src_fd, select.POLLIN)
+
+  def _Finish(self):
+    """Closes both file descriptors.
+
+    """
+    if not self._done:
+      self._done = True
+      for fd in [self._src_fd, self._dst_fd]:
+        utils.RetryOnSignal(os.close, fd)
+
+  def Abort(self):
+    """Stops relaying data.
+
+    """
+    self._Finish()
+
+  def _WritePending(self):
+    """Writes data which has been read into memory.
+
+    """
+    written = os.write(self._dst_fd, self._pending)
+    self._pending = self._pending[written:]
+    if self._pending:
+      self._wait_output = True
+    elif self._eof:
+      self._Finish()
+    else:
+      self._wait_output = False
+
+  def _ReadExpected(self):
+    """Reads and verifies the data expected before the payload.
+
+    """
+    data = os.read(self._src_fd, len(self._expect) - len(self._received))
+    if not data:
+      raise errors.GenericError("Connection closed before magic value was"
+                                " received")
+
+    self._received += data
+
+    if len(self._received) == len(self._expect):
+      if self._received != self._expect:
+        raise errors.GenericError("Magic value mismatch")
+      self._expect = None
+
+  def _Relay(self):
+    """Moves at most L{BUFSIZE} bytes.
+
+    """
+    if self._splice_fn:
+      try:
+        count = self._splice_fn(self._src_fd, self._dst_fd, BUFSIZE,
+                                _SPLICE_F_MOVE | _SPLICE_F_NONBLOCK |
+                                _SPLICE_F_MORE)
+      except EnvironmentError, err:
+        if err.errno not in (errno.EINVAL, errno.ENOSYS):
+          raise
+
+        logging.info("splice(2) not usable (%s), falling back to"
+                     " read(2)/write(2)", err)
+        self._splice_fn = None
+        return
+
+      if count:
+        self.transferred += count
+      else:
+        self._eof = True
+        self._Finish()
+
+    else:
+      data = os.read(self._src_fd, BUFSIZE)
+      if data:
+        self.transferred += len(data)
+      else:
+        self._eof = True
+
+      self._pending = data
+      self._WritePending()
+
+  def Transfer(self):
+    """Transfers as much data as possible without blocking.
+
+    To be called whenever the event returned by L{GetPollEvent} occurred.
+
+    """
+    if self._done:
+      return
+
+    if self._start is None:
+      self._start = time.time()
+
+    try:
+      if self._pending:
+        self._WritePending()
+      elif self._expect is not None:
+        self._ReadExpected()
+      else:
+        self._Relay()
+    except EnvironmentError, err:
+      if err.errno == errno.EAGAIN:
+        if self._pending:
+          self._wait_output = True
+        elif self._expect is not None or not self._splice_fn:
+          self._wait_output = False
+        else:
+          # splice(2) doesn't tell which side would block, so wait for the
+          # other one next time
+          self._wait_output = not self._wait_output
+      elif err.errno == errno.EPIPE:
+        logging.error("Reader of relayed data has gone away")
+        self._Finish()
+      else:
+        raise
@@ -0,0 +1,318 @@
+#
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Changed-chunk deltas for incremental instance exports.
+
+An incremental export only ships the chunks of a disk which changed since
+the previous export to the same node. The previous export is described by a
+manifest containing a checksum for every chunk of its disk image. The source
+node compares the disk against the base manifest and produces a delta
+stream, which the destination node applies to the base image to rebuild the
+complete image for the new export.
+
+A delta stream consists of a header line with the magic value, a JSON
+encoded header, a number of records made of a chunk index, a length and the
+chunk's data, and an end record followed by a JSON encoded trailer.
+
+"""
+
+import hashlib
+import struct
+
+from ganeti import errors
+from ganeti import serializer
+from ganeti import utils
+
+
+#: Size of the chunks checksums are calculated for
+CHUNK_SIZE = 4 * 1024 * 1024
+
+#: First line of a delta stream
+_MAGIC = "GANETI-DELTA-1\n"
+
+#: Chunk index and length of a record
+_RECORD = struct.Struct(">QI")
+
+#: Chunk index marking the end record
+_END_INDEX = 2 ** 64 - 1
+
+#: Maximum length of the header and the trailer
+_MAX_META_LENGTH = 64 * 1024
+
+
+def ComputeChecksum(data):
+  """Computes the checksum of a chunk.
+
+  @type data: string
+  @param data: Chunk data
+  @rtype: string
+
+  """
+  return hashlib.sha1(data).hexdigest()
+
+
+def _ReadFully(fh, length):
+  """Reads up to C{length} bytes, only returning less at end-of-file.
+
+  Reading from pipes can return short reads.
+
+  """
+  parts = []
+  remaining = length
+
+  while remaining > 0:
+    data = fh.read(remaining)
+    if not data:
+      break
+    parts.append(data)
+    remaining -= len(data)
+
+  return "".join(parts)
+
+
+def _ReadExactly(fh, length):
+  """Reads exactly C{length} bytes or raises an error.
+
+  """
+  data = _ReadFully(fh, length)
+  if len(data) != length:
+    raise errors.GenericError("Delta stream ended prematurely")
+  return data
+
+
+def _WriteMeta(fh, index, data):
+  """Writes a record containing JSON encoded metadata.
+
+  """
+  encoded = serializer.DumpJson(data)
+  fh.write(_RECORD.pack(index, len(encoded)))
+  fh.write(encoded)
+
+
+def _ReadMeta(fh, length):
+  """Reads JSON encoded metadata.
+
+  """
+  if length > _MAX_META_LENGTH:
+    raise errors.GenericError("Delta metadata too long (%s bytes)" % length)
+  return serializer.LoadJson(_ReadExactly(fh, length))
+
+
+def CheckManifest(manifest):
+  """Checks whether a manifest is well-formed.
+
+  @type manifest: dict
+  @rtype: bool
+
+  """
+  return (isinstance(manifest, dict) and
+          isinstance(manifest.get("id"), basestring) and
+          isinstance(manifest.get("chunk_size"), (int, long)) and
+          manifest["chunk_size"] > 0 and
+          isinstance(manifest.get("size"), (int, long)) and
+          isinstance(manifest.get("checksums"), list))
+
+
+def ComputeManifest(src, chunk_size=CHUNK_SIZE):
+  """Computes the manifest of a complete disk image.
+
+  @type src: file-like object
+  @param src: Complete disk data
+  @rtype: dict
+  @return: Manifest of the image
+
+  """
+  checksums = []
+  size = 0
+
+  while True:
+    data = _ReadFully(src, chunk_size)
+    if not data:
+      break
+
+    checksums.append(ComputeChecksum(data))
+    size += len(data)
+
+  return {
+    "id": utils.NewUUID(),
+    "chunk_size": chunk_size,
+    "size": size,
+    "checksums": checksums,
+    }
+
+
+def WriteDelta(src, dst, base=None, chunk_size=CHUNK_SIZE):
+  """Writes a delta stream against a base manifest.
+
+  @type src: file-like object
+  @param src: Complete disk data
+  @type dst: file-like object
+  @param dst: Output for the delta stream
+  @type base: dict or None
+  @param base: Manifest of the previous export; all chunks are written if
+    C{None} or if the manifest uses a different chunk size
+  @rtype: tuple; (int, int)
+  @return: Size of the disk data and number of written chunks
+
+  """
+  if base is not None and base["chunk_size"] != chunk_size:
+    base = None
+
+  if base is None:
+    base_id = None
+    base_checksums = []
+  else:
+    base_id = base["id"]
+    base_checksums = base["checksums"]
+
+  dst.write(_MAGIC)
+  _WriteMeta(dst, 0, {
+    "base": base_id,
+    "chunk_size": chunk_size,
+    })
+
+  index = 0
+  size = 0
+  changed = 0
+
+  while True:
+    data = _ReadFully(src, chunk_size)
+    if not data:
+      break
+
+    if (index >= len(base_checksums) or
+        ComputeChecksum(data) != base_checksums[index]):
+      dst.write(_RECORD.pack(index, len(data)))
+      dst.write(data)
+      changed += 1
+
+    index += 1
+    size += len(data)
+
+  _WriteMeta(dst, _END_INDEX, {
+    "size": size,
+    })
+
+  return (size, changed)
+
+
+def _ReadHeader(src):
+  """Reads the header of a delta stream.
+
+  """
+  if _ReadExactly(src, len(_MAGIC)) != _MAGIC:
+    raise errors.GenericError("Not a delta stream")
+
+  (_, length) = _RECORD.unpack(_ReadExactly(src, _RECORD.size))
+  header = _ReadMeta(src, length)
+
+  if not (isinstance(header, dict) and
+          isinstance(header.get("chunk_size"), (int, long)) and
+          header["chunk_size"] > 0):
+    raise errors.GenericError("Invalid delta stream header")
+
+  return header
+
+
+def GetDeltaBase(src):
+  """Returns the ID of the manifest a delta stream was made against.
+
+  @type src: file-like object
+  @param src: Delta stream
+  @rtype: string or None
+
+  """
+  return _ReadHeader(src).get("base")
+
+
+def ApplyDelta(src, image, base=None):
+  """Applies a delta stream to a disk image.
+
+  @type src: file-like object
+  @param src: Delta stream
+  @type image: file object
+  @param image: Base image opened for reading and writing, or an empty file
+    if the delta was written without a base manifest
+  @type base: dict or None
+  @param base: Manifest of the base image
+  @rtype: dict
+  @return: Manifest of the resulting image
+
+  """
+  header = _ReadHeader(src)
+  chunk_size = header["chunk_size"]
+
+  if base is None:
+    base_id = None
+    checksums = []
+  else:
+    base_id = base["id"]
+    checksums = list(base["checksums"])
+
+  if header.get("base") != base_id:
+    raise errors.GenericError("Delta was made against base '%s', but base"
+                              " image is '%s'" % (header["base"], base_id))
+
+  while True:
+    (index, length) = _RECORD.unpack(_ReadExactly(src, _RECORD.size))
+
+    if index == _END_INDEX:
+      trailer = _ReadMeta(src, length)
+      break
+
+    if length > chunk_size:
+      raise errors.GenericError("Chunk %s is too long (%s bytes)" %
+                                (index, length))
+
+    data = _ReadExactly(src, length)
+
+    image.seek(index * chunk_size)
+    image.write(data)
+
+    if index >= len(checksums):
+      checksums.extend([None] * (index + 1 - len(checksums)))
+    checksums[index] = ComputeChecksum(data)
+
+  size = trailer["size"]
+  chunk_count = (size + chunk_size - 1) // chunk_size
+
+  del checksums[chunk_count:]
+
+  if len(checksums) != chunk_count or None in checksums:
+    raise errors.GenericError("Delta stream is missing chunks")
+
+  image.truncate(size)
+
+  return {
+    "id": utils.NewUUID(),
+    "chunk_size": chunk_size,
+    "size": size,
+    "checksums": checksums,
+    }
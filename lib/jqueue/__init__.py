@@ -58,6 +58,7 @@ from ganeti import errors
 from ganeti import mcpu
 from ganeti import utils
 from ganeti import jstore
+from ganeti import jstats
 import ganeti.rpc.node as rpc
 from ganeti import runtime
 from ganeti import netutils
@@ -98,6 +99,59 @@ def _CallJqUpdate(runner, names, file_name, content):
   return runner.call_jobqueue_update(names, virt_file_name, content)
 
 
+def _CalcJobStatus(op_statuses):
+  """Compute the status of a job from the status of its opcodes.
+
+  The algorithm is:
+    - if we find a cancelled, or finished with error, the job
+      status will be the same
+    - otherwise, the last opcode with the status one of:
+        - waitlock
+        - canceling
+        - running
+
+      will determine the job status
+
+    - otherwise, it means either all opcodes are queued, or success,
+      and the job status will be the same
+
+  @type op_statuses: iterable
+  @param op_statuses: the status of each opcode, in order
+  @return: the job status
+
+  """
+  status = constants.JOB_STATUS_QUEUED
+
+  all_success = True
+  for op_status in op_statuses:
+    if op_status == constants.OP_STATUS_SUCCESS:
+      continue
+
+    all_success = False
+
+    if op_status == constants.OP_STATUS_QUEUED:
+      pass
+    elif op_status == constants.OP_STATUS_WAITING:
+      status = constants.JOB_STATUS_WAITING
+    elif op_status == constants.OP_STATUS_RUNNING:
+      status = constants.JOB_STATUS_RUNNING
+    elif op_status == constants.OP_STATUS_CANCELING:
+      status = constants.JOB_STATUS_CANCELING
+      break
+    elif op_status == constants.OP_STATUS_ERROR:
+      status = constants.JOB_STATUS_ERROR
+      # The whole job fails if one opcode failed
+      break
+    elif op_status == constants.OP_STATUS_CANCELED:
+      status = constants.OP_STATUS_CANCELED
+      break
+
+  if all_success:
+    status = constants.JOB_STATUS_SUCCESS
+
+  return status
+
+
 class _QueuedOpCode(object):
   """Encapsulates an opcode object.
 
@@ -109,11 +163,15 @@ class _QueuedOpCode(object):
   @ivar start_timestamp: timestamp for the start of the execution
   @ivar exec_timestamp: timestamp for the actual LU Exec() function invocation
   @ivar stop_timestamp: timestamp for the end of the execution
+  @ivar lock_stats: statistics about each attempt to acquire locks, see
+  L{mcpu.Processor._RecordLockWait}
+  @type phase_stats: L{jstats.PhaseStats}
+  @ivar phase_stats: time and resources spent in the phases of the execution
 
   """
   __slots__ = ["input", "status", "result", "log", "priority",
                "start_timestamp", "exec_timestamp", "end_timestamp",
-               "__weakref__"]
+               "lock_stats", "phase_stats", "__weakref__"]
 
   def __init__(self, op):
     """Initializes instances of this class.
@@ -129,6 +187,8 @@ class _QueuedOpCode(object):
     self.start_timestamp = None
     self.exec_timestamp = None
     self.end_timestamp = None
+    self.lock_stats = []
+    self.phase_stats = jstats.PhaseStats()
 
     # Get initial priority (it might change during the lifetime of this opcode)
     self.priority = getattr(op, "priority", constants.OP_PRIO_DEFAULT)
@@ -152,6 +212,8 @@ class _QueuedOpCode(object):
     obj.exec_timestamp = state.get("exec_timestamp", None)
     obj.end_timestamp = state.get("end_timestamp", None)
     obj.priority = state.get("priority", constants.OP_PRIO_DEFAULT)
+    obj.lock_stats = state.get("lock_stats", [])
+    obj.phase_stats = jstats.PhaseStats(state.get("phase_stats", None))
     return obj
 
   def Serialize(self):
@@ -170,6 +232,8 @@ class _QueuedOpCode(object):
       "exec_timestamp": self.exec_timestamp,
       "end_timestamp": self.end_timestamp,
       "priority": self.priority,
+      "lock_stats": self.lock_stats,
+      "phase_stats": self.phase_stats.ToDict(),
       }
 
 
@@ -190,13 +254,16 @@ class _QueuedJob(object):
   @ivar start_timestmap: the timestamp for start of execution
   @ivar end_timestamp: the timestamp for end of execution
   @ivar writable: Whether the job is allowed to be modified
+  @type phase_stats: L{jstats.PhaseStats}
+  @ivar phase_stats: time and resources spent by the job process outside of
+      the execution of opcodes, e.g. for its startup
 
   """
   # pylint: disable=W0212
   __slots__ = ["queue", "id", "ops", "log_serial", "ops_iter", "cur_opctx",
                "received_timestamp", "start_timestamp", "end_timestamp",
                "writable", "archived",
-               "livelock", "process_id",
+               "livelock", "process_id", "phase_stats",
                "__weakref__"]
 
   def AddReasons(self, pickup=False):
@@ -248,6 +315,7 @@ class _QueuedJob(object):
     self.archived = False
     self.livelock = None
     self.process_id = None
+    self.phase_stats = jstats.PhaseStats()
 
     self.writable = None
 
@@ -298,6 +366,7 @@ class _QueuedJob(object):
     obj.process_id = state.get("process_id", None)
     if obj.process_id is not None:
       obj.process_id = int(obj.process_id)
+    obj.phase_stats = jstats.PhaseStats(state.get("phase_stats", None))
 
     obj.ops = []
     obj.log_serial = 0
@@ -326,60 +395,17 @@ class _QueuedJob(object):
       "received_timestamp": self.received_timestamp,
       "livelock": self.livelock,
       "process_id": self.process_id,
+      "phase_stats": self.phase_stats.ToDict(),
       }
 
   def CalcStatus(self):
     """Compute the status of this job.
 
-    This function iterates over all the _QueuedOpCodes in the job and
-    based on their status, computes the job status.
-
-    The algorithm is:
-      - if we find a cancelled, or finished with error, the job
-        status will be the same
-      - otherwise, the last opcode with the status one of:
-          - waitlock
-          - canceling
-          - running
-
-        will determine the job status
-
-      - otherwise, it means either all opcodes are queued, or success,
-        and the job status will be the same
-
     @return: the job status
+    @see: L{_CalcJobStatus}
 
     """
-    status = constants.JOB_STATUS_QUEUED
-
-    all_success = True
-    for op in self.ops:
-      if op.status == constants.OP_STATUS_SUCCESS:
-        continue
-
-      all_success = False
-
-      if op.status == constants.OP_STATUS_QUEUED:
-        pass
-      elif op.status == constants.OP_STATUS_WAITING:
-        status = constants.JOB_STATUS_WAITING
-      elif op.status == constants.OP_STATUS_RUNNING:
-        status = constants.JOB_STATUS_RUNNING
-      elif op.status == constants.OP_STATUS_CANCELING:
-        status = constants.JOB_STATUS_CANCELING
-        break
-      elif op.status == constants.OP_STATUS_ERROR:
-        status = constants.JOB_STATUS_ERROR
-        # The whole job fails if one opcode failed
-        break
-      elif op.status == constants.OP_STATUS_CANCELED:
-        status = constants.OP_STATUS_CANCELED
-        break
-
-    if all_success:
-      status = constants.JOB_STATUS_SUCCESS
-
-    return status
+    return _CalcJobStatus(op.status for op in self.ops)
 
   def CalcPriority(self):
     """Gets the current priority for this job.
@@ -601,6 +627,13 @@ class _OpExecCallbacks(mcpu.OpExecCbBase):
     self._op.status = constants.OP_STATUS_WAITING
     logging.debug("Opcode will be retried. Back to waiting.")
 
+  def RecordLockWait(self, stats):
+    """Append statistics about an attempt to acquire locks.
+
+    """
+    self._op.lock_stats.append(stats)
+    self._queue.UpdateJobUnlocked(self._job, replicate=False)
+
   def _AppendFeedback(self, timestamp, log_type, log_msgs):
     """Internal feedback append function, with locks
 
@@ -932,9 +965,10 @@ class _JobProcessor(object):
 
     try:
       # Make sure not to hold queue lock while calling ExecOpCode
-      result = self.opexec_fn(op.input,
-                              _OpExecCallbacks(self.queue, self.job, op),
-                              timeout=timeout)
+      with jstats.Collecting(op.phase_stats):
+        result = self.opexec_fn(op.input,
+                                _OpExecCallbacks(self.queue, self.job, op),
+                                timeout=timeout)
     except mcpu.LockAcquireTimeout:
       assert timeout is not None, "Received timeout for blocking acquire"
       logging.debug("Couldn't acquire locks in %0.6fs", timeout)
@@ -1170,6 +1204,17 @@ class _JobDependencyManager(object):
     return compat.any(job in jobs
                       for jobs in self._waiters.values())
 
+  def GetWaitedJobIds(self, job):
+    """Returns the IDs of the jobs a job is waiting for.
+
+    @type job: L{_QueuedJob}
+    @param job: Job object
+    @rtype: list
+
+    """
+    return sorted(dep_job_id for (dep_job_id, jobs) in self._waiters.items()
+                  if job in jobs)
+
   def CheckAndRegister(self, job, dep_job_id, dep_status):
     """Checks if a dependency job has the requested status.
 
@@ -1236,6 +1281,98 @@ class _JobDependencyManager(object):
       del self._waiters[job_id]
 
 
+class _JobFilesEventHandler(asyncnotifier.FileEventHandlerBase):
+  """Records changes to a set of files in a watched directory.
+
+  """
+  def __init__(self, watch_manager, filenames):
+    """Initializes this class.
+
+    @type watch_manager: pyinotify.WatchManager
+    @param watch_manager: inotify watch manager
+    @type filenames: frozenset
+    @param filenames: names of the files to look for, without directory
+
+    """
+    asyncnotifier.FileEventHandlerBase.__init__(self, watch_manager)
+
+    self._filenames = filenames
+    self.changed = False
+
+  def process_default(self, event):
+    # Events without a name, such as a queue overflow, might hide a change
+    if not event.name or event.name in self._filenames:
+      self.changed = True
+
+
+class _JobFileChangesWaiter(object):
+  """Waits for any of a set of job files to be written, renamed or removed.
+
+  Job files are replaced by renaming a temporary file over them, so the
+  directories containing them are watched instead of the files themselves.
+
+  """
+  def __init__(self, filenames, _inotify_wm_cls=pyinotify.WatchManager):
+    """Initializes this class.
+
+    @type filenames: list of strings
+    @param filenames: Paths of the job files to wait for
+    @raises errors.InotifyError: if the notifier cannot be setup
+
+    """
+    self._wm = _inotify_wm_cls()
+    self._handler = \
+      _JobFilesEventHandler(self._wm,
+                            frozenset(os.path.basename(i) for i in filenames))
+    self._notifier = pyinotify.Notifier(self._wm,
+                                        default_proc_fun=self._handler)
+
+    # Different Pyinotify versions have the flag constants at different places,
+    # hence not accessing them directly
+    mask = (pyinotify.EventsCodes.ALL_FLAGS["IN_CLOSE_WRITE"] |
+            pyinotify.EventsCodes.ALL_FLAGS["IN_MOVED_TO"] |
+            pyinotify.EventsCodes.ALL_FLAGS["IN_MOVED_FROM"] |
+            pyinotify.EventsCodes.ALL_FLAGS["IN_DELETE"])
+
+    try:
+      for dirname in frozenset(os.path.dirname(i) for i in filenames):
+        self._handler.AddWatch(dirname, mask)
+    except Exception:
+      # pyinotify doesn't close file descriptors automatically
+      self._notifier.stop()
+      raise
+
+  def Wait(self, timeout):
+    """Waits for one of the job files to change.
+
+    @type timeout: float
+    @param timeout: Timeout in seconds
+    @rtype: bool
+    @return: Whether a job file changed before the timeout
+
+    """
+    assert timeout >= 0
+
+    deadline = time.time() + timeout
+
+    while not self._handler.changed:
+      remaining = deadline - time.time()
+      if remaining <= 0:
+        break
+
+      if self._notifier.check_events(remaining * 1000):
+        self._notifier.read_events()
+        self._notifier.process_events()
+
+    return self._handler.changed
+
+  def Close(self):
+    """Closes underlying notifier and its file descriptor.
+
+    """
+    self._notifier.stop()
+
+
 class JobQueue(object):
   """Queue used to manage the jobs.
 
@@ -1268,6 +1405,9 @@ class JobQueue(object):
     # Job dependencies
     self.depmgr = _JobDependencyManager(self._GetJobStatusForDependencies)
 
+    # Status of finalized dependency jobs, which can't change anymore
+    self._finalized_dep_status = {}
+
   def _GetRpc(self, address_list):
     """Gets RPC runner with context.
 
@@ -1334,13 +1474,15 @@ class JobQueue(object):
 
     """
     getents = runtime.GetEnts()
-    utils.WriteFile(file_name, data=data, uid=getents.masterd_uid,
-                    gid=getents.daemons_gid,
-                    mode=constants.JOB_QUEUE_FILES_PERMS)
+    with jstats.Measure("job-write"):
+      utils.WriteFile(file_name, data=data, uid=getents.masterd_uid,
+                      gid=getents.daemons_gid,
+                      mode=constants.JOB_QUEUE_FILES_PERMS)
 
     if replicate:
-      names, addrs = self._GetNodeIp()
-      result = _CallJqUpdate(self._GetRpc(addrs), names, file_name, data)
+      with jstats.Measure("job-replicate"):
+        names, addrs = self._GetNodeIp()
+        result = _CallJqUpdate(self._GetRpc(addrs), names, file_name, data)
       self._CheckRpcResult(result, self._nodes, "Updating %s" % file_name)
 
   def _RenameFilesUnlocked(self, rename):
@@ -1584,6 +1726,36 @@ class JobQueue(object):
 
     return (True, result)
 
+  @staticmethod
+  def _ReadJobStatusFromDisk(job_id):
+    """Reads the status of a job from its file.
+
+    Only the status of the opcodes is looked at; unlike
+    L{_LoadJobFromDisk}, no opcodes or job objects are restored.
+
+    @type job_id: int
+    @param job_id: job identifier
+    @return: the job status or C{None} if the job file doesn't exist
+    @raise errors.JobFileCorrupted: if the job file can't be parsed
+
+    """
+    for fn in [JobQueue._GetJobPath, JobQueue._GetArchivedJobPath]:
+      try:
+        raw_data = utils.ReadFile(fn(job_id))
+      except EnvironmentError, err:
+        if err.errno != errno.ENOENT:
+          raise
+      else:
+        break
+    else:
+      return None
+
+    try:
+      data = serializer.LoadJson(raw_data)
+      return _CalcJobStatus(op["status"] for op in data["ops"])
+    except Exception, err: # pylint: disable=W0703
+      raise errors.JobFileCorrupted(err)
+
   def _GetJobStatusForDependencies(self, job_id):
     """Gets the status of a job for dependencies.
 
@@ -1593,17 +1765,71 @@ class JobQueue(object):
 
     """
     # Not using in-memory cache as doing so would require an exclusive lock
+    status = self._finalized_dep_status.get(job_id, None)
+    if status is not None:
+      return status
 
-    # Try to load from disk
-    job = JobQueue.SafeLoadJobFromDisk(self, job_id, True, writable=False)
+    # Try to read from disk
+    try:
+      status = self._ReadJobStatusFromDisk(job_id)
+    except (errors.JobFileCorrupted, EnvironmentError):
+      logging.exception("Can't read status of job %s", job_id)
+      status = None
 
-    if job:
-      assert not job.writable, "Got writable job" # pylint: disable=E1101
+    if status is None:
+      raise errors.JobLost("Job %s not found" % job_id)
 
-    if job:
-      return job.CalcStatus()
+    if status in constants.JOBS_FINALIZED:
+      self._finalized_dep_status[job_id] = status
+
+    return status
+
+  def WaitForJobDependencies(self, job, timeout,
+                             _waiter_cls=_JobFileChangesWaiter):
+    """Waits for a dependency of a job to possibly change its status.
+
+    Instead of polling the dependencies, the files of the jobs the given job
+    is waiting for are watched using inotify. If that is not possible, this
+    function just sleeps for the given timeout.
 
-    raise errors.JobLost("Job %s not found" % job_id)
+    @type job: L{_QueuedJob}
+    @param job: Job registered as waiting with the dependency manager
+    @type timeout: float
+    @param timeout: Maximum time to wait in seconds
+    @rtype: bool
+    @return: Whether a dependency may have changed its status
+
+    """
+    dep_job_ids = self.depmgr.GetWaitedJobIds(job)
+    if not dep_job_ids:
+      return True
+
+    filenames = [self._GetJobPath(dep_job_id) for dep_job_id in dep_job_ids]
+
+    try:
+      waiter = _waiter_cls(filenames)
+    except (errors.InotifyError, EnvironmentError, pyinotify.PyinotifyError):
+      logging.warning("Can't watch the files of jobs %s, sleeping instead",
+                      utils.CommaJoin(dep_job_ids), exc_info=True)
+      time.sleep(timeout)
+      return False
+
+    try:
+      # A dependency might have finished before the watches were added
+      for dep_job_id in dep_job_ids:
+        try:
+          status = self._GetJobStatusForDependencies(dep_job_id)
+        except errors.JobLost:
+          return True
+
+        if status in constants.JOBS_FINALIZED:
+          return True
+
+      logging.debug("Waiting for a change of jobs %s",
+                    utils.CommaJoin(dep_job_ids))
+      return waiter.Wait(timeout)
+    finally:
+      waiter.Close()
 
   def UpdateJobUnlocked(self, job, replicate=True):
     """Update a job's on disk storage.
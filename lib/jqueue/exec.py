@@ -41,6 +41,7 @@ import signal
 import sys
 import time
 
+from ganeti import jstats
 from ganeti import mcpu
 from ganeti.server import masterd
 from ganeti.rpc import transport
@@ -52,6 +53,11 @@ from ganeti.utils import livelock
 from ganeti.jqueue import _JobProcessor, JobQueue
 
 
+#: Maximum time to wait for a dependency to change before checking again;
+#: this also bounds the delay in handling signals while waiting
+_DEPENDENCY_WAIT_TIMEOUT = 5.0
+
+
 def _GetMasterInfo():
   """Retrieve job id, lock file name and secret params from the master process
 
@@ -74,6 +80,24 @@ def _GetMasterInfo():
   return (job_id, livelock_name, secret_params)
 
 
+def _GetProcessAge():
+  """Returns the time elapsed since the current process was forked.
+
+  @rtype: float or None
+  @return: the age in seconds, or C{None} if it can't be determined
+
+  """
+  try:
+    stat = utils.ReadFile("/proc/self/stat")
+    uptime = float(utils.ReadFile("/proc/uptime").split()[0])
+    # The process name can contain spaces, so fields are counted from its end;
+    # the start time is the 22nd field, in clock ticks since boot
+    start_ticks = int(stat.rsplit(")", 1)[1].split()[19])
+    return uptime - float(start_ticks) / os.sysconf("SC_CLK_TCK")
+  except (EnvironmentError, IndexError, ValueError):
+    return None
+
+
 def RestorePrivateValueWrapping(json):
   """Wrap private values in JSON decoded structure.
 
@@ -91,7 +115,14 @@ def RestorePrivateValueWrapping(json):
   return result
 
 
-def main():
+def main(start_time=None):
+  """Runs a single job.
+
+  @type start_time: float
+  @param start_time: the time the job process was started at, used for
+      reporting its startup time; if not given, it's read from C{/proc}
+
+  """
 
   debug = int(os.environ["GNT_DEBUG"])
 
@@ -107,9 +138,13 @@ def main():
 
   utils.SetupLogging(logname, "job-%s" % (job_id,), debug=debug)
 
+  # Statistics of the job process startup, accounted to the job once loaded
+  startup_stats = jstats.PhaseStats()
+
   try:
     logging.debug("Preparing the context and the configuration")
-    context = masterd.GanetiContext(livelock_name)
+    with startup_stats.Measure("context"):
+      context = masterd.GanetiContext(livelock_name)
 
     logging.debug("Registering signal handlers")
 
@@ -122,9 +157,9 @@ def main():
     signal.signal(signal.SIGTERM, _TermHandler)
 
     def _HupHandler(signum, _frame):
-      logging.debug("Received signal %d, old flag was %s, will set to True",
-                    signum, mcpu.sighupReceived)
-      mcpu.sighupReceived[0] = True
+      # WConfD still signals granted locks, but the processor is already
+      # woken up by its pending WaitPendingRequest call
+      logging.debug("Received signal %d, ignoring", signum)
     signal.signal(signal.SIGHUP, _HupHandler)
 
     def _User1Handler(signum, _frame):
@@ -134,6 +169,17 @@ def main():
 
     job = JobQueue.SafeLoadJobFromDisk(context.jobqueue, job_id, False)
 
+    if start_time is None:
+      age = _GetProcessAge()
+    else:
+      age = time.time() - start_time
+    if age is not None:
+      logging.info("Job process started in %.3f seconds", age)
+      startup_stats.Add("startup", age, jstats.GetCpuTime())
+
+    job.phase_stats.Update(startup_stats)
+    jstats.SetCollector(job.phase_stats)
+
     job.SetPid(os.getpid())
 
     if secret_params:
@@ -148,13 +194,15 @@ def main():
       result = proc()
       if result == _JobProcessor.WAITDEP and not cancel[0]:
         # Normally, the scheduler should avoid starting a job where the
-        # dependencies are not yet finalised. So warn, but wait an continue.
+        # dependencies are not yet finalised. So warn, but wait for one of
+        # them to change and continue.
         logging.warning("Got started despite a dependency not yet finished")
-        time.sleep(5)
+        context.jobqueue.WaitForJobDependencies(job, _DEPENDENCY_WAIT_TIMEOUT)
       if cancel[0]:
         logging.debug("Got cancel request, cancelling job %d", job_id)
         r = context.jobqueue.CancelJob(job_id)
         job = JobQueue.SafeLoadJobFromDisk(context.jobqueue, job_id, False)
+        jstats.SetCollector(job.phase_stats)
         proc = _JobProcessor(context.jobqueue, execfun, job)
         logging.debug("CancelJob result for job %d: %s", job_id, r)
         cancel[0] = False
@@ -167,6 +215,7 @@ def main():
           logging.debug("Changing priority of job %d to %d", job_id, new_prio)
           r = context.jobqueue.ChangeJobPriority(job_id, new_prio)
           job = JobQueue.SafeLoadJobFromDisk(context.jobqueue, job_id, False)
+          jstats.SetCollector(job.phase_stats)
           proc = _JobProcessor(context.jobqueue, execfun, job)
           logging.debug("Result of changing priority of %d to %d: %s", job_id,
                         new_prio, r)
@@ -0,0 +1,219 @@
+#
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Module implementing a pre-forked zygote for job processes
+
+Starting a job by executing L{ganeti.jqueue.exec} requires importing most of
+Ganeti, which dominates the run time of short jobs. The zygote imports the
+modules once and forks a new process for each job, which then continues like
+L{ganeti.jqueue.exec}.
+
+The protocol for starting a job works as follows (MP = master process,
+FP = forked process):
+
+* MP connects to the zygote socket; the zygote forks FP for the connection.
+
+* MP sends FP the job ID.
+
+* FP creates and locks its livelock file and sends its process ID to MP.
+
+* FP sends the name of its livelock file to MP.
+
+* MP updates the lock file name in the job file and confirms FP it can
+  start.
+
+* FP continues with the protocol described in L{ganeti.jqueue.exec}, using
+  the connection as its standard input/output.
+
+The zygote exits as soon as MP closes its standard input.
+
+"""
+
+import contextlib
+import errno
+import importlib
+import logging
+import os
+import random
+import select
+import signal
+import socket
+import time
+
+from ganeti import pathutils
+from ganeti import utils
+from ganeti.rpc import transport
+from ganeti.utils import livelock
+
+# "exec" is a keyword, so the module can't be imported with a normal import
+# statement; importing it loads everything a job process needs
+_exec = importlib.import_module("ganeti.jqueue.exec")
+
+
+def _RunJobProcess(conn, start_time, sigchld_handler,
+                   _livelock_cls=livelock.LiveLock, _main_fn=None):
+  """Starts a job in a freshly forked process.
+
+  This function never returns.
+
+  @type conn: socket.socket
+  @param conn: the connection to the master process
+  @type start_time: float
+  @param start_time: the time the master process connected
+  @param sigchld_handler: the C{SIGCHLD} handler to restore
+
+  """
+  if _main_fn is None:
+    _main_fn = _exec.main
+
+  exit_code = 1
+  try:
+    # Job processes wait for the commands they run
+    signal.signal(signal.SIGCHLD, sigchld_handler)
+
+    # Don't share random state with other job processes
+    utils.ResetTempfileModule()
+    random.seed()
+
+    fd = conn.fileno()
+    with contextlib.closing(transport.FdTransport((os.dup(fd),
+                                                   os.dup(fd)))) as trans:
+      job_id = int(trans.Recv())
+      lock = _livelock_cls("job_%06d" % job_id)
+      trans.Send(str(os.getpid()))
+      trans.Send(lock.GetPath())
+      trans.Recv()
+
+    os.dup2(fd, 0)
+    os.dup2(fd, 1)
+    conn.close()
+
+    _main_fn(start_time=start_time)
+    exit_code = 0
+  except SystemExit, err:
+    exit_code = err.code
+  except Exception: # pylint: disable=W0703
+    logging.exception("Error while starting a job process")
+  finally:
+    # Don't run any cleanup of the zygote; the livelock stays locked until
+    # the process exits
+    os._exit(exit_code) # pylint: disable=W0212
+
+
+def _ServeForever(listener, sigchld_handler, _stdin_fd=0,
+                  _run_fn=_RunJobProcess):
+  """Forks a job process for each connection until stdin is closed.
+
+  @type listener: socket.socket
+  @param listener: the listening zygote socket
+  @param sigchld_handler: the C{SIGCHLD} handler for job processes
+
+  """
+  while True:
+    try:
+      (readable, _, _) = select.select([listener, _stdin_fd], [], [])
+    except select.error, err:
+      if err.args[0] == errno.EINTR:
+        continue
+      raise
+
+    if _stdin_fd in readable and not os.read(_stdin_fd, 4096):
+      logging.info("Master process closed its connection, exiting")
+      return
+
+    if listener in readable:
+      try:
+        (conn, _) = listener.accept()
+      except socket.error, err:
+        if err.args[0] in (errno.EINTR, errno.EAGAIN):
+          continue
+        raise
+
+      start_time = time.time()
+      pid = os.fork()
+      if pid == 0:
+        listener.close()
+        _run_fn(conn, start_time, sigchld_handler)
+
+      conn.close()
+      logging.debug("Forked job process %d", pid)
+
+
+def _Listen(path):
+  """Creates the listening zygote socket.
+
+  A socket file left behind by a previous zygote, e.g. one which was killed,
+  is replaced.
+
+  @type path: string
+  @param path: path of the socket
+  @rtype: socket.socket
+
+  """
+  utils.RemoveFile(path)
+
+  listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  old_umask = os.umask(077)
+  try:
+    listener.bind(path)
+  finally:
+    os.umask(old_umask)
+  listener.listen(128)
+
+  return listener
+
+
+def main():
+  """Runs the job zygote.
+
+  """
+  debug = int(os.environ["GNT_DEBUG"])
+
+  utils.SetupLogging(pathutils.GetLogFilename("jobs"), "job-zygote",
+                     debug=debug)
+
+  # Job processes are never waited for, let the kernel reap them
+  sigchld_handler = signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+  path = pathutils.JOB_ZYGOTE_SOCKET
+  listener = _Listen(path)
+
+  logging.info("Listening for jobs on %s", path)
+  try:
+    _ServeForever(listener, sigchld_handler)
+  except Exception: # pylint: disable=W0703
+    logging.exception("Job zygote failed")
+  finally:
+    listener.close()
+    utils.RemoveFile(path)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,220 @@
+#
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Per-phase time and resource accounting for job processes.
+
+A job process records, for each phase of its work (process startup, lock
+waits, the phases of a logical unit, RPCs, job file writes and so on), how
+often the phase was entered, the wall-clock and CPU time spent in it and
+the peak resident set size of the process at the end of the phase.
+
+Statistics are collected into the L{PhaseStats} object set with
+L{SetCollector} or L{Collecting}; code measuring a phase uses the
+module-level L{Measure}, which does nothing if no collector is set. Phases
+may be nested (e.g. RPCs are made while executing a logical unit), in
+which case the time is accounted to both of them.
+
+"""
+
+import contextlib
+import resource
+import time
+
+
+#: Keys of the per-phase statistics
+STAT_COUNT = "count"
+STAT_WALL = "wall"
+STAT_CPU = "cpu"
+STAT_MAXRSS = "maxrss"
+
+
+def GetCpuTime(_rusage_fn=resource.getrusage):
+  """Returns the CPU time (user and system) used by this process so far.
+
+  @rtype: float
+
+  """
+  usage = _rusage_fn(resource.RUSAGE_SELF)
+  return usage.ru_utime + usage.ru_stime
+
+
+def _GetMaxRss(_rusage_fn=resource.getrusage):
+  """Returns the peak resident set size of this process in kilobytes.
+
+  @rtype: int
+
+  """
+  return _rusage_fn(resource.RUSAGE_SELF).ru_maxrss
+
+
+class PhaseStats(object):
+  """Accumulated time and resource usage of the phases of a job or opcode.
+
+  """
+  def __init__(self, data=None, _time_fn=time.time,
+               _rusage_fn=resource.getrusage):
+    """Initializes this class.
+
+    @type data: dict or None
+    @param data: Serialized statistics as returned by L{ToDict}
+
+    """
+    self._time_fn = _time_fn
+    self._rusage_fn = _rusage_fn
+    self._phases = {}
+
+    if data:
+      for (phase, values) in data.items():
+        self._phases[phase] = dict(values)
+
+  def Add(self, phase, wall, cpu):
+    """Accounts time spent in a phase.
+
+    @type phase: string
+    @param phase: Name of the phase
+    @type wall: float
+    @param wall: Wall-clock time spent in the phase, in seconds
+    @type cpu: float
+    @param cpu: CPU time spent in the phase, in seconds
+
+    """
+    self._Accumulate(phase, 1, wall, cpu,
+                     _GetMaxRss(_rusage_fn=self._rusage_fn))
+
+  def Update(self, other):
+    """Adds the statistics of another object to this one.
+
+    @type other: L{PhaseStats}
+
+    """
+    for (phase, values) in other.ToDict().items():
+      self._Accumulate(phase, values[STAT_COUNT], values[STAT_WALL],
+                       values[STAT_CPU], values[STAT_MAXRSS])
+
+  def _Accumulate(self, phase, count, wall, cpu, maxrss):
+    """Adds values to the statistics of a phase.
+
+    """
+    values = self._phases.setdefault(phase, {
+      STAT_COUNT: 0,
+      STAT_WALL: 0.0,
+      STAT_CPU: 0.0,
+      STAT_MAXRSS: 0,
+      })
+
+    values[STAT_COUNT] += count
+    values[STAT_WALL] += wall
+    values[STAT_CPU] += cpu
+    values[STAT_MAXRSS] = max(values[STAT_MAXRSS], maxrss)
+
+  @contextlib.contextmanager
+  def Measure(self, phase):
+    """Context manager measuring the time spent in its body.
+
+    The time is accounted even if the body raises an exception.
+
+    @type phase: string
+    @param phase: Name of the phase
+
+    """
+    start_wall = self._time_fn()
+    start_cpu = GetCpuTime(_rusage_fn=self._rusage_fn)
+    try:
+      yield
+    finally:
+      self.Add(phase, self._time_fn() - start_wall,
+               GetCpuTime(_rusage_fn=self._rusage_fn) - start_cpu)
+
+  def ToDict(self):
+    """Returns the statistics in a serializable form.
+
+    @rtype: dict
+    @return: Dictionary mapping phase names to dictionaries with the keys
+      L{STAT_COUNT}, L{STAT_WALL}, L{STAT_CPU} and L{STAT_MAXRSS}
+
+    """
+    return dict((phase, dict(values))
+                for (phase, values) in self._phases.items())
+
+
+#: The statistics object phases are currently accounted to
+_current = [None]
+
+
+def SetCollector(stats):
+  """Sets the object phases measured by L{Measure} are accounted to.
+
+  @type stats: L{PhaseStats} or None
+  @param stats: New collector, C{None} to stop collecting
+  @return: The previous collector
+
+  """
+  previous = _current[0]
+  _current[0] = stats
+  return previous
+
+
+def GetCollector():
+  """Returns the current collector.
+
+  @rtype: L{PhaseStats} or None
+
+  """
+  return _current[0]
+
+
+@contextlib.contextmanager
+def Collecting(stats):
+  """Context manager setting the collector while its body is executed.
+
+  @type stats: L{PhaseStats}
+
+  """
+  previous = SetCollector(stats)
+  try:
+    yield
+  finally:
+    SetCollector(previous)
+
+
+@contextlib.contextmanager
+def Measure(phase):
+  """Measures the time spent in the body if a collector is set.
+
+  @type phase: string
+  @param phase: Name of the phase
+
+  """
+  stats = _current[0]
+  if stats is None:
+    yield
+  else:
+    with stats.Measure(phase):
+      yield
@@ -39,15 +39,20 @@ The module is also used by the master daemon.
 """
 
 from ganeti import constants
+from ganeti import errors
 from ganeti import pathutils
-from ganeti import objects
+from ganeti import utils
 import ganeti.rpc.client as cl
 from ganeti.rpc.errors import RequestError
 from ganeti.rpc.transport import Transport
 
+objects = utils.LazyModule("ganeti.objects")
+
 __all__ = [
   # classes:
-  "Client"
+  "Client",
+  "ConnectionPool",
+  "PooledClient",
   ]
 
 REQ_SUBMIT_JOB = constants.LUXI_REQ_SUBMIT_JOB
@@ -55,6 +60,7 @@ REQ_SUBMIT_JOB_TO_DRAINED_QUEUE = constants.LUXI_REQ_SUBMIT_JOB_TO_DRAINED_QUEUE
 REQ_SUBMIT_MANY_JOBS = constants.LUXI_REQ_SUBMIT_MANY_JOBS
 REQ_PICKUP_JOB = constants.LUXI_REQ_PICKUP_JOB
 REQ_WAIT_FOR_JOB_CHANGE = constants.LUXI_REQ_WAIT_FOR_JOB_CHANGE
+REQ_WAIT_FOR_JOBS_CHANGE = constants.LUXI_REQ_WAIT_FOR_JOBS_CHANGE
 REQ_CANCEL_JOB = constants.LUXI_REQ_CANCEL_JOB
 REQ_ARCHIVE_JOB = constants.LUXI_REQ_ARCHIVE_JOB
 REQ_CHANGE_JOB_PRIORITY = constants.LUXI_REQ_CHANGE_JOB_PRIORITY
@@ -189,7 +195,38 @@ class Client(cl.AbstractClient):
         break
     return result
 
-  def Query(self, what, fields, qfilter):
+  def WaitForJobsChangeOnce(self, jobs, fields, timeout=WFJC_TIMEOUT):
+    """Waits for changes on any of several jobs.
+
+    @type jobs: list of tuples
+    @param jobs: Tuples of job ID, previously received job information and
+      highest log serial number previously received, as passed to
+      L{WaitForJobChangeOnce} for a single job
+    @type fields: list
+    @param fields: List of field names to be observed
+    @type timeout: int/float
+    @param timeout: Timeout in seconds (values larger than L{WFJC_TIMEOUT} will
+                    be capped to that value)
+    @rtype: dict
+    @return: Dictionary mapping the IDs of the jobs which changed to their
+      new job information and log entries, or to C{None} if a job can't be
+      found; empty if no job changed before the timeout
+
+    """
+    assert timeout >= 0, "Timeout can not be negative"
+
+    ids = dict((Client._PrepareJobId(REQ_WAIT_FOR_JOBS_CHANGE, job_id), job_id)
+               for (job_id, _, _) in jobs)
+    args = [(Client._PrepareJobId(REQ_WAIT_FOR_JOBS_CHANGE, job_id),
+             prev_job_info, prev_log_serial)
+            for (job_id, prev_job_info, prev_log_serial) in jobs]
+
+    result = self.CallMethod(REQ_WAIT_FOR_JOBS_CHANGE,
+                             (args, fields, min(WFJC_TIMEOUT, timeout)))
+
+    return dict((ids[job_id], update) for (job_id, update) in result)
+
+  def Query(self, what, fields, qfilter, live_max_age=None):
     """Query for resources/items.
 
     @param what: One of L{constants.QR_VIA_LUXI}
@@ -197,10 +234,17 @@ class Client(cl.AbstractClient):
     @param fields: List of requested fields
     @type qfilter: None or list
     @param qfilter: Query filter
+    @type live_max_age: int or None
+    @param live_max_age: Maximum age in seconds of reused live data (e.g. the
+      run state of instances); 0 or C{None} to always collect it from the
+      nodes
     @rtype: L{objects.QueryResponse}
 
     """
-    result = self.CallMethod(REQ_QUERY, (what, fields, qfilter))
+    args = (what, fields, qfilter)
+    if live_max_age is not None:
+      args += (live_max_age, )
+    result = self.CallMethod(REQ_QUERY, args)
     return objects.QueryResponse.FromDict(result)
 
   def QueryFields(self, what, fields):
@@ -251,3 +295,51 @@ class Client(cl.AbstractClient):
 
   def QueryTags(self, kind, name):
     return self.CallMethod(REQ_QUERY_TAGS, (kind, name))
+
+
+class ConnectionPool(cl.ConnectionPool):
+  """Pool of multiplexed connections to the master daemon.
+
+  """
+  def __init__(self, address=None, **kwargs):
+    """Initializes this class.
+
+    Arguments are the same as for L{cl.ConnectionPool}, except that the
+    address defaults to the query socket.
+
+    """
+    if address is None:
+      address = pathutils.QUERY_SOCKET
+    super(ConnectionPool, self).__init__(address, **kwargs)
+
+
+class PooledClient(Client):
+  """Client sending its calls over the connections of a shared pool.
+
+  Any number of these clients, in any number of threads, can use the same
+  L{ConnectionPool}; their calls are multiplexed onto the pool's
+  connections instead of each client opening a connection of its own.
+
+  """
+  def __init__(self, pool):
+    """Initializes this class.
+
+    @type pool: L{ConnectionPool}
+
+    """
+    self._pool = pool
+    super(PooledClient, self).__init__(address=pool.address)
+
+  def _InitTransport(self):
+    """Does nothing, the connections are owned by the pool.
+
+    """
+
+  def CallMethod(self, method, args):
+    """Send a generic request and return the response.
+
+    """
+    if not isinstance(args, (list, tuple)):
+      raise errors.ProgrammerError("Invalid parameter passed to CallMethod:"
+                                   " expected list, got %s" % type(args))
+    return self._pool.Call(method, args, version=self.version)
@@ -948,7 +948,7 @@ class _TransferInstDestCb(_TransferInstCbBase):
 
 class DiskTransfer(object):
   def __init__(self, name, src_io, src_ioargs, dest_io, dest_ioargs,
-               finished_fn):
+               finished_fn, incremental=False, delta_base=None):
     """Initializes this class.
 
     @type name: string
@@ -959,6 +959,11 @@ class DiskTransfer(object):
     @param dest_ioargs: Destination I/O arguments
     @type finished_fn: callable
     @param finished_fn: Function called once transfer has finished
+    @type incremental: bool
+    @param incremental: Whether to only transfer the chunks which changed
+      compared to C{delta_base}
+    @type delta_base: dict or None
+    @param delta_base: Chunk manifest of the previous export
 
     """
     self.name = name
@@ -971,6 +976,9 @@ class DiskTransfer(object):
 
     self.finished_fn = finished_fn
 
+    self.incremental = incremental
+    self.delta_base = delta_base
+
 
 class _DiskTransferPrivate(object):
   def __init__(self, data, success, export_opts):
@@ -1015,6 +1023,27 @@ def _GetInstDiskMagic(base, instance_name, index):
   return h.hexdigest()
 
 
+def GetIntraClusterTransferOptions(compress, magic):
+  """Returns the import/export options for a transfer within the cluster.
+
+  Uncompressed transfers between the nodes of a cluster are moved by the
+  import/export daemons themselves instead of through dd(1) ("native
+  transfer"), as the nodes are usually connected by a fast network where the
+  extra copy through dd is a bottleneck.
+
+  @type compress: string
+  @param compress: Compression tool to use
+  @type magic: string
+  @param magic: Magic value for the disk
+  @rtype: L{objects.ImportExportOptions}
+
+  """
+  return objects.ImportExportOptions(key_name=None, ca_pem=None,
+                                     compress=compress, magic=magic,
+                                     native_transfer=(compress ==
+                                                      constants.IEC_NONE))
+
+
 def TransferInstanceData(lu, feedback_fn, src_node_uuid, dest_node_uuid,
                          dest_ip, compress, instance, all_transfers):
   """Transfers an instance's data from one node to another.
@@ -1063,10 +1092,17 @@ def TransferInstanceData(lu, feedback_fn, src_node_uuid, dest_node_uuid,
                     (transfer.name, src_node_name, dest_node_name))
 
         magic = _GetInstDiskMagic(base_magic, instance.name, idx)
-        opts = objects.ImportExportOptions(key_name=None, ca_pem=None,
-                                           compress=compress, magic=magic)
+        opts = GetIntraClusterTransferOptions(compress, magic)
+
+        if transfer.incremental:
+          # Only the source needs the base manifest
+          export_opts = opts.Copy()
+          export_opts.incremental = True
+          export_opts.delta_base = transfer.delta_base
+        else:
+          export_opts = opts
 
-        dtp = _DiskTransferPrivate(transfer, True, opts)
+        dtp = _DiskTransferPrivate(transfer, True, export_opts)
 
         di = DiskImport(lu, dest_node_uuid, opts, instance, "disk%d" % idx,
                         transfer.dest_io, transfer.dest_ioargs,
@@ -1286,13 +1322,47 @@ class ExportInstanceHelper(object):
     else:
       return "disk/%d" % idx
 
-  def LocalExport(self, dest_node, compress):
+  def _GetDeltaBases(self, dest_node):
+    """Returns the chunk manifests of the previous export.
+
+    @type dest_node: L{objects.Node}
+    @param dest_node: Destination node
+    @rtype: list
+    @return: Manifest (or C{None}) for every disk of the instance
+
+    """
+    instance = self._instance
+    disk_count = len(instance.disks)
+
+    result = self._lu.rpc.call_export_manifests(dest_node.uuid, instance.name)
+    if result.fail_msg:
+      self._lu.LogWarning("Could not retrieve manifests of previous export"
+                          " of instance %s on node %s, doing a full export:"
+                          " %s", instance.name, dest_node.name,
+                          result.fail_msg)
+      return [None] * disk_count
+
+    manifests = result.payload
+    if len(manifests) != disk_count:
+      if manifests:
+        self._lu.LogWarning("Previous export of instance %s on node %s has"
+                            " %s disks instead of %s, doing a full export",
+                            instance.name, dest_node.name, len(manifests),
+                            disk_count)
+      return [None] * disk_count
+
+    return manifests
+
+  def LocalExport(self, dest_node, compress, incremental=False):
     """Intra-cluster instance export.
 
     @type dest_node: L{objects.Node}
     @param dest_node: Destination node
     @type compress: string
     @param compress: Compression tool to use
+    @type incremental: bool
+    @param incremental: Whether to only transfer the chunks which changed
+      since the previous export to the same node
 
     """
     disks_to_transfer = self._GetDisksToTransfer()
@@ -1300,6 +1370,11 @@ class ExportInstanceHelper(object):
     instance = self._instance
     src_node_uuid = instance.primary_node
 
+    if incremental:
+      delta_bases = self._GetDeltaBases(dest_node)
+    else:
+      delta_bases = [None] * len(disks_to_transfer)
+
     transfers = []
 
     for idx, dev in enumerate(disks_to_transfer):
@@ -1315,9 +1390,14 @@ class ExportInstanceHelper(object):
         src_io = constants.IEIO_RAW_DISK
         src_ioargs = (dev, instance)
 
+      if delta_bases[idx]:
+        self._feedback_fn("Exporting only chunks of disk/%s changed since"
+                          " the previous export" % idx)
+
       # FIXME: pass debug option from opcode to backend
       dt = DiskTransfer(self._GetDiskLabel(idx), src_io, src_ioargs,
-                        constants.IEIO_FILE, (path, ), finished_fn)
+                        constants.IEIO_FILE, (path, ), finished_fn,
+                        incremental=incremental, delta_base=delta_bases[idx])
       transfers.append(dt)
 
     # Actually export data
@@ -1331,15 +1411,34 @@ class ExportInstanceHelper(object):
 
     # Finalize only if all the disks have been exported successfully
     if all(dresults):
-      self._feedback_fn("Finalizing export on %s" % dest_node.name)
-      result = self._lu.rpc.call_finalize_export(dest_node.uuid, instance,
-                                                 disks_to_transfer)
-      msg = result.fail_msg
-      fin_resu = not msg
-      if msg:
-        self._lu.LogWarning("Could not finalize export for instance %s"
-                            " on node %s: %s", instance.name, dest_node.name,
-                            msg)
+      rebuilt = True
+
+      if incremental:
+        # Applying the deltas reads and writes the complete images, which is
+        # done in a call of its own with a long timeout
+        self._feedback_fn("Rebuilding disk images on %s" % dest_node.name)
+        result = self._lu.rpc.call_export_rebuild_disks(dest_node.uuid,
+                                                        instance.name,
+                                                        disks_to_transfer)
+        msg = result.fail_msg
+        if msg:
+          self._lu.LogWarning("Could not rebuild disk images for instance %s"
+                              " on node %s: %s", instance.name,
+                              dest_node.name, msg)
+          rebuilt = False
+
+      if rebuilt:
+        self._feedback_fn("Finalizing export on %s" % dest_node.name)
+        result = self._lu.rpc.call_finalize_export(dest_node.uuid, instance,
+                                                   disks_to_transfer)
+        msg = result.fail_msg
+        fin_resu = not msg
+        if msg:
+          self._lu.LogWarning("Could not finalize export for instance %s"
+                              " on node %s: %s", instance.name,
+                              dest_node.name, msg)
+      else:
+        fin_resu = False
     else:
       fin_resu = False
       self._lu.LogWarning("Some disk exports have failed; there may be "
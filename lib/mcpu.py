@@ -49,13 +49,13 @@ from ganeti import opcodes_base
 from ganeti import constants
 from ganeti import errors
 from ganeti import hooksmaster
+from ganeti import jstats
 from ganeti import cmdlib
 from ganeti import locking
 from ganeti import utils
 from ganeti import wconfd
 
 
-sighupReceived = [False]
 lusExecuting = [0]
 
 _OP_PREFIX = "Op"
@@ -157,6 +157,15 @@ class OpExecCbBase(object): # pylint: disable=W0232
 
     """
 
+  def RecordLockWait(self, stats):
+    """Called after each attempt to acquire locks.
+
+    @type stats: dict
+    @param stats: statistics about the attempt, see
+        L{Processor._RecordLockWait}
+
+    """
+
   # TODO: Cleanup calling conventions, make them explicit.
   def Feedback(self, *args):
     """Sends feedback from the LU code to the end-user.
@@ -275,6 +284,26 @@ def _LockList(names):
     return list(names)
 
 
+def _RequestLevels(request):
+  """Returns the names of the lock levels involved in a WConfD lock request.
+
+  @type request: list
+  @param request: the lock request, a list of C{[lock, mode]} pairs
+  @rtype: list of strings
+
+  """
+  return utils.UniqueSequence(lock.split("/", 1)[0] for (lock, _) in request)
+
+
+def _LockWaitPhase(request):
+  """Returns the name of the phase of waiting for a lock request.
+
+  @see: L{jstats}
+
+  """
+  return "lock-wait/%s" % ",".join(_RequestLevels(request))
+
+
 def _CheckSecretParameters(op):
   """Check if secret parameters are expected, but missing.
 
@@ -340,37 +369,103 @@ class Processor(object):
     if priority is None:
       priority = constants.OP_PRIO_DEFAULT
 
-    ## Expect a signal
-    if sighupReceived[0]:
-      logging.warning("Ignoring unexpected SIGHUP")
-    sighupReceived[0] = False
-
     # Request locks
-    self.wconfd.Client().UpdateLocksWaiting(self._wconfdcontext, priority,
-                                            request)
-    pending = self.wconfd.Client().HasPendingRequest(self._wconfdcontext)
+    start = time.time()
+    with jstats.Measure(_LockWaitPhase(request)):
+      client = self.wconfd.Client()
+      blockers = client.UpdateLocksWaiting(self._wconfdcontext, priority,
+                                           request)
+      pending = self._WaitForPendingRequest(client, timeout)
 
+    self._RecordLockWait(request, start, pending,
+                         [owner[0] for owner in blockers])
+
+    logging.debug("Finished trying. Pending: %s", pending)
     if pending:
-      def _HasPending():
-        if sighupReceived[0]:
-          return self.wconfd.Client().HasPendingRequest(self._wconfdcontext)
-        else:
-          return True
+      raise LockAcquireTimeout()
 
-      pending = utils.SimpleRetry(False, _HasPending, 0.05, timeout)
+  def _RecordLockWait(self, request, start, pending, blockers,
+                      _time_fn=time.time):
+    """Records statistics about an attempt to acquire locks.
 
-      signal = sighupReceived[0]
+    The statistics are passed to the L{OpExecCbBase.RecordLockWait} callback
+    as a dictionary with the following keys:
+      - C{levels}: names of the lock levels involved
+      - C{count}: number of locks requested
+      - C{requested}: timestamp of the request
+      - C{granted}: timestamp of the grant, C{None} if the attempt timed out
+      - C{wait}: time waited in seconds
+      - C{blockers}: owners (usually job IDs) holding conflicting locks at the
+        time of the request
 
-      if pending:
-        pending = self.wconfd.Client().HasPendingRequest(self._wconfdcontext)
+    @type request: list
+    @param request: the lock request sent to WConfD
+    @type start: float
+    @param start: time of the request
+    @type pending: bool
+    @param pending: whether the request is still pending
+    @type blockers: list
+    @param blockers: the owners that blocked the request
 
-      if pending and signal:
-        logging.warning("Ignoring unexpected SIGHUP")
-      sighupReceived[0] = False
+    """
+    end = _time_fn()
 
-    logging.debug("Finished trying. Pending: %s", pending)
     if pending:
-      raise LockAcquireTimeout()
+      granted = None
+    else:
+      granted = utils.SplitTime(end)
+
+    stats = {
+      "levels": _RequestLevels(request),
+      "count": len(request),
+      "requested": utils.SplitTime(start),
+      "granted": granted,
+      "wait": end - start,
+      "blockers": blockers,
+      }
+
+    if self._cbs:
+      self._cbs.RecordLockWait(stats)
+
+  def _WaitForPendingRequest(self, client, timeout, _time_fn=time.time):
+    """Wait for the pending lock request to be granted by WConfD.
+
+    WConfD blocks each call until the request is granted, or the time passed
+    to it is over, so the job wakes up as soon as the locks are available
+    without polling.
+
+    @type client: L{wconfd.Client}
+    @param client: the client to use for talking to WConfD
+    @type timeout: float or None
+    @param timeout: the time to wait for the request to be granted, C{None}
+        to wait forever
+    @rtype: bool
+    @return: whether the request is still pending
+
+    """
+    start = _time_fn()
+    calls = 0
+
+    while True:
+      if timeout is None:
+        wait = constants.WCONFD_LOCK_WAIT_TIMEOUT
+      else:
+        wait = max(0.0, min(start + timeout - _time_fn(),
+                            constants.WCONFD_LOCK_WAIT_TIMEOUT))
+
+      pending = client.WaitPendingRequest(self._wconfdcontext, wait)
+      calls += 1
+
+      if not pending or (timeout is not None and
+                         _time_fn() >= start + timeout):
+        break
+
+    logging.debug("Lock request of %s %s after %.3fs and %d WConfD calls",
+                  self._wconfdcontext,
+                  "still pending" if pending else "granted",
+                  _time_fn() - start, calls)
+
+    return pending
 
   def _AcquireLocks(self, level, names, shared, opportunistic, timeout,
                     opportunistic_count=1, request_only=False):
@@ -452,22 +547,21 @@ class Processor(object):
       ## acquire the locks one by one (in lock order).
       for r in request:
         logging.debug("Definite request %s for %s", r, self._wconfdcontext)
-        self.wconfd.Client().UpdateLocksWaiting(self._wconfdcontext, priority,
-                                                [r])
-        while True:
-          pending = self.wconfd.Client().HasPendingRequest(self._wconfdcontext)
-          if not pending:
-            break
-          time.sleep(10.0 * random.random())
+        self._RequestAndWait([r], None)
 
     elif opportunistic:
       logging.debug("For %ss trying to opportunistically acquire"
                     "  at least %d of %s for %s.",
                     timeout, opportunistic_count, locks, self._wconfdcontext)
-      locks = utils.SimpleRetry(
-        lambda l: l != [], self.wconfd.Client().GuardedOpportunisticLockUnion,
-        2.0, timeout, args=[opportunistic_count, self._wconfdcontext, request])
+      start = time.time()
+      with jstats.Measure(_LockWaitPhase(request)):
+        locks = utils.SimpleRetry(
+          lambda l: l != [],
+          self.wconfd.Client().GuardedOpportunisticLockUnion,
+          2.0, timeout,
+          args=[opportunistic_count, self._wconfdcontext, request])
       logging.debug("Managed to get the following locks: %s", locks)
+      self._RecordLockWait(request, start, locks == [], [])
       if locks == []:
         raise LockAcquireTimeout()
     else:
@@ -481,13 +575,15 @@ class Processor(object):
     """
     write_count = self.cfg.write_count
     lu.cfg.OutDate()
-    lu.CheckPrereq()
+    with jstats.Measure("check-prereq"):
+      lu.CheckPrereq()
 
     self._hm = self.BuildHooksManager(lu)
     try:
       # Run hooks twice: first for the global hooks, then for the usual hooks.
-      self._hm.RunPhase(constants.HOOKS_PHASE_PRE, is_global=True)
-      h_results = self._hm.RunPhase(constants.HOOKS_PHASE_PRE)
+      with jstats.Measure("hooks-pre"):
+        self._hm.RunPhase(constants.HOOKS_PHASE_PRE, is_global=True)
+        h_results = self._hm.RunPhase(constants.HOOKS_PHASE_PRE)
     except Exception, err:  # pylint: disable=W0703
       # This gives the LU a chance of cleaning up in case of an hooks failure.
       # The type of exception is deliberately broad to be able to react to
@@ -514,8 +610,11 @@ class Processor(object):
 
     lusExecuting[0] += 1
     try:
-      result = _ProcessResult(submit_mj_fn, lu.op, lu.Exec(self.Log))
-      h_results = self._hm.RunPhase(constants.HOOKS_PHASE_POST)
+      with jstats.Measure("exec"):
+        result = lu.Exec(self.Log)
+      result = _ProcessResult(submit_mj_fn, lu.op, result)
+      with jstats.Measure("hooks-post"):
+        h_results = self._hm.RunPhase(constants.HOOKS_PHASE_POST)
       result = lu.HooksCallBack(constants.HOOKS_PHASE_POST, h_results,
                                 self.Log, result)
     finally:
@@ -612,7 +711,8 @@ class Processor(object):
     if adding_locks or acquiring_locks:
       self._CheckLocksEnabled()
 
-      lu.DeclareLocks(level)
+      with jstats.Measure("declare-locks"):
+        lu.DeclareLocks(level)
       share = lu.share_locks[level]
       opportunistic_count = lu.opportunistic_locks_count[level]
 
@@ -695,7 +795,8 @@ class Processor(object):
                     self._wconfdcontext, self.wconfd)
       lu.wconfdlocks = self.wconfd.Client().ListLocks(self._wconfdcontext)
       _CheckSecretParameters(op)
-      lu.ExpandNames()
+      with jstats.Measure("expand-names"):
+        lu.ExpandNames()
       assert lu.needed_locks is not None, "needed_locks not set by LU"
 
       try:
@@ -745,8 +846,9 @@ class Processor(object):
       # all the possible errors during pre hooks and LU execution cause
       # exception and therefore the statement below will be skipped.
       if self._hm is not None:
-        self._hm.RunPhase(constants.HOOKS_PHASE_POST, is_global=True,
-                          post_status=constants.POST_HOOKS_STATUS_SUCCESS)
+        with jstats.Measure("hooks-post"):
+          self._hm.RunPhase(constants.HOOKS_PHASE_POST, is_global=True,
+                            post_status=constants.POST_HOOKS_STATUS_SUCCESS)
     except:
       # execute global post hooks with the failed status on any exception
       hooksmaster.ExecGlobalPostHooks(op.OP_ID, self.cfg.GetMasterNodeName(),
@@ -2227,6 +2227,13 @@ class ImportExportOptions(ConfigObject):
   @ivar magic: Used to ensure the connection goes to the right disk
   @ivar ipv6: Whether to use IPv6
   @ivar connect_timeout: Number of seconds for establishing connection
+  @ivar native_transfer: Whether the daemon should move the data itself
+    instead of through dd(1); requires no compression and is used for
+    uncompressed transfers within the cluster
+  @ivar incremental: Whether to export only the chunks which changed since
+    the previous export
+  @ivar delta_base: Chunk manifest of the previous export (incremental
+    exports only)
 
   """
   __slots__ = [
@@ -2236,6 +2243,9 @@ class ImportExportOptions(ConfigObject):
     "magic",
     "ipv6",
     "connect_timeout",
+    "native_transfer",
+    "incremental",
+    "delta_base",
     ]
 
 
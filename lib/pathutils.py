@@ -71,6 +71,7 @@ XEN_CONSOLE_WRAPPER = _constants.PKGLIBDIR + "/tools/xen-console-wrapper"
 CFGUPGRADE = _constants.PKGLIBDIR + "/tools/cfgupgrade"
 POST_UPGRADE = _constants.PKGLIBDIR + "/tools/post-upgrade"
 ENSURE_DIRS = _constants.PKGLIBDIR + "/ensure-dirs"
+EXPORT_DELTA = _constants.PKGLIBDIR + "/export-delta"
 # Script to configure the metadata virtual network interface with Xen
 XEN_VIF_METAD_SETUP = _constants.PKGLIBDIR + "/vif-ganeti-metad"
 ETC_HOSTS = vcluster.ETC_HOSTS
@@ -102,6 +103,8 @@ INSTANCE_REASON_DIR = RUN_DIR + "/instance-reason"
 UIDPOOL_LOCKDIR = RUN_DIR + "/uid-pool"
 LIVELOCK_DIR = RUN_DIR + "/livelocks"
 LUXID_MESSAGE_DIR = RUN_DIR + "/luxidmessages"
+#: Results of RAPI read requests shared between the request processes
+RAPI_CACHE_DIR = RUN_DIR + "/rapi-cache"
 
 SSCONF_LOCK_FILE = LOCK_DIR + "/ganeti-ssconf.lock"
 
@@ -163,6 +166,8 @@ QUERY_SOCKET = SOCKET_DIR + "/ganeti-query"
 WCONFD_SOCKET = SOCKET_DIR + "/ganeti-wconfd"
 #: Metad socket
 METAD_SOCKET = SOCKET_DIR + "/ganeti-metad"
+#: Socket of the zygote forking job processes
+JOB_ZYGOTE_SOCKET = SOCKET_DIR + "/ganeti-job-zygote"
 
 LOG_OS_DIR = LOG_DIR + "/os"
 LOG_ES_DIR = LOG_DIR + "/extstorage"
@@ -43,12 +43,13 @@ converted to callable functions by L{query._CompileFilter}.
 import re
 import logging
 
-import pyparsing as pyp
-
 from ganeti import constants
 from ganeti import errors
 from ganeti import utils
 
+# The parser is only needed for filters given as text
+pyp = utils.LazyModule("pyparsing")
+
 
 OP_OR = constants.QLANG_OP_OR
 OP_AND = constants.QLANG_OP_AND
@@ -2651,6 +2651,16 @@ def _BuildJobFields():
     (_MakeField("oppriority", "OpCode_prio", QFT_OTHER,
                 "List of opcode priorities"),
      None, 0, _PerJobOp(operator.attrgetter("priority"))),
+    (_MakeField("oplocks", "OpCode_locks", QFT_OTHER,
+                "List of per-opcode lock acquisition statistics"),
+     None, 0, _PerJobOp(operator.attrgetter("lock_stats"))),
+    (_MakeField("opphasestats", "OpCode_phases", QFT_OTHER,
+                "List of per-opcode time and resource usage per phase"),
+     None, 0, _PerJobOp(lambda op: op.phase_stats.ToDict())),
+    (_MakeField("phasestats", "Phases", QFT_OTHER,
+                "Time and resource usage per phase of the job process"
+                " outside of opcodes"),
+     None, 0, _JobUnavail(lambda job: job.phase_stats.ToDict())),
     (_MakeField("summary", "Summary", QFT_OTHER,
                 "List of per-opcode summaries"),
      None, 0, _PerJobOp(lambda op: op.input.Summary())),
@@ -2988,3 +2998,33 @@ ALL_FIELDS = {
 
 #: All available field lists
 ALL_FIELD_LISTS = ALL_FIELDS.values()
+
+#: Kinds of data which are collected from the nodes instead of being read from
+#: the cluster configuration, for the resources stored in the configuration
+_LIVE_DATA_KINDS = {
+  constants.QR_INSTANCE: frozenset([IQ_LIVE, IQ_CONSOLE]),
+  constants.QR_NODE: frozenset([NQ_LIVE, NQ_OOB]),
+  constants.QR_GROUP: frozenset(),
+  constants.QR_NETWORK: frozenset(),
+  }
+
+
+def NeedsLiveData(resource, fields):
+  """Returns whether a query needs data collected from the nodes.
+
+  The values of all other fields depend only on the cluster configuration.
+  Unknown fields are ignored.
+
+  @type resource: string
+  @param resource: Resource stored in the cluster configuration, e.g.
+    L{constants.QR_INSTANCE}
+  @type fields: list of string
+  @param fields: Field names
+  @rtype: bool
+
+  """
+  kinds = _LIVE_DATA_KINDS[resource]
+  fielddefs = ALL_FIELDS[resource]
+
+  return compat.any(fielddefs[name][1] in kinds
+                    for name in fields if name in fielddefs)
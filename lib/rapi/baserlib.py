@@ -296,6 +296,10 @@ def CheckParameter(data, name, default=_DEFAULT, exptype=_DEFAULT):
 class ResourceBase(object):
   """Generic class for resources.
 
+  @cvar GET_CACHEABLE: Whether the results of GET requests depend only on the
+    request and the state of the cluster, and may therefore be served from
+    the result cache and validated using entity tags
+
   """
   # Default permission requirements
   GET_ACCESS = []
@@ -303,13 +307,18 @@ class ResourceBase(object):
   POST_ACCESS = [rapi.RAPI_ACCESS_WRITE]
   DELETE_ACCESS = [rapi.RAPI_ACCESS_WRITE]
 
-  def __init__(self, items, queryargs, req, _client_cls=None):
+  GET_CACHEABLE = False
+
+  def __init__(self, items, queryargs, req, _client_cls=None,
+               request_stats=None):
     """Generic resource constructor.
 
     @param items: a list with variables encoded in the URL
     @param queryargs: a dictionary with additional options from URL
     @param req: Request context
-    @param _client_cls: L{luxi} client class (unittests only)
+    @param _client_cls: Factory for L{luxi} clients, L{luxi.Client} by default
+    @type request_stats: L{ganeti.rapi.stats.RequestStats} or None
+    @param request_stats: Statistics of the requests handled by the daemon
 
     """
     assert isinstance(queryargs, dict)
@@ -322,6 +331,7 @@ class ResourceBase(object):
       _client_cls = luxi.Client
 
     self._client_cls = _client_cls
+    self._request_stats = request_stats
 
     self.auth_user = ""
 
@@ -400,6 +410,29 @@ class ResourceBase(object):
     """
     return bool(self._checkIntVariable("dry-run"))
 
+  def liveMaxAge(self):
+    """Returns the maximum age of reused live data requested by the client.
+
+    @rtype: int or None
+    @return: Age in seconds, or C{None} if the client didn't specify one
+
+    """
+    if "live_max_age" not in self.queryargs:
+      return None
+    return self._checkIntVariable("live_max_age")
+
+  def useResultCache(self):
+    """Check if the result of a GET request may be taken from the cache.
+
+    Requests asking for locking, or for live data newer than the cache
+    guarantees, are never served from the cache.
+
+    """
+    live_max_age = self.liveMaxAge()
+    return (self.GET_CACHEABLE and not self.useLocking() and
+            (live_max_age is None or
+             live_max_age >= constants.RAPI_CACHE_TTL))
+
   def GetClient(self):
     """Wrapper for L{luxi.Client} with HTTP-specific error handling.
 
@@ -413,11 +446,47 @@ class ResourceBase(object):
       raise http.HttpInternalServerError("Internal error: no permission to"
                                          " connect to the master daemon")
 
+  def GetConfigSerial(self):
+    """Returns the serial number of the cluster configuration.
+
+    @rtype: int or None
+    @return: The serial number, or C{None} if the master daemon doesn't
+      provide it
+
+    """
+    (serial, ) = self.GetClient().QueryConfigValues(["serial_no"])
+    return serial
+
+  def UsesLiveData(self):
+    """Returns whether the result of a GET request includes live data.
+
+    Unlike results computed from the cluster configuration only, results
+    including data collected from the nodes can change while the
+    configuration's serial number stays the same. The result cache
+    therefore only reuses them for a limited time.
+
+    @rtype: bool
+
+    """
+    return True
+
   def GetAuthReason(self):
     return (constants.OPCODE_REASON_SRC_RLIB2,
             constants.OPCODE_REASON_AUTH_USER + self.auth_user,
             utils.EpochNano())
 
+  def _AddAuthReason(self, ops):
+    """Adds the authorized user name to the reason trail of opcodes.
+
+    @type ops: list
+    @param ops: the list of opcodes for a job
+
+    """
+    for opcode in ops:
+      trail = getattr(opcode, constants.OPCODE_REASON, [])
+      trail.append(self.GetAuthReason())
+      setattr(opcode, constants.OPCODE_REASON, trail)
+
   def SubmitJob(self, op, cl=None):
     """Generic wrapper for submit job, for better http compatibility.
 
@@ -431,25 +500,46 @@ class ResourceBase(object):
     """
     if cl is None:
       cl = self.GetClient()
-    try:
-      for opcode in op:
-        # Add an authorized user name to the reason trail
-        trail = getattr(opcode, constants.OPCODE_REASON, [])
-        trail.append(self.GetAuthReason())
-        setattr(opcode, constants.OPCODE_REASON, trail)
-      return cl.SubmitJob(op)
-    except errors.JobQueueFull:
-      raise http.HttpServiceUnavailable("Job queue is full, needs archiving")
-    except errors.JobQueueDrainError:
-      raise http.HttpServiceUnavailable("Job queue is drained, cannot submit")
-    except rpcerr.NoMasterError, err:
-      raise http.HttpBadGateway("Master seems to be unreachable: %s" % err)
-    except rpcerr.PermissionError:
-      raise http.HttpInternalServerError("Internal error: no permission to"
-                                         " connect to the master daemon")
-    except rpcerr.TimeoutError, err:
-      raise http.HttpGatewayTimeout("Timeout while talking to the master"
-                                    " daemon: %s" % err)
+    self._AddAuthReason(op)
+    return _CallSubmit(cl.SubmitJob, op)
+
+  def SubmitManyJobs(self, jobs, cl=None):
+    """Submits multiple jobs at once, see L{SubmitJob}.
+
+    @type jobs: list
+    @param jobs: the list of jobs, each a list of opcodes
+    @type cl: None or luxi.Client
+    @param cl: optional luxi client to use
+    @rtype: list
+    @return: for each job, a tuple of a boolean denoting whether it was
+      submitted successfully and the job ID or the error message
+
+    """
+    if cl is None:
+      cl = self.GetClient()
+    for ops in jobs:
+      self._AddAuthReason(ops)
+    return _CallSubmit(cl.SubmitManyJobs, jobs)
+
+
+def _CallSubmit(fn, *args):
+  """Calls a job submission function, converting errors to HTTP errors.
+
+  """
+  try:
+    return fn(*args)
+  except errors.JobQueueFull:
+    raise http.HttpServiceUnavailable("Job queue is full, needs archiving")
+  except errors.JobQueueDrainError:
+    raise http.HttpServiceUnavailable("Job queue is drained, cannot submit")
+  except rpcerr.NoMasterError, err:
+    raise http.HttpBadGateway("Master seems to be unreachable: %s" % err)
+  except rpcerr.PermissionError:
+    raise http.HttpInternalServerError("Internal error: no permission to"
+                                       " connect to the master daemon")
+  except rpcerr.TimeoutError, err:
+    raise http.HttpGatewayTimeout("Timeout while talking to the master"
+                                  " daemon: %s" % err)
 
 
 def GetResourceOpcodes(cls):
@@ -0,0 +1,252 @@
+#
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Remote API result cache.
+
+The results of read requests are kept in files, which are shared by the
+requests the RAPI daemon handles concurrently and survive restarts of the
+daemon. Each cache entry records the serial number of the cluster
+configuration it was computed from and is only reused as long as that
+serial is unchanged. Results including live data (e.g. the run state of
+instances) are additionally only reused for L{constants.RAPI_CACHE_TTL}
+seconds, which bounds how outdated such data can be.
+
+The most recently used entries are also kept in memory, so that repeated
+requests (e.g. from dashboards listing instance names) are answered
+without reading files or taking locks.
+
+Identical concurrent requests wait for the first one to compute the result
+instead of all querying the master daemon.
+
+"""
+
+import logging
+import threading
+import time
+
+from ganeti import compat
+from ganeti import constants
+from ganeti import errors
+from ganeti import serializer
+from ganeti import utils
+
+
+#: Number of cache entries; keys are mapped to them by their hash
+_SLOTS = 64
+
+#: How long to wait for another request computing the same result
+_LOCK_TIMEOUT = 30.0
+
+
+def ComputeETag(body):
+  """Computes the entity tag of a response body.
+
+  @type body: string
+  @param body: Serialized response
+  @rtype: string
+  @return: Quoted entity tag
+
+  """
+  return "\"%s\"" % compat.sha1_hash(body).hexdigest()
+
+
+class ResultCache(object):
+  """File-based cache for the results of read requests.
+
+  """
+  def __init__(self, cache_dir, ttl=constants.RAPI_CACHE_TTL,
+               _time_fn=time.time):
+    """Initializes this class.
+
+    @type cache_dir: string
+    @param cache_dir: Directory holding the cache files
+    @type ttl: number
+    @param ttl: Maximum age of reused results including live data, in seconds
+
+    """
+    self._cache_dir = cache_dir
+    self._ttl = ttl
+    self._time_fn = _time_fn
+
+    # Entries kept in memory, one per slot; they are never modified, only
+    # replaced
+    self._memory_lock = threading.Lock()
+    self._memory = {}
+
+  def _GetSlot(self, key):
+    """Returns the slot used for a key.
+
+    """
+    return int(compat.sha1_hash(key).hexdigest(), 16) % _SLOTS
+
+  def _GetSlotPath(self, slot):
+    """Returns the path of the cache file used for a slot.
+
+    """
+    return utils.PathJoin(self._cache_dir, "slot%02d" % slot)
+
+  def _IsCurrent(self, entry, key, serial, live):
+    """Returns whether a cache entry can be reused.
+
+    @type entry: dict
+    @param entry: Cache entry header
+
+    """
+    return (entry.get("key") == key and entry.get("serial") == serial and
+            not (live and self._time_fn() - entry.get("time", 0) >= self._ttl))
+
+  def _ReadEntry(self, path, key, serial, live):
+    """Reads a cache entry if it is current.
+
+    @rtype: tuple or None
+    @return: Tuple of entry header and response body, or C{None}
+
+    """
+    try:
+      content = utils.ReadFile(path)
+    except EnvironmentError:
+      return None
+
+    (header, _, body) = content.partition("\n")
+    try:
+      data = serializer.LoadJson(header)
+    except Exception: # pylint: disable=W0703
+      logging.warning("Ignoring corrupt cache file %s", path)
+      return None
+
+    if not self._IsCurrent(data, key, serial, live):
+      return None
+
+    return (data, body)
+
+  def _WriteEntry(self, path, key, serial, etag, body):
+    """Writes a cache entry.
+
+    @rtype: dict
+    @return: Entry header
+
+    """
+    data = {
+      "key": key,
+      "serial": serial,
+      "time": self._time_fn(),
+      "etag": etag,
+      }
+
+    # The serialized header ends with a newline
+    try:
+      utils.WriteFile(path, data=serializer.DumpJson(data) + body, mode=0600)
+    except EnvironmentError, err:
+      logging.warning("Can't write cache file %s: %s", path, err)
+
+    return data
+
+  def _GetMemoryEntry(self, slot, key, serial, live):
+    """Returns an entry kept in memory if it is current.
+
+    @rtype: tuple or None
+    @return: Tuple of entity tag and response body, or C{None}
+
+    """
+    self._memory_lock.acquire()
+    try:
+      entry = self._memory.get(slot)
+    finally:
+      self._memory_lock.release()
+
+    if entry is None:
+      return None
+
+    (data, body) = entry
+    if not self._IsCurrent(data, key, serial, live):
+      return None
+
+    return (data["etag"], body)
+
+  def _SetMemoryEntry(self, slot, data, body):
+    """Keeps an entry in memory.
+
+    """
+    self._memory_lock.acquire()
+    try:
+      self._memory[slot] = (data, body)
+    finally:
+      self._memory_lock.release()
+
+  def GetResult(self, key, serial, compute_fn, live=True):
+    """Returns the result of a request, computing it if necessary.
+
+    @type key: string
+    @param key: Request path, including the query string
+    @type serial: int
+    @param serial: Serial number of the current cluster configuration
+    @type compute_fn: callable
+    @param compute_fn: Function returning the serialized result
+    @type live: bool
+    @param live: Whether the result includes live data, see L{ResultCache}
+    @rtype: tuple
+    @return: Tuple of entity tag and serialized result
+
+    """
+    slot = self._GetSlot(key)
+
+    entry = self._GetMemoryEntry(slot, key, serial, live)
+    if entry is not None:
+      return entry
+
+    path = self._GetSlotPath(slot)
+
+    try:
+      lock = utils.FileLock.Open(path + ".lock")
+    except EnvironmentError, err:
+      logging.debug("Not using the result cache: %s", err)
+      body = compute_fn()
+      return (ComputeETag(body), body)
+
+    try:
+      try:
+        lock.Exclusive(blocking=True, timeout=_LOCK_TIMEOUT)
+      except errors.LockError:
+        logging.debug("Timeout waiting for the result cache, not using it")
+        body = compute_fn()
+        return (ComputeETag(body), body)
+
+      entry = self._ReadEntry(path, key, serial, live)
+      if entry is None:
+        body = compute_fn()
+        data = self._WriteEntry(path, key, serial, ComputeETag(body), body)
+      else:
+        (data, body) = entry
+    finally:
+      lock.Close()
+
+    self._SetMemoryEntry(slot, data, body)
+
+    return (data["etag"], body)
@@ -65,6 +65,7 @@ HTTP_GET = "GET"
 HTTP_PUT = "PUT"
 HTTP_POST = "POST"
 HTTP_OK = 200
+HTTP_NOT_MODIFIED = 304
 HTTP_NOT_FOUND = 404
 HTTP_APP_JSON = "application/json"
 
@@ -248,6 +249,15 @@ def _AppendReason(container, reason):
   return _AppendIf(container, reason, ("reason", reason))
 
 
+def _AppendListQuery(container, fields, qfilter):
+  """Appends the fields and filter arguments of list resources if given.
+
+  """
+  if fields is not None:
+    container.append(("fields", ",".join(fields)))
+  _AppendIf(container, qfilter is not None, ("filter", qfilter))
+
+
 def _SetItemIf(container, condition, item, value):
   """Sets an item if a condition evaluates to truth.
 
@@ -389,6 +399,9 @@ class GanetiRapiClient(object): # pylint: disable=R0904
   USER_AGENT = "Ganeti RAPI Client"
   _json_encoder = simplejson.JSONEncoder(sort_keys=True)
 
+  #: Maximum number of responses kept for conditional requests
+  _ETAG_CACHE_SIZE = 128
+
   def __init__(self, host, port=GANETI_RAPI_PORT,
                username=None, password=None, logger=logging,
                curl_config_fn=None, curl_factory=None):
@@ -413,6 +426,9 @@ class GanetiRapiClient(object): # pylint: disable=R0904
     self._curl_config_fn = curl_config_fn
     self._curl_factory = curl_factory
 
+    # Last response (entity tag and body) to GET requests, by URL
+    self._etag_cache = {}
+
     try:
       socket.inet_pton(socket.AF_INET6, host)
       address = "[%s]:%s" % (host, port)
@@ -445,10 +461,7 @@ class GanetiRapiClient(object): # pylint: disable=R0904
     curl.setopt(pycurl.USERAGENT, self.USER_AGENT)
     curl.setopt(pycurl.SSL_VERIFYHOST, 0)
     curl.setopt(pycurl.SSL_VERIFYPEER, False)
-    curl.setopt(pycurl.HTTPHEADER, [
-      "Accept: %s" % HTTP_APP_JSON,
-      "Content-type: %s" % HTTP_APP_JSON,
-      ])
+    curl.setopt(pycurl.HTTPHEADER, self._GetRequestHeaders())
 
     assert ((self._username is None and self._password is None) ^
             (self._username is not None and self._password is not None))
@@ -465,6 +478,18 @@ class GanetiRapiClient(object): # pylint: disable=R0904
 
     return curl
 
+  @staticmethod
+  def _GetRequestHeaders():
+    """Returns the headers sent with every request.
+
+    @rtype: list of strings
+
+    """
+    return [
+      "Accept: %s" % HTTP_APP_JSON,
+      "Content-type: %s" % HTTP_APP_JSON,
+      ]
+
   @staticmethod
   def _EncodeQuery(query):
     """Encode query values for RAPI URL.
@@ -493,12 +518,31 @@ class GanetiRapiClient(object): # pylint: disable=R0904
 
     return result
 
+  @staticmethod
+  def _GetResponseETag(header_lines):
+    """Extracts the entity tag from the headers of a response.
+
+    @type header_lines: list of strings
+    @param header_lines: Response header lines as returned by cURL
+    @rtype: string or None
+
+    """
+    for line in header_lines:
+      (name, sep, value) = line.partition(":")
+      if sep and name.strip().lower() == "etag":
+        return value.strip()
+    return None
+
   def _SendRequest(self, method, path, query, content):
     """Sends an HTTP request.
 
     This constructs a full URL, encodes and decodes HTTP bodies, and
     handles invalid responses in a pythonic way.
 
+    GET requests are made conditional on the entity tag of the last
+    response to the same URL, if any; if the server reports the resource
+    to be unchanged, the last response is returned again.
+
     @type method: string
     @param method: HTTP method to use
     @type path: string
@@ -537,12 +581,23 @@ class GanetiRapiClient(object): # pylint: disable=R0904
 
     # Buffer for response
     encoded_resp_body = StringIO()
+    resp_header_lines = []
+
+    if method == HTTP_GET:
+      cached = self._etag_cache.get(url, None)
+    else:
+      cached = None
 
     # Configure cURL
     curl.setopt(pycurl.CUSTOMREQUEST, str(method))
     curl.setopt(pycurl.URL, str(url))
     curl.setopt(pycurl.POSTFIELDS, str(encoded_content))
     curl.setopt(pycurl.WRITEFUNCTION, encoded_resp_body.write)
+    curl.setopt(pycurl.HEADERFUNCTION, resp_header_lines.append)
+    if cached:
+      curl.setopt(pycurl.HTTPHEADER,
+                  self._GetRequestHeaders() +
+                  ["If-None-Match: %s" % cached[0]])
 
     try:
       # Send request and wait for response
@@ -559,10 +614,25 @@ class GanetiRapiClient(object): # pylint: disable=R0904
       # between requests
       curl.setopt(pycurl.POSTFIELDS, "")
       curl.setopt(pycurl.WRITEFUNCTION, lambda _: None)
+      curl.setopt(pycurl.HEADERFUNCTION, lambda _: None)
 
     # Get HTTP response code
     http_code = curl.getinfo(pycurl.RESPONSE_CODE)
 
+    if http_code == HTTP_NOT_MODIFIED and cached:
+      self._logger.debug("Resource %s not modified", url)
+      http_code = HTTP_OK
+      encoded_resp_body = StringIO(cached[1])
+      encoded_resp_body.seek(0, 2)
+    elif method == HTTP_GET and http_code == HTTP_OK:
+      etag = self._GetResponseETag(resp_header_lines)
+      if etag:
+        if len(self._etag_cache) >= self._ETAG_CACHE_SIZE:
+          self._etag_cache.popitem()
+        self._etag_cache[url] = (etag, encoded_resp_body.getvalue())
+      else:
+        self._etag_cache.pop(url, None)
+
     # Was anything written to the response buffer?
     if encoded_resp_body.tell():
       response_content = simplejson.loads(encoded_resp_body.getvalue())
@@ -608,6 +678,16 @@ class GanetiRapiClient(object): # pylint: disable=R0904
 
       raise
 
+  def GetStatus(self):
+    """Gets statistics of the requests handled by the RAPI server.
+
+    @rtype: dict
+    @return: Request counts, rate and latencies
+
+    """
+    return self._SendRequest(HTTP_GET, "/%s/status" % GANETI_RAPI_VERSION,
+                             None, None)
+
   def GetOperatingSystems(self, reason=None):
     """Gets the Operating Systems running in the Ganeti cluster.
 
@@ -725,13 +805,22 @@ class GanetiRapiClient(object): # pylint: disable=R0904
     return self._SendRequest(HTTP_DELETE, "/%s/tags" % GANETI_RAPI_VERSION,
                              query, None)
 
-  def GetInstances(self, bulk=False, reason=None):
+  def GetInstances(self, bulk=False, reason=None, fields=None, qfilter=None,
+                   live_max_age=None):
     """Gets information about instances on the cluster.
 
     @type bulk: bool
     @param bulk: whether to return all information about all instances
     @type reason: string
     @param reason: the reason for executing this operation
+    @type fields: list of string
+    @param fields: fields to return in bulk mode, by default all
+    @type qfilter: string
+    @param qfilter: query filter in the syntax of the C{--filter} option of
+        the command line tools, see L{qlang.ParseFilter}
+    @type live_max_age: int
+    @param live_max_age: maximum age in seconds of reused live data, e.g.
+        the run state of instances
 
     @rtype: list of dict or list of str
     @return: if bulk is True, info about the instances, else a list of instances
@@ -739,6 +828,9 @@ class GanetiRapiClient(object): # pylint: disable=R0904
     """
     query = []
     _AppendIf(query, bulk, ("bulk", 1))
+    _AppendListQuery(query, fields, qfilter)
+    _AppendIf(query, live_max_age is not None,
+              ("live_max_age", live_max_age))
     _AppendReason(query, reason)
 
     instances = self._SendRequest(HTTP_GET,
@@ -861,6 +953,105 @@ class GanetiRapiClient(object): # pylint: disable=R0904
                              "/%s/instances-multi-alloc" % GANETI_RAPI_VERSION,
                              query, body)
 
+  def _InstancesMultiOp(self, operation, instances, max_concurrent, reason,
+                        kwargs):
+    """Applies an operation to multiple instances.
+
+    @type operation: string
+    @param operation: Name of the operation, e.g. C{startup}
+    @type instances: list
+    @param instances: Instance names or dictionaries with the instance name
+      under C{instance_name} and parameters for that instance only
+    @type max_concurrent: int or None
+    @param max_concurrent: Maximum number of jobs running at the same time
+    @type reason: string
+    @param reason: the reason for executing this operation
+    @param kwargs: Parameters for all instances
+    @rtype: list
+    @return: for each instance, a tuple of a boolean denoting whether the job
+      was submitted and the job ID or the error message
+
+    """
+    query = []
+    body = {
+      "instances": instances,
+      }
+    _SetItemIf(body, max_concurrent is not None, "max_concurrent",
+               max_concurrent)
+    self._UpdateWithKwargs(body, **kwargs)
+
+    _AppendDryRunIf(query, kwargs.get("dry_run"))
+    _AppendReason(query, reason)
+
+    return self._SendRequest(HTTP_POST,
+                             ("/%s/instances-multi-%s" %
+                              (GANETI_RAPI_VERSION, operation)), query, body)
+
+  def InstancesMultiStartup(self, instances, max_concurrent=None, reason=None,
+                            **kwargs):
+    """Starts up multiple instances, one job per instance.
+
+    More details for parameters can be found in the RAPI documentation.
+
+    @param instances: A list of instance names or dictionaries, see
+      L{_InstancesMultiOp}
+
+    """
+    return self._InstancesMultiOp("startup", instances, max_concurrent,
+                                  reason, kwargs)
+
+  def InstancesMultiShutdown(self, instances, max_concurrent=None, reason=None,
+                             **kwargs):
+    """Shuts down multiple instances, one job per instance.
+
+    More details for parameters can be found in the RAPI documentation.
+
+    @param instances: A list of instance names or dictionaries, see
+      L{_InstancesMultiOp}
+
+    """
+    return self._InstancesMultiOp("shutdown", instances, max_concurrent,
+                                  reason, kwargs)
+
+  def InstancesMultiReboot(self, instances, max_concurrent=None, reason=None,
+                           **kwargs):
+    """Reboots multiple instances, one job per instance.
+
+    More details for parameters can be found in the RAPI documentation.
+
+    @param instances: A list of instance names or dictionaries, see
+      L{_InstancesMultiOp}
+
+    """
+    return self._InstancesMultiOp("reboot", instances, max_concurrent,
+                                  reason, kwargs)
+
+  def InstancesMultiMigrate(self, instances, max_concurrent=None, reason=None,
+                            **kwargs):
+    """Migrates multiple instances, one job per instance.
+
+    More details for parameters can be found in the RAPI documentation.
+
+    @param instances: A list of instance names or dictionaries, see
+      L{_InstancesMultiOp}
+
+    """
+    return self._InstancesMultiOp("migrate", instances, max_concurrent,
+                                  reason, kwargs)
+
+  def InstancesMultiModify(self, instances, max_concurrent=None, reason=None,
+                           **kwargs):
+    """Modifies multiple instances, one job per instance.
+
+    More details for parameters can be found in the RAPI documentation.
+
+    @param instances: A list of instance names or dictionaries, see
+      L{_InstancesMultiOp}
+
+    """
+    return self._InstancesMultiOp("modify", instances, max_concurrent,
+                                  reason, kwargs)
+
   def CreateInstance(self, mode, name, disk_template, disks, nics,
                      reason=None, **kwargs):
     """Creates a new instance.
@@ -1550,6 +1741,34 @@ class GanetiRapiClient(object): # pylint: disable=R0904
                              "/%s/jobs/%s/wait" % (GANETI_RAPI_VERSION, job_id),
                              None, body)
 
+  def WaitForJobsChange(self, jobs, fields):
+    """Waits for changes on any of several jobs.
+
+    @type jobs: list of tuples
+    @param jobs: Tuples of job ID, previously received job information and
+      highest log serial number previously received, as passed to
+      L{WaitForJobChange}
+    @type fields: list
+    @param fields: Job fields on which to watch for changes
+    @return: A list of dicts with the keys C{id}, C{job_info} and
+      C{log_entries} for the jobs which changed, empty if no changes have
+      been detected
+    @rtype: list
+
+    """
+    body = {
+      "fields": fields,
+      "jobs": [{
+        "id": job_id,
+        "previous_job_info": prev_job_info,
+        "previous_log_serial": prev_log_serial,
+        } for (job_id, prev_job_info, prev_log_serial) in jobs],
+      }
+
+    return self._SendRequest(HTTP_GET,
+                             "/%s/jobs/wait" % GANETI_RAPI_VERSION,
+                             None, body)
+
   def CancelJob(self, job_id, dry_run=False):
     """Cancels a job.
 
@@ -1568,13 +1787,22 @@ class GanetiRapiClient(object): # pylint: disable=R0904
                              "/%s/jobs/%s" % (GANETI_RAPI_VERSION, job_id),
                              query, None)
 
-  def GetNodes(self, bulk=False, reason=None):
+  def GetNodes(self, bulk=False, reason=None, fields=None, qfilter=None,
+               live_max_age=None):
     """Gets all nodes in the cluster.
 
     @type bulk: bool
     @param bulk: whether to return all information about all instances
     @type reason: string
     @param reason: the reason for executing this operation
+    @type fields: list of string
+    @param fields: fields to return in bulk mode, by default all
+    @type qfilter: string
+    @param qfilter: query filter in the syntax of the C{--filter} option of
+        the command line tools, see L{qlang.ParseFilter}
+    @type live_max_age: int
+    @param live_max_age: maximum age in seconds of reused live data, e.g.
+        the run state of instances
 
     @rtype: list of dict or str
     @return: if bulk is true, info about nodes in the cluster,
@@ -1583,6 +1811,9 @@ class GanetiRapiClient(object): # pylint: disable=R0904
     """
     query = []
     _AppendIf(query, bulk, ("bulk", 1))
+    _AppendListQuery(query, fields, qfilter)
+    _AppendIf(query, live_max_age is not None,
+              ("live_max_age", live_max_age))
     _AppendReason(query, reason)
 
     nodes = self._SendRequest(HTTP_GET, "/%s/nodes" % GANETI_RAPI_VERSION,
@@ -1971,11 +2202,16 @@ class GanetiRapiClient(object): # pylint: disable=R0904
                              ("/%s/nodes/%s/tags" %
                               (GANETI_RAPI_VERSION, node)), query, None)
 
-  def GetNetworks(self, bulk=False, reason=None):
+  def GetNetworks(self, bulk=False, reason=None, fields=None, qfilter=None):
     """Gets all networks in the cluster.
 
     @type bulk: bool
     @param bulk: whether to return all information about the networks
+    @type fields: list of string
+    @param fields: fields to return in bulk mode, by default all
+    @type qfilter: string
+    @param qfilter: query filter in the syntax of the C{--filter} option of
+        the command line tools, see L{qlang.ParseFilter}
 
     @rtype: list of dict or str
     @return: if bulk is true, a list of dictionaries with info about all
@@ -1984,6 +2220,7 @@ class GanetiRapiClient(object): # pylint: disable=R0904
     """
     query = []
     _AppendIf(query, bulk, ("bulk", 1))
+    _AppendListQuery(query, fields, qfilter)
     _AppendReason(query, reason)
 
     networks = self._SendRequest(HTTP_GET, "/%s/networks" % GANETI_RAPI_VERSION,
@@ -2198,13 +2435,18 @@ class GanetiRapiClient(object): # pylint: disable=R0904
                              ("/%s/networks/%s/tags" %
                               (GANETI_RAPI_VERSION, network)), query, None)
 
-  def GetGroups(self, bulk=False, reason=None):
+  def GetGroups(self, bulk=False, reason=None, fields=None, qfilter=None):
     """Gets all node groups in the cluster.
 
     @type bulk: bool
     @param bulk: whether to return all information about the groups
     @type reason: string
     @param reason: the reason for executing this operation
+    @type fields: list of string
+    @param fields: fields to return in bulk mode, by default all
+    @type qfilter: string
+    @param qfilter: query filter in the syntax of the C{--filter} option of
+        the command line tools, see L{qlang.ParseFilter}
 
     @rtype: list of dict or str
     @return: if bulk is true, a list of dictionaries with info about all node
@@ -2213,6 +2455,7 @@ class GanetiRapiClient(object): # pylint: disable=R0904
     """
     query = []
     _AppendIf(query, bulk, ("bulk", 1))
+    _AppendListQuery(query, fields, qfilter)
     _AppendReason(query, reason)
 
     groups = self._SendRequest(HTTP_GET, "/%s/groups" % GANETI_RAPI_VERSION,
@@ -72,6 +72,21 @@ class RapiJobPollCb(cli.JobPollCbBase):
 
     return (result["job_info"], result["log_entries"])
 
+  def WaitForJobsChangeOnce(self, jobs, fields,
+                            timeout=constants.DEFAULT_WFJC_TIMEOUT):
+    """Waits for changes on any of several jobs.
+
+    """
+    result = {}
+
+    for change in self.cl.WaitForJobsChange(jobs, fields):
+      if change["job_info"] is None:
+        result[change["id"]] = None
+      else:
+        result[change["id"]] = (change["job_info"], change["log_entries"])
+
+    return result
+
   def QueryJobs(self, job_ids, fields):
     """Returns the given fields for the selected job IDs.
 
@@ -81,18 +96,21 @@ class RapiJobPollCb(cli.JobPollCbBase):
     @param fields: Fields
 
     """
-    if len(job_ids) != 1:
-      raise NotImplementedError("Only one job supported at this time")
+    results = []
 
-    try:
-      result = self.cl.GetJobStatus(job_ids[0])
-    except client.GanetiApiError, err:
-      if err.code == HTTP_NOT_FOUND:
-        return [None]
+    for job_id in job_ids:
+      try:
+        result = self.cl.GetJobStatus(job_id)
+      except client.GanetiApiError, err:
+        if err.code == HTTP_NOT_FOUND:
+          results.append(None)
+          continue
 
-      raise
+        raise
+
+      results.append([result[name] for name in fields])
 
-    return [[result[name] for name in fields], ]
+    return results
 
   def CancelJob(self, job_id):
     """Cancels a currently running job.
@@ -118,3 +136,21 @@ def PollJob(rapi_client, job_id, reporter):
 
   """
   return cli.GenericPollJob(job_id, RapiJobPollCb(rapi_client), reporter)
+
+
+def PollJobs(rapi_client, job_ids, reporter):
+  """Function to poll for the results of several jobs at once.
+
+  @param rapi_client: RAPI client instance
+  @type job_ids: list of numbers
+  @param job_ids: Job IDs
+  @type reporter: L{cli.JobPollReportCbBase}
+  @param reporter: PollJob reporter instance
+
+  @return: A generator yielding tuples of job ID, success and opresult (or
+    exception) as the jobs finish
+
+  @see: L{ganeti.cli.GenericPollJobs}
+
+  """
+  return cli.GenericPollJobs(job_ids, RapiJobPollCb(rapi_client), reporter)
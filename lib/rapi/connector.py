@@ -261,17 +261,24 @@ def GetHandlers(node_name_pattern, instance_name_pattern,
       rlib2.R_2_groups_name_tags,
 
     "/2/jobs": rlib2.R_2_jobs,
+    "/2/jobs/wait": rlib2.R_2_jobs_wait,
     translate_fn("/2/jobs/", job_id):
       rlib2.R_2_jobs_id,
     translate_fn("/2/jobs/", job_id, "/wait"):
       rlib2.R_2_jobs_id_wait,
 
     "/2/instances-multi-alloc": rlib2.R_2_instances_multi_alloc,
+    "/2/instances-multi-startup": rlib2.R_2_instances_multi_startup,
+    "/2/instances-multi-shutdown": rlib2.R_2_instances_multi_shutdown,
+    "/2/instances-multi-reboot": rlib2.R_2_instances_multi_reboot,
+    "/2/instances-multi-migrate": rlib2.R_2_instances_multi_migrate,
+    "/2/instances-multi-modify": rlib2.R_2_instances_multi_modify,
     "/2/tags": rlib2.R_2_tags,
     "/2/info": rlib2.R_2_info,
     "/2/os": rlib2.R_2_os,
     "/2/redistribute-config": rlib2.R_2_redist_config,
     "/2/features": rlib2.R_2_features,
+    "/2/status": rlib2.R_2_status,
     "/2/modify": rlib2.R_2_cluster_modify,
 
     translate_fn("/2/query/", query_res):
@@ -70,6 +70,9 @@ from ganeti import opcodes
 from ganeti import objects
 from ganeti import http
 from ganeti import constants
+from ganeti import errors
+from ganeti import qlang
+from ganeti import query
 from ganeti import cli
 from ganeti import rapi
 from ganeti import ht
@@ -142,6 +145,8 @@ J_FIELDS_BULK = [
 J_FIELDS = J_FIELDS_BULK + [
   "oplog",
   "opresult",
+  "phasestats",
+  "opphasestats",
   ]
 
 _NR_DRAINED = "drained"
@@ -201,6 +206,120 @@ def _UpdateBeparams(inst):
   return inst
 
 
+def _GetFilterFields(qfilter):
+  """Returns the names of all fields used in a query filter.
+
+  @type qfilter: list
+  @param qfilter: Query filter, see L{qlang}
+  @rtype: set
+
+  """
+  if not isinstance(qfilter, list) or len(qfilter) < 2:
+    raise http.HttpBadRequest("Invalid query filter")
+
+  op = qfilter[0]
+  if op in (qlang.OP_OR, qlang.OP_AND, qlang.OP_NOT):
+    return set().union(*[_GetFilterFields(operand)
+                         for operand in qfilter[1:]])
+
+  # All other operators take a field name as their first operand
+  return set([qfilter[1]])
+
+
+def _GetListQuery(rsrc, bulk_fields):
+  """Returns the fields and filter requested from a list resource.
+
+  The client can pass the C{fields} query argument to request only some of
+  the fields returned in bulk mode, and the C{filter} query argument to list
+  only the items matching a filter (see L{qlang.ParseFilter}). As list
+  resources can be read without authentication, only the fields returned in
+  bulk mode can be used.
+
+  @type rsrc: L{baserlib.ResourceBase}
+  @param rsrc: Resource handling the request
+  @type bulk_fields: list of string
+  @param bulk_fields: Fields returned in bulk mode
+  @rtype: tuple; (list of string, list or None, set)
+  @return: The fields to query, the query filter and the names of all fields
+    used by either
+
+  """
+  if "fields" in rsrc.queryargs:
+    if not rsrc.useBulk():
+      raise http.HttpBadRequest("The 'fields' query argument can only be"
+                                " used with bulk output")
+    fields = _GetQueryFields(rsrc.queryargs)
+  elif rsrc.useBulk():
+    fields = bulk_fields
+  else:
+    fields = ["name"]
+
+  used_fields = set(fields)
+
+  text = rsrc.queryargs.get("filter", [None])[0]
+  if text:
+    try:
+      qfilter = qlang.ParseFilter(text)
+    except errors.QueryFilterParseError, err:
+      raise http.HttpBadRequest("Invalid query filter: %s" % err)
+    used_fields.update(_GetFilterFields(qfilter))
+  else:
+    qfilter = None
+
+  unknown = used_fields - set(bulk_fields)
+  if unknown:
+    raise http.HttpBadRequest("Unsupported field(s): %s" %
+                              ", ".join(sorted(unknown)))
+
+  return (fields, qfilter, used_fields)
+
+
+def _QueryListItems(rsrc, resource, bulk_fields, classic_fn):
+  """Queries the items of a list resource.
+
+  Fields and filter requested by the client (see L{_GetListQuery}) are
+  passed on to the query, so that e.g. live data is only collected if
+  requested. So is the maximum age of reused live data, given in the
+  C{live_max_age} query argument.
+
+  @type rsrc: L{baserlib.ResourceBase}
+  @param rsrc: Resource handling the request
+  @type resource: string
+  @param resource: Query resource, one of L{constants.QR_VIA_RAPI}
+  @type bulk_fields: list of string
+  @param bulk_fields: Fields returned in bulk mode
+  @type classic_fn: callable
+  @param classic_fn: Function querying all items given a list of fields,
+    used if neither fields, a filter nor a maximum age were requested
+  @rtype: tuple; (list of string, list of lists)
+  @return: The queried fields and their values for all items
+
+  """
+  (fields, qfilter, _) = _GetListQuery(rsrc, bulk_fields)
+  live_max_age = rsrc.liveMaxAge()
+
+  if not ("fields" in rsrc.queryargs or qfilter or live_max_age is not None):
+    return (fields, classic_fn([], fields))
+
+  response = rsrc.GetClient().Query(resource, fields, qfilter,
+                                    live_max_age=live_max_age)
+
+  # Like the classic queries, return None for unavailable values
+  return (fields, [[value if status == constants.RS_NORMAL else None
+                    for (status, value) in row]
+                   for row in response.data])
+
+
+def _ListNeedsLiveData(rsrc, resource, bulk_fields):
+  """Returns whether listing the items of a resource needs live data.
+
+  @see: L{_QueryListItems}
+
+  """
+  (_, _, used_fields) = _GetListQuery(rsrc, bulk_fields)
+  return query.NeedsLiveData(resource, used_fields)
+
+
 def _CheckIfConnectionDropped(sock):
   """Utility function to monitor the state of an open connection.
 
@@ -261,6 +380,7 @@ class R_2_info(baserlib.OpcodeResource):
   """/2/info resource.
 
   """
+  GET_CACHEABLE = True
   GET_OPCODE = opcodes.OpClusterQuery
   GET_ALIASES = {
     "volume_group_name": "vg_name",
@@ -287,6 +407,19 @@ class R_2_features(baserlib.ResourceBase):
     return list(ALL_FEATURES)
 
 
+class R_2_status(baserlib.ResourceBase):
+  """/2/status resource.
+
+  """
+  def GET(self):
+    """Returns statistics of the requests handled by the RAPI daemon.
+
+    """
+    if self._request_stats is None:
+      raise http.HttpNotFound(message="Request statistics are not collected")
+    return self._request_stats.ToDict()
+
+
 class R_2_os(baserlib.OpcodeResource):
   """/2/os resource.
 
@@ -495,6 +628,10 @@ class R_2_jobs_id(baserlib.ResourceBase):
               opcodes in the job
             - opstatus: OpCodes status as a list
             - opresult: OpCodes results as a list of lists
+            - phasestats: time and resource usage per phase of the job
+              process outside of opcodes
+            - opphasestats: time and resource usage per phase as a list
+              for each opcode
 
     """
     job_id = self.items[0]
@@ -561,10 +698,80 @@ class R_2_jobs_id_wait(baserlib.ResourceBase):
       }
 
 
+class R_2_jobs_wait(baserlib.ResourceBase):
+  """/2/jobs/wait resource.
+
+  """
+  # Like /2/jobs/[job_id]/wait, this is a blocking call giving access to
+  # sensitive information
+  GET_ACCESS = [rapi.RAPI_ACCESS_WRITE]
+
+  def GET(self):
+    """Waits for changes on any of several jobs.
+
+    @return: a list of dictionaries with the keys C{id}, C{job_info} and
+      C{log_entries}, one for each job which changed; if a job can't be found,
+      its C{job_info} and C{log_entries} are C{None}
+
+    """
+    fields = self.getBodyParameter("fields")
+    jobs = self.getBodyParameter("jobs")
+
+    if not isinstance(fields, list):
+      raise http.HttpBadRequest("The 'fields' parameter should be a list")
+
+    if not (isinstance(jobs, list) and jobs and
+            compat.all(isinstance(job, dict) and "id" in job
+                       for job in jobs)):
+      raise http.HttpBadRequest("The 'jobs' parameter should be a non-empty"
+                                " list of dictionaries containing a job ID")
+
+    args = []
+    for job in jobs:
+      prev_job_info = job.get("previous_job_info", None)
+      prev_log_serial = job.get("previous_log_serial", None)
+
+      if not (prev_job_info is None or isinstance(prev_job_info, list)):
+        raise http.HttpBadRequest("The 'previous_job_info' parameter should"
+                                  " be a list")
+
+      if not (prev_log_serial is None or
+              isinstance(prev_log_serial, (int, long))):
+        raise http.HttpBadRequest("The 'previous_log_serial' parameter should"
+                                  " be a number")
+
+      args.append((job["id"], prev_job_info, prev_log_serial))
+
+    client = self.GetClient()
+    result = client.WaitForJobsChangeOnce(args, fields, timeout=_WFJC_TIMEOUT)
+
+    changes = []
+    for (job_id, update) in sorted(result.items()):
+      if update:
+        (job_info, log_entries) = update
+      else:
+        (job_info, log_entries) = (None, None)
+
+      changes.append({
+        "id": job_id,
+        "job_info": job_info,
+        "log_entries": log_entries,
+        })
+
+    return changes
+
+
 class R_2_nodes(baserlib.OpcodeResource):
   """/2/nodes resource.
 
   """
+  GET_CACHEABLE = True
+
+  def UsesLiveData(self):
+    """Returns whether listing the nodes needs live data.
+
+    """
+    return _ListNeedsLiveData(self, constants.QR_NODE, N_FIELDS)
 
   def GET(self):
     """Returns a list of all nodes.
@@ -572,12 +779,14 @@ class R_2_nodes(baserlib.OpcodeResource):
     """
     client = self.GetClient()
 
+    (fields, data) = \
+      _QueryListItems(self, constants.QR_NODE, N_FIELDS,
+                      compat.partial(client.QueryNodes, use_locking=False))
+
     if self.useBulk():
-      bulkdata = client.QueryNodes([], N_FIELDS, False)
-      return baserlib.MapBulkFields(bulkdata, N_FIELDS)
+      return baserlib.MapBulkFields(data, fields)
     else:
-      nodesdata = client.QueryNodes([], ["name"], False)
-      nodeslist = [row[0] for row in nodesdata]
+      nodeslist = [row[0] for row in data]
       return baserlib.BuildUriList(nodeslist, "/2/nodes/%s",
                                    uri_fields=("id", "uri"))
 
@@ -586,6 +795,7 @@ class R_2_nodes_name(baserlib.OpcodeResource):
   """/2/nodes/[node_name] resource.
 
   """
+  GET_CACHEABLE = True
   GET_ALIASES = {
     "sip": "secondary_ip",
     }
@@ -831,6 +1041,7 @@ class R_2_networks(baserlib.OpcodeResource):
   """/2/networks resource.
 
   """
+  GET_CACHEABLE = True
   POST_OPCODE = opcodes.OpNetworkAdd
   POST_RENAME = {
     "name": "network_name",
@@ -845,17 +1056,25 @@ class R_2_networks(baserlib.OpcodeResource):
       "dry_run": self.dryRun(),
       })
 
+  def UsesLiveData(self):
+    """Returns whether listing the networks needs live data.
+
+    """
+    return _ListNeedsLiveData(self, constants.QR_NETWORK, NET_FIELDS)
+
   def GET(self):
     """Returns a list of all networks.
 
     """
     client = self.GetClient()
 
+    (fields, data) = \
+      _QueryListItems(self, constants.QR_NETWORK, NET_FIELDS,
+                      compat.partial(client.QueryNetworks, use_locking=False))
+
     if self.useBulk():
-      bulkdata = client.QueryNetworks([], NET_FIELDS, False)
-      return baserlib.MapBulkFields(bulkdata, NET_FIELDS)
+      return baserlib.MapBulkFields(data, fields)
     else:
-      data = client.QueryNetworks([], ["name"], False)
       networknames = [row[0] for row in data]
       return baserlib.BuildUriList(networknames, "/2/networks/%s",
                                    uri_fields=("name", "uri"))
@@ -865,6 +1084,7 @@ class R_2_networks_name(baserlib.OpcodeResource):
   """/2/networks/[network_name] resource.
 
   """
+  GET_CACHEABLE = True
   DELETE_OPCODE = opcodes.OpNetworkRemove
 
   def GET(self):
@@ -946,6 +1166,7 @@ class R_2_groups(baserlib.OpcodeResource):
   """/2/groups resource.
 
   """
+  GET_CACHEABLE = True
   POST_OPCODE = opcodes.OpGroupAdd
   POST_RENAME = {
     "name": "group_name",
@@ -961,17 +1182,25 @@ class R_2_groups(baserlib.OpcodeResource):
       "dry_run": self.dryRun(),
       })
 
+  def UsesLiveData(self):
+    """Returns whether listing the node groups needs live data.
+
+    """
+    return _ListNeedsLiveData(self, constants.QR_GROUP, G_FIELDS)
+
   def GET(self):
     """Returns a list of all node groups.
 
     """
     client = self.GetClient()
 
+    (fields, data) = \
+      _QueryListItems(self, constants.QR_GROUP, G_FIELDS,
+                      compat.partial(client.QueryGroups, use_locking=False))
+
     if self.useBulk():
-      bulkdata = client.QueryGroups([], G_FIELDS, False)
-      return baserlib.MapBulkFields(bulkdata, G_FIELDS)
+      return baserlib.MapBulkFields(data, fields)
     else:
-      data = client.QueryGroups([], ["name"], False)
       groupnames = [row[0] for row in data]
       return baserlib.BuildUriList(groupnames, "/2/groups/%s",
                                    uri_fields=("name", "uri"))
@@ -981,6 +1210,7 @@ class R_2_groups_name(baserlib.OpcodeResource):
   """/2/groups/[group_name] resource.
 
   """
+  GET_CACHEABLE = True
   DELETE_OPCODE = opcodes.OpGroupRemove
 
   def GET(self):
@@ -1088,25 +1318,37 @@ class R_2_instances(baserlib.OpcodeResource):
   """/2/instances resource.
 
   """
+  GET_CACHEABLE = True
   POST_OPCODE = opcodes.OpInstanceCreate
   POST_RENAME = {
     "os": "os_type",
     "name": "instance_name",
     }
 
+  def UsesLiveData(self):
+    """Returns whether listing the instances needs live data.
+
+    """
+    return _ListNeedsLiveData(self, constants.QR_INSTANCE, I_FIELDS)
+
   def GET(self):
     """Returns a list of all available instances.
 
     """
     client = self.GetClient()
 
-    use_locking = self.useLocking()
+    (fields, data) = \
+      _QueryListItems(self, constants.QR_INSTANCE, I_FIELDS,
+                      compat.partial(client.QueryInstances,
+                                     use_locking=self.useLocking()))
+
     if self.useBulk():
-      bulkdata = client.QueryInstances([], I_FIELDS, use_locking)
-      return map(_UpdateBeparams, baserlib.MapBulkFields(bulkdata, I_FIELDS))
+      result = baserlib.MapBulkFields(data, fields)
+      if "beparams" in fields:
+        result = map(_UpdateBeparams, result)
+      return result
     else:
-      instancesdata = client.QueryInstances([], ["name"], use_locking)
-      instanceslist = [row[0] for row in instancesdata]
+      instanceslist = [row[0] for row in data]
       return baserlib.BuildUriList(instanceslist, "/2/instances/%s",
                                    uri_fields=("id", "uri"))
 
@@ -1176,10 +1418,135 @@ class R_2_instances_multi_alloc(baserlib.OpcodeResource):
       })
 
 
+class _R_InstancesMulti(baserlib.OpcodeResource):
+  """Base class for resources applying an operation to multiple instances.
+
+  The request body lists the instances under C{instances}, either by name or
+  as dictionaries with the name under C{instance_name} and parameters for
+  that instance only. All other body parameters apply to every instance,
+  except for C{max_concurrent}, which limits how many of the jobs may run at
+  the same time.
+
+  """
+  #: Renamed parameters (see L{baserlib.FillOpcode})
+  OPCODE_RENAME = None
+
+  def GetJobs(self):
+    """Builds the jobs for all instances.
+
+    If the number of concurrent jobs is limited to I{n}, every job depends on
+    the one submitted I{n} positions before it.
+
+    @rtype: list of lists
+    @return: the list of jobs, each with a single opcode
+
+    """
+    baserlib.CheckType(self.request_body, dict, "Body contents")
+
+    common = self.request_body.copy()
+
+    instances = common.pop("instances", None)
+    if instances is None:
+      raise http.HttpBadRequest("Request is missing required 'instances' field"
+                                " in body")
+    baserlib.CheckType(instances, list, "'instances' field")
+
+    max_concurrent = common.pop("max_concurrent", None)
+    if not ht.TMaybePositiveInt(max_concurrent):
+      raise http.HttpBadRequest("Parameter 'max_concurrent' must be a"
+                                " positive integer")
+
+    jobs = []
+    for (idx, inst) in enumerate(instances):
+      if isinstance(inst, basestring):
+        params = objects.FillDict(common, {
+          "instance_name": inst,
+          })
+      else:
+        baserlib.CheckType(inst, dict, "Instance entry")
+        params = objects.FillDict(common, inst)
+
+      if max_concurrent is not None and idx >= max_concurrent:
+        params["depends"] = (list(params.get("depends") or []) +
+                             [[-max_concurrent,
+                               list(constants.JOBS_FINALIZED)]])
+
+      self.PrepareParams(params)
+
+      # The reason trail must not be shared between opcodes
+      static = self._GetCommonStatic()
+      static["dry_run"] = self.dryRun()
+
+      jobs.append([baserlib.FillOpcode(self.POST_OPCODE, params, static,
+                                       rename=self.OPCODE_RENAME)])
+
+    return jobs
+
+  def PrepareParams(self, params):
+    """Modifies the parameters for an instance in place before use.
+
+    """
+
+  def POST(self):
+    """Submits one job per instance.
+
+    @return: for each instance, a tuple of a boolean denoting whether the job
+      was submitted and the job ID or the error message
+
+    """
+    return self.SubmitManyJobs(self.GetJobs())
+
+
+class R_2_instances_multi_startup(_R_InstancesMulti):
+  """/2/instances-multi-startup resource.
+
+  """
+  POST_OPCODE = opcodes.OpInstanceStartup
+
+
+class R_2_instances_multi_shutdown(_R_InstancesMulti):
+  """/2/instances-multi-shutdown resource.
+
+  """
+  POST_OPCODE = opcodes.OpInstanceShutdown
+
+
+class R_2_instances_multi_reboot(_R_InstancesMulti):
+  """/2/instances-multi-reboot resource.
+
+  """
+  POST_OPCODE = opcodes.OpInstanceReboot
+
+
+class R_2_instances_multi_migrate(_R_InstancesMulti):
+  """/2/instances-multi-migrate resource.
+
+  """
+  POST_OPCODE = opcodes.OpInstanceMigrate
+
+
+class R_2_instances_multi_modify(_R_InstancesMulti):
+  """/2/instances-multi-modify resource.
+
+  """
+  POST_OPCODE = opcodes.OpInstanceSetParams
+  OPCODE_RENAME = {
+    "custom_beparams": "beparams",
+    "custom_hvparams": "hvparams",
+    }
+
+  def PrepareParams(self, params):
+    """Converts the USB devices hypervisor parameter.
+
+    """
+    _ConvertUsbDevices(params)
+
+
 class R_2_instances_name(baserlib.OpcodeResource):
   """/2/instances/[instance_name] resource.
 
   """
+  GET_CACHEABLE = True
   DELETE_OPCODE = opcodes.OpInstanceRemove
 
   def GET(self):
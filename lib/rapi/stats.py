@@ -0,0 +1,152 @@
+#
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Remote API request statistics.
+
+The RAPI daemon records, for every request it handles, the request method,
+the response status and the time it took. The statistics are served by the
+C{/2/status} resource.
+
+The daemon keeps a single L{RequestStats} object; as it handles requests in
+threads, the object is shared by all of them.
+
+"""
+
+import collections
+import threading
+import time
+
+
+#: Number of recent requests the rate and latency figures are based on
+_WINDOW_SIZE = 1000
+
+#: Period over which the request rate is computed, in seconds
+_RATE_PERIOD = 60.0
+
+#: Latency percentiles reported
+_PERCENTILES = [50, 90, 99]
+
+
+def _Percentile(values, percent):
+  """Returns a percentile of a sorted list of values.
+
+  @type values: list
+  @param values: Sorted, non-empty list of values
+  @type percent: number
+  @param percent: Percentile, between 0 and 100
+
+  """
+  idx = int(round((len(values) - 1) * percent / 100.0))
+  return values[idx]
+
+
+class RequestStats(object):
+  """Thread-safe statistics of the requests handled by the daemon.
+
+  """
+  def __init__(self, _time_fn=time.time):
+    """Initializes this class.
+
+    """
+    self._time_fn = _time_fn
+    self._lock = threading.Lock()
+    self._start = _time_fn()
+    self._count = 0
+    self._methods = {}
+    self._codes = {}
+    # Finish time and duration of the most recent requests
+    self._recent = collections.deque(maxlen=_WINDOW_SIZE)
+
+  def Record(self, method, code, duration):
+    """Records a handled request.
+
+    @type method: string
+    @param method: Request method
+    @type code: int
+    @param code: Response status code
+    @type duration: float
+    @param duration: Time taken to handle the request, in seconds
+
+    """
+    status = "%dxx" % (code // 100)
+
+    self._lock.acquire()
+    try:
+      self._count += 1
+      self._methods[method] = self._methods.get(method, 0) + 1
+      self._codes[status] = self._codes.get(status, 0) + 1
+      self._recent.append((self._time_fn(), duration))
+    finally:
+      self._lock.release()
+
+  def ToDict(self):
+    """Returns the statistics in a serializable form.
+
+    The request rate is the number of requests per second over the last
+    minute. Latencies are computed from the most recent requests and given
+    in seconds.
+
+    @rtype: dict
+
+    """
+    self._lock.acquire()
+    try:
+      now = self._time_fn()
+      count = self._count
+      methods = self._methods.copy()
+      codes = self._codes.copy()
+      recent = list(self._recent)
+    finally:
+      self._lock.release()
+
+    # Only the most recent requests are kept, which might not cover the
+    # whole period under heavy load
+    period = min(_RATE_PERIOD, max(now - self._start, 1.0))
+    if len(recent) == _WINDOW_SIZE:
+      period = min(period, max(now - recent[0][0], 1.0))
+    rate = len([1 for (finished, _) in recent
+                if now - finished <= period]) / period
+
+    latency = {}
+    if recent:
+      durations = sorted(duration for (_, duration) in recent)
+      latency["average"] = sum(durations) / len(durations)
+      latency["max"] = durations[-1]
+      for percent in _PERCENTILES:
+        latency["p%d" % percent] = _Percentile(durations, percent)
+
+    return {
+      "uptime": now - self._start,
+      "requests": count,
+      "methods": methods,
+      "status": codes,
+      "rate": rate,
+      "latency": latency,
+      }
@@ -210,10 +210,16 @@ class FakeCurl(object):
         "%s %s" % (http.auth.HTTP_BASIC_AUTH, base64.b64encode(userpwd))
 
     path = _GetPathFromUri(url)
-    (code, _, resp_body) = \
+    (code, resp_headers, resp_body) = \
       self._handler.FetchResponse(path, method, headers, request_body)
 
     self._info[pycurl.RESPONSE_CODE] = code
+
+    headerfn = self._opts.get(pycurl.HEADERFUNCTION)
+    if headerfn and isinstance(resp_headers, dict):
+      for (name, value) in resp_headers.items():
+        headerfn("%s: %s\r\n" % (name, value))
+
     if resp_body is not None:
       writefn(resp_body)
 
@@ -222,16 +228,19 @@ class _RapiMock(object):
   """Mocking out the RAPI server parts.
 
   """
-  def __init__(self, user_fn, luxi_client, reqauth=False):
+  def __init__(self, user_fn, luxi_client, reqauth=False, request_stats=None):
     """Initialize this class.
 
     @type user_fn: callable
     @param user_fn: Function to authentication username
     @param luxi_client: A LUXI client implementation
+    @param request_stats: Statistics handled requests are recorded in
 
     """
     self.handler = \
-      server.rapi.RemoteApiHandler(user_fn, reqauth, _client_cls=luxi_client)
+      server.rapi.RemoteApiHandler(user_fn, reqauth,
+                                   request_stats=request_stats,
+                                   _client_cls=luxi_client)
 
   def FetchResponse(self, path, method, headers, request_body):
     """This is a callback method used to fetch a response.
@@ -33,13 +33,16 @@
 """
 
 import logging
+import os
+import threading
 import time
 
 import ganeti.rpc.transport as t
 
 from ganeti import constants
 from ganeti import errors
-from ganeti.rpc.errors import (ProtocolError, RequestError, LuxiError)
+from ganeti.rpc.errors import (ProtocolError, RequestError, LuxiError,
+                               ConnectionClosedError, TimeoutError)
 from ganeti import serializer
 
 KEY_METHOD = constants.LUXI_KEY_METHOD
@@ -47,6 +50,10 @@ KEY_ARGS = constants.LUXI_KEY_ARGS
 KEY_SUCCESS = constants.LUXI_KEY_SUCCESS
 KEY_RESULT = constants.LUXI_KEY_RESULT
 KEY_VERSION = constants.LUXI_KEY_VERSION
+KEY_ID = constants.LUXI_KEY_ID
+
+#: Default number of connections kept by a L{ConnectionPool}
+DEF_POOL_SIZE = 4
 
 
 def ParseRequest(msg):
@@ -79,6 +86,19 @@ def ParseRequest(msg):
 def ParseResponse(msg):
   """Parses a response message.
 
+  """
+  (_, success, result, version) = ParseResponseWithId(msg)
+  return (success, result, version)
+
+
+def ParseResponseWithId(msg):
+  """Parses a response message, including the request identifier.
+
+  @rtype: tuple
+  @return: The identifier of the request the response belongs to (C{None}
+    if the response doesn't have one), the success flag, the result and
+    the version of the response
+
   """
   # Parse the result
   try:
@@ -94,11 +114,12 @@ def ParseResponse(msg):
           KEY_RESULT in data):
     raise ProtocolError("Invalid response from server: %r" % data)
 
-  return (data[KEY_SUCCESS], data[KEY_RESULT],
+  return (data.get(KEY_ID, None), # pylint: disable=E1103
+          data[KEY_SUCCESS], data[KEY_RESULT],
           data.get(KEY_VERSION, None)) # pylint: disable=E1103
 
 
-def FormatResponse(success, result, version=None):
+def FormatResponse(success, result, version=None, request_id=None):
   """Formats a response message.
 
   """
@@ -110,14 +131,20 @@ def FormatResponse(success, result, version=None):
   if version is not None:
     response[KEY_VERSION] = version
 
+  if request_id is not None:
+    response[KEY_ID] = request_id
+
   logging.debug("RPC response: %s", response)
 
   return serializer.DumpJson(response)
 
 
-def FormatRequest(method, args, version=None):
+def FormatRequest(method, args, version=None, request_id=None):
   """Formats a request message.
 
+  If a request identifier is given, the server may answer the request out
+  of order; its response then carries the same identifier.
+
   """
   # Build request
   request = {
@@ -128,6 +155,9 @@ def FormatRequest(method, args, version=None):
   if version is not None:
     request[KEY_VERSION] = version
 
+  if request_id is not None:
+    request[KEY_ID] = request_id
+
   # Serialize the request
   return serializer.DumpJson(request,
                              private_encoder=serializer.EncodeWithPrivateFields)
@@ -148,6 +178,13 @@ def CallRPCMethod(transport_cb, method, args, version=None):
   t4 = time.time() * 1000
   logging.debug("CallRPCMethod %s: format: %dms, sock: %dms, parse: %dms",
                 method, int(t2 - t1), int(t3 - t2), int(t4 - t3))
+  return _CheckResponse(success, result, resp_version, version)
+
+
+def _CheckResponse(success, result, resp_version, version):
+  """Checks a parsed response and returns its result.
+
+  """
   # Verify version if there was one in the response
   if resp_version is not None and resp_version != version:
     raise LuxiError("RPC version mismatch, client %s, response %s" %
@@ -283,3 +320,275 @@ class AbstractStubClient(AbstractClient):
 
   def _GetAddress(self):
     return self._GetSocketPath() # pylint: disable=E1101
+
+
+class MultiplexedConnection(object):
+  """A connection carrying many concurrent RPC calls.
+
+  Every request is tagged with an identifier, so that the server can
+  process the requests sent over the connection concurrently and answer
+  them in any order. Any number of threads can use the connection at the
+  same time: requests are sent under a lock, and whichever thread is
+  waiting for a response reads the incoming messages and hands them to the
+  threads they belong to until its own response arrives.
+
+  A network error makes the connection unusable; it is reported to all
+  calls in flight and to all later calls.
+
+  """
+  def __init__(self, address, timeouts=None, transport=t.Transport,
+               allow_non_master=False):
+    """Initializes this class.
+
+    Arguments are the same as for L{AbstractClient}, plus the address to
+    connect to.
+
+    """
+    self._transport = transport(address, timeouts=timeouts,
+                                allow_non_master=allow_non_master)
+    self._send_lock = threading.Lock()
+    self._lock = threading.Condition(threading.Lock())
+    self._next_id = 0
+    # Identifiers of the requests waiting for a response
+    self._pending = set()
+    # Responses received, but not yet picked up by the caller
+    self._responses = {}
+    self._reading = False
+    self._error = None
+
+  def IsUsable(self):
+    """Returns whether the connection can still be used.
+
+    """
+    return self._error is None
+
+  def GetPendingCount(self):
+    """Returns the number of calls in flight.
+
+    """
+    return len(self._pending)
+
+  def _Fail(self, err):
+    """Marks the connection as broken and wakes up all waiting calls.
+
+    Must be called with the lock held.
+
+    """
+    if self._error is None:
+      self._error = err
+      self._transport.Close()
+    self._lock.notifyAll()
+
+  def _SendRequest(self, method, args, version):
+    """Sends a request and returns its identifier.
+
+    """
+    self._lock.acquire()
+    try:
+      if self._error is not None:
+        raise self._error
+      request_id = self._next_id
+      self._next_id += 1
+      self._pending.add(request_id)
+    finally:
+      self._lock.release()
+
+    msg = FormatRequest(method, args, version=version, request_id=request_id)
+
+    try:
+      self._send_lock.acquire()
+      try:
+        self._transport.Send(msg)
+      finally:
+        self._send_lock.release()
+    except Exception, err:
+      # The message might have been sent partially
+      self._lock.acquire()
+      try:
+        self._pending.discard(request_id)
+        self._Fail(err)
+      finally:
+        self._lock.release()
+      raise
+
+    return request_id
+
+  def _WaitForResponse(self, request_id):
+    """Waits for the response to a request.
+
+    @rtype: tuple
+    @return: The success flag, the result and the version of the response
+
+    """
+    self._lock.acquire()
+    try:
+      while True:
+        if request_id in self._responses:
+          self._pending.discard(request_id)
+          return self._responses.pop(request_id)
+        if self._error is not None:
+          self._pending.discard(request_id)
+          raise self._error
+        if not self._reading:
+          # Nobody is reading, so this thread takes over
+          self._reading = True
+          break
+        self._lock.wait()
+    finally:
+      self._lock.release()
+
+    err = None
+    try:
+      while True:
+        (resp_id, success, result, resp_version) = \
+          ParseResponseWithId(self._transport.Recv())
+
+        self._lock.acquire()
+        try:
+          if resp_id == request_id:
+            return (success, result, resp_version)
+          elif resp_id in self._pending:
+            self._responses[resp_id] = (success, result, resp_version)
+            self._lock.notifyAll()
+          else:
+            logging.debug("Dropping response to unknown request %r", resp_id)
+        finally:
+          self._lock.release()
+    except TimeoutError:
+      # Other calls may still receive their response, only this one gives
+      # up; its response is dropped should it arrive later
+      raise
+    except Exception, err:
+      raise
+    finally:
+      self._StopReading(request_id, err)
+
+  def _StopReading(self, request_id, err):
+    """Hands reading the connection over to another waiting call.
+
+    @param err: If not C{None}, the error that broke the connection
+
+    """
+    self._lock.acquire()
+    try:
+      self._pending.discard(request_id)
+      self._reading = False
+      if err is None:
+        self._lock.notifyAll()
+      else:
+        self._Fail(err)
+    finally:
+      self._lock.release()
+
+  def Call(self, method, args, version=None):
+    """Sends a request and returns the result of the response.
+
+    """
+    request_id = self._SendRequest(method, args, version)
+    (success, result, resp_version) = self._WaitForResponse(request_id)
+    return _CheckResponse(success, result, resp_version, version)
+
+  def Close(self):
+    """Closes the connection.
+
+    """
+    self._lock.acquire()
+    try:
+      self._Fail(ConnectionClosedError("Connection closed"))
+    finally:
+      self._lock.release()
+
+
+class ConnectionPool(object):
+  """A pool of multiplexed connections to one server.
+
+  The pool can be shared by any number of threads. A call uses an idle
+  connection if there is one, opens a new connection while there are less
+  than the pool's size, and otherwise is multiplexed onto the connection
+  with the fewest calls in flight. Broken connections are replaced, and
+  calls failing with a network error are retried just like with
+  L{AbstractClient}.
+
+  Connections are not shared across processes: a child process forked
+  after connections have been opened starts with an empty pool.
+
+  """
+  def __init__(self, address, size=DEF_POOL_SIZE, timeouts=None,
+               transport=t.Transport, allow_non_master=False,
+               _connection_cls=MultiplexedConnection):
+    """Initializes this class.
+
+    @type address: socket address
+    @param address: address the connections are made to
+    @type size: int
+    @param size: maximum number of connections
+    @type timeouts: list of ints
+    @param timeouts: timeouts to be used on connect and read/write
+    @type transport: L{Transport} or another compatible class
+    @param transport: the underlying transport to use for the connections
+    @type allow_non_master: bool
+    @param allow_non_master: skip checks for the master node on errors
+
+    """
+    assert size > 0
+    self.address = address
+    self._size = size
+    self._timeouts = timeouts
+    self._transport = transport
+    self._allow_non_master = allow_non_master
+    self._connection_cls = _connection_cls
+    self._lock = threading.Lock()
+    self._connections = []
+    self._pid = os.getpid()
+
+  def _GetConnection(self):
+    """Returns the connection to be used for the next call.
+
+    """
+    self._lock.acquire()
+    try:
+      if self._pid != os.getpid():
+        # Inherited from the parent process, whose calls would get mixed up
+        # with ours
+        self._connections = []
+        self._pid = os.getpid()
+
+      self._connections = [conn for conn in self._connections
+                           if conn.IsUsable()]
+
+      if self._connections:
+        conn = min(self._connections, key=lambda c: c.GetPendingCount())
+        if (conn.GetPendingCount() == 0 or
+            len(self._connections) >= self._size):
+          return conn
+
+      conn = self._connection_cls(self.address, timeouts=self._timeouts,
+                                  transport=self._transport,
+                                  allow_non_master=self._allow_non_master)
+      self._connections.append(conn)
+      return conn
+    finally:
+      self._lock.release()
+
+  def Call(self, method, args, version=None):
+    """Sends a request over one of the connections and returns the result.
+
+    """
+    def call(try_no):
+      if try_no:
+        logging.debug("RPC peer disconnected, retrying")
+      return self._GetConnection().Call(method, args, version=version)
+    return t.Transport.RetryOnNetworkError(call, lambda _: None)
+
+  def Close(self):
+    """Closes all connections of the pool.
+
+    """
+    self._lock.acquire()
+    try:
+      (connections, self._connections) = (self._connections, [])
+    finally:
+      self._lock.release()
+
+    for conn in connections:
+      conn.Close()
@@ -51,6 +51,7 @@ import pycurl
 from ganeti import utils
 from ganeti import objects
 from ganeti import http
+from ganeti import jstats
 from ganeti import serializer
 from ganeti import constants
 from ganeti import errors
@@ -128,6 +129,8 @@ def _ConfigRpcCurl(curl):
   curl.setopt(pycurl.SSLKEYTYPE, "PEM")
   curl.setopt(pycurl.SSLKEY, noded_client_cert)
   curl.setopt(pycurl.CONNECTTIMEOUT, constants.RPC_CONNECT_TIMEOUT)
+  # Accept compressed responses, cURL decompresses them transparently
+  curl.setopt(pycurl.ENCODING, constants.RPC_CONTENT_ENCODING)
 
 
 def RunWithRPC(fn):
@@ -167,6 +170,29 @@ def _Compress(_, data):
           base64.b64encode(zlib.compress(data, 3)))
 
 
+def _EncodeRequestBody(data, codings):
+  """Prepares the body of an RPC request.
+
+  Large bodies are compressed if the node announced support for it.
+
+  @type data: str
+  @param data: Serialized request body
+  @type codings: frozenset or None
+  @param codings: Content codings the node accepts for requests
+  @rtype: tuple; (list of strings, str)
+  @return: Request headers and body to send
+
+  """
+  if (codings and constants.RPC_CONTENT_ENCODING in codings and
+      len(data) >= constants.RPC_COMPRESS_MIN_SIZE):
+    headers = _RPC_CLIENT_HEADERS + [
+      "%s: %s" % (http.HTTP_CONTENT_ENCODING, constants.RPC_CONTENT_ENCODING),
+      ]
+    return (headers, zlib.compress(data, constants.RPC_COMPRESS_LEVEL))
+
+  return (_RPC_CLIENT_HEADERS, data)
+
+
 class RpcResult(object):
   """RPC Result class.
 
@@ -380,14 +406,25 @@ class _RpcProcessor(object):
     self._port = port
     self._lock_monitor_cb = lock_monitor_cb
 
+    # Content codings accepted by nodes for request bodies, as announced in
+    # their responses; nodes not known yet are sent uncompressed requests
+    self._accepted_codings = {}
+
   @staticmethod
-  def _PrepareRequests(hosts, port, procedure, body, read_timeout):
+  def _PrepareRequests(hosts, port, procedure, body, read_timeout,
+                       accepted_codings=None):
     """Prepares requests by sorting offline hosts into separate list.
 
     @type body: dict
     @param body: a dictionary with per-host body data
+    @type accepted_codings: dict or None
+    @param accepted_codings: content codings accepted for request bodies,
+      indexed by host
 
     """
+    if accepted_codings is None:
+      accepted_codings = {}
+
     results = {}
     requests = {}
 
@@ -404,11 +441,14 @@ class _RpcProcessor(object):
                                            offline=True,
                                            call=procedure)
       else:
+        (headers, post_data) = \
+          _EncodeRequestBody(body[original_name],
+                             accepted_codings.get(original_name))
         requests[original_name] = \
           http.client.HttpClientRequest(str(ip), port,
                                         http.HTTP_POST, str("/%s" % procedure),
-                                        headers=_RPC_CLIENT_HEADERS,
-                                        post_data=body[original_name],
+                                        headers=headers,
+                                        post_data=post_data,
                                         read_timeout=read_timeout,
                                         nicename="%s/%s" % (name, procedure),
                                         curl_config_fn=_ConfigRpcCurl)
@@ -416,11 +456,20 @@ class _RpcProcessor(object):
     return (results, requests)
 
   @staticmethod
-  def _CombineResults(results, requests, procedure):
+  def _CombineResults(results, requests, procedure, accepted_codings=None):
     """Combines pre-computed results for offline hosts with actual call results.
 
+    @type accepted_codings: dict or None
+    @param accepted_codings: updated with the content codings announced by
+      the nodes
+
     """
     for name, req in requests.items():
+      if accepted_codings is not None and req.resp_headers is not None:
+        accepted_codings[name] = \
+          http.ParseContentCodings(req.resp_headers.get(
+            http.HTTP_ACCEPT_ENCODING))
+
       if req.success and req.resp_status_code == http.HTTP_OK:
         host_result = RpcResult(data=serializer.LoadJson(req.resp_body),
                                 node=name, call=procedure)
@@ -455,21 +504,213 @@ class _RpcProcessor(object):
     @return: a dictionary mapping host names to rpc.RpcResult objects
 
     """
-    assert read_timeout is not None, \
-      "Missing RPC read timeout for procedure '%s'" % procedure
+    calls = [(nodes, procedure, body, read_timeout, resolver_opts)]
+
+    return self.ProcessBatch(calls, _req_process_fn=_req_process_fn)[0]
+
+  def ProcessBatch(self, calls, _req_process_fn=None):
+    """Makes a number of RPC requests, possibly for different procedures.
 
+    All requests are processed concurrently, i.e. the total time is bound by
+    the slowest node instead of the sum of all calls.
+
+    @type calls: list of tuples
+    @param calls: Calls as tuples of the arguments to L{__call__}, i.e.
+      C{(nodes, procedure, body, read_timeout, resolver_opts)}
+    @rtype: list of dictionaries
+    @return: for every call, a dictionary mapping host names to
+      rpc.RpcResult objects
+
+    """
     if _req_process_fn is None:
       _req_process_fn = http.client.ProcessRequests
 
-    (results, requests) = \
-      self._PrepareRequests(self._resolver(nodes, resolver_opts), self._port,
-                            procedure, body, read_timeout)
+    prepared = []
+
+    for (nodes, procedure, body, read_timeout, resolver_opts) in calls:
+      assert read_timeout is not None, \
+        "Missing RPC read timeout for procedure '%s'" % procedure
+
+      (results, requests) = \
+        self._PrepareRequests(self._resolver(nodes, resolver_opts),
+                              self._port, procedure, body, read_timeout,
+                              accepted_codings=self._accepted_codings)
+
+      assert not frozenset(results).intersection(requests)
+
+      prepared.append((procedure, results, requests))
+
+    with jstats.Measure("rpc"):
+      _req_process_fn([req for (_, _, requests) in prepared
+                       for req in requests.values()],
+                      lock_monitor_cb=self._lock_monitor_cb)
+
+    return [self._CombineResults(results, requests, procedure,
+                                 accepted_codings=self._accepted_codings)
+            for (procedure, results, requests) in prepared]
+
+
+class RpcCallFuture(object):
+  """Pending result of an RPC call issued through a L{RpcBatch}.
+
+  """
+  def __init__(self, batch, postproc_fn=None):
+    """Initializes this class.
+
+    @type batch: L{RpcBatch}
+    @param batch: Batch the call belongs to
+    @param postproc_fn: Function applied to the result of every node
+
+    """
+    self._batch = batch
+    self._postproc_fn = postproc_fn
+    self._result = None
+    self._done = False
+
+  def SetResult(self, result):
+    """Sets the result of the call, called by L{RpcBatch.Run}.
+
+    @type result: dict
+    @param result: Dictionary mapping node names to L{RpcResult} objects
+
+    """
+    assert not self._done, "Result was already set"
+
+    self._result = _PostProcessResults(result, self._postproc_fn)
+    self._done = True
+
+  def Done(self):
+    """Returns whether the result is available.
+
+    """
+    return self._done
+
+  def GetResult(self):
+    """Returns the result of the call, running the batch if necessary.
+
+    @rtype: dict
+    @return: Dictionary mapping node names to L{RpcResult} objects
+
+    """
+    if not self._done:
+      self._batch.Run()
+
+    assert self._done
+
+    return self._result
+
+  def __getitem__(self, node):
+    """Returns a future for the result of a single node.
+
+    Used by the wrappers for single-node procedures.
+
+    """
+    return _RpcNodeFuture(self, node)
+
+
+class _RpcNodeFuture(object):
+  """Pending result of a single node in an RPC call.
+
+  """
+  def __init__(self, parent, node):
+    """Initializes this class.
+
+    """
+    self._parent = parent
+    self._node = node
+
+  def Done(self):
+    """Returns whether the result is available.
+
+    """
+    return self._parent.Done()
+
+  def GetResult(self):
+    """Returns the result for the node, running the batch if necessary.
+
+    @rtype: L{RpcResult}
+
+    """
+    return self._parent.GetResult()[self._node]
+
+
+class RpcBatch(object):
+  """Collects RPC calls and runs them concurrently.
+
+  The object provides the same C{call_*} methods as the RPC client it was
+  created for, but instead of results they return L{RpcCallFuture} objects.
+  All collected calls are sent at once by L{Run}, or when the first result is
+  requested, sharing one set of concurrent HTTP requests. Example::
+
+    batch = self.rpc.Batch()
+    nodeinfo = batch.call_node_info(node_uuids, None, hvspecs)
+    bridges = batch.call_bridges_exist(pnode_uuid, brlist)
+    batch.Run()
+    nodeinfo.GetResult()...
+
+  """
+  def __init__(self, client):
+    """Initializes this class.
+
+    @type client: L{_RpcClientBase}
+    @param client: RPC client used for encoding and sending the calls
+
+    """
+    self._client = client
+    self._pending = []
+
+  def __getattr__(self, name):
+    """Returns a wrapper for an RPC procedure.
+
+    """
+    if not name.startswith("call_"):
+      raise AttributeError(name)
+
+    # The generated wrappers only use C{self._Call}, so they can be bound to
+    # this object
+    fn = getattr(self._client.__class__, name).im_func
+
+    return compat.partial(fn, self)
+
+  def _Call(self, cdef, node_list, args):
+    """Queues a call, replaces L{_RpcClientBase._Call} for the wrappers.
+
+    """
+    # pylint: disable=W0212
+    (call, postproc_fn) = self._client._PrepareCall(cdef, node_list, args)
+
+    future = RpcCallFuture(self, postproc_fn=postproc_fn)
+    self._pending.append((call, future))
+
+    return future
+
+  def Run(self):
+    """Sends all pending calls and sets the results of their futures.
+
+    """
+    pending = self._pending
+    self._pending = []
+
+    if not pending:
+      return
+
+    # pylint: disable=W0212
+    results = self._client._proc_batch([call for (call, _) in pending])
+
+    assert len(results) == len(pending)
 
-    _req_process_fn(requests.values(), lock_monitor_cb=self._lock_monitor_cb)
+    for ((_, future), result) in zip(pending, results):
+      future.SetResult(result)
 
-    assert not frozenset(results).intersection(requests)
 
-    return self._CombineResults(results, requests, procedure)
+def _PostProcessResults(result, postproc_fn):
+  """Applies a post-processing function to the results of an RPC call.
+
+  """
+  if postproc_fn:
+    return dict((k, postproc_fn(v)) for (k, v) in result.items())
+  else:
+    return result
 
 
 class _RpcClientBase(object):
@@ -482,6 +723,8 @@ class _RpcClientBase(object):
                          netutils.GetDaemonPort(constants.NODED),
                          lock_monitor_cb=lock_monitor_cb)
     self._proc = compat.partial(proc, _req_process_fn=_req_process_fn)
+    self._proc_batch = compat.partial(proc.ProcessBatch,
+                                      _req_process_fn=_req_process_fn)
     self._encoder = compat.partial(self._EncodeArg, encoder_fn)
 
   @staticmethod
@@ -494,8 +737,19 @@ class _RpcClientBase(object):
     else:
       return encoder_fn(argkind)(node, value)
 
-  def _Call(self, cdef, node_list, args):
-    """Entry point for automatically generated RPC wrappers.
+  def Batch(self):
+    """Returns a new batch for issuing several RPC calls concurrently.
+
+    @rtype: L{RpcBatch}
+
+    """
+    return RpcBatch(self)
+
+  def _PrepareCall(self, cdef, node_list, args):
+    """Encodes the arguments of an RPC call.
+
+    @return: tuple containing the arguments for L{_RpcProcessor} and the
+      post-processing function
 
     """
     (procedure, _, resolver_opts, timeout, argdefs,
@@ -529,13 +783,16 @@ class _RpcClientBase(object):
       for n in node_list
     )
 
-    result = self._proc(node_list, procedure, pnbody, read_timeout,
-                        req_resolver_opts)
+    return ((node_list, procedure, pnbody, read_timeout, req_resolver_opts),
+            postproc_fn)
 
-    if postproc_fn:
-      return dict((k, postproc_fn(v)) for (k, v) in result.items())
-    else:
-      return result
+  def _Call(self, cdef, node_list, args):
+    """Entry point for automatically generated RPC wrappers.
+
+    """
+    (call, postproc_fn) = self._PrepareCall(cdef, node_list, args)
+
+    return _PostProcessResults(self._proc(*call), postproc_fn)
 
 
 def _ObjectToDict(_, value):
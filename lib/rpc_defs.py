@@ -341,10 +341,18 @@ _IMPEXP_CALLS = [
   ("export_info", SINGLE, None, constants.RPC_TMO_FAST, [
     ("path", None, None),
     ], None, None, "Queries the export information in a given path"),
+  ("export_rebuild_disks", SINGLE, None, constants.RPC_TMO_4HRS, [
+    ("instance_name", None, None),
+    ("snap_disks", ED_FINALIZE_EXPORT_DISKS, None),
+    ], None, None,
+   "Rebuilds the disk images of an incremental export from the deltas"),
   ("finalize_export", SINGLE, None, constants.RPC_TMO_NORMAL, [
     ("instance", ED_INST_DICT, None),
     ("snap_disks", ED_FINALIZE_EXPORT_DISKS, None),
     ], None, None, "Request the completion of an export operation"),
+  ("export_manifests", SINGLE, None, constants.RPC_TMO_FAST, [
+    ("instance_name", None, None),
+    ], None, None, "Gets the chunk manifests of an instance's export"),
   ("export_list", MULTI, None, constants.RPC_TMO_FAST, [], None, None,
    "Gets the stored exports list"),
   ("export_remove", SINGLE, None, constants.RPC_TMO_FAST, [
@@ -32,13 +32,18 @@
 This module introduces a simple abstraction over the serialization
 backend (currently json).
 
+simplejson is used by default. The standard library module can be selected
+instead, e.g. for comparing the two; it is not used by default as its
+parser returns all strings as unicode objects, whereas simplejson returns
+plain strings for ASCII data.
+
 """
 # pylint: disable=C0103
 
 # C0103: Invalid name, since pylint doesn't see that Dump points to a
 # function and not a constant
 
-import re
+import json
 
 # Python 2.6 and above contain a JSON module based on simplejson. Unfortunately
 # the standard library version is significantly slower than the external
@@ -51,7 +56,112 @@ from ganeti import errors
 from ganeti import utils
 from ganeti import constants
 
-_RE_EOLSP = re.compile("[ \t]+$", re.MULTILINE)
+
+class _JsonEngine(object):
+  """Wrapper around a JSON implementation.
+
+  Encoder objects are cached per private value encoder, as creating them for
+  every call is expensive compared to encoding small messages.
+
+  """
+  def __init__(self, name, encoder_cls, loads_fn):
+    """Initializes this class.
+
+    @type name: string
+    @param name: Name of the engine
+    @param encoder_cls: Encoder class, must accept C{default} as keyword
+      argument and provide an C{encode} method
+    @type loads_fn: callable
+    @param loads_fn: Function parsing a JSON document
+
+    """
+    self.name = name
+    self.loads = loads_fn
+    self._encoder_cls = encoder_cls
+    self._encoders = {}
+
+  def dumps(self, data, default):
+    """Serializes data using C{default} for unknown types.
+
+    """
+    try:
+      encoder = self._encoders[default]
+    except KeyError:
+      encoder = self._encoder_cls(default=default)
+      self._encoders[default] = encoder
+
+    return encoder.encode(data)
+
+
+def _GetSimplejsonEngine():
+  """Returns an engine using simplejson.
+
+  """
+  return _JsonEngine("simplejson", simplejson.JSONEncoder, simplejson.loads)
+
+
+def _GetStdlibEngine():
+  """Returns an engine using the Python standard library.
+
+  """
+  return _JsonEngine("json", json.JSONEncoder, json.loads)
+
+
+#: Available JSON engines, the first one is used by default
+_ENGINE_FACTORIES = [
+  _GetSimplejsonEngine,
+  _GetStdlibEngine,
+  ]
+
+
+def _GetEngines():
+  """Returns all available JSON engines.
+
+  @rtype: list of L{_JsonEngine}
+
+  """
+  return [fn() for fn in _ENGINE_FACTORIES]
+
+
+_engine = _ENGINE_FACTORIES[0]()
+
+
+def GetEngineNames():
+  """Returns the names of all available JSON engines.
+
+  @rtype: list of strings
+
+  """
+  return [engine.name for engine in _GetEngines()]
+
+
+def GetEngineName():
+  """Returns the name of the JSON engine in use.
+
+  @rtype: string
+
+  """
+  return _engine.name
+
+
+def SetEngine(name):
+  """Selects the JSON engine to use.
+
+  Meant for tests and benchmarks; simplejson is used unless another engine
+  is selected explicitly.
+
+  @type name: string
+  @param name: Name of the engine, see L{GetEngineNames}
+
+  """
+  global _engine # pylint: disable=W0603
+
+  for engine in _GetEngines():
+    if engine.name == name:
+      _engine = engine
+      return
+
+  raise errors.ProgrammerError("Unknown JSON engine '%s'" % name)
 
 
 def DumpJson(data, private_encoder=None):
@@ -67,13 +177,10 @@ def DumpJson(data, private_encoder=None):
   if private_encoder is None:
     # Do not leak private fields by default.
     private_encoder = EncodeWithoutPrivateFields
-  encoded = simplejson.dumps(data, default=private_encoder)
-
-  txt = _RE_EOLSP.sub("", encoded)
-  if not txt.endswith("\n"):
-    txt += "\n"
 
-  return txt
+  # The output doesn't contain line breaks, hence there is no need to strip
+  # trailing whitespace
+  return _engine.dumps(data, private_encoder) + "\n"
 
 
 def LoadJson(txt):
@@ -81,10 +188,10 @@ def LoadJson(txt):
 
   @param txt: the json-encoded form
   @return: the original data
-  @raise JSONDecodeError: if L{txt} is not a valid JSON document
+  @raise ValueError: if L{txt} is not a valid JSON document
 
   """
-  values = simplejson.loads(txt)
+  values = _engine.loads(txt)
 
   # Hunt and seek for Private fields and wrap them.
   WrapPrivateValues(values)
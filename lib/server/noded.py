@@ -40,6 +40,7 @@ import sys
 import logging
 import signal
 import codecs
+import zlib
 
 from optparse import OptionParser
 
@@ -128,6 +129,20 @@ def _DecodeImportExportIO(ieio, ieioargs):
   return ieioargs
 
 
+def _DecodeSnapDisks(disks):
+  """Decodes the snapshot disks of an export.
+
+  """
+  snap_disks = []
+  for disk in disks:
+    if isinstance(disk, bool):
+      snap_disks.append(disk)
+    else:
+      snap_disks.append(objects.Disk.FromDict(disk))
+
+  return snap_disks
+
+
 def _DefaultAlternative(value, default):
   """Returns value or, if evaluating to False, a default value.
 
@@ -145,6 +160,53 @@ def _DefaultAlternative(value, default):
   return default
 
 
+def _DecodeRequestBody(req):
+  """Returns the request body, decompressing it if necessary.
+
+  @raise http.HttpUnsupportedMediaType: if the content coding is not
+    supported
+
+  """
+  codings = http.ParseContentCodings(
+    req.request_headers.get(http.HTTP_CONTENT_ENCODING))
+
+  if not codings:
+    return req.request_body
+
+  if codings != frozenset([constants.RPC_CONTENT_ENCODING]):
+    raise http.HttpUnsupportedMediaType("Unsupported content coding: %s" %
+                                        utils.CommaJoin(codings))
+
+  try:
+    return zlib.decompress(req.request_body)
+  except zlib.error, err:
+    raise http.HttpBadRequest("Can't decompress request body: %s" % err)
+
+
+def _EncodeResponseBody(req, data):
+  """Prepares the response body, compressing it if the client accepts it.
+
+  The content coding is also announced to the client, which can then send
+  compressed requests.
+
+  @type data: str
+  @param data: Serialized response
+
+  """
+  req.resp_headers[http.HTTP_ACCEPT_ENCODING] = constants.RPC_CONTENT_ENCODING
+
+  codings = http.ParseContentCodings(
+    req.request_headers.get(http.HTTP_ACCEPT_ENCODING))
+
+  if (constants.RPC_CONTENT_ENCODING in codings and
+      len(data) >= constants.RPC_COMPRESS_MIN_SIZE):
+    req.resp_headers[http.HTTP_CONTENT_ENCODING] = \
+      constants.RPC_CONTENT_ENCODING
+    return zlib.compress(data, constants.RPC_COMPRESS_LEVEL)
+
+  return data
+
+
 class MlockallRequestExecutor(http.server.HttpServerRequestExecutor):
   """Subclass ensuring request handlers are locked in RAM.
 
@@ -184,8 +246,10 @@ class NodeRequestHandler(http.server.HttpServerHandler):
     if method is None:
       raise http.HttpNotFound()
 
+    body = _DecodeRequestBody(req)
+
     try:
-      result = (True, method(serializer.LoadJson(req.request_body)))
+      result = (True, method(serializer.LoadJson(body)))
 
     except backend.RPCFail, err:
       # our custom failure exception; str(err) works fine if the
@@ -204,7 +268,7 @@ class NodeRequestHandler(http.server.HttpServerHandler):
       logging.exception("Error in RPC call")
       result = (False, "Error while executing backend function: %s" % str(err))
 
-    return serializer.DumpJson(result)
+    return _EncodeResponseBody(req, serializer.DumpJson(result))
 
   # the new block devices  --------------------------
 
@@ -492,21 +556,31 @@ class NodeRequestHandler(http.server.HttpServerHandler):
 
   # export/import  --------------------------
 
+  @staticmethod
+  def perspective_export_rebuild_disks(params):
+    """Rebuild the disk images of an incremental export.
+
+    """
+    instance_name = params[0]
+    snap_disks = _DecodeSnapDisks(params[1])
+    return backend.RebuildExportDisks(instance_name, snap_disks)
+
   @staticmethod
   def perspective_finalize_export(params):
     """Expose the finalize export functionality.
 
     """
     instance = objects.Instance.FromDict(params[0])
+    snap_disks = _DecodeSnapDisks(params[1])
+    return backend.FinalizeExport(instance, snap_disks)
 
-    snap_disks = []
-    for disk in params[1]:
-      if isinstance(disk, bool):
-        snap_disks.append(disk)
-      else:
-        snap_disks.append(objects.Disk.FromDict(disk))
+  @staticmethod
+  def perspective_export_manifests(params):
+    """Query the chunk manifests of an existing export on this node.
 
-    return backend.FinalizeExport(instance, snap_disks)
+    """
+    instance_name = params[0]
+    return backend.GetExportManifests(instance_name)
 
   @staticmethod
   def perspective_export_info(params):
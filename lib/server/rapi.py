@@ -39,15 +39,19 @@ import logging
 import optparse
 import sys
 
+from ganeti import compat
 from ganeti import constants
 from ganeti import http
 from ganeti import daemon
+from ganeti import luxi
 from ganeti import ssconf
 import ganeti.rpc.errors as rpcerr
 from ganeti import serializer
 from ganeti import pathutils
 from ganeti.rapi import connector
 from ganeti.rapi import baserlib
+from ganeti.rapi import cache
+from ganeti.rapi import stats
 from ganeti.rapi.auth import basic_auth
 from ganeti.rapi.auth import pam
 
@@ -72,7 +76,8 @@ class RemoteApiHandler(http.auth.HttpServerRequestAuthentication,
   """
   AUTH_REALM = "Ganeti Remote API"
 
-  def __init__(self, authenticator, reqauth, _client_cls=None):
+  def __init__(self, authenticator, reqauth, result_cache=None,
+               client_pool=None, request_stats=None, _client_cls=None):
     """Initializes this class.
 
     @type authenticator: an implementation of {RapiAuthenticator} interface
@@ -80,16 +85,27 @@ class RemoteApiHandler(http.auth.HttpServerRequestAuthentication,
                           ValidateRequest function
     @type reqauth: bool
     @param reqauth: Whether to require authentication
+    @type result_cache: L{cache.ResultCache} or None
+    @param result_cache: Cache for the results of read requests
+    @type client_pool: L{luxi.ConnectionPool} or None
+    @param client_pool: Pool of connections to the master daemon shared by
+      the LUXI clients of all requests
+    @type request_stats: L{stats.RequestStats} or None
+    @param request_stats: Statistics handled requests are recorded in
 
     """
     # pylint: disable=W0233
     # it seems pylint doesn't see the second parent class there
     http.server.HttpServerHandler.__init__(self)
     http.auth.HttpServerRequestAuthentication.__init__(self)
+    if _client_cls is None and client_pool is not None:
+      _client_cls = compat.partial(luxi.PooledClient, client_pool)
     self._client_cls = _client_cls
     self._resmap = connector.Mapper()
     self._authenticator = authenticator
     self._reqauth = reqauth
+    self._result_cache = result_cache
+    self._request_stats = request_stats
 
   @staticmethod
   def FormatErrorMessage(values):
@@ -114,7 +130,8 @@ class RemoteApiHandler(http.auth.HttpServerRequestAuthentication,
                      self._resmap.getController(req.request_path)
 
       ctx = RemoteApiRequestContext()
-      ctx.handler = HandlerClass(items, args, req, _client_cls=self._client_cls)
+      ctx.handler = HandlerClass(items, args, req, _client_cls=self._client_cls,
+                                 request_stats=self._request_stats)
 
       method = req.request_method.upper()
       try:
@@ -191,7 +208,11 @@ class RemoteApiHandler(http.auth.HttpServerRequestAuthentication,
       ctx.body_data = None
 
     try:
-      result = ctx.handler_fn()
+      if (req.request_method.upper() == http.HTTP_GET and
+          ctx.handler.useResultCache()):
+        body = self._GetCacheableResult(req, ctx)
+      else:
+        body = serializer.DumpJson(ctx.handler_fn())
     except rpcerr.TimeoutError:
       raise http.HttpGatewayTimeout()
     except rpcerr.ProtocolError, err:
@@ -199,7 +220,44 @@ class RemoteApiHandler(http.auth.HttpServerRequestAuthentication,
 
     req.resp_headers[http.HTTP_CONTENT_TYPE] = http.HTTP_APP_JSON
 
-    return serializer.DumpJson(result)
+    return body
+
+  def RequestFinished(self, method, code, duration):
+    """Records a handled request in the request statistics.
+
+    """
+    if self._request_stats is not None:
+      self._request_stats.Record(method, code, duration)
+
+  def _GetCacheableResult(self, req, ctx):
+    """Returns the serialized result of a cacheable read request.
+
+    The result is reused from the result cache if it is still current. Its
+    entity tag is sent to the client, and if the client already has the
+    same result, L{http.HttpNotModified} is raised instead.
+
+    """
+    compute_fn = lambda: serializer.DumpJson(ctx.handler_fn())
+
+    serial = None
+    if self._result_cache is not None:
+      serial = ctx.handler.GetConfigSerial()
+
+    if serial is None:
+      body = compute_fn()
+      etag = cache.ComputeETag(body)
+    else:
+      live = ctx.handler.UsesLiveData()
+      (etag, body) = self._result_cache.GetResult(req.request_path, serial,
+                                                  compute_fn, live=live)
+
+    if http.ETagMatches(req.request_headers.get(http.HTTP_IF_NONE_MATCH),
+                        etag):
+      raise http.HttpNotModified(headers={http.HTTP_ETAG: etag})
+
+    req.resp_headers[http.HTTP_ETAG] = etag
+
+    return body
 
 
 def CheckRapi(options, args):
@@ -238,11 +296,16 @@ def PrepRapi(options, _):
   else:
     authenticator = basic_auth.BasicAuthenticator()
 
-  handler = RemoteApiHandler(authenticator, options.reqauth)
+  handler = RemoteApiHandler(
+    authenticator, options.reqauth,
+    result_cache=cache.ResultCache(pathutils.RAPI_CACHE_DIR),
+    client_pool=luxi.ConnectionPool(),
+    request_stats=stats.RequestStats())
 
   server = http.server.HttpServer(
       mainloop, options.bind_address, options.port, options.max_clients,
-      handler, ssl_params=options.ssl_params, ssl_verify_peer=False)
+      handler, ssl_params=options.ssl_params, ssl_verify_peer=False,
+      threaded=True, keep_alive=True)
   server.Start()
 
   return (mainloop, server)
@@ -280,7 +343,7 @@ def Main():
                           " PAM"))
   parser.add_option("--max-clients", dest="max_clients",
                     default=20, type="int",
-                    help="Number of simultaneous connections accepted"
+                    help="Number of connections handled simultaneously"
                     " by ganeti-rapi")
 
   daemon.GenericMain(constants.RAPI, parser, CheckRapi, PrepRapi, ExecRapi,
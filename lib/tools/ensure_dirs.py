@@ -221,6 +221,8 @@ def GetPaths():
     (pathutils.LIVELOCK_DIR, DIR, 0750, getent.masterd_uid, getent.daemons_gid),
     (pathutils.LUXID_MESSAGE_DIR, DIR, 0750, getent.masterd_uid,
      getent.daemons_gid),
+    (pathutils.RAPI_CACHE_DIR, DIR, 0750, getent.rapi_uid,
+     getent.masterd_gid),
     ])
 
   return paths
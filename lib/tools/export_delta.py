@@ -0,0 +1,124 @@
+#
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script to write the delta stream for an incremental export.
+
+Reads the complete disk data from standard input and writes only the chunks
+which differ from the base manifest to standard output. Used as part of the
+export pipeline started by the import/export daemon.
+
+"""
+
+import os
+import optparse
+import sys
+import logging
+
+from ganeti import constants
+from ganeti import errors
+from ganeti import serializer
+from ganeti import utils
+from ganeti import cli
+from ganeti.impexpd import delta
+
+
+def ParseOptions():
+  """Parses the options passed to the program.
+
+  @return: Options and arguments
+
+  """
+  program = os.path.basename(sys.argv[0])
+
+  parser = optparse.OptionParser(usage="%prog [--base=<manifest>]",
+                                 prog=program)
+  parser.add_option(cli.DEBUG_OPT)
+  parser.add_option(cli.VERBOSE_OPT)
+  parser.add_option("--base", dest="base", action="store", type="string",
+                    default=None,
+                    help="File containing the manifest of the base export")
+
+  return parser.parse_args()
+
+
+def LoadBaseManifest(path):
+  """Loads the base manifest.
+
+  @type path: string
+  @param path: Path to manifest file
+  @rtype: dict or None
+  @return: Manifest, or C{None} if it's not usable
+
+  """
+  try:
+    manifest = serializer.LoadJson(utils.ReadFile(path))
+  except (EnvironmentError, ValueError), err:
+    logging.warning("Can't read base manifest %s: %s", path, err)
+    return None
+
+  if not delta.CheckManifest(manifest):
+    logging.warning("Ignoring malformed base manifest %s", path)
+    return None
+
+  return manifest
+
+
+def Main():
+  """Main routine.
+
+  """
+  (opts, args) = ParseOptions()
+
+  utils.SetupToolLogging(
+      opts.debug, opts.verbose,
+      toolname=os.path.splitext(os.path.basename(__file__))[0])
+
+  if args:
+    logging.error("No arguments are expected")
+    return constants.EXIT_FAILURE
+
+  if opts.base:
+    base = LoadBaseManifest(opts.base)
+  else:
+    base = None
+
+  if base is None:
+    logging.info("No base manifest, writing all chunks")
+
+  try:
+    (size, changed) = delta.WriteDelta(sys.stdin, sys.stdout, base=base)
+    sys.stdout.flush()
+  except (EnvironmentError, errors.GenericError), err:
+    logging.error("Writing delta failed: %s", err)
+    return constants.EXIT_FAILURE
+
+  logging.info("Wrote %s changed chunk(s) of %s bytes of data", changed, size)
+
+  return constants.EXIT_SUCCESS
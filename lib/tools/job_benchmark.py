@@ -0,0 +1,845 @@
+#
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Job throughput benchmark.
+
+Runs a configurable mix of instance jobs (creation, startup, shutdown,
+migration and queries) against a cluster and reports the job throughput,
+latency percentiles per job phase and an estimate of the configuration data
+moved, as JSON. The results of two runs can be compared to detect
+regressions.
+
+The benchmark is meant to be run on the master node of a virtual cluster
+set up with vcluster-setup, with the fake hypervisor and diskless
+instances, so that it measures the job machinery of the master daemons
+rather than the hypervisor or storage.
+
+"""
+
+import itertools
+import optparse
+import os
+import random
+import sys
+import time
+
+from ganeti import cli
+from ganeti import compat
+from ganeti import constants
+from ganeti import errors
+from ganeti import jstats
+from ganeti import opcodes
+from ganeti import pathutils
+from ganeti import serializer
+from ganeti import utils
+
+
+USAGE = ("\tjob-benchmark -o OS_NAME [options...]")
+
+#: Version of the result format; to be increased on incompatible changes
+RESULT_VERSION = 1
+
+KIND_CREATE = "create"
+KIND_START = "start"
+KIND_STOP = "stop"
+KIND_MIGRATE = "migrate"
+KIND_QUERY = "query"
+
+#: Kinds of jobs the benchmark can submit
+KINDS = compat.UniqueFrozenset([
+  KIND_CREATE,
+  KIND_START,
+  KIND_STOP,
+  KIND_MIGRATE,
+  KIND_QUERY,
+  ])
+
+_DEFAULT_MIX = "create=1,start=3,stop=3,migrate=2,query=3"
+
+#: Percentiles reported for the latency of each phase
+PERCENTILES = [50, 99]
+
+#: Latency phases derived from the job and opcode timestamps; the names
+#: don't clash with the phases recorded by L{jstats}
+PHASE_TOTAL = "total"
+PHASE_QUEUED = "queued"
+PHASE_LOCKING = "locking"
+PHASE_RUNNING = "running"
+
+#: Phases accounting for configuration transfers from and to WConfD
+_CONFIG_READ = "config-read"
+_CONFIG_WRITE = "config-write"
+
+#: Job fields needed to compute the statistics of finished jobs
+_JOB_FIELDS = [
+  "id", "status", "received_ts", "start_ts", "end_ts",
+  "opstart", "opexec", "opend", "phasestats", "opphasestats",
+  ]
+
+OPTIONS = [
+  cli.cli_option("-o", "--os", dest="os", default=None,
+                 help="OS to use for the benchmark instances",
+                 metavar="<OS>"),
+  cli.cli_option("--instances", dest="instances", type="int", default=10,
+                 help="Number of instances to create before running the job"
+                 " mix (default: 10)", metavar="<N>"),
+  cli.cli_option("--jobs", dest="jobs", type="int", default=100,
+                 help="Number of jobs in the job mix (default: 100)",
+                 metavar="<N>"),
+  cli.cli_option("--mix", dest="mix", default=_DEFAULT_MIX,
+                 help=("Relative weights of the job kinds in the job mix"
+                       " (default: %s)" % _DEFAULT_MIX),
+                 metavar="<kind=weight,...>"),
+  cli.cli_option("--prefix", dest="prefix", default="bench",
+                 help="Name prefix of the benchmark instances"
+                 " (default: bench)", metavar="<PREFIX>"),
+  cli.cli_option("--seed", dest="seed", type="int", default=0,
+                 help="Seed for choosing the jobs, so that runs can be"
+                 " repeated (default: 0)", metavar="<SEED>"),
+  cli.cli_option("--output", dest="output", default=None,
+                 help="Write the results to this file instead of the"
+                 " standard output", metavar="<FILE>"),
+  cli.cli_option("--baseline", dest="baseline", default=None,
+                 help="Results of a previous run to compare with; the"
+                 " program fails if performance regressed",
+                 metavar="<FILE>"),
+  cli.cli_option("--max-regression", dest="max_regression", type="float",
+                 default=20.0,
+                 help="Regression in percent tolerated when comparing with"
+                 " the baseline (default: 20)", metavar="<PERCENT>"),
+  cli.cli_option("--keep-instances", dest="keep_instances", default=False,
+                 action="store_true",
+                 help="Don't remove the benchmark instances at the end"),
+  cli.cli_option("--force", dest="force", default=False,
+                 action="store_true",
+                 help="Run even if the fake hypervisor is not enabled"),
+  cli.DEBUG_OPT,
+  cli.VERBOSE_OPT,
+  ]
+
+
+class _QuietReporter(cli.JobPollReportCbBase):
+  """Job poll reporter ignoring all messages.
+
+  """
+  def ReportLogMessage(self, job_id, serial, timestamp, log_type, log_msg):
+    """Ignores a log message.
+
+    """
+
+  def ReportNotChanged(self, job_id, status):
+    """Ignores an unchanged job.
+
+    """
+
+
+def ParseMix(value):
+  """Parses a job mix specification.
+
+  @type value: string
+  @param value: Comma-separated list of C{kind=weight} pairs
+  @rtype: dict
+  @return: Dictionary mapping job kinds to their weights
+  @raise errors.ParameterError: If the specification is invalid
+
+  """
+  mix = {}
+
+  for part in value.split(","):
+    (kind, sep, weight) = part.strip().partition("=")
+    if not sep:
+      raise errors.ParameterError("Invalid job mix entry '%s'" % part)
+    if kind not in KINDS:
+      raise errors.ParameterError("Unknown job kind '%s', valid kinds are %s" %
+                                  (kind, utils.CommaJoin(sorted(KINDS))))
+    if kind in mix:
+      raise errors.ParameterError("Job kind '%s' given twice" % kind)
+    try:
+      mix[kind] = int(weight)
+    except ValueError:
+      raise errors.ParameterError("Invalid weight '%s' for job kind '%s'" %
+                                  (weight, kind))
+    if mix[kind] < 0:
+      raise errors.ParameterError("Negative weight for job kind '%s'" % kind)
+
+  if not compat.any(weight > 0 for weight in mix.values()):
+    raise errors.ParameterError("The job mix contains no jobs")
+
+  return mix
+
+
+def ChooseKinds(mix, count, rng):
+  """Chooses the kinds of a number of jobs according to a job mix.
+
+  @type mix: dict
+  @param mix: Job mix as returned by L{ParseMix}
+  @type count: int
+  @param count: Number of jobs
+  @type rng: C{random.Random}
+  @param rng: Random number generator
+  @rtype: list of strings
+
+  """
+  kinds = sorted(kind for (kind, weight) in mix.items() if weight > 0)
+  total = sum(mix[kind] for kind in kinds)
+
+  result = []
+
+  for _ in range(count):
+    point = rng.randint(1, total)
+    for kind in kinds:
+      point -= mix[kind]
+      if point <= 0:
+        result.append(kind)
+        break
+
+  return result
+
+
+def Percentile(values, percent):
+  """Returns a percentile of a sorted list of values.
+
+  @type values: list
+  @param values: Sorted, non-empty list of values
+  @type percent: number
+  @param percent: Percentile, between 0 and 100
+
+  """
+  idx = int(round((len(values) - 1) * percent / 100.0))
+  return values[idx]
+
+
+def _Duration(start, end):
+  """Returns the time between two job timestamps.
+
+  @rtype: float or None
+  @return: Duration in seconds, C{None} if a timestamp is missing
+
+  """
+  if start is None or end is None:
+    return None
+
+  return utils.MergeTime(end) - utils.MergeTime(start)
+
+
+def _GetPhaseStats(job):
+  """Returns the per-phase statistics of a job and its opcodes.
+
+  @type job: dict
+  @param job: Job fields (see L{_JOB_FIELDS})
+  @rtype: list of dicts
+
+  """
+  return [job["phasestats"] or {}] + [stats or {}
+                                      for stats in job["opphasestats"] or []]
+
+
+def GetJobPhases(job):
+  """Computes the time a job spent in each of its phases.
+
+  Besides the phases recorded by the job process (see L{jstats}), the time
+  from submission to completion, the time spent queued and the time the
+  opcodes spent acquiring locks and running are derived from the job
+  timestamps. The time of a phase entered by several opcodes is summed up.
+
+  @type job: dict
+  @param job: Job fields (see L{_JOB_FIELDS})
+  @rtype: dict
+  @return: Dictionary mapping phase names to durations in seconds
+
+  """
+  phases = {}
+
+  def _Add(phase, value):
+    if value is not None:
+      phases[phase] = phases.get(phase, 0.0) + value
+
+  _Add(PHASE_TOTAL, _Duration(job["received_ts"], job["end_ts"]))
+  _Add(PHASE_QUEUED, _Duration(job["received_ts"], job["start_ts"]))
+
+  for (start, exec_ts, end) in zip(job["opstart"] or [], job["opexec"] or [],
+                                   job["opend"] or []):
+    _Add(PHASE_LOCKING, _Duration(start, exec_ts))
+    _Add(PHASE_RUNNING, _Duration(exec_ts, end))
+
+  for stats in _GetPhaseStats(job):
+    for (phase, values) in stats.items():
+      _Add(phase, values[jstats.STAT_WALL])
+
+  return phases
+
+
+def CountConfigTransfers(job):
+  """Counts the configuration transfers from and to WConfD made by a job.
+
+  @type job: dict
+  @param job: Job fields (see L{_JOB_FIELDS})
+  @rtype: tuple
+  @return: Tuple of the number of configuration reads and writes
+
+  """
+  reads = writes = 0
+
+  for stats in _GetPhaseStats(job):
+    reads += stats.get(_CONFIG_READ, {}).get(jstats.STAT_COUNT, 0)
+    writes += stats.get(_CONFIG_WRITE, {}).get(jstats.STAT_COUNT, 0)
+
+  return (reads, writes)
+
+
+def SummarizeLatencies(jobs):
+  """Computes the latency percentiles of each phase over a set of jobs.
+
+  Only jobs which entered a phase are taken into account for it.
+
+  @type jobs: list of dicts
+  @param jobs: Job fields (see L{_JOB_FIELDS})
+  @rtype: dict
+  @return: Dictionary mapping phase names to dictionaries mapping
+    percentiles (e.g. C{p50}) to durations in seconds
+
+  """
+  values = {}
+
+  for job in jobs:
+    for (phase, value) in GetJobPhases(job).items():
+      values.setdefault(phase, []).append(value)
+
+  return dict((phase, dict(("p%s" % percent,
+                            round(Percentile(sorted(durations), percent), 6))
+                           for percent in PERCENTILES))
+              for (phase, durations) in values.items())
+
+
+def _CountFailed(jobs):
+  """Returns the number of jobs which didn't succeed.
+
+  """
+  return len([job for job in jobs
+              if job["status"] != constants.JOB_STATUS_SUCCESS])
+
+
+def SummarizeThroughput(jobs, duration):
+  """Summarizes the number of jobs run over a period of time.
+
+  @type jobs: list of dicts
+  @param jobs: Job fields (see L{_JOB_FIELDS})
+  @type duration: float
+  @param duration: Time it took to run the jobs, in seconds
+  @rtype: dict
+
+  """
+  if duration > 0:
+    rate = round(len(jobs) / duration, 6)
+  else:
+    rate = None
+
+  return {
+    "jobs": len(jobs),
+    "failed": _CountFailed(jobs),
+    "duration": round(duration, 6),
+    "jobs_per_second": rate,
+    }
+
+
+def BuildReport(parameters, setup, jobs, duration, config_size):
+  """Builds the result of a benchmark run.
+
+  The configuration bytes moved are estimated as the number of
+  configuration transfers from and to WConfD times the size of the
+  configuration at the end of the run.
+
+  @type parameters: dict
+  @param parameters: Parameters of the run
+  @type setup: dict
+  @param setup: Throughput of the instance creation before the job mix, as
+    returned by L{SummarizeThroughput}
+  @type jobs: list of tuples
+  @param jobs: Tuples of job kind and job fields (see L{_JOB_FIELDS}) of the
+    jobs in the job mix
+  @type duration: float
+  @param duration: Time it took to run the job mix, in seconds
+  @type config_size: int or None
+  @param config_size: Size of the cluster configuration file, if known
+  @rtype: dict
+
+  """
+  by_kind = {}
+  for (kind, job) in jobs:
+    by_kind.setdefault(kind, []).append(job)
+
+  all_jobs = [job for (_, job) in jobs]
+
+  reads = writes = 0
+  for job in all_jobs:
+    (job_reads, job_writes) = CountConfigTransfers(job)
+    reads += job_reads
+    writes += job_writes
+
+  if config_size is None:
+    config_bytes = None
+  else:
+    config_bytes = (reads + writes) * config_size
+
+  kinds = {}
+  for (kind, kind_jobs) in by_kind.items():
+    kinds[kind] = {
+      "jobs": len(kind_jobs),
+      "failed": _CountFailed(kind_jobs),
+      "latency": SummarizeLatencies(kind_jobs),
+      }
+
+  return {
+    "version": RESULT_VERSION,
+    "parameters": parameters,
+    "setup": setup,
+    "throughput": SummarizeThroughput(all_jobs, duration),
+    "latency": SummarizeLatencies(all_jobs),
+    "kinds": kinds,
+    "config": {
+      "size": config_size,
+      "reads": reads,
+      "writes": writes,
+      "bytes": config_bytes,
+      },
+    }
+
+
+def FormatReport(report):
+  """Serializes the result of a benchmark run.
+
+  The same JSON engine as for reading a baseline is used.
+
+  @type report: dict
+  @rtype: string
+
+  """
+  return serializer.DumpJson(report)
+
+
+def CompareReports(baseline, report, max_regression):
+  """Compares the result of a benchmark run with a previous one.
+
+  The throughput, the total latency percentiles of each job kind and the
+  configuration bytes moved per job are compared.
+
+  @type baseline: dict
+  @param baseline: Result of the previous run
+  @type report: dict
+  @param report: Result of the current run
+  @type max_regression: float
+  @param max_regression: Tolerated regression in percent
+  @rtype: list of strings
+  @return: Descriptions of the regressions found
+  @raise errors.ParameterError: If the results can't be compared
+
+  """
+  if baseline.get("version") != report["version"]:
+    raise errors.ParameterError("Baseline uses result format version %s,"
+                                " expected %s" %
+                                (baseline.get("version"), report["version"]))
+
+  factor = max_regression / 100.0
+  regressions = []
+
+  old_rate = baseline["throughput"]["jobs_per_second"]
+  new_rate = report["throughput"]["jobs_per_second"]
+  if old_rate and new_rate is not None and new_rate < old_rate * (1 - factor):
+    regressions.append("Throughput dropped from %.3f to %.3f jobs/s" %
+                       (old_rate, new_rate))
+
+  for (kind, summary) in sorted(report["kinds"].items()):
+    old_latency = baseline["kinds"].get(kind, {}).get("latency", {})
+    old_total = old_latency.get(PHASE_TOTAL, {})
+    new_total = summary["latency"].get(PHASE_TOTAL, {})
+    for (name, new_value) in sorted(new_total.items()):
+      old_value = old_total.get(name)
+      if old_value and new_value > old_value * (1 + factor):
+        regressions.append("Latency (%s) of %s jobs rose from %.3fs to %.3fs" %
+                           (name, kind, old_value, new_value))
+
+  old_bytes = baseline["config"]["bytes"]
+  new_bytes = report["config"]["bytes"]
+  old_jobs = baseline["throughput"]["jobs"]
+  new_jobs = report["throughput"]["jobs"]
+  if old_bytes and new_bytes is not None and old_jobs and new_jobs:
+    old_per_job = float(old_bytes) / old_jobs
+    new_per_job = float(new_bytes) / new_jobs
+    if new_per_job > old_per_job * (1 + factor):
+      regressions.append("Configuration data moved per job rose from %d to"
+                         " %d bytes" % (old_per_job, new_per_job))
+
+  return regressions
+
+
+class BenchmarkError(Exception):
+  """Failure while setting up or running the benchmark"""
+
+
+class JobBenchmark(object):
+  """Runs the benchmark against a cluster.
+
+  """
+  def __init__(self, opts, mix, cl):
+    """Initializes this class.
+
+    @param opts: Command line options
+    @type mix: dict
+    @param mix: Job mix as returned by L{ParseMix}
+    @param cl: LUXI client
+
+    """
+    self.opts = opts
+    self.mix = mix
+    self.cl = cl
+    self.nodes = []
+    self.hypervisor = None
+    self.instances = []
+    self._rng = random.Random(opts.seed)
+    self._counter = itertools.count(1)
+    self._existing = set()
+    self._created = []
+    self._pnode_cycle = None
+
+  def GetState(self):
+    """Reads the cluster state from the master daemon.
+
+    """
+    cluster_info = self.cl.QueryClusterInfo()
+
+    if constants.HT_FAKE in cluster_info["enabled_hypervisors"]:
+      self.hypervisor = constants.HT_FAKE
+    elif self.opts.force:
+      self.hypervisor = cluster_info["default_hypervisor"]
+    else:
+      raise BenchmarkError("The fake hypervisor is not enabled; use --force"
+                           " to run the benchmark anyway")
+
+    result = self.cl.QueryNodes([], ["name", "offline", "drained"], False)
+    self.nodes = sorted(name for (name, offline, drained) in result
+                        if not (offline or drained))
+    if not self.nodes:
+      raise BenchmarkError("No usable nodes found")
+    if self.mix.get(KIND_MIGRATE) and len(self.nodes) < 2:
+      raise BenchmarkError("Migrations need at least two usable nodes")
+
+    self._pnode_cycle = itertools.cycle(self.nodes)
+    self._existing = set(name for (name, ) in
+                         self.cl.QueryInstances([], ["name"], False))
+
+  def _NewInstanceName(self):
+    """Returns the name of a new benchmark instance.
+
+    """
+    while True:
+      name = "%s%d" % (self.opts.prefix, self._counter.next())
+      if name not in self._existing:
+        self._existing.add(name)
+        self._created.append(name)
+        return name
+
+  def _CreateOp(self, name):
+    """Returns an opcode creating a benchmark instance.
+
+    """
+    return opcodes.OpInstanceCreate(instance_name=name,
+                                    disks=[],
+                                    disk_template=constants.DT_DISKLESS,
+                                    nics=[],
+                                    mode=constants.INSTANCE_CREATE,
+                                    os_type=self.opts.os,
+                                    pnode=self._pnode_cycle.next(),
+                                    start=True,
+                                    no_install=True,
+                                    ip_check=False,
+                                    name_check=False,
+                                    wait_for_sync=False,
+                                    hypervisor=self.hypervisor)
+
+  def _GetOp(self, kind, name, pnode):
+    """Returns an opcode of the given kind for an existing instance.
+
+    """
+    if kind == KIND_START:
+      return opcodes.OpInstanceStartup(instance_name=name, force=False)
+    elif kind == KIND_STOP:
+      return opcodes.OpInstanceShutdown(instance_name=name)
+    elif kind == KIND_MIGRATE:
+      # Stopped instances are failed over instead
+      target = self.nodes[(self.nodes.index(pnode) + 1) % len(self.nodes)]
+      return opcodes.OpInstanceMigrate(instance_name=name, mode=None,
+                                       cleanup=False, target_node=target,
+                                       allow_failover=True)
+    elif kind == KIND_QUERY:
+      return opcodes.OpInstanceQueryData(instances=[name], static=False,
+                                         use_locking=False)
+
+    raise errors.ProgrammerError("Unknown job kind '%s'" % kind)
+
+  def _ExecuteJobs(self, jobs):
+    """Submits jobs and waits for them to finish.
+
+    @type jobs: list of tuples
+    @param jobs: Tuples of job kind, instance name and list of opcodes
+    @rtype: list of tuples
+    @return: Tuples of job kind, instance name and job fields (see
+      L{_JOB_FIELDS})
+
+    """
+    submitted = self.cl.SubmitManyJobs([ops for (_, _, ops) in jobs])
+
+    job_ids = []
+    for (success, job_id) in submitted:
+      if not success:
+        raise BenchmarkError("Submitting a job failed: %s" % job_id)
+      job_ids.append(job_id)
+
+    for _ in cli.PollJobs(job_ids, cl=self.cl, reporter=_QuietReporter()):
+      pass
+
+    result = []
+
+    for ((kind, name, _), row) in zip(jobs,
+                                      self.cl.QueryJobs(job_ids, _JOB_FIELDS)):
+      if row is None:
+        raise BenchmarkError("A job of kind %s for instance %s was lost" %
+                             (kind, name))
+      result.append((kind, name, dict(zip(_JOB_FIELDS, row))))
+
+    return result
+
+  def _RunJobs(self, jobs):
+    """Runs jobs and keeps track of the instances they create.
+
+    @rtype: tuple
+    @return: Tuple of the list of job kinds and job fields and the time it
+      took to run the jobs
+
+    """
+    start = time.time()
+    result = self._ExecuteJobs(jobs)
+    duration = time.time() - start
+
+    for (kind, name, job) in result:
+      if job["status"] != constants.JOB_STATUS_SUCCESS:
+        cli.ToStderr("Job %s (%s of instance %s) failed", job["id"], kind,
+                     name)
+      elif kind == KIND_CREATE:
+        self.instances.append(name)
+
+    return ([(kind, job) for (kind, _, job) in result], duration)
+
+  def _RunRound(self, count):
+    """Runs a round of the job mix.
+
+    Every instance is the target of at most one job per round, so that the
+    jobs of a round don't depend on each other.
+
+    @type count: int
+    @param count: Number of jobs, at most the number of instances
+
+    """
+    kinds = ChooseKinds(self.mix, count, self._rng)
+    targets = self._rng.sample(self.instances,
+                               len([kind for kind in kinds
+                                    if kind != KIND_CREATE]))
+
+    pnodes = {}
+    if targets:
+      pnodes = dict(self.cl.QueryInstances(targets, ["name", "pnode"], False))
+
+    jobs = []
+    for kind in kinds:
+      if kind == KIND_CREATE:
+        name = self._NewInstanceName()
+        op = self._CreateOp(name)
+      else:
+        name = targets.pop()
+        op = self._GetOp(kind, name, pnodes[name])
+      jobs.append((kind, name, [op]))
+
+    return self._RunJobs(jobs)
+
+  def _Cleanup(self):
+    """Removes the benchmark instances.
+
+    """
+    existing = set(name for (name, ) in
+                   self.cl.QueryInstances([], ["name"], False))
+    names = [name for name in self._created if name in existing]
+    if not names:
+      return
+
+    cli.ToStderr("Removing %s instances", len(names))
+    for (_, name, job) in self._ExecuteJobs([
+        (None, name, [opcodes.OpInstanceRemove(instance_name=name,
+                                               ignore_failures=True)])
+        for name in names]):
+      if job["status"] != constants.JOB_STATUS_SUCCESS:
+        cli.ToStderr("Removing instance %s failed", name)
+
+  def Run(self):
+    """Runs the benchmark.
+
+    @rtype: dict
+    @return: Result as returned by L{BuildReport}
+
+    """
+    self.GetState()
+
+    try:
+      cli.ToStderr("Creating %s instances on %s nodes", self.opts.instances,
+                   len(self.nodes))
+      (setup_jobs, setup_duration) = \
+        self._RunJobs([(KIND_CREATE, name, [self._CreateOp(name)])
+                       for name in [self._NewInstanceName()
+                                    for _ in range(self.opts.instances)]])
+      if not self.instances:
+        raise BenchmarkError("No instance could be created")
+
+      cli.ToStderr("Running %s jobs", self.opts.jobs)
+      jobs = []
+      duration = 0.0
+      while len(jobs) < self.opts.jobs:
+        (round_jobs, round_duration) = \
+          self._RunRound(min(self.opts.jobs - len(jobs), len(self.instances)))
+        jobs.extend(round_jobs)
+        duration += round_duration
+
+      try:
+        config_size = os.path.getsize(pathutils.CLUSTER_CONF_FILE)
+      except EnvironmentError, err:
+        cli.ToStderr("Can't determine the configuration size: %s", err)
+        config_size = None
+    finally:
+      if not self.opts.keep_instances:
+        self._Cleanup()
+
+    parameters = {
+      "instances": self.opts.instances,
+      "jobs": self.opts.jobs,
+      "mix": self.mix,
+      "seed": self.opts.seed,
+      "nodes": len(self.nodes),
+      "hypervisor": self.hypervisor,
+      }
+
+    return BuildReport(parameters,
+                       SummarizeThroughput([job for (_, job) in setup_jobs],
+                                           setup_duration),
+                       jobs, duration, config_size)
+
+
+def ParseOptions():
+  """Parses the command line options.
+
+  In case of command line errors, it will show the usage and exit the
+  program.
+
+  @return: Options and job mix
+
+  """
+  parser = optparse.OptionParser(usage="\n%s" % USAGE,
+                                 version=("%%prog (ganeti) %s" %
+                                          constants.RELEASE_VERSION),
+                                 option_list=OPTIONS)
+
+  (opts, args) = parser.parse_args()
+  if args:
+    parser.error("No arguments are expected")
+  if opts.os is None:
+    parser.error("An OS must be given")
+  if opts.instances < 1:
+    parser.error("At least one instance is needed")
+  if opts.jobs < 1:
+    parser.error("At least one job is needed")
+
+  try:
+    mix = ParseMix(opts.mix)
+  except errors.ParameterError, err:
+    parser.error(str(err))
+
+  return (opts, mix)
+
+
+def Main():
+  """Main function.
+
+  """
+  (opts, mix) = ParseOptions()
+
+  utils.SetupToolLogging(
+      opts.debug, opts.verbose,
+      toolname=os.path.splitext(os.path.basename(__file__))[0])
+
+  baseline = None
+  if opts.baseline:
+    try:
+      baseline = serializer.LoadJson(utils.ReadFile(opts.baseline))
+    except (EnvironmentError, ValueError), err:
+      cli.ToStderr("Can't read baseline %s: %s", opts.baseline, err)
+      return constants.EXIT_FAILURE
+
+  try:
+    report = JobBenchmark(opts, mix, cli.GetClient()).Run()
+  except BenchmarkError, err:
+    cli.ToStderr("Benchmark failed: %s", err)
+    return constants.EXIT_FAILURE
+  except errors.GenericError, err:
+    (retcode, msg) = cli.FormatError(err)
+    cli.ToStderr("Benchmark failed: %s", msg)
+    return retcode
+
+  text = FormatReport(report)
+  if opts.output:
+    utils.WriteFile(opts.output, data=text)
+  else:
+    sys.stdout.write(text)
+
+  status = constants.EXIT_SUCCESS
+
+  failed = report["setup"]["failed"] + report["throughput"]["failed"]
+  if failed:
+    cli.ToStderr("%s job(s) failed", failed)
+    status = constants.EXIT_FAILURE
+
+  if baseline is not None:
+    try:
+      regressions = CompareReports(baseline, report, opts.max_regression)
+    except (errors.ParameterError, KeyError, TypeError), err:
+      cli.ToStderr("Can't compare with baseline %s: %s", opts.baseline, err)
+      return constants.EXIT_FAILURE
+
+    for msg in regressions:
+      cli.ToStderr("Regression: %s", msg)
+    if regressions:
+      status = constants.EXIT_FAILURE
+
+  return status
@@ -56,6 +56,7 @@ from ganeti.utils.algo import *
 from ganeti.utils.filelock import *
 from ganeti.utils.hash import *
 from ganeti.utils.io import *
+from ganeti.utils.lazy import *
 from ganeti.utils.livelock import *
 from ganeti.utils.log import *
 from ganeti.utils.lvm import *
@@ -0,0 +1,86 @@
+#
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Utility functions for deferring module imports.
+
+"""
+
+import importlib
+import types
+
+
+class LazyModule(types.ModuleType):
+  """Proxy for a module which is only imported when it is first used.
+
+  Modules which are expensive to import, but only needed by some code
+  paths, can be bound to a name using this class instead of a plain
+  C{import} statement. The real module is imported when an attribute of the
+  proxy is accessed for the first time; after that the proxy only forwards
+  attribute accesses to it. Assigning or deleting attributes modifies the
+  real module, so test code can replace functions as usual.
+
+  Since the module is imported on first use, the proxy must not be accessed
+  at module level of the importing module, otherwise nothing is gained.
+
+  """
+  def __init__(self, name):
+    """Initializes this class.
+
+    @type name: string
+    @param name: Fully qualified name of the module, e.g. C{ganeti.opcodes}
+
+    """
+    types.ModuleType.__init__(self, name)
+
+  def __getattr__(self, name):
+    return getattr(_LoadModule(self), name)
+
+  def __setattr__(self, name, value):
+    setattr(_LoadModule(self), name, value)
+
+  def __delattr__(self, name):
+    delattr(_LoadModule(self), name)
+
+  def __repr__(self):
+    return "<lazy module %r>" % _GetModuleName(self)
+
+
+def _GetModuleName(proxy):
+  """Returns the name of the module behind a L{LazyModule}.
+
+  """
+  return types.ModuleType.__getattribute__(proxy, "__name__")
+
+
+def _LoadModule(proxy):
+  """Returns the module behind a L{LazyModule}, importing it if necessary.
+
+  """
+  return importlib.import_module(_GetModuleName(proxy))
@@ -36,14 +36,15 @@ import os
 import time
 import uuid as uuid_module
 
-import OpenSSL
-
 from ganeti.utils import io
+from ganeti.utils import lazy
 from ganeti.utils import x509
 from ganeti import constants
 from ganeti import errors
 from ganeti import pathutils
 
+OpenSSL = lazy.LazyModule("OpenSSL")
+
 
 def UuidToInt(uuid):
   uuid_obj = uuid_module.UUID(uuid)
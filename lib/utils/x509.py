@@ -38,8 +38,6 @@ import logging
 import re
 import time
 
-import OpenSSL
-
 from ganeti import errors
 from ganeti import constants
 from ganeti import pathutils
@@ -47,6 +45,9 @@ from ganeti import pathutils
 from ganeti.utils import text as utils_text
 from ganeti.utils import io as utils_io
 from ganeti.utils import hash as utils_hash
+from ganeti.utils import lazy as utils_lazy
+
+OpenSSL = utils_lazy.LazyModule("OpenSSL")
 
 
 HEX_CHAR_RE = r"[a-zA-Z0-9]"
@@ -43,6 +43,7 @@ import signal
 import time
 import logging
 import errno
+import re
 from optparse import OptionParser
 
 from ganeti import utils
@@ -50,6 +51,7 @@ from ganeti import wconfd
 from ganeti import constants
 from ganeti import compat
 from ganeti import errors
+from ganeti import jstats
 from ganeti import opcodes
 from ganeti import cli
 import ganeti.rpc.errors as rpcerr
@@ -84,6 +86,9 @@ CHILD_PROCESS_DELAY = 1.0
 #: How many seconds to wait for instance status file lock
 INSTANCE_STATUS_LOCK_TIMEOUT = 10.0
 
+#: Summary of the verify-disks jobs submitted for node groups
+_VERIFY_DISKS_SUMMARY_RE = re.compile(r"^GROUP_VERIFY_DISKS\((.+)\)$")
+
 
 class NotMasterError(errors.GenericError):
   """Exception raised when this host is not the master."""
@@ -157,25 +162,21 @@ class Instance(object):
     self.snodes = snodes
     self.disk_template = disk_template
 
-  def Restart(self, cl):
-    """Encapsulates the start of an instance.
+  def RestartOp(self):
+    """Returns the opcode to start the instance.
 
     """
     op = opcodes.OpInstanceStartup(instance_name=self.name, force=False)
     op.reason = [(constants.OPCODE_REASON_SRC_WATCHER,
                   "Restarting instance %s" % self.name,
                   utils.EpochNano())]
-    cli.SubmitOpCode(op, cl=cl)
+    return op
 
-  def ActivateDisks(self, cl):
-    """Encapsulates the activation of all disks of an instance.
+  def ActivateDisksOp(self):
+    """Returns the opcode to activate all disks of the instance.
 
     """
-    op = opcodes.OpInstanceActivateDisks(instance_name=self.name)
-    op.reason = [(constants.OPCODE_REASON_SRC_WATCHER,
-                  "Activating disks for instance %s" % self.name,
-                  utils.EpochNano())]
-    cli.SubmitOpCode(op, cl=cl)
+    return _ActivateDisksOp(self.name)
 
   def NeedsCleanup(self):
     """Determines whether the instance needs cleanup.
@@ -205,7 +206,140 @@ class Node(object):
     self.secondaries = secondaries
 
 
-def _CleanupInstance(cl, notepad, inst, locks):
+def _ActivateDisksOp(instance_name):
+  """Returns the opcode to activate all disks of an instance.
+
+  """
+  op = opcodes.OpInstanceActivateDisks(instance_name=instance_name)
+  op.reason = [(constants.OPCODE_REASON_SRC_WATCHER,
+                "Activating disks for instance %s" % instance_name,
+                utils.EpochNano())]
+  return op
+
+
+def _CallIfSet(fn):
+  """Calls a function without arguments unless it is C{None}.
+
+  """
+  if fn is not None:
+    fn()
+
+
+class _JobSubmitter(object):
+  """Submits the jobs of the watcher one at a time, waiting for each.
+
+  """
+  def __init__(self, cl):
+    """Initializes this class.
+
+    @param cl: the LUXI client to use
+
+    """
+    self._cl = cl
+
+  def Submit(self, op, description, success_fn=None, failure_fn=None):
+    """Runs a job consisting of a single opcode.
+
+    @type op: L{opcodes.OpCode}
+    @param op: the opcode to run
+    @type description: string
+    @param description: what the job does, used in log messages
+    @type success_fn: callable or None
+    @param success_fn: called without arguments if the job succeeded
+    @type failure_fn: callable or None
+    @param failure_fn: called without arguments if the job failed
+    @rtype: bool
+    @return: whether the job succeeded; for submitters which run the jobs
+      later, whether the job was accepted
+
+    """
+    try:
+      cli.SubmitOpCode(op, cl=self._cl)
+    except Exception: # pylint: disable=W0703
+      logging.exception("Error while %s", description)
+      _CallIfSet(failure_fn)
+      return False
+
+    _CallIfSet(success_fn)
+    return True
+
+
+class _JobBatch(_JobSubmitter):
+  """Collects the jobs of the watcher to submit them all at once.
+
+  The jobs are only submitted by L{Finish}, which also runs the callbacks
+  passed to L{Submit}. As all jobs are in the queue at the same time, the
+  time spent waiting for them is bound by the slowest job, not their sum.
+
+  """
+  def __init__(self, cl):
+    """Initializes this class.
+
+    """
+    _JobSubmitter.__init__(self, cl)
+    self._pending = []
+
+  def Submit(self, op, description, success_fn=None, failure_fn=None):
+    """Queues a job consisting of a single opcode.
+
+    @see: L{_JobSubmitter.Submit}
+
+    """
+    return self.SubmitJob([op], description, success_fn=success_fn,
+                          failure_fn=failure_fn)
+
+  def SubmitJob(self, ops, description, success_fn=None, failure_fn=None):
+    """Queues a job.
+
+    @type ops: list of L{opcodes.OpCode}
+    @param ops: the opcodes of the job
+    @see: L{_JobSubmitter.Submit}
+
+    """
+    self._pending.append((ops, description, success_fn, failure_fn))
+    return True
+
+  def Finish(self):
+    """Submits all queued jobs and waits for them to finish.
+
+    @rtype: list of tuples; (job ID or None, list of opcode results or None)
+    @return: for every queued job, in order, the job ID (C{None} if the job
+      couldn't be submitted) and its results (C{None} if it failed)
+
+    """
+    (pending, self._pending) = (self._pending, [])
+
+    if not pending:
+      return []
+
+    logging.debug("Submitting %s jobs", len(pending))
+    submitted = self._cl.SubmitManyJobs([ops for (ops, _, _, _) in pending])
+
+    results = []
+
+    for ((status, job_id), (_, description, success_fn, failure_fn)) in \
+        zip(submitted, pending):
+      if not status:
+        logging.error("Failed to submit job for %s: %s", description, job_id)
+        _CallIfSet(failure_fn)
+        results.append((None, None))
+        continue
+
+      try:
+        result = cli.PollJob(job_id, cl=self._cl, feedback_fn=logging.debug)
+      except Exception: # pylint: disable=W0703
+        logging.exception("Error while %s (job %s)", description, job_id)
+        _CallIfSet(failure_fn)
+        result = None
+      else:
+        _CallIfSet(success_fn)
+
+      results.append((job_id, result))
+
+    return results
+
+
+def _CleanupInstance(jobs, notepad, inst, locks):
   n = notepad.NumberOfCleanupAttempts(inst.name)
 
   if inst.name in locks:
@@ -226,18 +360,23 @@ def _CleanupInstance(cl, notepad, inst, locks):
   op.reason = [(constants.OPCODE_REASON_SRC_WATCHER,
                 "Cleaning up instance %s" % inst.name,
                 utils.EpochNano())]
-  try:
-    cli.SubmitOpCode(op, cl=cl)
+
+  def _Succeeded():
     if notepad.NumberOfCleanupAttempts(inst.name):
       notepad.RemoveInstance(inst.name)
-  except Exception: # pylint: disable=W0703
-    logging.exception("Error while cleaning up instance '%s'", inst.name)
-    notepad.RecordCleanupAttempt(inst.name)
+
+  jobs.Submit(op, "cleaning up instance '%s'" % inst.name,
+              success_fn=_Succeeded,
+              failure_fn=compat.partial(notepad.RecordCleanupAttempt,
+                                        inst.name))
 
 
-def _CheckInstances(cl, notepad, instances, locks):
+def _CheckInstances(jobs, notepad, instances, locks):
   """Make a pass over the list of instances, restarting downed ones.
 
+  @type jobs: L{_JobSubmitter}
+  @param jobs: the object to submit jobs with
+
   """
   notepad.MaintainInstanceList(instances.keys())
 
@@ -245,7 +384,7 @@ def _CheckInstances(cl, notepad, instances, locks):
 
   for inst in instances.values():
     if inst.NeedsCleanup():
-      _CleanupInstance(cl, notepad, inst, locks)
+      _CleanupInstance(jobs, notepad, inst, locks)
     elif inst.status in BAD_STATES:
       n = notepad.NumberOfRestartAttempts(inst.name)
 
@@ -260,13 +399,10 @@ def _CheckInstances(cl, notepad, instances, locks):
                       " giving up", inst.name, MAXTRIES)
         continue
 
-      try:
-        logging.info("Restarting instance '%s' (attempt #%s)",
-                     inst.name, n + 1)
-        inst.Restart(cl)
-      except Exception: # pylint: disable=W0703
-        logging.exception("Error while restarting instance '%s'", inst.name)
-      else:
+      logging.info("Restarting instance '%s' (attempt #%s)",
+                   inst.name, n + 1)
+      if jobs.Submit(inst.RestartOp(),
+                     "restarting instance '%s'" % inst.name):
         started.add(inst.name)
 
       notepad.RecordRestartAttempt(inst.name)
@@ -280,9 +416,12 @@ def _CheckInstances(cl, notepad, instances, locks):
   return started
 
 
-def _CheckDisks(cl, notepad, nodes, instances, started):
+def _CheckDisks(jobs, notepad, nodes, instances, started):
   """Check all nodes for restarted ones.
 
+  @type jobs: L{_JobSubmitter}
+  @param jobs: the object to submit jobs with
+
   """
   check_nodes = []
 
@@ -323,12 +462,9 @@ def _CheckDisks(cl, notepad, nodes, instances, started):
                         " it was already started", inst.name)
           continue
 
-        try:
-          logging.info("Activating disks for instance '%s'", inst.name)
-          inst.ActivateDisks(cl)
-        except Exception: # pylint: disable=W0703
-          logging.exception("Error while activating disks for instance '%s'",
-                            inst.name)
+        logging.info("Activating disks for instance '%s'", inst.name)
+        jobs.Submit(inst.ActivateDisksOp(),
+                    "activating disks for instance '%s'" % inst.name)
 
     # Keep changed boot IDs
     for node in check_nodes:
@@ -345,9 +481,11 @@ def _CheckForOfflineNodes(nodes, instance):
   return compat.any(nodes[node_name].offline for node_name in instance.snodes)
 
 
-def _GetPendingVerifyDisks(cl, uuid):
-  """Checks if there are any currently running or pending group verify jobs and
-  if so, returns their id.
+def _GetPendingVerifyDisksJobs(cl):
+  """Returns the currently running or pending group verify jobs.
+
+  @rtype: dict
+  @return: group UUIDs as keys, lists of job IDs as values
 
   """
   qfilter = qlang.MakeSimpleFilter("status",
@@ -356,44 +494,52 @@ def _GetPendingVerifyDisks(cl, uuid):
                                                constants.JOB_STATUS_WAITING]))
   qresult = cl.Query(constants.QR_JOB, ["id", "summary"], qfilter)
 
-  ids = [jobid for ((_, jobid), (_, (job, ))) in qresult.data
-         if job == ("GROUP_VERIFY_DISKS(%s)" % uuid)]
-  return ids
+  result = {}
 
+  for ((_, jobid), (_, summary)) in qresult.data:
+    if len(summary) != 1:
+      continue
 
-def _VerifyDisks(cl, uuid, nodes, instances, is_strict):
-  """Run a per-group "gnt-cluster verify-disks".
+    match = _VERIFY_DISKS_SUMMARY_RE.match(summary[0])
+    if match:
+      result.setdefault(match.group(1), []).append(jobid)
+
+  return result
+
+
+def _GetPendingVerifyDisks(cl, uuid):
+  """Checks if there are any currently running or pending group verify jobs and
+  if so, returns their id.
 
   """
+  return _GetPendingVerifyDisksJobs(cl).get(uuid, [])
 
-  existing_jobs = _GetPendingVerifyDisks(cl, uuid)
-  if existing_jobs:
-    logging.info("There are verify disks jobs already pending (%s), skipping "
-                 "VerifyDisks step for %s.",
-                 utils.CommaJoin(existing_jobs), uuid)
-    return
 
+def _VerifyDisksOp(uuid, is_strict):
+  """Returns the opcode to verify the disks of a node group.
+
+  """
   op = opcodes.OpGroupVerifyDisks(
     group_name=uuid, priority=constants.OP_PRIO_LOW, is_strict=is_strict)
   op.reason = [(constants.OPCODE_REASON_SRC_WATCHER,
                 "Verifying disks of group %s" % uuid,
                 utils.EpochNano())]
-  job_id = cl.SubmitJob([op])
-  ((_, offline_disk_instances, _), ) = \
-    cli.PollJob(job_id, cl=cl, feedback_fn=logging.debug)
-  cl.ArchiveJob(job_id)
+  return op
 
+
+def _GetActivateDisksOps(nodes, instances, offline_disk_instances):
+  """Returns the opcodes to activate disks reported offline by verify-disks.
+
+  """
   if not offline_disk_instances:
     # nothing to do
     logging.debug("Verify-disks reported no offline disks, nothing to do")
-    return
+    return []
 
   logging.debug("Will activate disks for instance(s) %s",
                 utils.CommaJoin(offline_disk_instances))
 
-  # We submit only one job, and wait for it. Not optimal, but this puts less
-  # load on the job queue.
-  job = []
+  ops = []
   for name in offline_disk_instances:
     try:
       inst = instances[name]
@@ -406,11 +552,31 @@ def _VerifyDisks(cl, uuid, nodes, instances, is_strict):
                    " or has offline secondaries", name)
       continue
 
-    op = opcodes.OpInstanceActivateDisks(instance_name=name)
-    op.reason = [(constants.OPCODE_REASON_SRC_WATCHER,
-                  "Activating disks for instance %s" % name,
-                  utils.EpochNano())]
-    job.append(op)
+    ops.append(_ActivateDisksOp(name))
+
+  return ops
+
+
+def _VerifyDisks(cl, uuid, nodes, instances, is_strict):
+  """Run a per-group "gnt-cluster verify-disks".
+
+  """
+
+  existing_jobs = _GetPendingVerifyDisks(cl, uuid)
+  if existing_jobs:
+    logging.info("There are verify disks jobs already pending (%s), skipping "
+                 "VerifyDisks step for %s.",
+                 utils.CommaJoin(existing_jobs), uuid)
+    return
+
+  job_id = cl.SubmitJob([_VerifyDisksOp(uuid, is_strict)])
+  ((_, offline_disk_instances, _), ) = \
+    cli.PollJob(job_id, cl=cl, feedback_fn=logging.debug)
+  cl.ArchiveJob(job_id)
+
+  # We submit only one job, and wait for it. Not optimal, but this puts less
+  # load on the job queue.
+  job = _GetActivateDisksOps(nodes, instances, offline_disk_instances)
 
   if job:
     job_id = cli.SendJob(job, cl=cl)
@@ -421,6 +587,52 @@ def _VerifyDisks(cl, uuid, nodes, instances, is_strict):
       logging.exception("Error while activating disks")
 
 
+def _VerifyDisksBatch(cl, groups, is_strict):
+  """Runs verify-disks for several node groups at once.
+
+  The verify jobs of all groups are submitted together, followed by one job
+  per group activating the disks reported as offline.
+
+  @type groups: dict
+  @param groups: group UUIDs as keys, tuples of nodes and instances as
+    returned by L{_GetClusterData} as values
+
+  """
+  pending_jobs = _GetPendingVerifyDisksJobs(cl)
+
+  verify = _JobBatch(cl)
+  uuids = []
+
+  for uuid in sorted(groups):
+    existing_jobs = pending_jobs.get(uuid)
+    if existing_jobs:
+      logging.info("There are verify disks jobs already pending (%s),"
+                   " skipping VerifyDisks step for %s.",
+                   utils.CommaJoin(existing_jobs), uuid)
+      continue
+
+    verify.Submit(_VerifyDisksOp(uuid, is_strict),
+                  "verifying disks of group %s" % uuid)
+    uuids.append(uuid)
+
+  activate = _JobBatch(cl)
+
+  for (uuid, (job_id, result)) in zip(uuids, verify.Finish()):
+    if result is None:
+      continue
+
+    cl.ArchiveJob(job_id)
+
+    ((_, offline_disk_instances, _), ) = result
+    (nodes, instances) = groups[uuid]
+
+    job = _GetActivateDisksOps(nodes, instances, offline_disk_instances)
+    if job:
+      activate.SubmitJob(job, "activating disks in group %s" % uuid)
+
+  activate.Finish()
+
+
 def IsRapiResponding(hostname):
   """Connects to RAPI port and does a simple test.
 
@@ -504,6 +716,11 @@ def ParseOptions():
   parser.add_option("--no-strict", dest="no_strict",
                     default=False, action="store_true",
                     help="Do not run group verify in strict mode")
+  parser.add_option("--single-process", dest="single_process", default=False,
+                    action="store_true",
+                    help="Check all node groups in this process, based on"
+                         " one cluster-wide query, instead of starting a"
+                         " process per group")
   parser.add_option("--rapi-ip", dest="rapi_ip",
                     default=constants.IP4_ADDRESS_LOCALHOST,
                     help="Use this IP to talk to RAPI.")
@@ -521,7 +738,9 @@ def ParseOptions():
 def _WriteInstanceStatus(filename, data):
   """Writes the per-group instance status file.
 
-  The entries are sorted.
+  The entries are sorted. The file is left untouched if its contents
+  wouldn't change, keeping its modification time, which is used to decide
+  on the most recent status of an instance when merging the files.
 
   @type filename: string
   @param filename: Path to instance status file
@@ -529,11 +748,21 @@ def _WriteInstanceStatus(filename, data):
   @param data: Instance name and status
 
   """
+  content = "\n".join("%s %s" % (n, s) for (n, s) in sorted(data))
+
+  try:
+    current = utils.ReadFile(filename)
+  except EnvironmentError:
+    current = None
+
+  if current == content:
+    logging.debug("Instance status file '%s' is up to date", filename)
+    return
+
   logging.debug("Updating instance status file '%s' with %s instances",
                 filename, len(data))
 
-  utils.WriteFile(filename,
-                  data="\n".join("%s %s" % (n, s) for (n, s) in sorted(data)))
+  utils.WriteFile(filename, data=content)
 
 
 def _UpdateInstanceStatus(filename, instances):
@@ -711,7 +940,8 @@ def _CheckMaster(cl):
 def _GlobalWatcher(opts):
   """Main function for global watcher.
 
-  At the end child processes are spawned for every node group.
+  At the end child processes are spawned for every node group, unless the
+  groups are checked by this process (see L{_SingleProcessWatcher}).
 
   """
   StartNodeDaemons()
@@ -758,14 +988,17 @@ def _GlobalWatcher(opts):
   _CheckMaster(client)
   _ArchiveJobs(client, opts.job_age)
 
-  # Spawn child processes for all node groups
-  _StartGroupChildren(client, opts.wait_children)
+  if opts.single_process:
+    _SingleProcessWatcher(client, opts)
+  else:
+    # Spawn child processes for all node groups
+    _StartGroupChildren(client, opts.wait_children)
 
   return constants.EXIT_SUCCESS
 
 
-def _GetGroupData(qcl, uuid):
-  """Retrieves instances and nodes per node group.
+def _GetLockedInstances(qcl):
+  """Returns the names of all instances currently locked.
 
   """
   locks = qcl.Query(constants.QR_LOCK, ["name", "mode"], None)
@@ -779,16 +1012,27 @@ def _GetGroupData(qcl, uuid):
     if name.startswith(prefix) and lock:
       locked_instances.add(name[prefix_len:])
 
-  queries = [
-      (constants.QR_INSTANCE,
-       ["name", "status", "admin_state", "admin_state_source", "disks_active",
-        "snodes", "pnode.group.uuid", "snodes.group.uuid", "disk_template"],
-       [qlang.OP_EQUAL, "pnode.group.uuid", uuid]),
-      (constants.QR_NODE,
-       ["name", "bootid", "offline"],
-       [qlang.OP_EQUAL, "group.uuid", uuid]),
-      ]
+  return locked_instances
+
+
+#: Instance fields queried by the watcher
+_INSTANCE_FIELDS = [
+  "name", "status", "admin_state", "admin_state_source", "disks_active",
+  "snodes", "pnode.group.uuid", "snodes.group.uuid", "disk_template",
+  ]
+
+#: Node fields queried by the watcher
+_NODE_FIELDS = ["name", "bootid", "offline"]
 
+
+def _QueryValues(qcl, queries):
+  """Runs queries and returns their values, ignoring the result status.
+
+  @type queries: list of tuples; (resource, fields, filter)
+  @rtype: list
+  @return: for every query, the list of rows
+
+  """
   results_data = [
     qcl.Query(what, field, qfilter).data
     for (what, field, qfilter) in queries
@@ -799,10 +1043,19 @@ def _GetGroupData(qcl, uuid):
       ht.TListOf(ht.TListOf(ht.TIsLength(2)))(d) for d in results_data)
 
   # Extract values ignoring result status
-  (raw_instances, raw_nodes) = [[map(compat.snd, values)
-                                 for values in res]
-                                for res in results_data]
+  return [[map(compat.snd, values) for values in res]
+          for res in results_data]
+
+
+def _BuildGroupData(raw_instances, raw_nodes):
+  """Builds the instances and nodes of a node group from query results.
+
+  @param raw_instances: rows with the values of L{_INSTANCE_FIELDS}
+  @param raw_nodes: rows with the values of L{_NODE_FIELDS}
+  @rtype: tuple; (dict, dict)
+  @return: L{Node} and L{Instance} objects by name
 
+  """
   secondaries = {}
   instances = []
 
@@ -825,7 +1078,66 @@ def _GetGroupData(qcl, uuid):
            for (name, bootid, offline) in raw_nodes]
 
   return (dict((node.name, node) for node in nodes),
-          dict((inst.name, inst) for inst in instances),
+          dict((inst.name, inst) for inst in instances))
+
+
+def _GetGroupData(qcl, uuid):
+  """Retrieves instances and nodes per node group.
+
+  """
+  locked_instances = _GetLockedInstances(qcl)
+
+  (raw_instances, raw_nodes) = _QueryValues(qcl, [
+    (constants.QR_INSTANCE, _INSTANCE_FIELDS,
+     [qlang.OP_EQUAL, "pnode.group.uuid", uuid]),
+    (constants.QR_NODE, _NODE_FIELDS,
+     [qlang.OP_EQUAL, "group.uuid", uuid]),
+    ])
+
+  (nodes, instances) = _BuildGroupData(raw_instances, raw_nodes)
+
+  return (nodes, instances, locked_instances)
+
+
+def _GetClusterData(qcl, groups):
+  """Retrieves instances and nodes of all node groups at once.
+
+  Unlike calling L{_GetGroupData} for every group, this runs a single query
+  per resource, so all groups are evaluated on the same snapshot.
+
+  @type groups: list of strings
+  @param groups: UUIDs of the node groups to return data for
+  @rtype: tuple; (dict, set)
+  @return: a dictionary with group UUIDs as keys and tuples of nodes and
+    instances as returned by L{_BuildGroupData} as values, and the names of
+    the locked instances
+
+  """
+  locked_instances = _GetLockedInstances(qcl)
+
+  (raw_instances, raw_nodes) = _QueryValues(qcl, [
+    (constants.QR_INSTANCE, _INSTANCE_FIELDS, None),
+    (constants.QR_NODE, _NODE_FIELDS + ["group.uuid"], None),
+    ])
+
+  group_instances = dict((uuid, []) for uuid in groups)
+  group_nodes = dict((uuid, []) for uuid in groups)
+
+  pnode_group_idx = _INSTANCE_FIELDS.index("pnode.group.uuid")
+
+  for row in raw_instances:
+    group_list = group_instances.get(row[pnode_group_idx])
+    if group_list is not None:
+      group_list.append(row)
+
+  for row in raw_nodes:
+    group_list = group_nodes.get(row[-1])
+    if group_list is not None:
+      group_list.append(row[:-1])
+
+  return (dict((uuid, _BuildGroupData(group_instances[uuid],
+                                      group_nodes[uuid]))
+               for uuid in groups),
           locked_instances)
 
 
@@ -892,8 +1204,9 @@ def _GroupWatcher(opts):
                          pathutils.WATCHER_GROUP_INSTANCE_STATUS_FILE,
                          known_groups)
 
-    started = _CheckInstances(client, notepad, instances, locks)
-    _CheckDisks(client, notepad, nodes, instances, started)
+    jobs = _JobSubmitter(client)
+    started = _CheckInstances(jobs, notepad, instances, locks)
+    _CheckDisks(jobs, notepad, nodes, instances, started)
   except Exception, err:
     logging.info("Not updating status file due to failure: %s", err)
     raise
@@ -902,22 +1215,107 @@ def _GroupWatcher(opts):
     notepad.Save(state_path)
     notepad.Close()
 
-  # Check if the nodegroup only has ext storage type
-  only_ext = compat.all(i.disk_template == constants.DT_EXT
-                        for i in instances.values())
+  if not opts.no_verify_disks and _NeedsVerifyDisks(instances):
+    is_strict = not opts.no_strict
+    _VerifyDisks(client, group_uuid, nodes, instances, is_strict=is_strict)
+
+  return constants.EXIT_SUCCESS
 
-  # We skip current NodeGroup verification if there are only external storage
+
+def _NeedsVerifyDisks(instances):
+  """Checks whether the disks of a node group's instances should be verified.
+
+  """
+  # We skip NodeGroup verification if there are only external storage
   # devices. Currently we provide an interface for external storage provider
   # for disk verification implementations, however current ExtStorageDevice
   # does not provide an API for this yet.
   #
   # This check needs to be revisited if ES_ACTION_VERIFY on ExtStorageDevice
   # is implemented.
-  if not opts.no_verify_disks and not only_ext:
-    is_strict = not opts.no_strict
-    _VerifyDisks(client, group_uuid, nodes, instances, is_strict=is_strict)
+  return not compat.all(i.disk_template == constants.DT_EXT
+                        for i in instances.values())
 
-  return constants.EXIT_SUCCESS
+
+def _LogPhaseStats(stats):
+  """Logs the time spent in the phases of a watcher run.
+
+  @type stats: L{jstats.PhaseStats}
+
+  """
+  logging.info("Watcher phases: %s",
+               utils.CommaJoin("%s %.3fs (CPU %.3fs)" %
+                               (phase, values[jstats.STAT_WALL],
+                                values[jstats.STAT_CPU])
+                               for (phase, values)
+                               in sorted(stats.ToDict().items())))
+
+
+def _SingleProcessWatcher(client, opts):
+  """Watches all node groups from the current process.
+
+  Instead of starting a process per node group, which all query their own
+  data, the instances and nodes of all groups are fetched with one query
+  each and the groups are checked one after the other. The resulting jobs
+  are submitted together and waited for at the end, so they run
+  concurrently as far as their locks allow.
+
+  """
+  stats = jstats.PhaseStats()
+
+  known_groups = _LoadKnownGroups()
+
+  with stats.Measure("snapshot"):
+    (groups, locks) = _GetClusterData(client, known_groups)
+
+  jobs = _JobBatch(client)
+  notepads = []
+
+  try:
+    with stats.Measure("evaluate"):
+      for group_uuid in known_groups:
+        state_path = pathutils.WATCHER_GROUP_STATE_FILE % group_uuid
+
+        # Another watcher might be handling this group
+        statefile = state.OpenStateFile(state_path) # pylint: disable=E0602
+        if not statefile:
+          del groups[group_uuid]
+          continue
+
+        notepad = state.WatcherState(statefile) # pylint: disable=E0602
+        notepads.append((state_path, notepad))
+
+        (nodes, instances) = groups[group_uuid]
+
+        _UpdateInstanceStatus(pathutils.WATCHER_GROUP_INSTANCE_STATUS_FILE %
+                              group_uuid, instances.values())
+
+        started = _CheckInstances(jobs, notepad, instances, locks)
+        _CheckDisks(jobs, notepad, nodes, instances, started)
+
+      _MergeInstanceStatus(pathutils.INSTANCE_STATUS_FILE,
+                           pathutils.WATCHER_GROUP_INSTANCE_STATUS_FILE,
+                           known_groups)
+
+    with stats.Measure("jobs"):
+      jobs.Finish()
+  except Exception, err:
+    logging.info("Not updating status files due to failure: %s", err)
+    raise
+  else:
+    # Save changes for next run
+    for (state_path, notepad) in notepads:
+      notepad.Save(state_path)
+      notepad.Close()
+
+  if not opts.no_verify_disks:
+    with stats.Measure("verify-disks"):
+      _VerifyDisksBatch(client,
+                        dict((uuid, data) for (uuid, data) in groups.items()
+                             if _NeedsVerifyDisks(data[1])),
+                        not opts.no_strict)
+
+  _LogPhaseStats(stats)
 
 
 def Main():
@@ -30,6 +30,14 @@
 
 """Module keeping state for Ganeti watcher.
 
+The state file consists of lines with one JSON document each. The first line
+is a snapshot of the whole state; every following line records a change of
+a single entry as C{[section, name, value]}, where a value of C{null} removes
+the entry. Changes are appended to the file, and the file is only rewritten
+with a new snapshot once there are more change records than entries in the
+state. A state file consisting only of the snapshot is what older versions
+of the watcher wrote.
+
 """
 
 import os
@@ -53,6 +61,65 @@ KEY_RESTART_COUNT = "restart_count"
 KEY_RESTART_WHEN = "restart_when"
 KEY_BOOT_ID = "bootid"
 
+#: State file sections
+SECTION_INSTANCE = "instance"
+SECTION_NODE = "node"
+
+#: Minimum number of change records in the state file before it is compacted
+COMPACT_MIN_RECORDS = 100
+
+
+def _ParseState(content):
+  """Parses the contents of a state file.
+
+  @type content: string
+  @param content: the contents of the state file
+  @rtype: tuple; (dict, int or None)
+  @return: the state and the number of change records read, or C{None} if
+    the file needs to be rewritten before appending records
+
+  """
+  lines = content.splitlines()
+
+  # Every record ends with a newline; without it, further records would be
+  # appended to the last line
+  complete = content.endswith("\n")
+
+  if not lines:
+    return ({}, None)
+
+  data = serializer.Load(lines[0])
+  if not isinstance(data, dict):
+    raise errors.ParseError("State snapshot is not a dictionary")
+
+  records = 0
+
+  for (idx, line) in enumerate(lines[1:]):
+    try:
+      (section, name, value) = serializer.Load(line)
+    except (ValueError, TypeError), err:
+      if idx == len(lines) - 2:
+        # The watcher might have been interrupted while appending the record;
+        # as further records can't be appended after it, the file needs to
+        # be rewritten
+        logging.warning("Ignoring incomplete last record of state file: %s",
+                        err)
+        return (data, None)
+      raise
+
+    if value is None:
+      data.get(section, {}).pop(name, None)
+    else:
+      data.setdefault(section, {})[name] = value
+
+    records += 1
+
+  if not complete:
+    logging.warning("Last record of state file is not terminated")
+    return (data, None)
+
+  return (data, records)
+
 
 def OpenStateFile(path):
   """Opens the state file and acquires a lock on it.
@@ -92,42 +159,72 @@ class WatcherState(object):
     self.statefile = statefile
 
     try:
-      state_data = self.statefile.read()
-      if not state_data:
-        self._data = {}
-      else:
-        self._data = serializer.Load(state_data)
+      (self._data, self._records) = _ParseState(self.statefile.read())
     except Exception, msg: # pylint: disable=W0703
       # Ignore errors while loading the file and treat it as empty
-      self._data = {}
+      (self._data, self._records) = ({}, None)
       logging.warning(("Invalid state file. Using defaults."
                        " Error message: %s"), msg)
 
-    if "instance" not in self._data:
-      self._data["instance"] = {}
-    if "node" not in self._data:
-      self._data["node"] = {}
+    if SECTION_INSTANCE not in self._data:
+      self._data[SECTION_INSTANCE] = {}
+    if SECTION_NODE not in self._data:
+      self._data[SECTION_NODE] = {}
+
+    # Entries changed since the state was loaded, as (section, name) tuples
+    self._changed = set()
 
-    self._orig_data = serializer.Dump(self._data)
+  def _MarkChanged(self, section, name):
+    """Records that an entry was changed.
+
+    """
+    self._changed.add((section, name))
 
   def Save(self, filename):
     """Save state to file.
 
+    Changed entries are appended to the state file, unless it needs to be
+    compacted.
+
     """
     assert self.statefile
 
-    serialized_form = serializer.Dump(self._data)
-    if self._orig_data == serialized_form:
+    if not self._changed:
       logging.debug("Data didn't change, just touching status file")
       os.utime(filename, None)
       return
 
+    changes = [[section, name, self._data[section].get(name, None)]
+               for (section, name) in sorted(self._changed)]
+    self._changed.clear()
+
+    entries = sum(len(entries) for entries in self._data.values())
+
+    if (self._records is None or
+        self._records + len(changes) > max(COMPACT_MIN_RECORDS, entries)):
+      self._WriteSnapshot(filename)
+    else:
+      logging.debug("Appending %s changes to state file", len(changes))
+      self.statefile.seek(0, os.SEEK_END)
+      self.statefile.write("".join(serializer.Dump(record)
+                                   for record in changes))
+      self.statefile.flush()
+      self._records += len(changes)
+
+  def _WriteSnapshot(self, filename):
+    """Replaces the state file with a snapshot of the current state.
+
+    """
+    logging.debug("Writing snapshot of state to file %s", filename)
+
     # We need to make sure the file is locked before renaming it, otherwise
     # starting ganeti-watcher again at the same time will create a conflict.
     fd = utils.WriteFile(filename,
-                         data=serialized_form,
+                         data=serializer.Dump(self._data),
                          prewrite=utils.LockFile, close=False)
+    self.statefile.close()
     self.statefile = os.fdopen(fd, "w+")
+    self._records = 0
 
   def Close(self):
     """Unlock configuration file and close it.
@@ -143,7 +240,7 @@ class WatcherState(object):
     """Returns the last boot ID of a node or None.
 
     """
-    ndata = self._data["node"]
+    ndata = self._data[SECTION_NODE]
 
     if name in ndata and KEY_BOOT_ID in ndata[name]:
       return ndata[name][KEY_BOOT_ID]
@@ -155,9 +252,10 @@ class WatcherState(object):
     """
     assert bootid
 
-    ndata = self._data["node"]
+    ndata = self._data[SECTION_NODE]
 
     ndata.setdefault(name, {})[KEY_BOOT_ID] = bootid
+    self._MarkChanged(SECTION_NODE, name)
 
   def NumberOfRestartAttempts(self, instance_name):
     """Returns number of previous restart attempts.
@@ -166,7 +264,7 @@ class WatcherState(object):
     @param instance_name: the name of the instance to look up
 
     """
-    idata = self._data["instance"]
+    idata = self._data[SECTION_INSTANCE]
     return idata.get(instance_name, {}).get(KEY_RESTART_COUNT, 0)
 
   def NumberOfCleanupAttempts(self, instance_name):
@@ -176,7 +274,7 @@ class WatcherState(object):
     @param instance_name: the name of the instance to look up
 
     """
-    idata = self._data["instance"]
+    idata = self._data[SECTION_INSTANCE]
     return idata.get(instance_name, {}).get(KEY_CLEANUP_COUNT, 0)
 
   def MaintainInstanceList(self, instances):
@@ -186,13 +284,14 @@ class WatcherState(object):
     @param instances: the list of currently existing instances
 
     """
-    idict = self._data["instance"]
+    idict = self._data[SECTION_INSTANCE]
 
     # First, delete obsolete instances
     obsolete_instances = set(idict).difference(instances)
     for inst in obsolete_instances:
       logging.debug("Forgetting obsolete instance %s", inst)
       idict.pop(inst, None)
+      self._MarkChanged(SECTION_INSTANCE, inst)
 
     # Second, delete expired records
     earliest = time.time() - RETRY_EXPIRATION
@@ -201,6 +300,7 @@ class WatcherState(object):
     for inst in expired_instances:
       logging.debug("Expiring record for instance %s", inst)
       idict.pop(inst, None)
+      self._MarkChanged(SECTION_INSTANCE, inst)
 
   @staticmethod
   def _RecordAttempt(instances, instance_name, key_when, key_count):
@@ -231,8 +331,9 @@ class WatcherState(object):
     @param instance_name: the name of the instance being restarted
 
     """
-    self._RecordAttempt(self._data["instance"], instance_name,
+    self._RecordAttempt(self._data[SECTION_INSTANCE], instance_name,
                         KEY_RESTART_WHEN, KEY_RESTART_COUNT)
+    self._MarkChanged(SECTION_INSTANCE, instance_name)
 
   def RecordCleanupAttempt(self, instance_name):
     """Record a cleanup attempt.
@@ -241,8 +342,9 @@ class WatcherState(object):
     @param instance_name: the name of the instance being cleaned up
 
     """
-    self._RecordAttempt(self._data["instance"], instance_name,
+    self._RecordAttempt(self._data[SECTION_INSTANCE], instance_name,
                         KEY_CLEANUP_WHEN, KEY_CLEANUP_COUNT)
+    self._MarkChanged(SECTION_INSTANCE, instance_name)
 
   def RemoveInstance(self, instance_name):
     """Update state to reflect that a machine is running.
@@ -254,6 +356,7 @@ class WatcherState(object):
     @param instance_name: the name of the instance to remove from books
 
     """
-    idata = self._data["instance"]
+    idata = self._data[SECTION_INSTANCE]
 
-    idata.pop(instance_name, None)
+    if idata.pop(instance_name, None) is not None:
+      self._MarkChanged(SECTION_INSTANCE, instance_name)
@@ -94,6 +94,10 @@ queryInternalError = (ReplyStatusError, J.showJSON ConfdErrorInternal)
 queryArgumentError :: StatusAnswer
 queryArgumentError = (ReplyStatusError, J.showJSON ConfdErrorArgument, 0)
 
+-- | Error answer for replies not fitting into a UDP datagram.
+replyTooLargeError :: StatusAnswer
+replyTooLargeError = (ReplyStatusError, J.showJSON ConfdErrorTooLarge, 0)
+
 -- | Converter from specific error to a string format.
 gntErrorToResult :: ErrorResult a -> Result a
 gntErrorToResult (Bad err) = Bad (show err)
@@ -283,6 +287,25 @@ buildResponse (cdata,_) (ConfdRequest { confdRqType = ReqDataCollectors }) = do
   return (ReplyStatusOk, J.showJSON datacollectors,
           clusterSerial . configCluster $ cdata)
 
+-- | Answers a batch of queries, each of them as if it had been sent in
+-- a request of its own. The reply serial is the serial of the whole
+-- configuration, so that clients can drop answers cached from an older
+-- configuration.
+buildResponse cdata req@(ConfdRequest { confdRqType = ReqMulti }) =
+  case confdRqQuery req of
+    MultiQuery queries | length queries <= C.confdMaxMultiQueries ->
+      return (ReplyStatusOk, J.showJSON $ map answer queries,
+              configSerial . fst $ cdata)
+    _ -> return queryArgumentError
+  where answer (ReqMulti, _) = subAnswer $ return queryArgumentError
+        answer (rtype, query) =
+          subAnswer . buildResponse cdata $
+            req { confdRqType = rtype, confdRqQuery = query }
+        subAnswer r =
+          let reply = serializeResponse r
+          in J.showJSON (confdReplyStatus reply, confdReplyAnswer reply,
+                         confdReplySerial reply)
+
 -- | Creates a ConfdReply from a given answer.
 serializeResponse :: Result StatusAnswer -> ConfdReply
 serializeResponse r =
@@ -313,23 +336,28 @@ responder cfgref socket hmac msg peer = do
 
 -- | Inner helper function for a given client. This generates the
 -- final encoded message (as a string), ready to be sent out to the
--- client.
+-- client. Replies which don't fit into a UDP datagram, e.g. the answers to
+-- too many queries of a multi-query request, are replaced by an error.
 respondInner :: Result (ConfigData, LinkIpMap) -> HashKey
              -> ConfdRequest -> String
 respondInner cfg hmac rq =
   let rsalt = confdRqRsalt rq
-      innermsg = serializeResponse (cfg >>= flip buildResponse rq)
-      innerserialised = J.encodeStrict innermsg
-      outermsg = signMessage hmac rsalt innerserialised
-      outerserialised = C.confdMagicFourcc ++ J.encodeStrict outermsg
-  in outerserialised
+      encodeReply innermsg =
+        let innerserialised = J.encodeStrict innermsg
+            outermsg = signMessage hmac rsalt innerserialised
+        in C.confdMagicFourcc ++ J.encodeStrict outermsg
+      outerserialised =
+        encodeReply $ serializeResponse (cfg >>= flip buildResponse rq)
+  in if length outerserialised <= C.maxUdpDataSize
+       then outerserialised
+       else encodeReply . serializeResponse $ Ok replyTooLargeError
 
 -- | Main listener loop.
 listener :: S.Socket -> HashKey
          -> (S.Socket -> HashKey -> String -> S.SockAddr -> IO ())
          -> IO ()
 listener s hmac resp = do
-  (msg, _, peer) <- S.recvFrom s 4096
+  (msg, _, peer) <- S.recvFrom s C.maxUdpDataSize
   if C.confdMagicFourcc `isPrefixOf` msg
     then forkIO (resp s hmac (drop 4 msg) peer) >> return ()
     else logDebug "Invalid magic code!" >> return ()
@@ -75,6 +75,7 @@ $(declareILADT "ConfdRequestType"
   , ("ReqInstanceDisks",     9)
   , ("ReqConfigQuery",      10)
   , ("ReqDataCollectors",   11)
+  , ("ReqMulti",            12)
   ])
 $(makeJSONInstance ''ConfdRequestType)
 
@@ -105,10 +106,13 @@ $(buildObject "ConfdReqQ" "confdReqQ"
   ])
 
 -- | Confd query type. This is complex enough that we can't
--- automatically derive it via THH.
+-- automatically derive it via THH. A 'MultiQuery' is the query of a
+-- 'ReqMulti' request and holds the non-empty list of (type, query)
+-- pairs of the batched requests.
 data ConfdQuery = EmptyQuery
                 | PlainQuery String
                 | DictQuery  ConfdReqQ
+                | MultiQuery [(ConfdRequestType, ConfdQuery)]
                   deriving (Show, Eq)
 
 instance JSON ConfdQuery where
@@ -116,12 +120,14 @@ instance JSON ConfdQuery where
                  JSNull     -> return EmptyQuery
                  JSString s -> return . PlainQuery . fromJSString $ s
                  JSObject _ -> fmap DictQuery (readJSON o::Result ConfdReqQ)
+                 JSArray (_:_) -> fmap MultiQuery (readJSON o)
                  _ -> fail $ "Cannot deserialise into ConfdQuery\
                              \ the value '" ++ show o ++ "'"
   showJSON cq = case cq of
                   EmptyQuery -> JSNull
                   PlainQuery s -> showJSON s
                   DictQuery drq -> showJSON drq
+                  MultiQuery qs -> showJSON qs
 
 $(declareILADT "ConfdReplyStatus"
   [ ("ReplyStatusOk",      0)
@@ -146,6 +152,7 @@ $(declareILADT "ConfdErrorType"
   [ ("ConfdErrorUnknownEntry", 0)
   , ("ConfdErrorInternal",     1)
   , ("ConfdErrorArgument",     2)
+  , ("ConfdErrorTooLarge",     3)
   ])
 $(makeJSONInstance ''ConfdErrorType)
 
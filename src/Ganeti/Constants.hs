@@ -1409,6 +1409,19 @@ rpcEncodingNone = 0
 rpcEncodingZlibBase64 :: Int
 rpcEncodingZlibBase64 = 1
 
+-- | HTTP content coding used to compress RPC request and response bodies
+rpcContentEncoding :: String
+rpcContentEncoding = "deflate"
+
+-- | Minimum size of an RPC request or response body to be compressed
+-- (bytes)
+rpcCompressMinSize :: Int
+rpcCompressMinSize = 4096
+
+-- | zlib compression level for RPC request and response bodies
+rpcCompressLevel :: Int
+rpcCompressLevel = 3
+
 -- * Timeout table
 --
 -- Various time constants for the timeout table
@@ -4441,6 +4454,12 @@ luxidRetryForkCount = 5
 luxidRetryForkStepUS :: Int
 luxidRetryForkStepUS = 500000
 
+-- | Timeout in seconds for connecting to the zygote forking job processes.
+-- If the zygote doesn't accept the connection in time, the job process is
+-- started by forking luxid instead.
+luxidJobZygoteConnectTimeout :: Int
+luxidJobZygoteConnectTimeout = 2
+
 -- * Luxid job death testing
 
 -- | The number of attempts to prove that a job is dead after sending it a
@@ -4471,6 +4490,12 @@ wconfdDefCtmo = 10
 wconfdDefRwto :: Int
 wconfdDefRwto = 60
 
+-- | Maximal time in seconds a single request waiting for locks to be granted
+-- is blocked in WConfD before returning to the job, which then repeats the
+-- request. This has to be well below the read timeout of the clients.
+wconfdLockWaitTimeout :: Int
+wconfdLockWaitTimeout = (wconfdDefRwto - 1) `div` 2
+
 -- | The prefix of the WConfD livelock file name.
 wconfLivelockPrefix :: String
 wconfLivelockPrefix = "wconf-daemon"
@@ -4518,6 +4543,9 @@ confdReqConfigQuery = Types.confdRequestTypeToRaw ReqConfigQuery
 confdReqDataCollectors :: Int
 confdReqDataCollectors = Types.confdRequestTypeToRaw ReqDataCollectors
 
+confdReqMulti :: Int
+confdReqMulti = Types.confdRequestTypeToRaw ReqMulti
+
 confdReqs :: FrozenSet Int
 confdReqs =
   ConstantUtils.mkSet .
@@ -4578,6 +4606,11 @@ confdErrorInternal = Types.confdErrorTypeToRaw ConfdErrorInternal
 confdErrorArgument :: Int
 confdErrorArgument = Types.confdErrorTypeToRaw ConfdErrorArgument
 
+-- | The reply doesn't fit into a UDP datagram; for multi-query requests,
+-- fewer queries should be sent per request
+confdErrorTooLarge :: Int
+confdErrorTooLarge = Types.confdErrorTypeToRaw ConfdErrorTooLarge
+
 -- * Confd request query fields
 
 confdReqqLink :: String
@@ -4635,6 +4668,19 @@ confdDefaultReqCoverage = 6
 confdClientExpireTimeout :: Int
 confdClientExpireTimeout = 10
 
+-- | Maximum number of queries batched in a single multi-query
+-- request. This keeps both the request and the reply well below the
+-- maximum UDP datagram size for the usual (small) answers; larger replies
+-- are refused with 'confdErrorTooLarge'.
+confdMaxMultiQueries :: Int
+confdMaxMultiQueries = 64
+
+-- | Time in seconds for which the confd client library caches replies
+-- to batched queries, unless a reply with a newer configuration
+-- serial invalidates them earlier.
+confdClientCacheTtl :: Int
+confdClientCacheTtl = 5
+
 -- | Maximum UDP datagram size.
 --
 -- On IPv4: 64K - 20 (ip header size) - 8 (udp header size) = 65507
@@ -5139,6 +5185,11 @@ luxiKeyResult = "result"
 luxiKeyVersion :: String
 luxiKeyVersion = "version"
 
+-- | Optional request identifier; requests carrying it may be answered
+-- out of order and their responses carry the same identifier
+luxiKeyId :: String
+luxiKeyId = "id"
+
 luxiReqSubmitJob :: String
 luxiReqSubmitJob = "SubmitJob"
 
@@ -5151,6 +5202,9 @@ luxiReqSubmitManyJobs = "SubmitManyJobs"
 luxiReqWaitForJobChange :: String
 luxiReqWaitForJobChange = "WaitForJobChange"
 
+luxiReqWaitForJobsChange :: String
+luxiReqWaitForJobsChange = "WaitForJobsChange"
+
 luxiReqPickupJob :: String
 luxiReqPickupJob = "PickupJob"
 
@@ -5238,6 +5292,7 @@ luxiReqAll =
   , luxiReqSubmitJobToDrainedQueue
   , luxiReqSubmitManyJobs
   , luxiReqWaitForJobChange
+  , luxiReqWaitForJobsChange
   , luxiReqPickupJob
   , luxiReqQueryFilters
   , luxiReqReplaceFilter
@@ -5608,6 +5663,21 @@ maintdFailureTagPrefix = maintdPrefix ++ "repairfailed:"
 httpRapiPamCredential :: String
 httpRapiPamCredential = "Ganeti-RAPI-Credential"
 
+-- * RAPI result cache
+
+-- | Time in seconds for which the RAPI daemon reuses the result of a
+-- read request, as long as the cluster configuration is unchanged
+rapiCacheTtl :: Int
+rapiCacheTtl = 5
+
+-- * Query live-data cache
+
+-- | Default maximum age in seconds of live data (e.g. the run state of
+-- instances) reused by queries, as long as the cluster configuration is
+-- unchanged. Live data is only reused if requested by the client.
+queryLiveMaxAge :: Int
+queryLiveMaxAge = 0
+
 -- | The polling frequency to wait for a job status change
 cliWfjcFrequency :: Int
 cliWfjcFrequency = 20
@@ -97,7 +97,7 @@ queryNodesMsg =
       "ndp/spindle_count", "group.uuid", "tags",
       "ndp/exclusive_storage", "sptotal", "spfree", "ndp/cpu_speed",
       "hv_state"]
-     Qlang.EmptyFilter
+     Qlang.EmptyFilter Nothing
 
 -- | The input data for instance query.
 queryInstancesMsg :: L.LuxiOp
@@ -107,7 +107,7 @@ queryInstancesMsg =
       "status", "pnode", "snodes", "tags", "oper_ram",
       "be/auto_balance", "disk_template",
       "be/spindle_use", "disk.sizes", "disk.spindles",
-      "forthcoming"] Qlang.EmptyFilter
+      "forthcoming"] Qlang.EmptyFilter Nothing
 
 -- | The input data for cluster query.
 queryClusterInfoMsg :: L.LuxiOp
@@ -118,7 +118,7 @@ queryGroupsMsg :: L.LuxiOp
 queryGroupsMsg =
   L.Query (Qlang.ItemTypeOpCode Qlang.QRGroup)
      ["uuid", "name", "alloc_policy", "ipolicy", "tags", "networks"]
-     Qlang.EmptyFilter
+     Qlang.EmptyFilter Nothing
 
 -- | Wraper over 'callMethod' doing node query.
 queryNodes :: L.Client -> IO (Result JSValue)
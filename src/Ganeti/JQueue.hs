@@ -194,6 +194,8 @@ queuedOpCodeFromMetaOpCode op =
                , qoStartTimestamp = Nothing
                , qoEndTimestamp = Nothing
                , qoExecTimestamp = Nothing
+               , qoLockStats = []
+               , qoPhaseStats = Nothing
                }
 
 -- | From a job-id and a list of op-codes create a job. This is
@@ -209,6 +211,7 @@ queuedJobFromOpCodes jobid ops = do
                    , qjEndTimestamp = Nothing
                    , qjLivelock = Nothing
                    , qjProcessId = Nothing
+                   , qjPhaseStats = Nothing
                    }
 
 -- | Attach a received timestamp to a Queued Job.
@@ -82,6 +82,10 @@ $(buildObject "QueuedOpCode" "qo"
     simpleField "exec_timestamp"  [t| Timestamp   |]
   , optionalNullSerField $
     simpleField "end_timestamp"   [t| Timestamp   |]
+  , defaultField [| [] |] $
+    simpleField "lock_stats"      [t| [JSValue]   |]
+  , optionalField $
+    simpleField "phase_stats"     [t| JSValue     |]
   ])
 
 deriving instance Ord QueuedOpCode
@@ -98,6 +102,8 @@ $(buildObject "QueuedJob" "qj"
   , optionalField $
     simpleField "livelock"           [t| FilePath      |]
   , optionalField $ processIdField "process_id"
+  , optionalField $
+    simpleField "phase_stats"        [t| JSValue        |]
   ])
 
 deriving instance Ord QueuedJob
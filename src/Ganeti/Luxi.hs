@@ -93,6 +93,8 @@ $(genLuxiOp "LuxiOp"
     [ simpleField "what"    [t| Qlang.ItemType |]
     , simpleField "fields"  [t| [String]  |]
     , simpleField "qfilter" [t| Qlang.Filter Qlang.FilterField |]
+    , optionalField $
+      simpleField "live_max_age" [t| Int |]
     ])
   , (luxiReqQueryFields,
     [ simpleField "what"    [t| Qlang.ItemType |]
@@ -166,6 +168,11 @@ $(genLuxiOp "LuxiOp"
      , simpleField "prev_log" [t| JSValue |]
      , simpleField "tmout"    [t| Int     |]
      ])
+  , (luxiReqWaitForJobsChange,
+     [ simpleField "jobs"   [t| [(JobId, JSValue, JSValue)] |]
+     , simpleField "fields" [t| [String] |]
+     , simpleField "tmout"  [t| Int      |]
+     ])
   , (luxiReqPickupJob,
      [ simpleField "job" [t| JobId |] ]
     )
@@ -271,8 +278,14 @@ decodeLuxiCall method args = do
               (names, fields, locking) <- fromJVal args
               return $ QueryNetworks names fields locking
     ReqQuery -> do
-              (what, fields, qfilter) <- fromJVal args
-              return $ Query what fields qfilter
+              args' <- fromJVal args
+              (what, fields, qfilter) <- fromJVal . JSArray $ take 3 args'
+              -- The maximum age of live data is optional
+              max_age <- case drop 3 args' of
+                           [] -> return Nothing
+                           [v] -> liftM Just $ fromJVal v
+                           _ -> fail "Too many arguments for a query"
+              return $ Query what fields qfilter max_age
     ReqQueryFields -> do
               (what, fields) <- fromJVal args
               fields' <- case fields of
@@ -306,6 +319,9 @@ decodeLuxiCall method args = do
                     J.readJSON e
                   _ -> J.Error "Not enough values"
               return $ WaitForJobChange jid fields pinfo pidx wtmout
+    ReqWaitForJobsChange -> do
+              (jobs, fields, wtmout) <- fromJVal args
+              return $ WaitForJobsChange jobs fields wtmout
     ReqPickupJob -> do
               [jid] <- fromJVal args
               return $ PickupJob jid
@@ -122,7 +122,7 @@ queryLoad = Traversable.mapM queryNode
 getXenInstances :: ResultT String IO (Set.Set String)
 getXenInstances = do
   let query = L.Query (Qlang.ItemTypeOpCode Qlang.QRInstance)
-              ["name", "hypervisor"] Qlang.EmptyFilter
+              ["name", "hypervisor"] Qlang.EmptyFilter Nothing
   luxiSocket <- liftIO Path.defaultQuerySocket
   raw <- bracket (mkResultT . liftM (either (Bad . show) Ok)
                    . tryIOError $ L.getLuxiClient luxiSocket)
@@ -478,6 +478,7 @@ $(genOpCode "OpCode"
      , pNameCheck
      , pIgnoreIpolicy
      , pOpportunisticLocking
+     , pNodeLockPlanning
      , pInstBeParams
      , pInstDisks
      , pOptDiskTemplate
@@ -858,6 +859,7 @@ $(genOpCode "OpCode"
      , pZeroingTimeoutFixed
      , pZeroingTimeoutPerMiB
      , pLongSleep
+     , pExportIncremental
      ],
      "instance_name")
   , ("OpBackupRemove",
@@ -84,6 +84,7 @@ module Ganeti.OpParams
   , pStorageName
   , pUseLocking
   , pOpportunisticLocking
+  , pNodeLockPlanning
   , pNameCheck
   , pNodeGroupAllocPolicy
   , pGroupNodeParams
@@ -244,6 +245,7 @@ module Ganeti.OpParams
   , pExportTargetNodeUuid
   , pRemoveInstance
   , pIgnoreRemoveFailures
+  , pExportIncremental
   , pX509KeyName
   , pX509DestCA
   , pZeroFreeSpace
@@ -1378,6 +1380,14 @@ pOpportunisticLocking =
           \ instance allocation (only when an iallocator is used)" $
   defaultFalse "opportunistic_locking"
 
+pNodeLockPlanning :: Field
+pNodeLockPlanning =
+  withDoc "Whether to compute the nodes for a new instance before acquiring\
+          \ node locks and then lock only those nodes, falling back to\
+          \ locking all nodes if the allocation is no longer possible (only\
+          \ when an iallocator is used without opportunistic locking)" $
+  defaultTrue "node_lock_planning"
+
 pInstanceUuid :: Field
 pInstanceUuid =
   withDoc "An instance UUID (for single-instance LUs)" .
@@ -1657,6 +1667,12 @@ pIgnoreRemoveFailures =
   withDoc "Whether to ignore failures while removing instances" $
   defaultFalse "ignore_remove_failures"
 
+pExportIncremental :: Field
+pExportIncremental =
+  withDoc "Whether to only export the chunks changed since the previous\
+          \ export (local export only)" $
+  defaultFalse "incremental"
+
 pX509KeyName :: Field
 pX509KeyName =
   withDoc "Name of X509 key (remote export only)" .
@@ -43,6 +43,7 @@ module Ganeti.Path
   , defaultQuerySocket
   , defaultWConfdSocket
   , defaultMetadSocket
+  , jobZygoteSocket
   , confdHmacKey
   , clusterConfFile
   , lockStatusFile
@@ -59,6 +60,7 @@ module Ganeti.Path
   , getInstReasonFilename
   , jqueueExecutorPy
   , postHooksExecutorPy
+  , jqueueZygotePy
   , kvmPidDir
   ) where
 
@@ -130,6 +132,10 @@ defaultWConfdSocket = socketDir `pjoin` "ganeti-wconfd"
 defaultMetadSocket :: IO FilePath
 defaultMetadSocket = socketDir `pjoin` "ganeti-metad"
 
+-- | The socket of the zygote forking job processes.
+jobZygoteSocket :: IO FilePath
+jobZygoteSocket = socketDir `pjoin` "ganeti-job-zygote"
+
 -- | Path to file containing confd's HMAC key.
 confdHmacKey :: IO FilePath
 confdHmacKey = dataDirP "hmac.key"
@@ -199,6 +205,11 @@ postHooksExecutorPy :: IO FilePath
 postHooksExecutorPy =
   return $ versionedsharedir </> "ganeti" </> "jqueue" </> "post_hooks_exec.py"
 
+-- | The path to the Python executable of the zygote forking job processes.
+jqueueZygotePy :: IO FilePath
+jqueueZygotePy = return $ versionedsharedir
+                          </> "ganeti" </> "jqueue" </> "zygote.py"
+
 -- | The path to the directory where kvm stores the pid files.
 kvmPidDir :: IO FilePath
 kvmPidDir = runDir `pjoin` "kvm-hypervisor" `pjoin` "pid"
@@ -23,6 +23,11 @@ The protocol works as follows (MP = master process, FP = forked process):
 
 * Both MP and FP close the communication channel.
 
+If the job zygote (see @lib/jqueue/zygote.py@) is running, MP connects to it
+instead of forking. The zygote forks FP, which receives the job ID from MP,
+sends its process ID back and then continues as above, except that it is
+already a Python process.
+
  -}
 
 {-
@@ -61,6 +66,7 @@ module Ganeti.Query.Exec
   ( isForkSupported
   , forkJobProcess
   , forkPostHooksProcess
+  , startJobZygote
   ) where
 
 import Prelude ()
@@ -78,7 +84,8 @@ import System.Environment
 import System.IO.Error (tryIOError, annotateIOError, modifyIOError)
 import System.Posix.Process
 import System.Posix.IO
-import System.Posix.Signals (sigABRT, sigKILL, sigTERM, signalProcess)
+import System.Posix.Signals ( Signal, nullSignal, sigABRT, sigKILL, sigTERM
+                            , signalProcess )
 import System.Posix.Types (Fd, ProcessID)
 import System.Time
 import Text.JSON
@@ -142,7 +149,26 @@ runProcess :: JobId -- ^ a job to process
               -- function returns the file descriptor which should
               -- remain open
            -> IO ()
-runProcess jid s pyExecIO commFn = withErrorLogAt CRITICAL (show jid) $
+runProcess jid s pyExecIO commFn =
+  -- We pass the job id as the first argument to the process. While the
+  -- process never uses it, it's very convenient when listing job processes.
+  runPythonProcess (show jid) [show (fromJobId jid)] s pyExecIO
+                   (\logFn -> commFn logFn jid)
+
+-- | Code that is executed in a @fork@-ed process. Performs communication with
+-- the parent process by calling commFn, connects the UDS transport to
+-- stdin/out and then runs pyExecIO python executable with the given
+-- arguments.
+runPythonProcess :: String -- ^ description of the process for logging
+                 -> [String] -- ^ arguments of the python executable
+                 -> Client -- ^ UDS transport
+                 -> IO FilePath -- ^ path to the python executable
+                 -> ((String -> IO ()) -> Client -> IO Fd)
+                    -- ^ pre-execution function communicating with the
+                    -- parent. The function returns the file descriptor
+                    -- which should remain open
+                 -> IO ()
+runPythonProcess desc args s pyExecIO commFn = withErrorLogAt CRITICAL desc $
   do
     -- Close the standard error to prevent anything being written there
     -- (for example by exceptions when closing unneeded FDs).
@@ -154,8 +180,8 @@ runProcess jid s pyExecIO commFn = withErrorLogAt CRITICAL (show jid) $
     -- Later we might direct them to an appropriate file.
     let logLater _ = return ()
 
-    logLater $ "Forking a new process for job " ++ show (fromJobId jid)
-    preserve_fd <- commFn logLater jid s
+    logLater $ "Forking a new process for " ++ desc
+    preserve_fd <- commFn logLater s
     -- close the client
     logLater "Closing the client"
     (clFdR, clFdW) <- clientToFd s
@@ -174,9 +200,7 @@ runProcess jid s pyExecIO commFn = withErrorLogAt CRITICAL (show jid) $
     mapM_ (tryIOError . closeFd) fds
 
     -- The master process will send the job id and the livelock file name
-    -- using the same protocol. We pass the job id as the first argument
-    -- to the process. While the process never uses it, it's very convenient
-    -- when listing job processes.
+    -- using the same protocol.
     use_debug <- isDebugMode
     env <- (M.insert "GNT_DEBUG" (if use_debug then "1" else "0")
             . M.insert "PYTHONPATH" AC.versionedsharedir
@@ -185,7 +209,7 @@ runProcess jid s pyExecIO commFn = withErrorLogAt CRITICAL (show jid) $
     execPy <- pyExecIO
     logLater $ "Executing " ++ AC.pythonPath ++ " " ++ execPy
                ++ " with PYTHONPATH=" ++ AC.versionedsharedir
-    () <- executeFile AC.pythonPath True [execPy, show (fromJobId jid)]
+    () <- executeFile AC.pythonPath True (execPy : args)
                       (Just $ M.toList env)
 
     failError $ "Failed to execute " ++ AC.pythonPath ++ " " ++ execPy
@@ -232,20 +256,61 @@ killProcessOnError pid master logFn = do
   logFn "Closing the pipe to the client"
   withErrorLogAt WARNING "Closing the communication pipe failed"
                  (liftIO (closeClient master)) `orElse` return ()
-  killIfAlive [sigTERM, sigABRT, sigKILL]
-  where killIfAlive [] = return ()
-        killIfAlive (sig : sigs) = do
+  killWhileRunning isRunning pid logFn [sigTERM, sigABRT, sigKILL]
+  where isRunning = do
           logFn "Getting the status of the process"
           status <- tryError . liftIO $ getProcessStatus False True pid
           case status of
-            Left e -> logFn $ "Job process already gone: " ++ show e
-            Right (Just s) -> logFn $ "Child process status: " ++ show s
-            Right Nothing -> do
-              logFn $ "Child process running, killing by " ++ show sig
-              liftIO $ signalProcess sig pid
-              unless (null sigs) $ do
-                threadDelay 100000 -- wait for 0.1s and check again
-                killIfAlive sigs
+            Left e -> do
+              logFn $ "Job process already gone: " ++ show e
+              return False
+            Right (Just s) -> do
+              logFn $ "Child process status: " ++ show s
+              return False
+            Right Nothing -> return True
+
+-- | Like 'killProcessOnError', but for a job process forked by the job
+-- zygote. As the process isn't our child, it is only checked whether it
+-- still exists; the zygote reaps it.
+killZygoteProcessOnError :: (FromString e, Show e)
+                         => ProcessID -- ^ job process pid
+                         -> Client -- ^ UDS client connected to the process
+                         -> (String -> ResultT e (WriterLogT IO) ())
+                            -- ^ log function
+                         -> ResultT e (WriterLogT IO) ()
+killZygoteProcessOnError pid master logFn = do
+  logFn "Closing the pipe to the client"
+  withErrorLogAt WARNING "Closing the communication pipe failed"
+                 (liftIO (closeClient master)) `orElse` return ()
+  killWhileRunning isRunning pid logFn [sigTERM, sigABRT, sigKILL]
+  where isRunning = do
+          logFn "Checking whether the process exists"
+          status <- liftIO . tryIOError $ signalProcess nullSignal pid
+          case status of
+            Left e -> do
+              logFn $ "Job process already gone: " ++ show e
+              return False
+            Right () -> return True
+
+-- | Sends a process the given signals one after another, for as long as it
+-- is still running according to the given check.
+killWhileRunning :: (FromString e, Show e)
+                 => ResultT e (WriterLogT IO) Bool
+                    -- ^ checks whether the process is still running
+                 -> ProcessID -- ^ job process pid
+                 -> (String -> ResultT e (WriterLogT IO) ())
+                    -- ^ log function
+                 -> [Signal] -- ^ the signals to send
+                 -> ResultT e (WriterLogT IO) ()
+killWhileRunning _ _ _ [] = return ()
+killWhileRunning isRunning pid logFn (sig : sigs) = do
+  running <- isRunning
+  when running $ do
+    logFn $ "Child process running, killing by " ++ show sig
+    liftIO $ signalProcess sig pid
+    unless (null sigs) $ do
+      threadDelay 100000 -- wait for 0.1s and check again
+      killWhileRunning isRunning pid logFn sigs
 
 -- | Data type used only to define the return type of forkProcessCatchErrors.
 data ForkProcessRet = ForkJob (FilePath, ProcessID) |
@@ -293,8 +358,12 @@ forkJobProcess job luxiLivelock update = do
              ++ " for job " ++ jidStr
   update luxiLivelock
 
-  ForkJob ret <- forkProcessCatchErrors (childMain . qjId $ job) logDebugJob
-                                        parentMain
+  zygote <- liftIO connectJobZygote
+  ForkJob ret <- case zygote of
+    Just master -> ResultT . execWriterLogT . runResultT
+                     $ zygoteMain master
+    Nothing -> forkProcessCatchErrors (childMain . qjId $ job) logDebugJob
+                                      parentMain
   return ret
   where
     -- Retrieve secret parameters if present
@@ -302,6 +371,28 @@ forkJobProcess job luxiLivelock update = do
     jidStr = show . fromJobId . qjId $ job
     jobLogPrefix pid = "[start:job-" ++ jidStr ++ ",pid=" ++ show pid ++ "] "
     logDebugJob pid = logDebug . (jobLogPrefix pid ++)
+    zygoteLogPrefix = "[start:job-" ++ jidStr ++ ",zygote] "
+
+    -- | Code asking the job zygote to fork the job process. Once the process
+    -- ID of the forked process is known, the communication continues as
+    -- with a process forked by us.
+    zygoteMain master = do
+      pid <- flip catchError (\e -> liftIO (closeClient master)
+                                    >> throwError e) $ do
+        let zygoteIO msg k = do
+              logDebug $ zygoteLogPrefix ++ msg
+              liftIO $ rethrowAnnotateIOError (zygoteLogPrefix ++ msg) k
+        zygoteIO "Sending the job id to the job zygote" $ sendMsg master jidStr
+        pidStr <- zygoteIO "Getting the pid of the forked process"
+                    $ recvMsg master
+        case reads pidStr :: [(Integer, String)] of
+          [(p, "")] -> return $ fromInteger p
+          _ -> failError $ zygoteLogPrefix ++ "Invalid pid received: "
+                           ++ show pidStr
+      logDebugJob pid "Forked a new process in the job zygote"
+      flip catchError (\e -> killZygoteProcessOnError pid master
+                               (logDebugJob pid)
+                             >> throwError e) $ parentMain pid master
 
     -- | Code performing communication with the child process. First, receive
     -- the livelock, then send necessary parameters to the python child.
@@ -347,6 +438,30 @@ forkJobProcess job luxiLivelock update = do
           _ <- recvMsg s'
           return fd
 
+-- | Connects to the job zygote, if it is running.
+connectJobZygote :: IO (Maybe Client)
+connectJobZygote = do
+  path <- P.jobZygoteSocket
+  result <- tryIOError
+              $ connectClient connectConfig C.luxidJobZygoteConnectTimeout path
+  case result of
+    Left e -> do
+      logDebug $ "Can't connect to the job zygote, forking instead: "
+                 ++ show e
+      return Nothing
+    Right client -> return $ Just client
+
+-- | Starts the zygote that forks job processes, see @lib/jqueue/zygote.py@.
+-- Returns the action stopping the zygote. The zygote also stops if luxid
+-- exits, as it exits once its standard input is closed.
+startJobZygote :: IO (IO ())
+startJobZygote = do
+  (pid, master) <- forkWithPipe connectConfig $ \child ->
+    runPythonProcess "job zygote" [] child P.jqueueZygotePy
+                     (\_ _ -> return (0 :: Fd))
+  logInfo $ "Started the job zygote with pid " ++ show pid
+  return $ closeClient master
+
 -- | Forks the process and starts the processing of post hooks for the opcode
 -- whose execution was unfinished due to job process disappearing.
 forkPostHooksProcess :: (FromString e, Show e)
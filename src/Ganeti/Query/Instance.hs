@@ -63,6 +63,7 @@ import Ganeti.JSON (MaybeForJSON(..), fromContainer)
 import Ganeti.Objects
 import Ganeti.Query.Common
 import Ganeti.Query.Language
+import Ganeti.Query.LiveCache
 import Ganeti.Query.Types
 import Ganeti.Rpc
 import Ganeti.Storage.Utils
@@ -932,12 +933,13 @@ getHypervisorSpecs cfg instances =
   in zip hvs . map ((Map.!) hvParamMap) $ hvs
 
 -- | Collect live data from RPC query if enabled.
-collectLiveData :: Bool        -- ^ Live queries allowed
+collectLiveData :: CacheUse    -- ^ How to use the live-data cache
+                -> Bool        -- ^ Live queries allowed
                 -> ConfigData  -- ^ The cluster config
                 -> [String]    -- ^ The requested fields
                 -> [Instance]  -- ^ The instance objects
                 -> IO [(Instance, Runtime)]
-collectLiveData liveDataEnabled cfg fields instances
+collectLiveData cache liveDataEnabled cfg fields instances
   | not liveDataEnabled = return . zip instances . repeat . Left .
                             RpcResultError $ "Live data disabled"
   | otherwise = do
@@ -948,7 +950,8 @@ collectLiveData liveDataEnabled cfg fields instances
                        . instPrimaryNode
                        >=> getNodeByUuid cfg) instances
           goodNodes = nodesWithValidConfig cfg instanceNodes
-      instInfoRes <- executeRpcCall goodNodes (RpcCallAllInstancesInfo hvSpecs)
+      instInfoRes <- cachedAllInstancesInfo cache cfg goodNodes
+                       (RpcCallAllInstancesInfo hvSpecs)
       consInfoRes <-
         if "console" `elem` fields
           then case getAllConsoleParams cfg instances of
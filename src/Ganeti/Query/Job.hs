@@ -38,6 +38,7 @@ module Ganeti.Query.Job
   , wantArchived
   ) where
 
+import Data.Maybe (fromMaybe)
 import qualified Text.JSON as J
 
 import Ganeti.BasicTypes
@@ -90,6 +91,10 @@ opsOptGetter f =
                                          Nothing -> J.JSNull
                                          Just a -> J.showJSON a) . qjOps)
 
+-- | Phase statistics, empty if none have been recorded.
+phaseStats :: Maybe J.JSValue -> J.JSValue
+phaseStats = fromMaybe (J.makeObj ([] :: [(String, J.JSValue)]))
+
 -- | Archived field name.
 archivedField :: String
 archivedField = "archived"
@@ -131,6 +136,16 @@ jobFields =
      opsOptGetter qoEndTimestamp, QffNormal)
   , (FieldDefinition "oppriority" "OpCode_prio" QFTOther
        "List of opcode priorities", opsGetter qoPriority, QffNormal)
+  , (FieldDefinition "oplocks" "OpCode_locks" QFTOther
+       "List of per-opcode lock acquisition statistics",
+     opsGetter qoLockStats, QffNormal)
+  , (FieldDefinition "opphasestats" "OpCode_phases" QFTOther
+       "List of per-opcode time and resource usage per phase",
+     opsGetter (phaseStats . qoPhaseStats), QffNormal)
+  , (FieldDefinition "phasestats" "Phases" QFTOther
+       "Time and resource usage per phase of the job process outside of\
+       \ opcodes",
+     jobGetter (phaseStats . qjPhaseStats), QffNormal)
   , (FieldDefinition "summary" "Summary" QFTOther
        "List of per-opcode summaries",
      opsGetter (extractOpSummary . qoInput), QffNormal)
@@ -0,0 +1,167 @@
+{-| Cache of the live data collected for queries.
+
+Queries for live data of nodes and instances make RPC calls to the nodes
+involved. The results of these calls are kept in a cache shared by all
+queries handled by the daemon, so that queries arriving shortly after each
+other (e.g. from several clients, or from the watcher and a user) only
+contact the nodes once. Concurrent queries needing the same data wait for
+the call already in flight instead of making their own.
+
+An entry of the cache is only reused while the cluster configuration is
+unchanged and the entry isn't older than the maximum age requested by the
+query. Failed calls are not cached.
+
+ -}
+
+{-
+
+Copyright (C) 2016 Google Inc.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+1. Redistributions of source code must retain the above copyright notice,
+this list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright
+notice, this list of conditions and the following disclaimer in the
+documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+-}
+
+
+module Ganeti.Query.LiveCache
+  ( LiveCache
+  , CacheUse(..)
+  , newLiveCache
+  , cachedNodeInfo
+  , cachedNodeInfoWith
+  , cachedAllInstancesInfo
+  ) where
+
+import Prelude ()
+import Ganeti.Prelude
+
+import Control.Concurrent.MVar
+import Control.Exception (onException)
+import Control.Monad (unless)
+import qualified Data.Map as Map
+
+import Ganeti.Objects
+import Ganeti.Rpc
+import Ganeti.Utils (getCurrentTimeUSec)
+
+-- | A cached result of an RPC call to a node.
+data Entry b = Entry
+  { entryTime   :: Integer         -- ^ When the call was made, in
+                                   -- microseconds
+  , entrySerial :: Int             -- ^ The configuration serial number
+                                   -- at that time
+  , entryResult :: MVar (ERpcError b) -- ^ The result, empty while the call
+                                      -- is in flight
+  }
+
+-- | Cached results of one kind of RPC call, by node UUID and call data.
+type EntryMap b = MVar (Map.Map (String, String) (Entry b))
+
+-- | The live-data cache of a daemon.
+data LiveCache = LiveCache
+  { lcNodeInfo      :: EntryMap RpcResultNodeInfo
+  , lcInstancesInfo :: EntryMap RpcResultAllInstancesInfo
+  }
+
+-- | How a query uses the live-data cache.
+data CacheUse
+  = NoCache                -- ^ Always contact the nodes
+  | UseCache LiveCache Int -- ^ Reuse data at most the given number of
+                           -- seconds old
+
+-- | Creates an empty live-data cache.
+newLiveCache :: IO LiveCache
+newLiveCache = LiveCache <$> newMVar Map.empty <*> newMVar Map.empty
+
+-- | Removes an entry from the cache, unless it was replaced in the meantime.
+dropEntry :: EntryMap b -> (String, String) -> MVar (ERpcError b) -> IO ()
+dropEntry entries key var =
+  modifyMVar_ entries $ return . Map.update
+    (\e -> if entryResult e == var then Nothing else Just e) key
+
+-- | Executes RPC calls, reusing cached results where possible.
+cachedRpcCalls :: (Rpc a b)
+               => ([(Node, a)] -> IO [(Node, ERpcError b)])
+                                            -- ^ How to execute the calls
+               -> (LiveCache -> EntryMap b) -- ^ The cache for the call kind
+               -> CacheUse                  -- ^ How to use the cache
+               -> ConfigData                -- ^ The current configuration
+               -> [(Node, a)]               -- ^ The calls to make
+               -> IO [(Node, ERpcError b)]
+cachedRpcCalls execute _ NoCache _ calls = execute calls
+cachedRpcCalls execute getEntries (UseCache cache maxAge) cfg calls = do
+  now <- getCurrentTimeUSec
+  let entries = getEntries cache
+      serial = configSerial cfg
+      keyOf (node, call) = (nodeUuid node, rpcCallData call)
+      usable e = entrySerial e == serial &&
+                 now - entryTime e < fromIntegral maxAge * 1000000
+      lookupEntry current nc =
+        case Map.lookup (keyOf nc) current of
+          Just e | usable e -> return (e, False)
+          _ -> do
+            var <- newEmptyMVar
+            return (Entry now serial var, True)
+  -- Entries computed for older configurations are dropped; the calls not
+  -- answered by the cache are registered, so that concurrent queries can
+  -- wait for them
+  found <- modifyMVar entries $ \m -> do
+    let current = Map.filter ((== serial) . entrySerial) m
+    looked <- mapM (lookupEntry current) calls
+    let added = [(keyOf nc, e) | (nc, (e, True)) <- zip calls looked]
+    return (foldr (uncurry Map.insert) current added, looked)
+  let pending = [(nc, entryResult e) | (nc, (e, True)) <- zip calls found]
+      failPending = mapM_ (\(nc, var) -> do
+                             _ <- tryPutMVar var . Left $
+                                    RpcResultError "Live data collection failed"
+                             dropEntry entries (keyOf nc) var) pending
+  unless (null pending) $ do
+    results <- execute (map fst pending) `onException` failPending
+    mapM_ (\((nc, var), (_, result)) -> do
+             putMVar var result
+             case result of
+               Left _ -> dropEntry entries (keyOf nc) var
+               Right _ -> return ()) $ zip pending results
+  mapM (\((node, _), (e, _)) -> (,) node <$> readMVar (entryResult e)) $
+    zip calls found
+
+-- | Executes node information calls using the cache.
+cachedNodeInfo :: CacheUse -> ConfigData -> [(Node, RpcCallNodeInfo)]
+               -> IO [(Node, ERpcError RpcResultNodeInfo)]
+cachedNodeInfo = cachedNodeInfoWith executeRpcCalls
+
+-- | Executes node information calls using the cache and the given function
+-- to contact the nodes.
+cachedNodeInfoWith :: ([(Node, RpcCallNodeInfo)]
+                       -> IO [(Node, ERpcError RpcResultNodeInfo)])
+                   -> CacheUse -> ConfigData -> [(Node, RpcCallNodeInfo)]
+                   -> IO [(Node, ERpcError RpcResultNodeInfo)]
+cachedNodeInfoWith execute = cachedRpcCalls execute lcNodeInfo
+
+-- | Executes an instance information call on several nodes using the cache.
+cachedAllInstancesInfo :: CacheUse -> ConfigData -> [Node]
+                       -> RpcCallAllInstancesInfo
+                       -> IO [(Node, ERpcError RpcResultAllInstancesInfo)]
+cachedAllInstancesInfo use cfg nodes call =
+  cachedRpcCalls executeRpcCalls lcInstancesInfo use cfg [(n, call) | n <- nodes]
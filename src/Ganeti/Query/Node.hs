@@ -53,6 +53,7 @@ import Ganeti.Rpc
 import Ganeti.Types
 import Ganeti.Query.Language
 import Ganeti.Query.Common
+import Ganeti.Query.LiveCache
 import Ganeti.Query.Types
 import Ganeti.Storage.Utils
 import Ganeti.Utils (niceSort)
@@ -294,21 +295,22 @@ queryDomainRequired :: -- domain-specific fields to look for (storage, hv)
 queryDomainRequired domain_fields fields = any (`elem` fields) domain_fields
 
 -- | Collect live data from RPC query if enabled.
-collectLiveData :: Bool
+collectLiveData :: CacheUse
+                -> Bool
                 -> ConfigData
                 -> [String]
                 -> [Node]
                 -> IO [(Node, Runtime)]
-collectLiveData False _ _ nodes =
+collectLiveData _ False _ _ nodes =
   return $ zip nodes (repeat $ Left (RpcResultError "Live data disabled"))
-collectLiveData True cfg fields nodes = do
+collectLiveData cache True cfg fields nodes = do
   let hvs = [getDefaultHypervisorSpec cfg |
              queryDomainRequired hypervisorFields fields]
       good_nodes = nodesWithValidConfig cfg nodes
       storage_units n = if queryDomainRequired storageFields fields
                         then getStorageUnitsOfNode cfg n
                         else []
-  rpcres <- executeRpcCalls
+  rpcres <- cachedNodeInfo cache cfg
       [(n, RpcCallNodeInfo (storage_units n) hvs) | n <- good_nodes]
   return $ fillUpList (fillPairFromMaybe rpcResultNodeBroken pickPairUnique)
       nodes rpcres
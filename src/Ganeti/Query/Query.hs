@@ -57,6 +57,7 @@ too.
 
 module Ganeti.Query.Query
     ( query
+    , queryCached
     , queryFields
     , queryCompat
     , getRequestedNames
@@ -95,6 +96,7 @@ import qualified Ganeti.Query.Instance as Instance
 import qualified Ganeti.Query.Job as Query.Job
 import qualified Ganeti.Query.Group as Group
 import Ganeti.Query.Language
+import Ganeti.Query.LiveCache (CacheUse(..))
 import qualified Ganeti.Query.Locks as Locks
 import qualified Ganeti.Query.Network as Network
 import qualified Ganeti.Query.Node as Node
@@ -275,30 +277,40 @@ query :: ConfigData   -- ^ The current configuration
       -> Bool         -- ^ Whether to collect live data
       -> Query        -- ^ The query (item, fields, filter)
       -> IO (ErrorResult QueryResult) -- ^ Result
-query cfg live (Query (ItemTypeLuxi QRJob) fields qfilter) =
+query = queryCached NoCache
+
+-- | Query execution function reusing cached live data.
+queryCached :: CacheUse     -- ^ How to use the live-data cache
+            -> ConfigData   -- ^ The current configuration
+            -> Bool         -- ^ Whether to collect live data
+            -> Query        -- ^ The query (item, fields, filter)
+            -> IO (ErrorResult QueryResult) -- ^ Result
+queryCached _ cfg live (Query (ItemTypeLuxi QRJob) fields qfilter) =
   queryJobs cfg live fields qfilter
-query cfg live (Query (ItemTypeLuxi QRLock) fields qfilter) = runResultT $ do
-  unless live (failError "Locks can only be queried live")
-  cl <- liftIO $ do
-     socketpath <- defaultWConfdSocket
-     getWConfdClient socketpath
-  livedata <- runRpcClient listLocksWaitingStatus cl
-  logDebug $ "Live state of all locks is " ++ show livedata
-  let allLocks = Set.toList . Set.unions
-                 $ (Set.fromList . map fst $ fst livedata)
-                   : map (\(_, _, req) -> Set.fromList $ map lockAffected req)
-                      (snd livedata)
-  answer <- liftIO $ genericQuery
-             Locks.fieldsMap
-             (CollectorSimple $ recollectLocksData livedata)
-             id
-             (const . GenericContainer . Map.fromList
-              . map ((UTF8.fromString &&& id) . lockName) $ allLocks)
-             (const Ok)
-             cfg live fields qfilter []
-  toError answer
-
-query cfg live qry = queryInner cfg live qry $ getRequestedNames qry
+queryCached _ cfg live (Query (ItemTypeLuxi QRLock) fields qfilter) =
+  runResultT $ do
+    unless live (failError "Locks can only be queried live")
+    cl <- liftIO $ do
+       socketpath <- defaultWConfdSocket
+       getWConfdClient socketpath
+    livedata <- runRpcClient listLocksWaitingStatus cl
+    logDebug $ "Live state of all locks is " ++ show livedata
+    let allLocks = Set.toList . Set.unions
+                   $ (Set.fromList . map fst $ fst livedata)
+                     : map (\(_, _, req) -> Set.fromList $ map lockAffected req)
+                        (snd livedata)
+    answer <- liftIO $ genericQuery
+               Locks.fieldsMap
+               (CollectorSimple $ recollectLocksData livedata)
+               id
+               (const . GenericContainer . Map.fromList
+                . map ((UTF8.fromString &&& id) . lockName) $ allLocks)
+               (const Ok)
+               cfg live fields qfilter []
+    toError answer
+
+queryCached cache cfg live qry =
+  queryInner cache cfg live qry $ getRequestedNames qry
 
 
 -- | Dummy data collection fuction
@@ -306,40 +318,45 @@ dummyCollectLiveData :: Bool -> ConfigData -> [a] -> IO [(a, NoDataRuntime)]
 dummyCollectLiveData _ _ = return . map (, NoDataRuntime)
 
 -- | Inner query execution function.
-queryInner :: ConfigData   -- ^ The current configuration
+queryInner :: CacheUse     -- ^ How to use the live-data cache
+           -> ConfigData   -- ^ The current configuration
            -> Bool         -- ^ Whether to collect live data
            -> Query        -- ^ The query (item, fields, filter)
            -> [String]     -- ^ Requested names
            -> IO (ErrorResult QueryResult) -- ^ Result
 
-queryInner cfg live (Query (ItemTypeOpCode QRNode) fields qfilter) wanted =
-  genericQuery Node.fieldsMap (CollectorFieldAware Node.collectLiveData)
+queryInner cache cfg live (Query (ItemTypeOpCode QRNode) fields qfilter)
+           wanted =
+  genericQuery Node.fieldsMap
+               (CollectorFieldAware $ Node.collectLiveData cache)
                nodeName configNodes getNode cfg live fields qfilter wanted
 
-queryInner cfg live (Query (ItemTypeOpCode QRInstance) fields qfilter) wanted =
-  genericQuery Instance.fieldsMap (CollectorFieldAware Instance.collectLiveData)
+queryInner cache cfg live (Query (ItemTypeOpCode QRInstance) fields qfilter)
+           wanted =
+  genericQuery Instance.fieldsMap
+               (CollectorFieldAware $ Instance.collectLiveData cache)
                (fromMaybe "" . instName) configInstances getInstance cfg live
                fields qfilter
                wanted
 
-queryInner cfg live (Query (ItemTypeOpCode QRGroup) fields qfilter) wanted =
+queryInner _ cfg live (Query (ItemTypeOpCode QRGroup) fields qfilter) wanted =
   genericQuery Group.fieldsMap (CollectorSimple dummyCollectLiveData) groupName
                configNodegroups getGroup cfg live fields qfilter wanted
 
-queryInner cfg live (Query (ItemTypeOpCode QRNetwork) fields qfilter) wanted =
+queryInner _ cfg live (Query (ItemTypeOpCode QRNetwork) fields qfilter) wanted =
   genericQuery Network.fieldsMap (CollectorSimple dummyCollectLiveData)
                (fromNonEmpty . networkName)
                configNetworks getNetwork cfg live fields qfilter wanted
 
-queryInner cfg live (Query (ItemTypeOpCode QRExport) fields qfilter) wanted =
+queryInner _ cfg live (Query (ItemTypeOpCode QRExport) fields qfilter) wanted =
   genericQuery Export.fieldsMap (CollectorSimple Export.collectLiveData)
                nodeName configNodes getNode cfg live fields qfilter wanted
 
-queryInner cfg live (Query (ItemTypeLuxi QRFilter) fields qfilter) wanted =
+queryInner _ cfg live (Query (ItemTypeLuxi QRFilter) fields qfilter) wanted =
   genericQuery FilterRules.fieldsMap (CollectorSimple dummyCollectLiveData)
                uuidOf configFilters getFilterRule cfg live fields qfilter wanted
 
-queryInner _ _ (Query qkind _ _) _ =
+queryInner _ _ _ (Query qkind _ _) _ =
   return . Bad . GenericError $ "Query '" ++ show qkind ++ "' not supported"
 
 -- | Query jobs specific query function, needed as we need to accept
@@ -46,17 +46,18 @@ import Ganeti.Prelude
 import Control.Concurrent
 import Control.Exception
 import Control.Lens ((.~))
-import Control.Monad (forever, when, mzero, guard, zipWithM, liftM, void)
+import Control.Monad (forever, when, mzero, guard, zipWithM, liftM, void, forM)
 import Control.Monad.Base (MonadBase, liftBase)
 import Control.Monad.Error.Class (MonadError)
 import Control.Monad.IO.Class
 import Control.Monad.Trans (lift)
 import Control.Monad.Trans.Maybe
 import qualified Data.ByteString.UTF8 as UTF8
-import qualified Data.Set as Set (toList)
+import qualified Data.Map as M
+import qualified Data.Set as Set (toList, fromList, member)
 import Data.IORef
 import Data.List (intersperse)
-import Data.Maybe (fromMaybe)
+import Data.Maybe (fromMaybe, catMaybes)
 import qualified Text.JSON as J
 import Text.JSON (encode, showJSON, JSValue(..))
 import System.Info (arch)
@@ -84,6 +85,7 @@ import Ganeti.Logging
 import Ganeti.Luxi
 import qualified Ganeti.Query.Language as Qlang
 import qualified Ganeti.Query.Cluster as QCluster
+import Ganeti.Query.LiveCache (LiveCache, CacheUse(..), newLiveCache)
 import Ganeti.Path ( queueDir, jobQueueLockFile, jobQueueDrainFile )
 import Ganeti.Rpc
 import qualified Ganeti.Query.Exec as Exec
@@ -93,7 +95,8 @@ import Ganeti.THH.HsRPC (runRpcClient, RpcClientMonad)
 import Ganeti.Types
 import qualified Ganeti.UDSServer as U (Handler(..), listener)
 import Ganeti.Utils ( lockFile, exitIfBad, exitUnless, watchFile
-                    , safeRenameFile, newUUID, isUUID )
+                    , watchFilesChangedBy, getFStatSafe, safeRenameFile
+                    , newUUID, isUUID )
 import Ganeti.Utils.Monad (orM)
 import Ganeti.Utils.MVarLock
 import qualified Ganeti.Version as Version
@@ -136,8 +139,18 @@ withLockedWconfdConfig cid f = do
   wconfdClient <- liftBase $ getWConfdClient =<< Path.defaultWConfdSocket
   runRpcClient (withLockedConfig cid False f) wconfdClient
 
+-- | Returns how a query uses the live-data cache, given the maximum age of
+-- reused data requested by the client. A maximum age of zero bypasses the
+-- cache.
+liveCacheUse :: LiveCache -> Maybe Int -> CacheUse
+liveCacheUse cache max_age =
+  case fromMaybe C.queryLiveMaxAge max_age of
+    age | age > 0 -> UseCache cache age
+    _ -> NoCache
+
 -- | Helper for classic queries.
-handleQuery :: [Qlang.ItemType -> Qlang.FilterField] -- ^ Fields to put into
+handleQuery :: CacheUse        -- ^ How to use the live-data cache
+            -> [Qlang.ItemType -> Qlang.FilterField] -- ^ Fields to put into
                                                      -- the query
             -> ConfigData      -- ^ Cluster config
             -> Qlang.ItemType  -- ^ Query type
@@ -146,12 +159,12 @@ handleQuery :: [Qlang.ItemType -> Qlang.FilterField] -- ^ Fields to put into
             -> [String]        -- ^ Requested fields
             -> Bool            -- ^ Whether to do sync queries or not
             -> IO (GenericResult GanetiException JSValue)
-handleQuery _ _ _ _ _ True =
+handleQuery _ _ _ _ _ _ True =
   return . Bad $ OpPrereqError "Sync queries are not allowed" ECodeInval
-handleQuery filterFields cfg qkind names fields _ = do
+handleQuery cache filterFields cfg qkind names fields _ = do
   let simpleNameFilter field = makeSimpleFilter (field qkind) names
       flt = Qlang.OrFilter $ map simpleNameFilter filterFields
-  qr <- query cfg True (Qlang.Query qkind fields flt)
+  qr <- queryCached cache cfg True (Qlang.Query qkind fields flt)
   return $ showJSON <$> (qr >>= queryCompat)
 
 -- | Helper for classic queries.
@@ -163,7 +176,7 @@ handleClassicQuery :: ConfigData      -- ^ Cluster config
                    -> [String]        -- ^ Requested fields
                    -> Bool            -- ^ Whether to do sync queries or not
                    -> IO (GenericResult GanetiException JSValue)
-handleClassicQuery = handleQuery [nameField, uuidField]
+handleClassicQuery = handleQuery NoCache [nameField, uuidField]
 
 -- | Like `handleClassicQuery`, but filters only by UUID.
 handleUuidQuery :: ConfigData      -- ^ Cluster config
@@ -173,21 +186,22 @@ handleUuidQuery :: ConfigData      -- ^ Cluster config
                 -> [String]        -- ^ Requested fields
                 -> Bool            -- ^ Whether to do sync queries or not
                 -> IO (GenericResult GanetiException JSValue)
-handleUuidQuery = handleQuery [uuidField]
+handleUuidQuery = handleQuery NoCache [uuidField]
 
 -- | Minimal wrapper to handle the missing config case.
-handleCallWrapper :: Lock -> JQStatus ->  Result ConfigData
+handleCallWrapper :: Lock -> JQStatus -> LiveCache -> Result ConfigData
                      -> LuxiOp -> IO (ErrorResult JSValue)
-handleCallWrapper _ _ (Bad msg) _ =
+handleCallWrapper _ _ _ (Bad msg) _ =
   return . Bad . ConfigurationError $
            "I do not have access to a valid configuration, cannot\
            \ process queries: " ++ msg
-handleCallWrapper qlock qstat (Ok config) op = handleCall qlock qstat config op
+handleCallWrapper qlock qstat cache (Ok config) op =
+  handleCall qlock qstat cache config op
 
 -- | Actual luxi operation handler.
-handleCall :: Lock -> JQStatus
+handleCall :: Lock -> JQStatus -> LiveCache
               -> ConfigData -> LuxiOp -> IO (ErrorResult JSValue)
-handleCall _ _ cdata QueryClusterInfo =
+handleCall _ _ _ cdata QueryClusterInfo =
   let cluster = configCluster cdata
       master = QCluster.clusterMasterNodeName cdata
       hypervisors = clusterEnabledHypervisors cluster
@@ -297,7 +311,7 @@ handleCall _ _ cdata QueryClusterInfo =
     Ok _ -> return . Ok . J.makeObj $ obj
     Bad ex -> return $ Bad ex
 
-handleCall _ _ cfg (QueryTags kind name) = do
+handleCall _ _ _ cfg (QueryTags kind name) = do
   let tags = case kind of
                TagKindCluster  -> Ok . clusterTags $ configCluster cfg
                TagKindGroup    -> groupTags   <$> Config.getGroup    cfg name
@@ -306,35 +320,36 @@ handleCall _ _ cfg (QueryTags kind name) = do
                TagKindNetwork  -> networkTags <$> Config.getNetwork  cfg name
   return (J.showJSON <$> tags)
 
-handleCall _ _ cfg (Query qkind qfields qfilter) = do
-  result <- query cfg True (Qlang.Query qkind qfields qfilter)
+handleCall _ _ cache cfg (Query qkind qfields qfilter max_age) = do
+  result <- queryCached (liveCacheUse cache max_age) cfg True
+              (Qlang.Query qkind qfields qfilter)
   return $ J.showJSON <$> result
 
-handleCall _ _ _ (QueryFields qkind qfields) = do
+handleCall _ _ _ _ (QueryFields qkind qfields) = do
   let result = queryFields (Qlang.QueryFields qkind qfields)
   return $ J.showJSON <$> result
 
-handleCall _ _ cfg (QueryNodes names fields lock) =
-  handleClassicQuery cfg (Qlang.ItemTypeOpCode Qlang.QRNode)
-    (map Left names) fields lock
+handleCall _ _ cache cfg (QueryNodes names fields lock) =
+  handleQuery (liveCacheUse cache Nothing) [nameField, uuidField] cfg
+    (Qlang.ItemTypeOpCode Qlang.QRNode) (map Left names) fields lock
 
-handleCall _ _ cfg (QueryInstances names fields lock) =
-  handleClassicQuery cfg (Qlang.ItemTypeOpCode Qlang.QRInstance)
-    (map Left names) fields lock
+handleCall _ _ cache cfg (QueryInstances names fields lock) =
+  handleQuery (liveCacheUse cache Nothing) [nameField, uuidField] cfg
+    (Qlang.ItemTypeOpCode Qlang.QRInstance) (map Left names) fields lock
 
-handleCall _ _ cfg (QueryGroups names fields lock) =
+handleCall _ _ _ cfg (QueryGroups names fields lock) =
   handleClassicQuery cfg (Qlang.ItemTypeOpCode Qlang.QRGroup)
     (map Left names) fields lock
 
-handleCall _ _ cfg (QueryJobs names fields) =
+handleCall _ _ _ cfg (QueryJobs names fields) =
   handleClassicQuery cfg (Qlang.ItemTypeLuxi Qlang.QRJob)
     (map (Right . fromIntegral . fromJobId) names)  fields False
 
-handleCall _ _ cfg (QueryFilters uuids fields) =
+handleCall _ _ _ cfg (QueryFilters uuids fields) =
   handleUuidQuery cfg (Qlang.ItemTypeLuxi Qlang.QRFilter)
     (map Left uuids) fields False
 
-handleCall _ status _ (ReplaceFilter mUuid priority predicates action
+handleCall _ status _ _ (ReplaceFilter mUuid priority predicates action
                                      reason) =
   -- Handles both adding new filter and changing existing ones.
   runResultT $ do
@@ -373,7 +388,7 @@ handleCall _ status _ (ReplaceFilter mUuid priority predicates action
     -- Return UUID of added/replaced filter.
     return $ showJSON uuid
 
-handleCall _ status cfg (DeleteFilter uuid) = runResultT $ do
+handleCall _ status _ cfg (DeleteFilter uuid) = runResultT $ do
   -- Check if filter exists.
   _ <- lookupContainer
     (failError $ "Filter rule with UUID " ++ uuid ++ " does not exist")
@@ -389,11 +404,11 @@ handleCall _ status cfg (DeleteFilter uuid) = runResultT $ do
 
   return JSNull
 
-handleCall _ _ cfg (QueryNetworks names fields lock) =
+handleCall _ _ _ cfg (QueryNetworks names fields lock) =
   handleClassicQuery cfg (Qlang.ItemTypeOpCode Qlang.QRNetwork)
     (map Left names) fields lock
 
-handleCall _ _ cfg (QueryConfigValues fields) = do
+handleCall _ _ _ cfg (QueryConfigValues fields) = do
   let clusterProperty fn = showJSON . fn . configCluster $ cfg
   let params = [ ("cluster_name", return $ clusterProperty clusterClusterName)
                , ("watcher_pause", liftM (maybe JSNull showJSON)
@@ -405,16 +420,17 @@ handleCall _ _ cfg (QueryConfigValues fields) = do
                   return $ clusterProperty clusterModifySshSetup)
                , ("ssh_key_type", return $ clusterProperty clusterSshKeyType)
                , ("ssh_key_bits", return $ clusterProperty clusterSshKeyBits)
+               , ("serial_no", return . showJSON $ configSerial cfg)
                ] :: [(String, IO JSValue)]
   let answer = map (fromMaybe (return JSNull) . flip lookup params) fields
   answerEval <- sequence answer
   return . Ok . showJSON $ answerEval
 
-handleCall _ _ cfg (QueryExports nodes lock) =
+handleCall _ _ _ cfg (QueryExports nodes lock) =
   handleClassicQuery cfg (Qlang.ItemTypeOpCode Qlang.QRExport)
     (map Left nodes) ["node", "export"] lock
 
-handleCall qlock qstat cfg (SubmitJobToDrainedQueue ops) = runResultT $ do
+handleCall qlock qstat _ cfg (SubmitJobToDrainedQueue ops) = runResultT $ do
     jid <- mkResultT $ allocateJobId (Config.getMasterCandidates cfg) qlock
     ts <- liftIO currentTimestamp
     job <- liftM (extendJobReasonTrail . setReceivedTimestamp ts)
@@ -424,14 +440,14 @@ handleCall qlock qstat cfg (SubmitJobToDrainedQueue ops) = runResultT $ do
     _ <- liftIO . forkIO $ enqueueNewJobs qstat [job]
     return . showJSON . fromJobId $ jid
 
-handleCall qlock qstat cfg (SubmitJob ops) =
+handleCall qlock qstat cache cfg (SubmitJob ops) =
   do
     open <- isQueueOpen
     if not open
        then return . Bad . GenericError $ "Queue drained"
-       else handleCall qlock qstat cfg (SubmitJobToDrainedQueue ops)
+       else handleCall qlock qstat cache cfg (SubmitJobToDrainedQueue ops)
 
-handleCall qlock qstat cfg (SubmitManyJobs lops) =
+handleCall qlock qstat _ cfg (SubmitManyJobs lops) =
   do
     open <- isQueueOpen
     if not open
@@ -460,15 +476,18 @@ handleCall qlock qstat cfg (SubmitManyJobs lops) =
                         else showJSON (False, genericResult id (const "") res))
               $ annotated_results
 
-handleCall _ _ cfg (WaitForJobChange jid fields prev_job prev_log tmout) =
+handleCall _ _ _ cfg (WaitForJobChange jid fields prev_job prev_log tmout) =
   waitForJobChange jid prev_job tmout $ computeJobUpdate cfg jid fields prev_log
 
-handleCall _ _ cfg (SetWatcherPause time) = do
+handleCall _ _ _ cfg (WaitForJobsChange jobs fields tmout) =
+  waitForJobsChange jobs tmout $ queryJobUpdate cfg fields
+
+handleCall _ _ _ cfg (SetWatcherPause time) = do
   let mcs = Config.getMasterOrCandidates cfg
   _ <- executeRpcCall mcs $ RpcCallSetWatcherPause time
   return . Ok . maybe JSNull showJSON $ fmap TimeAsDoubleJSON time
 
-handleCall _ _ cfg (SetDrainFlag value) = do
+handleCall _ _ _ cfg (SetDrainFlag value) = do
   let mcs = Config.getMasterCandidates cfg
   fpath <- jobQueueDrainFile
   if value
@@ -477,7 +496,7 @@ handleCall _ _ cfg (SetDrainFlag value) = do
   _ <- executeRpcCall mcs $ RpcCallSetDrainFlag value
   return . Ok . showJSON $ True
 
-handleCall _ qstat cfg (ChangeJobPriority jid prio) = do
+handleCall _ qstat _ cfg (ChangeJobPriority jid prio) = do
   let jName = (++) "job " . show $ fromJobId jid
   maybeJob <- setJobPriority qstat jid prio
   case maybeJob of
@@ -493,7 +512,7 @@ handleCall _ qstat cfg (ChangeJobPriority jid prio) = do
       logDebug $ jName ++ " started, will signal"
       fmap showJSON <$> tellJobPriority (jqLivelock qstat) jid prio
 
-handleCall _ qstat  cfg (CancelJob jid kill) = do
+handleCall _ qstat _  cfg (CancelJob jid kill) = do
   let jName = (++) "job " . show $ fromJobId jid
   dequeueResult <- dequeueJob qstat jid
   case dequeueResult of
@@ -524,7 +543,7 @@ handleCall _ qstat  cfg (CancelJob jid kill) = do
       return result
     Bad s -> return . Ok . showJSON $ (False, s)
 
-handleCall qlock _ cfg (ArchiveJob jid) =
+handleCall qlock _ _ cfg (ArchiveJob jid) =
   -- By adding a layer of MaybeT, we can prematurely end a computation
   -- using 'mzero' or other 'MonadPlus' primitive and return 'Ok False'.
   runResultT . liftM (showJSON . fromMaybe False) . runMaybeT $ do
@@ -543,7 +562,7 @@ handleCall qlock _ cfg (ArchiveJob jid) =
                 $ RpcCallJobqueueRename [(live, archive)]
     return True
 
-handleCall qlock _ cfg (AutoArchiveJobs age timeout) = do
+handleCall qlock _ _ cfg (AutoArchiveJobs age timeout) = do
   qDir <- queueDir
   resultJids <- getJobIDs [qDir]
   case resultJids of
@@ -554,7 +573,7 @@ handleCall qlock _ cfg (AutoArchiveJobs age timeout) = do
                   $ sortJobIDs jids
       return . Ok $ showJSON result
 
-handleCall _ _ _ (PickupJob _) =
+handleCall _ _ _ _ (PickupJob _) =
   return . Bad
     $ GenericError "Luxi call 'PickupJob' is for internal use only"
 
@@ -584,56 +603,140 @@ waitForJobChange jid prev_job tmout compute_fn = do
       return . Ok $ showJSON answer
     _ -> liftM (Ok . showJSON) compute_fn
 
--- | Query the status of a job and return the requested fields
--- and the logs newer than the given log number.
-computeJobUpdate :: ConfigData -> JobId -> [String] -> JSValue
-                    -> IO (JSValue, JSValue)
-computeJobUpdate cfg jid fields prev_log = do
-  let sjid = show $ fromJobId jid
-  logDebug $ "Inspecting fields " ++ show fields ++ " of job " ++ sjid
+-- | Special-case handler for WaitForJobsChange RPC call for
+-- fields == ["status"] that doesn't require the use of ConfigData
+handleWaitForJobsChangeStatus :: [(JobId, JSValue, JSValue)] -> Int
+                                 -> IO (ErrorResult JSValue)
+handleWaitForJobsChangeStatus jobs tmout =
+  waitForJobsChange jobs tmout loadJobUpdateStatus
+
+-- | Wait until any of the given jobs changes and return the updates of
+-- all jobs that changed, as pairs of the job id and the same update
+-- WaitForJobChange would return for it. Finalized jobs are always
+-- reported, jobs that can't be loaded are reported with a null update.
+-- If no job changes within the timeout, the result is empty. After the
+-- first look at all jobs, only the jobs whose files changed are looked at
+-- again.
+waitForJobsChange :: [(JobId, JSValue, JSValue)] -> Int
+                     -> (JobId -> JSValue
+                         -> IO (Maybe (Bool, (JSValue, JSValue))))
+                     -> IO (ErrorResult JSValue)
+waitForJobsChange jobs tmout compute_fn = do
+  qDir <- queueDir
+  let jobfiles = map (\job@(jid, _, _) -> (liveJobFile qDir jid, job)) jobs
+      compute_changed changed =
+        let changedSet = Set.fromList changed
+        in computeJobsUpdates compute_fn
+             [ job | (jobfile, job) <- jobfiles
+                   , jobfile `Set.member` changedSet ]
+  -- take the status of the files before looking at the jobs, so that no
+  -- change in between is missed
+  fstats <- liftM (M.fromList . zip (map fst jobfiles))
+              $ mapM (getFStatSafe . fst) jobfiles
+  -- report lost and finalized jobs without setting up any watches
+  initial <- computeJobsUpdates compute_fn jobs
+  answer <- if not (null initial)
+              then return initial
+              else watchFilesChangedBy fstats (min tmout C.luxiWfjcTimeout)
+                     (not . null) compute_changed
+  return . Ok $ JSArray answer
+
+-- | Compute the updates of those of the given jobs that changed with
+-- respect to the previously received job information and log number.
+-- Every job is looked at once by the given function, which returns whether
+-- the job is finalized along with its update, or 'Nothing' if the job
+-- can't be loaded.
+computeJobsUpdates :: (JobId -> JSValue
+                       -> IO (Maybe (Bool, (JSValue, JSValue))))
+                      -> [(JobId, JSValue, JSValue)]
+                      -> IO [JSValue]
+computeJobsUpdates compute_fn jobs =
+  liftM catMaybes . forM jobs $ \(jid, prev_job, prev_log) -> do
+    result <- compute_fn jid prev_log
+    return $ case result of
+      Nothing -> Just $ showJSON (jid, JSNull)
+      Just (finalized, update@(job_info, logs)) ->
+        if finalized || job_info /= prev_job || logs /= JSArray []
+          then Just $ showJSON (jid, update)
+          else Nothing
+
+-- | Keep the log entries newer than the given log number.
+filterJobLogs :: JSValue -> [JSValue] -> JSValue
+filterJobLogs prev_log logs =
   let fromJSArray (JSArray xs) = xs
       fromJSArray _ = []
-  let logFilter JSNull (JSArray _) = True
+      logFilter JSNull (JSArray _) = True
       logFilter (JSRational _ n) (JSArray (JSRational _ m:_)) = n < m
       logFilter _ _ = False
-  let filterLogs n logs = JSArray (filter (logFilter n) (logs >>= fromJSArray))
+  in JSArray (filter (logFilter prev_log) (logs >>= fromJSArray))
+
+-- | Query a job and return whether it is finalized, the requested fields
+-- and the logs newer than the given log number; or 'Nothing' if the job
+-- can't be queried.
+queryJobUpdate :: ConfigData -> [String] -> JobId -> JSValue
+                  -> IO (Maybe (Bool, (JSValue, JSValue)))
+queryJobUpdate cfg fields jid prev_log = do
+  let sjid = show $ fromJobId jid
+  logDebug $ "Inspecting fields " ++ show fields ++ " of job " ++ sjid
   jobQuery <- handleClassicQuery cfg (Qlang.ItemTypeLuxi Qlang.QRJob)
-                [Right . fromIntegral $ fromJobId jid] ("oplog" : fields) False
-  let (rfields, rlogs) = case jobQuery of
-        Ok (JSArray [JSArray (JSArray logs : answer)]) ->
-          (answer, filterLogs prev_log logs)
-        _ -> (map (const JSNull) fields, JSArray [])
-  logDebug $ "Updates for job " ++ sjid ++ " are " ++ encode (rfields, rlogs)
-  return (JSArray rfields, rlogs)
+                [Right . fromIntegral $ fromJobId jid]
+                ("oplog" : "status" : fields) False
+  let result = case jobQuery of
+        Ok (JSArray [JSArray (JSArray logs : status : answer)]) ->
+          case J.readJSON status of
+            J.Ok st -> Just (st > JOB_STATUS_RUNNING,
+                             (JSArray answer, filterJobLogs prev_log logs))
+            J.Error _ -> Nothing
+        _ -> Nothing
+  logDebug $ "Updates for job " ++ sjid ++ " are "
+               ++ maybe "unavailable" (encode . snd) result
+  return result
 
--- | A version of computeJobUpdate hardcoded to only return logs and the status
+-- | Query the status of a job and return the requested fields
+-- and the logs newer than the given log number.
+computeJobUpdate :: ConfigData -> JobId -> [String] -> JSValue
+                    -> IO (JSValue, JSValue)
+computeJobUpdate cfg jid fields prev_log =
+  liftM (maybe (JSArray $ map (const JSNull) fields, JSArray []) snd)
+    $ queryJobUpdate cfg fields jid prev_log
+
+-- | A version of queryJobUpdate hardcoded to only return logs and the status
 -- field. By hardcoding this we avoid using the luxi Query infrastructure and
--- the ConfigData value it requires.
-computeJobUpdateStatus :: JobId -> JSValue -> IO (JSValue, JSValue)
-computeJobUpdateStatus jid prev_log = do
+-- the ConfigData value it requires. The job is loaded only once.
+loadJobUpdateStatus :: JobId -> JSValue
+                       -> IO (Maybe (Bool, (JSValue, JSValue)))
+loadJobUpdateStatus jid prev_log = do
   qdir <- queueDir
   loadResult <- loadJobFromDisk qdir True jid
   let sjid = show $ fromJobId jid
   logDebug $ "Inspecting status of job " ++ sjid
-  let (rfields, rlogs) = case loadResult of
-       Ok (job, _) -> (J.JSArray [status], newlogs)
+  let result = case loadResult of
+       Ok (job, _) -> Just (jobFinalized job, (J.JSArray [status], newlogs))
           where status  = showJSON $ calcJobStatus job -- like "status" jobField
                 oplogs  = map qoLog (qjOps job)        -- like "oplog" jobField
                 newer   = case J.readJSON prev_log of
                   J.Ok n -> (\(idx, _time, _type, _msg) -> n < idx)
                   _      -> const True
                 newlogs = showJSON $ concatMap (filter newer) oplogs
-       _ -> (JSArray[JSNull], JSArray [])
-  logDebug $ "Updates for job " ++ sjid ++ " are " ++ encode (rfields, rlogs)
-  return (rfields, rlogs)
+       _ -> Nothing
+  logDebug $ "Updates for job " ++ sjid ++ " are "
+               ++ maybe "unavailable" (encode . snd) result
+  return result
 
-type LuxiConfig = (Lock, JQStatus, ConfigReader)
+-- | A version of computeJobUpdate hardcoded to only return logs and the status
+-- field. By hardcoding this we avoid using the luxi Query infrastructure and
+-- the ConfigData value it requires.
+computeJobUpdateStatus :: JobId -> JSValue -> IO (JSValue, JSValue)
+computeJobUpdateStatus jid =
+  liftM (maybe (JSArray [JSNull], JSArray []) snd) . loadJobUpdateStatus jid
+
+type LuxiConfig = (Lock, JQStatus, ConfigReader, LiveCache)
 
 luxiExec
     :: LuxiConfig
     -> LuxiOp
     -> IO (Bool, GenericResult GanetiException JSValue)
-luxiExec (qlock, qstat, creader) args =
+luxiExec (qlock, qstat, creader, cache) args =
   case args of
     -- Special case WaitForJobChange handling to avoid passing a ConfigData to
     -- a potentially long-lived thread. ConfigData uses lots of heap, and
@@ -643,9 +746,13 @@ luxiExec (qlock, qstat, creader) args =
       | fields == ["status"] -> do
         result <- handleWaitForJobChangeStatus jid prev_job prev_log tmout
         return (True, result)
+    WaitForJobsChange jobs fields tmout
+      | fields == ["status"] -> do
+        result <- handleWaitForJobsChangeStatus jobs tmout
+        return (True, result)
     _ -> do
      cfg <- creader
-     result <- handleCallWrapper qlock qstat cfg args
+     result <- handleCallWrapper qlock qstat cache cfg args
      return (True, result)
 
 luxiHandler :: LuxiConfig -> U.Handler LuxiOp IO JSValue
@@ -713,10 +820,20 @@ main _ _ (server, cref, jq) = do
 
   _ <- P.installHandler P.sigCHLD P.Ignore Nothing
 
+  zygote <- try Exec.startJobZygote
+  stopZygote <- case zygote of
+    Left e -> do
+      logWarning $ "Failed to start the job zygote, job processes will be"
+                   ++ " forked instead: " ++ show (e :: IOException)
+      return $ return ()
+    Right stop -> return stop
+
   _ <- forkIO . void $ activateMasterIP
 
   initJQScheduler jq
 
+  cache <- newLiveCache
+
   finally
-    (forever $ U.listener (luxiHandler (qlock, jq, creader)) server)
-    (closeServer server >> removeFile qlockFile)
+    (forever $ U.listener (luxiHandler (qlock, jq, creader, cache)) server)
+    (closeServer server >> removeFile qlockFile >> stopZygote)
@@ -58,9 +58,11 @@ module Ganeti.UDSServer
   , clientToFd
   , closeServer
   , buildResponse
+  , buildResponseWithId
   , parseResponse
   , buildCall
   , parseCall
+  , parseCallWithId
   , recvMsg
   , recvMsgExt
   , sendMsg
@@ -74,9 +76,10 @@ import Prelude ()
 import Ganeti.Prelude
 
 import Control.Concurrent.Lifted (fork, yield)
+import Control.Concurrent.MVar (MVar, newMVar, withMVar)
 import Control.Monad.Base
 import Control.Monad.Trans.Control
-import Control.Exception (catch)
+import Control.Exception (catch, onException)
 import Control.Monad
 import qualified Data.ByteString as B
 import qualified Data.ByteString.UTF8 as UTF8
@@ -136,6 +139,7 @@ data MsgKeys = Method
              | Args
              | Success
              | Result
+             | Id
 
 -- | The serialisation of MsgKeys into strings in messages.
 $(genStrOfKey ''MsgKeys "strOfKey")
@@ -180,8 +184,9 @@ openClientSocket
   -> IO Handle
 openClientSocket tmo path = do
   sock <- S.socket S.AF_UNIX S.Stream S.defaultProtocol
-  withTimeout tmo "creating a connection" $
-              S.connect sock (S.SockAddrUnix path)
+  withTimeout tmo "creating a connection"
+              (S.connect sock (S.SockAddrUnix path))
+    `onException` S.sClose sock
   S.socketToHandle sock ReadWriteMode
 
 -- | Closes the handle.
@@ -353,20 +358,39 @@ buildCall mth args =
 -- | Parse the required keys out of a call.
 parseCall :: (J.JSON mth, J.JSON args) => String -> Result (mth, args)
 parseCall s = do
+  (mth, args, _) <- parseCallWithId s
+  return (mth, args)
+
+-- | Parse the required keys and the optional request identifier out of
+-- a call.
+parseCallWithId :: (J.JSON mth, J.JSON args)
+                => String -> Result (mth, args, Maybe JSValue)
+parseCallWithId s = do
   arr <- fromJResult "parsing top-level JSON message" $
            decodeStrict s :: Result (JSObject JSValue)
-  let keyFromObj :: (J.JSON a) => MsgKeys -> Result a
-      keyFromObj = fromObj (fromJSObject arr) . strOfKey
-  (,) <$> keyFromObj Method <*> keyFromObj Args
+  let obj = fromJSObject arr
+      keyFromObj :: (J.JSON a) => MsgKeys -> Result a
+      keyFromObj = fromObj obj . strOfKey
+  (,,) <$> keyFromObj Method <*> keyFromObj Args
+       <*> pure (lookup (strOfKey Id) obj)
 
 
 -- | Serialize the response to String.
 buildResponse :: Bool    -- ^ Success
               -> JSValue -- ^ The arguments
               -> String  -- ^ The serialized form
-buildResponse success args =
+buildResponse = buildResponseWithId Nothing
+
+-- | Serialize the response to a request with an optional identifier to
+-- String.
+buildResponseWithId :: Maybe JSValue -- ^ The identifier of the request
+                    -> Bool          -- ^ Success
+                    -> JSValue       -- ^ The arguments
+                    -> String        -- ^ The serialized form
+buildResponseWithId reqid success args =
   let ja = [ (strOfKey Success, JSBool success)
            , (strOfKey Result, args)]
+           ++ maybe [] (\i -> [(strOfKey Id, i)]) reqid
       jo = toJSObject ja
   in encodeStrict jo
 
@@ -443,25 +467,39 @@ handleJsonMessage handler req = do
   (close, call_result) <- hExec handler req
   return (close, fmap J.showJSON call_result)
 
--- | Takes a request as a 'String', parses it, passes it to a handler and
--- formats its response.
-handleRawMessage
+-- | Parses a request given as a 'String' into the handler's input type,
+-- also returning the identifier of the request, if it has one.
+parseRawMessage
+    :: Handler i m o            -- ^ handler
+    -> String                   -- ^ raw unparsed input
+    -> (Maybe JSValue, Result i)
+parseRawMessage handler payload =
+  case parseCallWithId payload of
+    Bad err -> (Nothing, Bad err)
+    Ok (mth, args, reqid) -> (reqid, hParse handler mth args)
+
+-- | Passes a parsed request to a handler and formats its response.
+handleParsedMessage
     :: (J.JSON o, MonadLog m)
     => Handler i m o            -- ^ handler
-    -> String                   -- ^ raw unparsed input
+    -> Maybe JSValue            -- ^ identifier of the request
+    -> Result i                 -- ^ parsed input
     -> m (Bool, String)
-handleRawMessage handler payload =
-  case parseCall payload >>= uncurry (hParse handler) of
-    Bad err -> do
-         let errmsg = "Failed to parse request: " ++ err
-         logWarning errmsg
-         return (False, buildResponse False (J.showJSON errmsg))
-    Ok req -> do
-        logDebug $ "Request: " ++ hInputLogLong handler req
-        (close, call_result_json) <- handleJsonMessage handler req
-        logMsg handler req call_result_json
-        let (status, response) = prepareMsg call_result_json
-        return (close, buildResponse status response)
+handleParsedMessage _ reqid (Bad err) = do
+  let errmsg = "Failed to parse request: " ++ err
+  logWarning errmsg
+  return (False, buildResponseWithId reqid False (J.showJSON errmsg))
+handleParsedMessage handler reqid (Ok req) = do
+  logDebug $ "Request: " ++ hInputLogLong handler req
+  (close, call_result_json) <- handleJsonMessage handler req
+  logMsg handler req call_result_json
+  let (status, response) = prepareMsg call_result_json
+  return (close, buildResponseWithId reqid status response)
+
+-- | Sends a message to a client while holding the client's send lock, so
+-- that responses computed concurrently are not interleaved.
+sendMsgLocked :: MVar () -> Client -> String -> IO ()
+sendMsgLocked lock client msg = withMVar lock . const $ sendMsg client msg
 
 isRisky :: RecvResult -> Bool
 isRisky msg = case msg of
@@ -470,12 +508,19 @@ isRisky msg = case msg of
 
 -- | Reads a request, passes it to a handler and sends a response back to the
 -- client.
+--
+-- Requests carrying an identifier are pipelined: each of them is handled
+-- in a thread of its own, so that the client can have many requests in
+-- flight on one connection, and the responses, which carry the identifier
+-- of their request, are sent in the order they become available. Requests
+-- without an identifier are handled one after another, as before.
 handleClient
-    :: (J.JSON o, MonadBase IO m, MonadLog m)
+    :: (J.JSON o, MonadBaseControl IO m, MonadLog m)
     => Handler i m o
+    -> MVar ()
     -> Client
     -> m Bool
-handleClient handler client = do
+handleClient handler lock client = do
   msg <- liftBase $ recvMsgExt client
 
   debugMode <- liftBase isDebugMode
@@ -490,21 +535,35 @@ handleClient handler client = do
                       return False
     RecvError err -> logWarning ("Error during message receiving: " ++ err) >>
                      return False
-    RecvOk payload -> do
-      (close, outMsg) <- handleRawMessage handler payload
-      liftBase $ sendMsg client outMsg
-      return close
+    RecvOk payload ->
+      case parseRawMessage handler payload of
+        (Nothing, req) -> do
+          (close, outMsg) <- handleParsedMessage handler Nothing req
+          liftBase $ sendMsgLocked lock client outMsg
+          return close
+        (reqid, req) -> do
+          -- The connection might be closed before the response is ready,
+          -- in which case it is dropped
+          let logSendError :: IOError -> IO ()
+              logSendError err = logWarning $ "Error while sending the\
+                                              \ response: " ++ show err
+          _ <- fork $ do
+            (_, outMsg) <- handleParsedMessage handler reqid req
+            liftBase $ sendMsgLocked lock client outMsg
+                         `Control.Exception.catch` logSendError
+          return True
 
 
 -- | Main client loop: runs one loop of 'handleClient', and if that
 -- doesn't report a finished (closed) connection, restarts itself.
 clientLoop
-    :: (J.JSON o, MonadBase IO m, MonadLog m)
+    :: (J.JSON o, MonadBaseControl IO m, MonadLog m)
     => Handler i m o
+    -> MVar ()
     -> Client
     -> m ()
-clientLoop handler client = do
-  result <- handleClient handler client
+clientLoop handler lock client = do
+  result <- handleClient handler lock client
   {- It's been observed sometimes that reading immediately after sending
      a response leads to worse performance, as there is nothing to read and
      the system calls are just wasted. Thus yielding before reading gives
@@ -512,7 +571,7 @@ clientLoop handler client = do
      to a bit more efficient communication.
   -}
   if result
-    then yield >> clientLoop handler client
+    then yield >> clientLoop handler lock client
     else liftBase $ closeClient client
 
 -- | Main listener loop: accepts clients, forks an I/O thread to handle
@@ -524,5 +583,6 @@ listener
     -> m ()
 listener handler server = do
   client <- liftBase $ acceptClient server
-  _ <- fork $ clientLoop handler client
+  lock <- liftBase $ newMVar ()
+  _ <- fork $ clientLoop handler lock client
   return ()
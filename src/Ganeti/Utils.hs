@@ -94,6 +94,8 @@ module Ganeti.Utils
   , needsReload
   , watchFile
   , watchFileBy
+  , watchFilesBy
+  , watchFilesChangedBy
   , safeRenameFile
   , FilePermissions(..)
   , ensurePermissions
@@ -731,51 +733,82 @@ needsReload oldstat path = do
 
 -- | Until the given point in time (useconds since the epoch), wait
 -- for the output of a given method to change and return the new value;
--- make use of the promise that the output only changes if the reference
--- has a value different than the given one.
-watchFileEx :: (Eq b) => Integer -> b -> IORef b -> (a -> Bool) -> IO a -> IO a
-watchFileEx endtime base ref check read_fn = do
+-- make use of the promise that the output only changes if the status of one
+-- of the files in the reference differs from the given one. The method is
+-- passed the files whose status changed since it was last called.
+watchFilesEx :: Integer -> M.Map FilePath FStat -> IORef (M.Map FilePath FStat)
+                -> (a -> Bool) -> ([FilePath] -> IO a) -> IO a
+watchFilesEx endtime base ref check read_fn = do
   current <- getCurrentTimeUSec
-  if current > endtime then read_fn else do
-    val <- readIORef ref
-    if val /= base
+  val <- readIORef ref
+  let changed = [ fpath | (fpath, fstat) <- M.toList val
+                        , M.lookup fpath base /= Just fstat ]
+  if current > endtime then read_fn changed else
+    if not (null changed)
       then do
-        new <- read_fn
+        new <- read_fn changed
         if check new then return new else do
           logDebug "Observed change not relevant"
           threadDelay 100000
-          watchFileEx endtime val ref check read_fn
+          watchFilesEx endtime val ref check read_fn
       else do
        threadDelay 100000
-       watchFileEx endtime base ref check read_fn
+       watchFilesEx endtime base ref check read_fn
 
 -- | Within the given timeout (in seconds), wait for for the output
 -- of the given method to satisfy a given predicate and return the new value;
 -- make use of the promise that the method will only change its value, if
--- the given file changes on disk. If the file does not exist on disk, return
--- immediately.
-watchFileBy :: FilePath -> Int -> (a -> Bool) -> IO a -> IO a
-watchFileBy fpath timeout check read_fn = do
+-- one of the given files changes on disk. The files are given with their
+-- status at the time the caller last looked at them. The method is passed
+-- the files that changed since then, or since its previous call, so it only
+-- needs to look at those.
+watchFilesChangedBy :: M.Map FilePath FStat -> Int -> (a -> Bool)
+                       -> ([FilePath] -> IO a) -> IO a
+watchFilesChangedBy fstats timeout check read_fn = do
   current <- getCurrentTimeUSec
   let endtime = current + fromIntegral timeout * 1000000
-  fstat <- getFStatSafe fpath
-  ref <- newIORef fstat
+      fpaths = M.keys fstats
+  ref <- newIORef fstats
   bracket initINotify killINotify $ \inotify -> do
-    let do_watch e = do
-                       logDebug $ "Notified of change in " ++ fpath
-                                    ++ "; event: " ++ show e
-                       when (e == Ignored)
-                         (addWatch inotify [Modify, Delete] fpath do_watch
-                            >> return ())
-                       fstat' <- getFStatSafe fpath
-                       writeIORef ref fstat'
-    _ <- addWatch inotify [Modify, Delete] fpath do_watch
-    newval <- read_fn
+    let do_watch fpath e = do
+                             logDebug $ "Notified of change in " ++ fpath
+                                          ++ "; event: " ++ show e
+                             when (e == Ignored)
+                               (addWatch inotify [Modify, Delete] fpath
+                                  (do_watch fpath) >> return ())
+                             fstat' <- getFStatSafe fpath
+                             atomicModifyIORef ref
+                               (\m -> (M.insert fpath fstat' m, ()))
+    mapM_ (\fpath -> addWatch inotify [Modify, Delete] fpath (do_watch fpath))
+          fpaths
+    -- Changes that happened before the watches were set up don't trigger
+    -- any notification
+    let hasChanged fpath = liftM ((/= M.lookup fpath fstats) . Just)
+                             $ getFStatSafe fpath
+    changed <- filterM hasChanged fpaths
+    newval <- read_fn changed
     if check newval
       then do
-        logDebug $ "File " ++ fpath ++ " changed during setup of inotify"
+        logDebug $ "Files " ++ show fpaths ++ " changed during setup of inotify"
         return newval
-      else watchFileEx endtime fstat ref check read_fn
+      else watchFilesEx endtime fstats ref check read_fn
+
+-- | Within the given timeout (in seconds), wait for for the output
+-- of the given method to satisfy a given predicate and return the new value;
+-- make use of the promise that the method will only change its value, if
+-- one of the given files changes on disk.
+watchFilesBy :: [FilePath] -> Int -> (a -> Bool) -> IO a -> IO a
+watchFilesBy fpaths timeout check read_fn = do
+  fstats <- liftM (M.fromList . zip fpaths) $ mapM getFStatSafe fpaths
+  watchFilesChangedBy fstats timeout check (const read_fn)
+
+-- | Within the given timeout (in seconds), wait for for the output
+-- of the given method to satisfy a given predicate and return the new value;
+-- make use of the promise that the method will only change its value, if
+-- the given file changes on disk. If the file does not exist on disk, return
+-- immediately.
+watchFileBy :: FilePath -> Int -> (a -> Bool) -> IO a -> IO a
+watchFileBy fpath = watchFilesBy [fpath]
 
 -- | Within the given timeout (in seconds), wait for for the output
 -- of the given method to change and return the new value; make use of
@@ -341,6 +341,17 @@ updateLocksWaiting cid prio req =
 hasPendingRequest :: ClientId -> WConfdMonad Bool
 hasPendingRequest cid = liftM (LW.hasPendingRequest cid) readLockWaiting
 
+-- | Wait for the pending request of a given owner to be granted (or to
+-- disappear otherwise), but at most the given number of seconds, capped at
+-- 'C.wconfdLockWaitTimeout'. Returns whether the owner still has a pending
+-- request. This allows jobs to wait for their locks without polling.
+waitPendingRequest :: ClientId -> Double -> WConfdMonad Bool
+waitPendingRequest cid tmo =
+  liftM not
+  . waitLockWaiting (not . LW.hasPendingRequest cid)
+  . floor . (* 1000000) . max 0
+  $ min tmo (fromIntegral C.wconfdLockWaitTimeout)
+
 -- | Free all locks of a given owner (i.e., a job-id lockfile pair).
 freeLocks :: ClientId -> WConfdMonad ()
 freeLocks cid =
@@ -464,5 +475,6 @@ exportedFunctions = [ 'echo
                     , 'opportunisticLockUnion
                     , 'guardedOpportunisticLockUnion
                     , 'hasPendingRequest
+                    , 'waitPendingRequest
                     ]
                     ++ CM.exportedFunctions
@@ -62,6 +62,9 @@ module Ganeti.WConfd.Monad
   , modifyLockWaiting
   , modifyLockWaiting_
   , readLockWaiting
+  , waitLockWaiting
+  , signalChange
+  , waitForChange
   , readLockAllocation
   , modifyTempResState
   , modifyTempResStateErr
@@ -74,6 +77,7 @@ import Ganeti.Prelude
 
 import Control.Arrow ((&&&), second)
 import Control.Concurrent (forkIO, myThreadId)
+import Control.Concurrent.MVar (MVar, newEmptyMVar, putMVar, readMVar)
 import Control.Exception.Lifted (bracket)
 import Control.Monad
 import Control.Monad.Base
@@ -82,11 +86,13 @@ import Control.Monad.State
 import Control.Monad.Trans.Control
 import Data.Functor.Identity
 import Data.IORef.Lifted
+import Data.Maybe (isJust)
 import Data.Monoid (Any(..))
 import qualified Data.Set as S
 import Data.Tuple (swap)
 import System.Posix.Process (getProcessID)
 import System.Time (getClockTime, ClockTime)
+import System.Timeout (timeout)
 import qualified Text.JSON as J
 
 import Ganeti.BasicTypes
@@ -138,6 +144,9 @@ data DaemonHandle = DaemonHandle
   , dhSaveLocksWorker :: AsyncWorker () ()
   , dhSaveTempResWorker :: AsyncWorker () ()
   , dhLivelock :: Livelock
+  , dhLockWaitingChange :: IORef (MVar ())
+    -- ^ A barrier that is filled, and replaced by a fresh one, whenever
+    -- the lock waiting state changes
   }
 
 mkDaemonHandle :: FilePath
@@ -180,8 +189,10 @@ mkDaemonHandle cpath cstat lstat trstat
 
   saveTempResWorker <- saveTempResWorkerFn $ dsTempRes `liftM` readIORef ds
 
+  lockChange <- newIORef =<< liftBase newEmptyMVar
+
   return $ DaemonHandle ds cpath saveWorker saveLockWorker saveTempResWorker
-                        livelock
+                        livelock lockChange
 
 -- * The monad and its instances
 
@@ -376,6 +387,7 @@ modifyLockWaiting f = do
     logDebug . (++) "Locks became available for " . show $ S.toList nfy
     liftIO . mapM_ (notifyJob . ciPid) $ S.toList nfy
     logDebug "Finished notifying processes"
+  liftBase $ signalLockWaitingChange dh
   return r
 
 -- | Atomically modifies the lock allocation state in WConfdMonad, not
@@ -391,6 +403,46 @@ readLockWaiting = liftM dsLockWaiting
                   =<< daemonHandle
 
 
+-- | Fill a change barrier, waking up all threads waiting for it in
+-- 'waitForChange', and replace it by a fresh one.
+signalChange :: IORef (MVar ()) -> IO ()
+signalChange ref = do
+  new <- newEmptyMVar
+  old <- atomicModifyIORef ref ((,) new)
+  putMVar old ()
+
+-- | Wait until a condition holds, but at most the given number of
+-- microseconds. Returns whether the condition holds. The condition is only
+-- re-evaluated when the barrier is signalled with 'signalChange', so waiting
+-- doesn't cost anything while nothing happens. The condition is always
+-- evaluated at least once, even if the timeout is not positive.
+waitForChange :: IORef (MVar ()) -> IO Bool -> Int -> IO Bool
+waitForChange ref cond tmo = do
+  let check = do
+        -- Take the barrier before evaluating the condition, so that a change
+        -- happening in between wakes us up.
+        barrier <- readIORef ref
+        ok <- cond
+        unless ok $ readMVar barrier >> check
+  ok <- cond
+  if ok || tmo <= 0
+    then return ok
+    else liftM isJust $ timeout tmo check
+
+-- | Wake up all threads waiting in 'waitLockWaiting'.
+signalLockWaitingChange :: DaemonHandle -> IO ()
+signalLockWaitingChange = signalChange . dhLockWaitingChange
+
+-- | Wait until the lock waiting state satisfies a given predicate, but at
+-- most the given number of microseconds. Returns whether the predicate is
+-- satisfied. See 'waitForChange'.
+waitLockWaiting :: (GanetiLockWaiting -> Bool) -> Int -> WConfdMonad Bool
+waitLockWaiting p tmo = do
+  dh <- daemonHandle
+  liftBase . waitForChange (dhLockWaitingChange dh)
+    (liftM (p . dsLockWaiting) . readIORef $ dhDaemonState dh)
+    $ tmo
+
 -- | Read the underlying lock allocation.
 readLockAllocation :: WConfdMonad (LA.LockAllocation GanetiLocks ClientId)
 readLockAllocation = liftM LW.getAllocation readLockWaiting
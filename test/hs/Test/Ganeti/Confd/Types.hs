@@ -68,7 +68,12 @@ instance Arbitrary ConfdQuery where
   arbitrary = oneof [ pure EmptyQuery
                     , PlainQuery <$> genName
                     , DictQuery <$> arbitrary
+                    , MultiQuery <$> listOf1 ((,) <$> arbitrary <*> simpleQuery)
                     ]
+    where simpleQuery = oneof [ pure EmptyQuery
+                              , PlainQuery <$> genName
+                              , DictQuery <$> arbitrary
+                              ]
 
 $(genArbitrary ''ConfdRequest)
 
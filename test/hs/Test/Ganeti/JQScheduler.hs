@@ -96,6 +96,7 @@ instance Arbitrary QueuedJob where
           .~ limitString
 
     return $ QueuedJob jid ops justNoTs justNoTs justNoTs Nothing Nothing
+                       Nothing
 
 
 instance Arbitrary JobWithStat where
@@ -181,6 +182,7 @@ case_reasonRateLimit = do
               , qjEndTimestamp = Nothing
               , qjLivelock = Nothing
               , qjProcessId = Nothing
+              , qjPhaseStats = Nothing
               }
 
   -- 3 jobs, limited to 2 of them running.
@@ -302,6 +304,8 @@ case_matchPredicate = do
                   , qoStartTimestamp = Nothing
                   , qoExecTimestamp = Nothing
                   , qoEndTimestamp = Nothing
+                  , qoLockStats = []
+                  , qoPhaseStats = Nothing
                   }
               ]
           , qjReceivedTimestamp = Nothing
@@ -309,6 +313,7 @@ case_matchPredicate = do
           , qjEndTimestamp = Nothing
           , qjLivelock = Nothing
           , qjProcessId = Nothing
+          , qjPhaseStats = Nothing
           }
 
   let watermark = jid1
@@ -424,6 +429,8 @@ case_jobFiltering = do
                   , qoStartTimestamp = Nothing
                   , qoExecTimestamp = Nothing
                   , qoEndTimestamp = Nothing
+                  , qoLockStats = []
+                  , qoPhaseStats = Nothing
                   }
               ]
           , qjReceivedTimestamp = Nothing
@@ -431,6 +438,7 @@ case_jobFiltering = do
           , qjEndTimestamp = Nothing
           , qjLivelock = Nothing
           , qjProcessId = Nothing
+          , qjPhaseStats = Nothing
           }
 
       j2 = j1 & jJobL . qjIdL .~ jid2
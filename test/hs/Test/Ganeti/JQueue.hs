@@ -79,6 +79,7 @@ prop_JobPriority =
          $ \ops -> property $ do
   jid0 <- makeJobId 0
   let job = QueuedJob jid0 ops justNoTs justNoTs justNoTs Nothing Nothing
+                        Nothing
   return $ calcJobPriority job ==? minimum (map qoPriority ops) :: Gen Property
 
 -- | Tests default job status.
@@ -93,6 +94,7 @@ prop_JobStatus =
   forAll genJobId $ \jid ->
   forAll genQueuedOpCode $ \op ->
   let job1 = QueuedJob jid [op] justNoTs justNoTs justNoTs Nothing Nothing
+                       Nothing
       st1 = calcJobStatus job1
       op_succ = op { qoStatus = OP_STATUS_SUCCESS }
       op_err  = op { qoStatus = OP_STATUS_ERROR }
@@ -124,7 +126,7 @@ case_JobStatusPri_py_equiv = do
                        ops <- vectorOf num_ops genQueuedOpCode
                        jid <- genJobId
                        return $ QueuedJob jid ops justNoTs justNoTs justNoTs
-                                          Nothing Nothing)
+                                          Nothing Nothing Nothing)
   let serialized = encode jobs
   -- check for non-ASCII fields, usually due to 'arbitrary :: String'
   mapM_ (\job -> when (any (not . isAscii) (encode job)) .
@@ -183,6 +185,7 @@ prop_LoadJobs = monadicIO $ do
   ops <- pick $ resize 5 (listOf1 genQueuedOpCode)
   jid <- pick genJobId
   let job = QueuedJob jid ops justNoTs justNoTs justNoTs Nothing Nothing
+                      Nothing
       job_s = encode job
   -- check that jobs in the right directories are parsed correctly
   (missing, current, archived, missing_current, broken) <-
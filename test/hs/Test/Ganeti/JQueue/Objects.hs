@@ -62,13 +62,15 @@ genQueuedOpCode =
   QueuedOpCode <$> (ValidOpCode <$> arbitrary) <*>
     arbitrary <*> pure JSNull <*> pure [] <*>
     choose (C.opPrioLowest, C.opPrioHighest) <*>
-    pure justNoTs <*> pure justNoTs <*> pure justNoTs
+    pure justNoTs <*> pure justNoTs <*> pure justNoTs <*> pure [] <*>
+    pure Nothing
 
 -- | Generates an static, empty job.
 emptyJob :: (Monad m) => m QueuedJob
 emptyJob = do
   jid0 <- makeJobId 0
   return $ QueuedJob jid0 [] justNoTs justNoTs justNoTs Nothing Nothing
+                     Nothing
 
 -- | Generates a job ID.
 genJobId :: Gen JobId
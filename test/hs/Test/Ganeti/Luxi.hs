@@ -70,6 +70,7 @@ instance Arbitrary Luxi.LuxiOp where
     lreq <- arbitrary
     case lreq of
       Luxi.ReqQuery -> Luxi.Query <$> arbitrary <*> genFields <*> genFilter
+                                  <*> genMaybe genNonNegative
       Luxi.ReqQueryFields -> Luxi.QueryFields <$> arbitrary <*> genFields
       Luxi.ReqQueryNodes -> Luxi.QueryNodes <$> listOf genFQDN <*>
                             genFields <*> arbitrary
@@ -100,6 +101,10 @@ instance Arbitrary Luxi.LuxiOp where
       Luxi.ReqWaitForJobChange -> Luxi.WaitForJobChange <$> arbitrary <*>
                                   genFields <*> pure J.JSNull <*>
                                   pure J.JSNull <*> arbitrary
+      Luxi.ReqWaitForJobsChange -> Luxi.WaitForJobsChange <$>
+                                   listOf ((,,) <$> arbitrary <*>
+                                           pure J.JSNull <*> pure J.JSNull)
+                                   <*> genFields <*> arbitrary
       Luxi.ReqPickupJob -> Luxi.PickupJob <$> arbitrary
       Luxi.ReqArchiveJob -> Luxi.ArchiveJob <$> arbitrary
       Luxi.ReqAutoArchiveJobs -> Luxi.AutoArchiveJobs <$> arbitrary <*>
@@ -116,6 +121,26 @@ prop_CallEncoding op =
   (US.parseCall (US.buildCall (Luxi.strOfOp op) (Luxi.opToArgs op))
     >>= uncurry Luxi.decodeLuxiCall) ==? Ok op
 
+-- | Checks that the optional request identifier is parsed from calls and
+-- sent back in responses.
+case_CallWithId :: Assertion
+case_CallWithId = do
+  let reqid = J.showJSON (7 :: Int)
+      call = "{\"method\": \"QueryTags\", \"args\": [], \"id\": 7}"
+      parse :: String -> Result (String, J.JSValue, Maybe J.JSValue)
+      parse = US.parseCallWithId
+  assertEqual "request with an id"
+    (Ok ("QueryTags", J.JSArray [], Just reqid)) (parse call)
+  assertEqual "request without an id"
+    (Ok ("QueryTags", J.JSArray [], Nothing))
+    (parse $ US.buildCall "QueryTags" (J.JSArray []))
+  let respId = fmap (lookup (US.strOfKey US.Id) . J.fromJSObject) .
+                 J.decodeStrict
+  assertEqual "response with an id" (J.Ok (Just reqid))
+    (respId $ US.buildResponseWithId (Just reqid) True J.JSNull)
+  assertEqual "response without an id" (J.Ok Nothing)
+    (respId $ US.buildResponse True J.JSNull)
+
 -- | Server ping-pong helper.
 luxiServerPong :: Luxi.Client -> IO ()
 luxiServerPong c = do
@@ -172,5 +197,6 @@ case_AllDefined = do
 testSuite "Luxi"
           [ 'prop_CallEncoding
           , 'prop_ClientServer
+          , 'case_CallWithId
           , 'case_AllDefined
           ]
@@ -322,6 +322,7 @@ genOpCodeFromId op_id cfg =
         <*> arbitrary                       -- name_check
         <*> arbitrary                       -- ignore_ipolicy
         <*> arbitrary                       -- opportunistic_locking
+        <*> arbitrary                       -- node_lock_planning
         <*> pure emptyJSObject              -- beparams
         <*> arbitrary                       -- disks
         <*> arbitrary                       -- disk_template
@@ -496,6 +497,7 @@ genOpCodeFromId op_id cfg =
         <*> arbitrary                -- zeroing_timeout_fixed
         <*> arbitrary                -- zeroing_timeout_per_mib
         <*> arbitrary                -- long_sleep
+        <*> arbitrary                -- incremental
     "OP_BACKUP_REMOVE" ->
       OpCodes.OpBackupRemove <$> getInstanceName <*> return Nothing
     "OP_TEST_ALLOCATOR" ->
@@ -0,0 +1,176 @@
+{-# LANGUAGE TemplateHaskell #-}
+
+{-| Unittests for the live data cache
+
+-}
+
+{-
+
+Copyright (C) 2016 Google Inc.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+1. Redistributions of source code must retain the above copyright notice,
+this list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright
+notice, this list of conditions and the following disclaimer in the
+documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+-}
+
+module Test.Ganeti.Query.LiveCache (testQuery_LiveCache) where
+
+import Control.Concurrent (forkIO)
+import Control.Concurrent.MVar
+import Data.IORef
+import qualified Data.Map as Map
+import Test.QuickCheck
+import Test.QuickCheck.Monadic
+
+import Test.Ganeti.TestHelper
+import Test.Ganeti.TestCommon
+import Test.Ganeti.Objects (genEmptyCluster)
+
+import Ganeti.JSON
+import Ganeti.Objects
+import Ganeti.Query.LiveCache
+import Ganeti.Rpc
+
+{-# ANN module "HLint: ignore Use camelCase" #-}
+
+-- * Helpers
+
+-- | A node information call without storage units and hypervisors.
+nodeInfoCall :: RpcCallNodeInfo
+nodeInfoCall = RpcCallNodeInfo [] []
+
+-- | Returns a stubbed RPC executor, answering every call with the given
+-- result, and a counter of the calls made to the nodes.
+countingExecutor :: ERpcError RpcResultNodeInfo
+                 -> IO ( [(Node, RpcCallNodeInfo)]
+                         -> IO [(Node, ERpcError RpcResultNodeInfo)]
+                       , IORef Int )
+countingExecutor result = do
+  counter <- newIORef 0
+  let execute calls = do
+        atomicModifyIORef counter (\n -> (n + length calls, ()))
+        return [(node, result) | (node, _) <- calls]
+  return (execute, counter)
+
+-- | A successful node information result.
+goodResult :: ERpcError RpcResultNodeInfo
+goodResult = Right $ RpcResultNodeInfo "boot-id" [] []
+
+-- | Returns the calls for all nodes of a configuration.
+callsFor :: ConfigData -> [(Node, RpcCallNodeInfo)]
+callsFor cfg = [ (node, nodeInfoCall)
+               | node <- Map.elems . fromContainer $ configNodes cfg ]
+
+-- * Test cases
+
+-- | Tests that a second query within the maximum age reuses the results.
+prop_reuse :: Property
+prop_reuse = forAll (genEmptyCluster 1) $ \cfg -> monadicIO $ do
+  count <- run $ do
+    cache <- newLiveCache
+    (execute, counter) <- countingExecutor goodResult
+    _ <- cachedNodeInfoWith execute (UseCache cache 60) cfg $ callsFor cfg
+    _ <- cachedNodeInfoWith execute (UseCache cache 60) cfg $ callsFor cfg
+    readIORef counter
+  stop $ count ==? 1
+
+-- | Tests that queries not using the cache always contact the nodes.
+prop_noCache :: Property
+prop_noCache = forAll (genEmptyCluster 1) $ \cfg -> monadicIO $ do
+  count <- run $ do
+    (execute, counter) <- countingExecutor goodResult
+    _ <- cachedNodeInfoWith execute NoCache cfg $ callsFor cfg
+    _ <- cachedNodeInfoWith execute NoCache cfg $ callsFor cfg
+    readIORef counter
+  stop $ count ==? 2
+
+-- | Tests that failed calls are not kept in the cache.
+prop_errorsEvicted :: Property
+prop_errorsEvicted = forAll (genEmptyCluster 1) $ \cfg -> monadicIO $ do
+  (count, results) <- run $ do
+    cache <- newLiveCache
+    (execute, counter) <-
+      countingExecutor . Left $ RpcResultError "node unreachable"
+    _ <- cachedNodeInfoWith execute (UseCache cache 60) cfg $ callsFor cfg
+    results <- cachedNodeInfoWith execute (UseCache cache 60) cfg $
+                 callsFor cfg
+    count <- readIORef counter
+    return (count, results)
+  stop $ conjoin
+    [ count ==? 2
+    , map snd results ==? [Left $ RpcResultError "node unreachable"]
+    ]
+
+-- | Tests that a change of the configuration invalidates the cache.
+prop_serialChange :: Property
+prop_serialChange = forAll (genEmptyCluster 1) $ \cfg -> monadicIO $ do
+  count <- run $ do
+    cache <- newLiveCache
+    (execute, counter) <- countingExecutor goodResult
+    let cfg' = cfg { configSerial = configSerial cfg + 1 }
+    _ <- cachedNodeInfoWith execute (UseCache cache 60) cfg $ callsFor cfg
+    _ <- cachedNodeInfoWith execute (UseCache cache 60) cfg' $ callsFor cfg'
+    readIORef counter
+  stop $ count ==? 2
+
+-- | Tests that concurrent queries wait for the call already in flight
+-- instead of contacting the nodes again.
+prop_concurrentWaiters :: Property
+prop_concurrentWaiters = forAll (genEmptyCluster 1) $ \cfg -> monadicIO $ do
+  (count, first, second) <- run $ do
+    cache <- newLiveCache
+    counter <- newIORef (0 :: Int)
+    started <- newEmptyMVar
+    release <- newEmptyMVar
+    let execute calls = do
+          atomicModifyIORef counter (\n -> (n + length calls, ()))
+          _ <- tryPutMVar started ()
+          readMVar release
+          return [(node, goodResult) | (node, _) <- calls]
+        runQuery = cachedNodeInfoWith execute (UseCache cache 60) cfg $
+                     callsFor cfg
+    firstVar <- newEmptyMVar
+    _ <- forkIO $ runQuery >>= putMVar firstVar
+    -- the second query starts only once the first one's call is in flight
+    takeMVar started
+    secondVar <- newEmptyMVar
+    _ <- forkIO $ runQuery >>= putMVar secondVar
+    putMVar release ()
+    first <- takeMVar firstVar
+    second <- takeMVar secondVar
+    count <- readIORef counter
+    return (count, first, second)
+  stop $ conjoin
+    [ count ==? 1
+    , map snd first ==? [goodResult]
+    , map snd second ==? [goodResult]
+    ]
+
+testSuite "Query/LiveCache"
+  [ 'prop_reuse
+  , 'prop_noCache
+  , 'prop_errorsEvicted
+  , 'prop_serialChange
+  , 'prop_concurrentWaiters
+  ]
@@ -0,0 +1,86 @@
+{-# LANGUAGE TemplateHaskell #-}
+
+{-| Unittests for the WConfd monad
+
+-}
+
+{-
+
+Copyright (C) 2016 Google Inc.
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+1. Redistributions of source code must retain the above copyright notice,
+this list of conditions and the following disclaimer.
+
+2. Redistributions in binary form must reproduce the above copyright
+notice, this list of conditions and the following disclaimer in the
+documentation and/or other materials provided with the distribution.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+-}
+
+module Test.Ganeti.WConfd.Monad (testWConfd_Monad) where
+
+import Control.Concurrent (forkIO, threadDelay)
+import Control.Concurrent.MVar (newEmptyMVar)
+import Data.IORef
+import Test.HUnit
+
+import Test.Ganeti.TestHelper
+
+import Ganeti.WConfd.Monad
+
+{-# ANN module "HLint: ignore Use camelCase" #-}
+
+-- * Waiting for changes
+
+-- | Tests that a zero timeout still evaluates the condition once.
+case_waitForChange_zeroTimeout :: Assertion
+case_waitForChange_zeroTimeout = do
+  ref <- newIORef =<< newEmptyMVar
+  satisfied <- waitForChange ref (return True) 0
+  assertBool "a satisfied condition is reported with a zero timeout" satisfied
+  unsatisfied <- waitForChange ref (return False) 0
+  assertBool "an unsatisfied condition must not be reported as satisfied"
+    (not unsatisfied)
+
+-- | Tests that waiting ends when the condition changes.
+case_waitForChange_signalled :: Assertion
+case_waitForChange_signalled = do
+  ref <- newIORef =<< newEmptyMVar
+  state <- newIORef False
+  _ <- forkIO $ do
+    threadDelay 10000
+    writeIORef state True
+    signalChange ref
+  satisfied <- waitForChange ref (readIORef state) 10000000
+  assertBool "waiting must end once the condition is satisfied" satisfied
+
+-- | Tests that waiting for a condition which never holds times out.
+case_waitForChange_timeout :: Assertion
+case_waitForChange_timeout = do
+  ref <- newIORef =<< newEmptyMVar
+  _ <- forkIO $ threadDelay 10000 >> signalChange ref
+  satisfied <- waitForChange ref (return False) 50000
+  assertBool "an unsatisfied condition must time out" (not satisfied)
+
+testSuite "WConfd/Monad"
+  [ 'case_waitForChange_zeroTimeout
+  , 'case_waitForChange_signalled
+  , 'case_waitForChange_timeout
+  ]
@@ -82,6 +82,7 @@ import Test.Ganeti.Query.Aliases
 import Test.Ganeti.Query.Filter
 import Test.Ganeti.Query.Instance
 import Test.Ganeti.Query.Language
+import Test.Ganeti.Query.LiveCache
 import Test.Ganeti.Query.Network
 import Test.Ganeti.Query.Query
 import Test.Ganeti.Rpc
@@ -98,6 +99,7 @@ import Test.Ganeti.Types
 import Test.Ganeti.Utils
 import Test.Ganeti.Utils.MultiMap
 import Test.Ganeti.Utils.Statistics
+import Test.Ganeti.WConfd.Monad
 import Test.Ganeti.WConfd.Ssconf
 import Test.Ganeti.WConfd.TempRes
 
@@ -159,6 +161,7 @@ allTests =
   , testQuery_Filter
   , testQuery_Instance
   , testQuery_Language
+  , testQuery_LiveCache
   , testQuery_Network
   , testQuery_Query
   , testRpc
@@ -172,6 +175,7 @@ allTests =
   , testUtils
   , testUtils_MultiMap
   , testUtils_Statistics
+  , testWConfd_Monad
   , testWConfd_Ssconf
   , testWConfd_TempRes
   ]
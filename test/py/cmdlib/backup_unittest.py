@@ -143,6 +143,10 @@ class TestLUBackupExportBase(CmdlibTestCase):
       self.RpcResultsBuilder() \
         .CreateSuccessfulNodeResult(self.master, None)
 
+    self.rpc.call_export_rebuild_disks.return_value = \
+      self.RpcResultsBuilder() \
+        .CreateSuccessfulNodeResult(self.master, None)
+
   def testRemoveRunningInstanceWithoutShutdown(self):
     inst = self.cfg.AddNewInstance(admin_state=constants.ADMINST_UP)
     op = opcodes.OpBackupExport(instance_name=inst.name,
@@ -223,6 +227,7 @@ class TestLUBackupExportLocalExport(TestLUBackupExportBase):
   def testPlainOfflineExport(self):
     self._PrepareInstance(online=False)
     self.ExecOpCode(self.op)
+    self.assertFalse(self.rpc.call_export_rebuild_disks.called)
 
   @TrySnapshots(False)
   @InstanceRemoved(False)
@@ -261,6 +266,33 @@ class TestLUBackupExportLocalExport(TestLUBackupExportBase):
     op = self.CopyOpCode(self.op, shutdown=False, long_sleep=True)
     self.ExecOpCodeExpectOpPrereqError(op, ".*long sleep.*")
 
+  @TrySnapshots(False)
+  @InstanceRemoved(False)
+  def testIncrementalExport(self):
+    manifest = {
+      "id": "mock_manifest",
+      "chunk_size": 4096,
+      "size": 4096,
+      "checksums": ["mock_checksum"],
+      }
+    self.rpc.call_export_manifests.return_value = \
+      self.RpcResultsBuilder() \
+        .CreateSuccessfulNodeResult(self.target_node, [manifest])
+
+    op = self.CopyOpCode(self.op, incremental=True)
+    self.ExecOpCode(op)
+
+    self.rpc.call_export_manifests.assert_called_once_with(
+      self.target_node.uuid, op.instance_name)
+    (_, _, opts, _, _, _, _) = self.rpc.call_export_start.call_args[0]
+    self.assertTrue(opts.incremental)
+    self.assertEqual(opts.delta_base, manifest)
+    (node_uuid, instance_name, _) = \
+      self.rpc.call_export_rebuild_disks.call_args[0]
+    self.assertEqual(node_uuid, self.target_node.uuid)
+    self.assertEqual(instance_name, op.instance_name)
+    self.assertTrue(self.rpc.call_finalize_export.called)
+
 
 class TestLUBackupExportRemoteExport(TestLUBackupExportBase):
   def setUp(self):
@@ -285,6 +317,11 @@ class TestLUBackupExportRemoteExport(TestLUBackupExportBase):
     self.ExecOpCodeExpectOpPrereqError(op,
                                        "Missing destination X509 CA")
 
+  @InstanceRemoved(False)
+  def testRemoteIncrementalExport(self):
+    op = self.CopyOpCode(self.op, incremental=True)
+    self.ExecOpCodeExpectOpPrereqError(op, ".*only supported in local mode")
+
 
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
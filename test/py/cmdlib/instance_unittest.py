@@ -45,6 +45,7 @@ from ganeti import config
 from ganeti import constants
 from ganeti import errors
 from ganeti import ht
+from ganeti import locking
 from ganeti import opcodes
 from ganeti import objects
 from ganeti.rpc import node as rpc
@@ -485,6 +486,44 @@ class TestLUInstanceCreate(CmdlibTestCase):
                          iallocator="mock")
     self.ExecOpCode(op)
 
+  def testIAllocatorNodeLockPlanning(self):
+    op = self.CopyOpCode(self.plain_op,
+                         pnode=self.REMOVE,
+                         iallocator="mock")
+    self.ExecOpCode(op)
+
+    node_locks = [lock for lock in self.wconfd.all_locks
+                  if lock.startswith("node/")]
+    self.assertEqual(sorted(node_locks),
+                     sorted(["node/%s" % self.node1.uuid,
+                             "node/%s" % self.node2.uuid]))
+
+  def testIAllocatorNodeLockPlanningWithTimeout(self):
+    op = self.CopyOpCode(self.plain_op,
+                         pnode=self.REMOVE,
+                         iallocator="mock")
+    # With a lock timeout, the acquisition of the node and node resource
+    # locks is collated
+    self.mcpu.ExecOpCode(op, None, timeout=60.0)
+
+    node_names = sorted([self.node1.name, self.node2.name])
+    ((_, _, req), _) = self.iallocator_cls.call_args
+    self.assertEqual(sorted(req.node_whitelist), node_names)
+    node_res_locks = [lock for lock in self.wconfd.all_locks
+                      if lock.startswith("node-res/")]
+    self.assertEqual(sorted(node_res_locks),
+                     sorted(["node-res/%s" % self.node1.uuid,
+                             "node-res/%s" % self.node2.uuid]))
+
+  def testIAllocatorWithoutNodeLockPlanning(self):
+    op = self.CopyOpCode(self.plain_op,
+                         pnode=self.REMOVE,
+                         iallocator="mock",
+                         node_lock_planning=False)
+    self.ExecOpCode(op)
+
+    self.assertTrue("node/%s" % locking.LOCKSET_NAME in self.wconfd.all_locks)
+
   def testIAllocatorOpportunisticLocking(self):
     op = self.CopyOpCode(self.plain_op,
                          pnode=self.REMOVE,
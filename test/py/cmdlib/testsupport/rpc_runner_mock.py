@@ -50,12 +50,49 @@ def MockHooksExecutionFn(nodes, _hpath, _phase, _env):
   return results.Build()
 
 
+class _CompletedRpcFuture(object):
+  """Future-like wrapper around an already available RPC result.
+
+  """
+  def __init__(self, result):
+    self._result = result
+
+  def Done(self):
+    return True
+
+  def GetResult(self):
+    return self._result
+
+
+class MockRpcBatch(object):
+  """Replacement for L{rpc.RpcBatch} using the mocked RPC runner.
+
+  Calls are forwarded to the C{call_*} mocks of the runner immediately, so
+  tests can set up return values and side effects as for direct calls.
+
+  """
+  def __init__(self, runner):
+    self._runner = runner
+
+  def __getattr__(self, name):
+    if not name.startswith("call_"):
+      raise AttributeError(name)
+
+    fn = getattr(self._runner, name)
+
+    return lambda *args, **kwargs: _CompletedRpcFuture(fn(*args, **kwargs))
+
+  def Run(self):
+    pass
+
+
 def CreateRpcRunnerMock():
   """Creates a new L{mock.MagicMock} tailored for L{rpc.RpcRunner}
 
   """
   ret = mock.MagicMock(spec=rpc.RpcRunner)
   ret.call_hooks_runner.side_effect = MockHooksExecutionFn
+  ret.Batch.side_effect = lambda: MockRpcBatch(ret)
   return ret
 
 
@@ -58,6 +58,9 @@ class MockClient(object):
   def HasPendingRequest(self, _cid):
     return False
 
+  def WaitPendingRequest(self, _cid, _timeout):
+    return False
+
   def ListLocks(self, *_):
     result = []
     for lock in self.wconfdmock.mylocks:
@@ -40,6 +40,7 @@ import tempfile
 import testutils
 import testutils_ssh
 import unittest
+from cStringIO import StringIO
 
 from ganeti import backend
 from ganeti import constants
@@ -50,6 +51,7 @@ from ganeti import objects
 from ganeti import serializer
 from ganeti import ssh
 from ganeti import utils
+from ganeti.impexpd import delta
 from testutils.config_mock import ConfigMock
 
 
@@ -2242,5 +2244,75 @@ class TestOSEnvironment(unittest.TestCase):
     self.assertEqual("more_privacy", env["OSP_ANOTHER_PRIVATE_PARAM"])
 
 
+class TestRebuildExportImage(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.olddir = os.path.join(self.tmpdir, "inst1")
+    self.newdir = os.path.join(self.tmpdir, "inst1.new")
+    os.mkdir(self.olddir)
+    os.mkdir(self.newdir)
+
+    self.base_data = "".join(chr(ord("a") + i) * 100 for i in range(10))
+    self.base_image = os.path.join(self.olddir, "disk0")
+    utils.WriteFile(self.base_image, data=self.base_data)
+    self.base = delta.ComputeManifest(StringIO(self.base_data),
+                                      chunk_size=64)
+
+    self.image = os.path.join(self.newdir, "disk0")
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def _WriteDelta(self, data, base):
+    dst = StringIO()
+    delta.WriteDelta(StringIO(data), dst, base=base, chunk_size=64)
+    utils.WriteFile(self.image, data=dst.getvalue())
+
+  def _ReadManifest(self):
+    return serializer.LoadJson(utils.ReadFile(self.image + ".manifest"))
+
+  def testIncremental(self):
+    data = self.base_data[:300] + "XYZ" + self.base_data[303:]
+    self._WriteDelta(data, self.base)
+
+    backend._RebuildExportImage(self.image, self.base_image, self.base)
+
+    self.assertEqual(utils.ReadFile(self.image), data)
+    self.assertFalse(os.path.exists(self.image + ".delta"))
+    self.assertEqual(self._ReadManifest()["checksums"],
+                     delta.ComputeManifest(StringIO(data),
+                                           chunk_size=64)["checksums"])
+
+    # The previous export is left untouched
+    self.assertEqual(utils.ReadFile(self.base_image), self.base_data)
+
+  def testWithoutBase(self):
+    data = "Hello World" * 50
+    self._WriteDelta(data, None)
+
+    backend._RebuildExportImage(self.image, None, None)
+
+    self.assertEqual(utils.ReadFile(self.image), data)
+    self.assertEqual(self._ReadManifest()["size"], len(data))
+
+  def testWrongBase(self):
+    self._WriteDelta(self.base_data, dict(self.base, id="other"))
+
+    self.assertRaises(backend.RPCFail, backend._RebuildExportImage,
+                      self.image, self.base_image, self.base)
+    self.assertEqual(utils.ReadFile(self.base_image), self.base_data)
+
+  def testFailedApplyKeepsBase(self):
+    self._WriteDelta("x" * 1000, self.base)
+    utils.WriteFile(self.image + ".tmp",
+                    data=utils.ReadFile(self.image)[:-20])
+    os.rename(self.image + ".tmp", self.image)
+
+    self.assertRaises(backend.RPCFail, backend._RebuildExportImage,
+                      self.image, self.base_image, self.base)
+    self.assertEqual(utils.ReadFile(self.base_image), self.base_data)
+    self.assertFalse(os.path.exists(self.image + ".manifest"))
+
+
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
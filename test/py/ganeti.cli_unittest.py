@@ -480,6 +480,202 @@ class TestFormatQueryResult(unittest.TestCase):
     self.assertRaises(AssertionError, cli.FormatQueryResult, response)
 
 
+class TestFormatTableLines(unittest.TestCase):
+  def setUp(self):
+    self.columns = [
+      cli.TableColumn("Name", str, False),
+      cli.TableColumn("Size", str, True),
+      cli.TableColumn("Comment", str, False),
+      ]
+    self.consumed = []
+
+  def _GetRows(self, rows):
+    for row in rows:
+      self.consumed.append(row)
+      yield row
+
+  def testSeparator(self):
+    lines = cli._FormatTableLines(self._GetRows([["a", 1, "x"],
+                                                 ["b", 22, "y"]]),
+                                  self.columns, True, ":", None)
+    self.assertEqual(lines.next(), "Name:Size:Comment")
+    self.assertEqual(self.consumed, [])
+    self.assertEqual(lines.next(), "a:1:x")
+    self.assertEqual(len(self.consumed), 1)
+    self.assertEqual(list(lines), ["b:22:y"])
+
+  def testSample(self):
+    rows = [
+      ["a", 1, "x"],
+      ["bb", 22, "y"],
+      ["longer", 333333, "z"],
+      ]
+    lines = cli._FormatTableLines(self._GetRows(rows), self.columns, True,
+                                  None, 2)
+    self.assertEqual(lines.next(), "Name Size Comment")
+    self.assertEqual(len(self.consumed), 2)
+    self.assertEqual(list(lines), [
+      "a       1 x",
+      "bb     22 y",
+      "longer 333333 z",
+      ])
+
+  def testAllRows(self):
+    rows = [
+      ["a", 1, "x"],
+      ["bb", 22, "y"],
+      ["longer", 333333, "z"],
+      ]
+    expected = [
+      "a           1 x",
+      "bb         22 y",
+      "longer 333333 z",
+      ]
+    self.assertEqual(list(cli._FormatTableLines(rows, self.columns, False,
+                                                None, None)),
+                     expected)
+    self.assertEqual(cli.FormatTable(rows, self.columns, False, None),
+                     expected)
+
+
+class _FakePagedQueryClient:
+  def __init__(self, tc, names):
+    self.tc = tc
+    self.names = names
+    self.queries = []
+    self.live_max_age = []
+
+  @staticmethod
+  def _GetFieldDefs(fields):
+    return [objects.QueryFieldDefinition(name=name, title=name.title(),
+                                         kind=constants.QFT_TEXT)
+            for name in fields]
+
+  def QueryFields(self, resource, fields):
+    self.tc.assertEqual(resource, constants.QR_INSTANCE)
+    return objects.QueryFieldsResponse(fields=self._GetFieldDefs(fields))
+
+  def Query(self, resource, fields, qfilter, live_max_age=None):
+    self.tc.assertEqual(resource, constants.QR_INSTANCE)
+    self.queries.append((fields, qfilter))
+    self.live_max_age.append(live_max_age)
+
+    if fields == ["name"]:
+      return objects.QueryResponse(fields=None, data=[
+        [(constants.RS_NORMAL, name)] for name in self.names
+        ])
+
+    # Pages are selected by a name filter, possibly combined with the query
+    # filter
+    names = self.names
+    if qfilter is not None and qfilter[0] == qlang.OP_AND:
+      qfilter = qfilter[2]
+    if qfilter is not None and qfilter[0] == qlang.OP_OR:
+      names = [value for (_, _, value) in qfilter[1:]]
+
+    return objects.QueryResponse(fields=self._GetFieldDefs(fields), data=[
+      [(constants.RS_NORMAL, "%s-%s" % (name, field)) for field in fields]
+      for name in names
+      ])
+
+
+class TestQueryPaged(unittest.TestCase):
+  def test(self):
+    names = ["inst%s" % i for i in range(7)]
+    cl = _FakePagedQueryClient(self, names)
+    qfilter = ["=", "name", "x"]
+
+    (fdefs, rows) = cli._QueryPaged(cl, constants.QR_INSTANCE,
+                                    ["name", "os"], qfilter, "name", 3, None)
+    self.assertEqual([fdef.name for fdef in fdefs], ["name", "os"])
+    self.assertEqual(cl.queries, [(["name"], qfilter)])
+
+    self.assertEqual([row[1] for row in rows],
+                     [(constants.RS_NORMAL, "%s-os" % name)
+                      for name in names])
+
+    # Every page is restricted by the query filter as well
+    page_filters = [page_filter for (_, page_filter) in cl.queries[1:]]
+    self.assertEqual([page_filter[:2] for page_filter in page_filters],
+                     [[qlang.OP_AND, qfilter]] * 3)
+    self.assertEqual([page_filter[2] for page_filter in page_filters],
+                     [qlang.MakeSimpleFilter("name", names[0:3]),
+                      qlang.MakeSimpleFilter("name", names[3:6]),
+                      qlang.MakeSimpleFilter("name", names[6:])])
+
+  def testWithoutFilter(self):
+    names = ["inst%s" % i for i in range(5)]
+    cl = _FakePagedQueryClient(self, names)
+
+    (_, rows) = cli._QueryPaged(cl, constants.QR_INSTANCE, ["os"], None,
+                                "name", 3, None)
+    self.assertEqual(list(rows), [[(constants.RS_NORMAL, "%s-os" % name)]
+                                  for name in names])
+    self.assertEqual([page_filter for (_, page_filter) in cl.queries[1:]],
+                     [qlang.MakeSimpleFilter("name", names[0:3]),
+                      qlang.MakeSimpleFilter("name", names[3:])])
+
+  def testBelowPageSize(self):
+    names = ["inst%s" % i for i in range(3)]
+    cl = _FakePagedQueryClient(self, names)
+    qfilter = ["=", "name", "x"]
+
+    (fdefs, rows) = cli._QueryPaged(cl, constants.QR_INSTANCE,
+                                    ["name", "os"], qfilter, "name", 3, 10)
+    self.assertEqual([fdef.name for fdef in fdefs], ["name", "os"])
+    self.assertEqual(len(list(rows)), 3)
+
+    # A single query retrieves all fields
+    self.assertEqual(cl.queries, [
+      (["name"], qfilter),
+      (["name", "os"], qfilter),
+      ])
+    self.assertEqual(cl.live_max_age, [10, 10])
+
+  def testEmpty(self):
+    cl = _FakePagedQueryClient(self, [])
+
+    (fdefs, rows) = cli._QueryPaged(cl, constants.QR_INSTANCE,
+                                    ["name", "os"], None, "name", 3, 10)
+    self.assertEqual(len(fdefs), 2)
+    self.assertEqual(list(rows), [])
+    self.assertEqual(len(cl.queries), 2)
+    self.assertEqual(cl.live_max_age, [10, 10])
+
+
+class TestGenericList(unittest.TestCase):
+  def setUp(self):
+    self.lines = []
+    self._orig_to_stdout = cli.ToStdout
+    cli.ToStdout = self.lines.append
+
+  def tearDown(self):
+    cli.ToStdout = self._orig_to_stdout
+
+  def test(self):
+    cl = _FakePagedQueryClient(self, ["inst1", "inst2"])
+
+    self.assertEqual(cli.GenericList(constants.QR_INSTANCE, ["name", "os"],
+                                     None, None, None, True, cl=cl),
+                     constants.EXIT_SUCCESS)
+    self.assertEqual(self.lines, [
+      "Name       Os",
+      "inst1-name inst1-os",
+      "inst2-name inst2-os",
+      ])
+    self.assertEqual(len(cl.queries), 2)
+    self.assertEqual(cl.live_max_age, [None, None])
+
+  def testLiveMaxAge(self):
+    cl = _FakePagedQueryClient(self, ["inst1", "inst2"])
+
+    self.assertEqual(cli.GenericList(constants.QR_INSTANCE, ["name", "os"],
+                                     None, None, None, True, cl=cl,
+                                     live_max_age=0),
+                     constants.EXIT_SUCCESS)
+    self.assertEqual(cl.live_max_age, [0, 0])
+
+
 class _MockJobPollCb(cli.JobPollCbBase, cli.JobPollReportCbBase):
   def __init__(self, tc, job_id):
     self.tc = tc
@@ -688,6 +884,121 @@ class TestGenericPollJob(testutils.GanetiTestCase):
                          job_id, cbs, cbs, cancel_fn=(lambda: False)))
     cbs.CheckEmpty()
 
+class _MockJobsPollCb(cli.JobPollCbBase, cli.JobPollReportCbBase):
+  def __init__(self, tc):
+    self.tc = tc
+    self._wfjcr = []
+    self._jobstatus = {}
+    self.logs = []
+    self.notchanged = []
+
+  def CheckEmpty(self):
+    self.tc.assertFalse(self._wfjcr)
+    self.tc.assertFalse(self._jobstatus)
+
+  def AddWfjcResult(self, expected, result):
+    self._wfjcr.append((expected, result))
+
+  def AddQueryJobsResult(self, job_id, *args):
+    self._jobstatus[job_id] = args
+
+  def WaitForJobsChangeOnce(self, jobs, fields,
+                            timeout=constants.DEFAULT_WFJC_TIMEOUT):
+    self.tc.assertEqualValues(fields, ["status"])
+
+    (expected, result) = self._wfjcr.pop(0)
+    self.tc.assertEqualValues(sorted(jobs), expected)
+    return result
+
+  def QueryJobs(self, job_ids, fields):
+    self.tc.assertEqualValues(fields, ["status", "opstatus", "opresult"])
+    return [self._jobstatus.pop(job_id) for job_id in job_ids]
+
+  def ReportLogMessage(self, job_id, serial, timestamp, log_type, log_msg):
+    self.logs.append((job_id, serial, log_msg))
+
+  def ReportNotChanged(self, job_id, status):
+    self.notchanged.append((job_id, status))
+
+
+class TestGenericPollJobs(testutils.GanetiTestCase):
+  def test(self):
+    cbs = _MockJobsPollCb(self)
+
+    cbs.AddWfjcResult([(10, None, None), (11, None, None), (12, None, None)],
+                      {})
+    cbs.AddWfjcResult([(10, None, None), (11, None, None), (12, None, None)], {
+      10: ((constants.JOB_STATUS_RUNNING, ),
+           [(1, utils.SplitTime(1273491611.0), constants.ELOG_MESSAGE,
+             "Step 1")]),
+      11: ((constants.JOB_STATUS_SUCCESS, ), None),
+      12: None,
+      })
+    cbs.AddWfjcResult([(10, (constants.JOB_STATUS_RUNNING, ), 1)], {
+      10: ((constants.JOB_STATUS_RUNNING, ),
+           [(2, utils.SplitTime(1273491612.0), constants.ELOG_MESSAGE,
+             "Step 2")]),
+      })
+    cbs.AddWfjcResult([(10, (constants.JOB_STATUS_RUNNING, ), 2)], {
+      10: ((constants.JOB_STATUS_ERROR, ), []),
+      })
+    cbs.AddQueryJobsResult(11, constants.JOB_STATUS_SUCCESS,
+                           [constants.OP_STATUS_SUCCESS], ["Hello World"])
+    cbs.AddQueryJobsResult(10, constants.JOB_STATUS_ERROR,
+                           [constants.OP_STATUS_ERROR], ["Error code 123"])
+
+    result = list(cli.GenericPollJobs([10, 11, 12], cbs, cbs))
+    self.assertEqual(len(result), 3)
+    self.assertEqual(result[0][:2], (12, False))
+    self.assertTrue(isinstance(result[0][2], errors.JobLost))
+    self.assertEqual(result[1], (11, True, ["Hello World"]))
+    self.assertEqual(result[2][:2], (10, False))
+    self.assertTrue(isinstance(result[2][2], errors.OpExecError))
+
+    self.assertEqual(cbs.notchanged, [(10, None), (11, None), (12, None)])
+    self.assertEqual(cbs.logs, [(10, 1, "Step 1"), (10, 2, "Step 2")])
+    cbs.CheckEmpty()
+
+  def testNoJobs(self):
+    cbs = _MockJobsPollCb(self)
+    self.assertEqual(list(cli.GenericPollJobs([], cbs, cbs)), [])
+
+  def testZeroUpdateFreqParameter(self):
+    cbs = _MockJobsPollCb(self)
+    self.assertRaises(errors.ParameterError, list,
+                      cli.GenericPollJobs([1], cbs, cbs, update_freq=0))
+
+
+class _FakeJobExecutorClient(_MockJobsPollCb):
+  def SubmitManyJobs(self, jobs):
+    return [(True, 100 + idx) for idx in range(len(jobs))]
+
+
+class TestJobExecutor(testutils.GanetiTestCase):
+  def test(self):
+    cl = _FakeJobExecutorClient(self)
+    cl.AddWfjcResult([(100, None, None), (101, None, None)], {
+      100: ((constants.JOB_STATUS_SUCCESS, ), []),
+      })
+    cl.AddWfjcResult([(101, None, None)], {
+      101: ((constants.JOB_STATUS_ERROR, ), []),
+      })
+    cl.AddQueryJobsResult(100, constants.JOB_STATUS_SUCCESS,
+                          [constants.OP_STATUS_SUCCESS], ["result"])
+    cl.AddQueryJobsResult(101, constants.JOB_STATUS_ERROR,
+                          [constants.OP_STATUS_ERROR], ["failure"])
+
+    jex = cli.JobExecutor(cl=cl, verbose=False, feedback_fn=lambda _: None)
+    jex.QueueJob("first")
+    jex.QueueJob("second")
+
+    results = jex.GetResults()
+    self.assertEqual(results[0], (True, ["result"]))
+    self.assertFalse(results[1][0])
+    self.assertTrue("failure" in results[1][1])
+    cl.CheckEmpty()
+
+
 class TestFormatLogMessage(unittest.TestCase):
   def test(self):
     self.assertEqual(cli.FormatLogMessage(constants.ELOG_MESSAGE,
@@ -0,0 +1,90 @@
+#!/usr/bin/python
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for testing ganeti.client.gnt_debug"""
+
+import unittest
+
+from ganeti.client import gnt_debug
+
+import testutils
+
+
+def _Stats(levels, wait, granted=True, blockers=None):
+  if granted:
+    granted_ts = (1460000000, 0)
+  else:
+    granted_ts = None
+
+  return {
+    "levels": levels,
+    "count": 1,
+    "requested": (1460000000, 0),
+    "granted": granted_ts,
+    "wait": wait,
+    "blockers": blockers or [],
+    }
+
+
+class TestAggregateLockStats(unittest.TestCase):
+  def testEmpty(self):
+    self.assertEqual(gnt_debug._AggregateLockStats([]), ({}, {}))
+    self.assertEqual(gnt_debug._AggregateLockStats([(1, None), (2, [[]])]),
+                     ({}, {}))
+
+  def test(self):
+    jobs = [
+      (10, [[_Stats(["cluster"], 0.0)],
+            [_Stats(["node", "node-res"], 30.0, blockers=[9]),
+             _Stats(["node"], 700.0, granted=False, blockers=[9, "watcher"])]]),
+      (11, [[_Stats(["node"], 5.0, blockers=[10])]]),
+      ]
+
+    (levels, blockers) = gnt_debug._AggregateLockStats(jobs)
+
+    self.assertEqual(sorted(levels.keys()), ["cluster", "node", "node-res"])
+    self.assertEqual(levels["node"], {
+      "attempts": 3,
+      "timeouts": 1,
+      "total": 735.0,
+      "max": 700.0,
+      "buckets": [0, 1, 1, 0, 1],
+      })
+    self.assertEqual(levels["cluster"]["buckets"], [1, 0, 0, 0, 0])
+
+    self.assertEqual(sorted(blockers.keys()), ["10", "9", "watcher"])
+    self.assertEqual(blockers["9"]["attempts"], 2)
+    self.assertEqual(blockers["9"]["total"], 730.0)
+    self.assertEqual(blockers["watcher"]["timeouts"], 1)
+    self.assertEqual(blockers["10"]["max"], 5.0)
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
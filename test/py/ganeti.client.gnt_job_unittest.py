@@ -162,5 +162,35 @@ class TestCancelJob(unittest.TestCase):
     self.assertEqual(result, constants.EXIT_CONFIRMATION)
 
 
+class TestFormatLockStats(unittest.TestCase):
+  def testGranted(self):
+    info = dict(gnt_job._FormatLockStats({
+      "levels": ["node", "node-res"],
+      "count": 4,
+      "requested": (1460000000, 0),
+      "granted": (1460000012, 500000),
+      "wait": 12.5,
+      "blockers": [3891, 3895],
+      }))
+    self.assertEqual(info["Levels"], "node, node-res")
+    self.assertEqual(info["Locks"], 4)
+    self.assertEqual(info["Granted"],
+                     gnt_job.FormatTimestamp((1460000012, 500000)))
+    self.assertEqual(info["Waited"], "12.500000 seconds")
+    self.assertEqual(info["Blocked by"], "3891, 3895")
+
+  def testTimeout(self):
+    info = dict(gnt_job._FormatLockStats({
+      "levels": ["instance"],
+      "count": 1,
+      "requested": (1460000000, 0),
+      "granted": None,
+      "wait": 7.0,
+      "blockers": [],
+      }))
+    self.assertEqual(info["Granted"], "not granted (timeout)")
+    self.assertEqual(info["Blocked by"], "-")
+
+
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
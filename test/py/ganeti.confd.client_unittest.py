@@ -34,9 +34,11 @@
 import socket
 import unittest
 
+from ganeti import compat
 from ganeti import confd
 from ganeti import constants
 from ganeti import errors
+from ganeti import objects
 
 import ganeti.confd.client
 
@@ -237,5 +239,181 @@ class TestIP6Client(unittest.TestCase, _BaseClientTest):
     _BaseClientTest.setUp(self)
 
 
+class TestMultiRequests(unittest.TestCase):
+  def testMake(self):
+    queries = [(constants.CONFD_REQ_NODE_ROLE_BYNAME, "node%s" % i)
+               for i in range(5)]
+    reqs = confd.client.MakeMultiRequests(queries, max_queries=2)
+    self.assertEqual([len(req.query) for req in reqs], [2, 2, 1])
+    for req in reqs:
+      self.assertEqual(req.type, constants.CONFD_REQ_MULTI)
+    self.assertEqual(reqs[2].query,
+                     [[constants.CONFD_REQ_NODE_ROLE_BYNAME, "node4"]])
+    self.assertEqual(confd.client.MakeMultiRequests([]), [])
+
+  def testMakeInvalid(self):
+    self.assertRaises(errors.ConfdClientError,
+                      confd.client.MakeMultiRequests,
+                      [(constants.CONFD_REQ_MULTI, [])])
+    self.assertRaises(errors.ConfdClientError,
+                      confd.client.MakeMultiRequests, [(-33, None)])
+
+  def testSplit(self):
+    reply = objects.ConfdReply(protocol=1,
+                               status=constants.CONFD_REPL_STATUS_OK,
+                               answer=[[constants.CONFD_REPL_STATUS_OK, "a", 3],
+                                       [constants.CONFD_REPL_STATUS_ERROR, 0,
+                                        0]],
+                               serial=7)
+    (first, second) = confd.client.SplitMultiReply(reply)
+    self.assertEqual(first.status, constants.CONFD_REPL_STATUS_OK)
+    self.assertEqual(first.answer, "a")
+    self.assertEqual(first.serial, 3)
+    self.assertEqual(second.status, constants.CONFD_REPL_STATUS_ERROR)
+
+    reply.status = constants.CONFD_REPL_STATUS_ERROR
+    self.assertRaises(errors.ConfdClientError,
+                      confd.client.SplitMultiReply, reply)
+
+
+class TestConfdReplyCache(unittest.TestCase):
+  def setUp(self):
+    self.mock_time = MockTime()
+    self.cache = confd.client.ConfdReplyCache(ttl=5,
+                                              _time_fn=self.mock_time.time)
+    self.reply = objects.ConfdReply(protocol=1,
+                                    status=constants.CONFD_REPL_STATUS_OK,
+                                    answer="x", serial=1)
+
+  def testExpiry(self):
+    rtype = constants.CONFD_REQ_PING
+    self.assertTrue(self.cache.Get(rtype, None) is None)
+    self.cache.Put(rtype, None, self.reply, 10)
+    self.assertEqual(self.cache.Get(rtype, None), self.reply)
+    self.mock_time.increase(4)
+    self.assertEqual(self.cache.Get(rtype, None), self.reply)
+    self.mock_time.increase(1)
+    self.assertTrue(self.cache.Get(rtype, None) is None)
+
+  def testKeys(self):
+    rtype = constants.CONFD_REQ_CLUSTER_MASTER
+    query = {constants.CONFD_REQQ_FIELDS: ["0", "1"]}
+    self.cache.Put(rtype, query, self.reply, 10)
+    self.assertEqual(self.cache.Get(rtype, dict(query)), self.reply)
+    self.assertTrue(self.cache.Get(rtype, None) is None)
+    self.assertTrue(self.cache.Get(constants.CONFD_REQ_PING, query) is None)
+
+  def testSerial(self):
+    rtype = constants.CONFD_REQ_NODE_ROLE_BYNAME
+    self.cache.Put(rtype, "node1", self.reply, 10)
+    # Replies based on an older configuration are not cached
+    self.cache.Put(rtype, "node2", self.reply, 9)
+    self.assertTrue(self.cache.Get(rtype, "node2") is None)
+    self.assertEqual(self.cache.Get(rtype, "node1"), self.reply)
+    # A newer configuration invalidates all entries
+    self.cache.Put(rtype, "node2", self.reply, 11)
+    self.assertTrue(self.cache.Get(rtype, "node1") is None)
+    self.assertEqual(self.cache.Get(rtype, "node2"), self.reply)
+
+  def testErrorsNotCached(self):
+    rtype = constants.CONFD_REQ_NODE_ROLE_BYNAME
+    self.reply.status = constants.CONFD_REPL_STATUS_ERROR
+    self.cache.Put(rtype, "node1", self.reply, 10)
+    self.assertTrue(self.cache.Get(rtype, "node1") is None)
+
+
+class _FakeBatchConfdClient(object):
+  """Confd client answering multi-query requests on L{WaitForReply}.
+
+  """
+  def __init__(self, callback, answer_fn, max_answers=None):
+    self._callback = callback
+    self._answer_fn = answer_fn
+    self._max_answers = max_answers
+    self._requests = {}
+    self.sent = []
+
+  def SendRequest(self, request, args=None, coverage=0, async=True):
+    self.sent.append(request)
+    self._requests[request.rsalt] = request
+
+  def WaitForReply(self, salt, timeout=None):
+    req = self._requests.pop(salt)
+    if (self._max_answers is not None and
+        len(req.query) > self._max_answers):
+      reply = objects.ConfdReply(protocol=1,
+                                 status=constants.CONFD_REPL_STATUS_ERROR,
+                                 answer=constants.CONFD_ERROR_TOO_LARGE,
+                                 serial=0)
+    else:
+      answer = [self._answer_fn(rtype, query) for (rtype, query) in req.query]
+      reply = objects.ConfdReply(protocol=1,
+                                 status=constants.CONFD_REPL_STATUS_OK,
+                                 answer=answer, serial=10)
+    self._callback(confd.client.ConfdUpcallPayload(
+      salt=salt, type=confd.client.UPCALL_REPLY, server_reply=reply,
+      orig_request=req))
+    return (False, 1, 1)
+
+
+class TestConfdBatchClient(unittest.TestCase):
+  @staticmethod
+  def _Answer(rtype, query):
+    if query == "missing":
+      return [constants.CONFD_REPL_STATUS_ERROR, 0, 0]
+    return [constants.CONFD_REPL_STATUS_OK, query.upper(), 1]
+
+  def _GetClient(self, callback, max_answers=None):
+    self.fake = _FakeBatchConfdClient(callback, self._Answer,
+                                      max_answers=max_answers)
+    return self.fake
+
+  def testQuery(self):
+    cache = confd.client.ConfdReplyCache()
+    client = confd.client.ConfdBatchClient(cache=cache,
+                                           _client_fn=self._GetClient)
+    rtype = constants.CONFD_REQ_NODE_ROLE_BYNAME
+    names = ["node%s" % i for i in range(100)] + ["node1", "missing"]
+    replies = client.Query([(rtype, name) for name in names])
+    self.assertEqual(len(replies), len(names))
+    self.assertEqual(replies[0].answer, "NODE0")
+    self.assertEqual(replies[100].answer, "NODE1")
+    self.assertEqual(replies[101].status, constants.CONFD_REPL_STATUS_ERROR)
+    # Duplicate queries are only sent once
+    self.assertEqual(sum(len(req.query) for req in self.fake.sent), 101)
+    self.assertEqual(len(self.fake.sent),
+                     (101 + constants.CONFD_MAX_MULTI_QUERIES - 1) /
+                     constants.CONFD_MAX_MULTI_QUERIES)
+
+    # Successful answers come from the cache
+    self.fake.sent = []
+    replies = client.Query([(rtype, "node5"), (rtype, "missing")])
+    self.assertEqual(replies[0].answer, "NODE5")
+    self.assertEqual([req.query for req in self.fake.sent],
+                     [[[rtype, "missing"]]])
+
+  def testReplyTooLarge(self):
+    client_fn = compat.partial(self._GetClient, max_answers=10)
+    client = confd.client.ConfdBatchClient(_client_fn=client_fn)
+    rtype = constants.CONFD_REQ_NODE_ROLE_BYNAME
+    names = ["node%s" % i for i in range(50)]
+    replies = client.Query([(rtype, name) for name in names])
+    self.assertEqual([reply.answer for reply in replies],
+                     [name.upper() for name in names])
+
+    # Refused requests are split until the replies fit
+    self.assertEqual([len(req.query) for req in self.fake.sent],
+                     [50, 25, 25, 13, 12, 13, 12, 7, 6, 6, 6, 7, 6, 6, 6])
+
+  def testSingleReplyTooLarge(self):
+    client_fn = compat.partial(self._GetClient, max_answers=0)
+    client = confd.client.ConfdBatchClient(_client_fn=client_fn)
+    rtype = constants.CONFD_REQ_NODE_ROLE_BYNAME
+    self.assertEqual(client.Query([(rtype, "node1"), (rtype, "node2")]),
+                     [None, None])
+    self.assertEqual([len(req.query) for req in self.fake.sent], [2, 1, 1])
+
+
+
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
@@ -32,6 +32,7 @@
 
 
 import os
+import socket
 import unittest
 import time
 import tempfile
@@ -420,6 +421,37 @@ class TestClientRequest(unittest.TestCase):
                           "localhost", 23150, "GET", "/version", **kwargs)
 
 
+class TestParseContentCodings(unittest.TestCase):
+  def test(self):
+    for (value, expected) in [
+      (None, []),
+      ("", []),
+      ("deflate", ["deflate"]),
+      ("Deflate, gzip", ["deflate", "gzip"]),
+      (" gzip ,, identity ", ["gzip", "identity"]),
+      ("gzip;q=0.5, deflate;q=1.0", ["deflate", "gzip"]),
+      ("gzip;q=0, deflate", ["deflate"]),
+      ("gzip; Q=0.0, deflate;q=invalid", []),
+      ]:
+      self.assertEqual(http.ParseContentCodings(value), frozenset(expected))
+
+
+class TestETagMatches(unittest.TestCase):
+  def test(self):
+    for (value, expected) in [
+      (None, False),
+      ("", False),
+      ("\"abc\"", True),
+      ("W/\"abc\"", True),
+      ("\"xyz\", \"abc\"", True),
+      ("*", True),
+      ("\"ABC\"", False),
+      ("abc", False),
+      ("\"xyz\"", False),
+      ]:
+      self.assertEqual(http.ETagMatches(value, "\"abc\""), expected)
+
+
 class _FakeCurl:
   def __init__(self):
     self.opts = {}
@@ -478,6 +510,8 @@ class TestClientStartRequest(unittest.TestCase):
           self.assertFalse(opts.pop(pycurl.HTTPHEADER))
           write_fn = opts.pop(pycurl.WRITEFUNCTION)
           self.assertTrue(callable(write_fn))
+          header_fn = opts.pop(pycurl.HEADERFUNCTION)
+          self.assertTrue(callable(header_fn))
           if hasattr(pycurl, "SSL_SESSIONID_CACHE"):
             self.assertFalse(opts.pop(pycurl.SSL_SESSIONID_CACHE))
           if curl_config_fn:
@@ -486,6 +520,13 @@ class TestClientStartRequest(unittest.TestCase):
             self.assertFalse(pycurl.SSLKEYTYPE in opts)
           self.assertFalse(opts)
 
+          header_fn("HTTP/1.1 100 Continue\r\n")
+          header_fn("\r\n")
+          header_fn("HTTP/1.1 %s Something\r\n" % response_code)
+          header_fn("Content-Encoding: deflate\r\n")
+          header_fn("X-Port: %s\r\n" % port)
+          header_fn("\r\n")
+
           if response_body is not None:
             offset = 0
             while offset < len(response_body):
@@ -519,12 +560,17 @@ class TestClientStartRequest(unittest.TestCase):
             self.assertEqual(req.resp_body, "")
           else:
             self.assertEqual(req.resp_body, response_body)
+          self.assertEqual(req.resp_headers.get("content-encoding"),
+                           "deflate")
+          self.assertEqual(req.resp_headers.get("X-Port"), str(port))
+          self.assertEqual(len(req.resp_headers.keys()), 2)
 
           # Check if resetting worked
           assert not hasattr(curl, "reset")
           opts = curl.opts
           self.assertFalse(opts.pop(pycurl.POSTFIELDS))
           self.assertTrue(callable(opts.pop(pycurl.WRITEFUNCTION)))
+          self.assertTrue(callable(opts.pop(pycurl.HEADERFUNCTION)))
           self.assertFalse(opts)
 
           self.assertFalse(curl.opts,
@@ -740,6 +786,7 @@ class TestProcessRequests(unittest.TestCase):
         # Prepare for reset
         self.assertFalse(curl.opts.pop(pycurl.POSTFIELDS))
         self.assertTrue(callable(curl.opts.pop(pycurl.WRITEFUNCTION)))
+        self.assertTrue(callable(curl.opts.pop(pycurl.HEADERFUNCTION)))
 
         yield (curl, msg)
 
@@ -781,5 +828,143 @@ class TestProcessRequests(unittest.TestCase):
                       _curl_multi=NotImplemented, _curl_process=NotImplemented)
 
 
+class _FakeServer(object):
+  using_ssl = False
+
+  def __init__(self, keep_alive):
+    self.keep_alive = keep_alive
+    self.waiting = False
+
+  def HasWaitingConnections(self):
+    return self.waiting
+
+
+class _PathHandler(http.server.HttpServerHandler):
+  def __init__(self):
+    http.server.HttpServerHandler.__init__(self)
+    self.finished = []
+
+  def HandleRequest(self, req):
+    if req.request_path == "/missing":
+      raise http.HttpNotFound()
+    return req.request_path
+
+  def RequestFinished(self, method, code, duration):
+    self.finished.append((method, code))
+
+
+def _ReadResponse(sock):
+  """Reads a response, returning its status line, headers and body.
+
+  """
+  buf = ""
+  while "\r\n\r\n" not in buf:
+    data = sock.recv(4096)
+    if not data:
+      return None
+    buf += data
+
+  (head, body) = buf.split("\r\n\r\n", 1)
+  lines = head.split("\r\n")
+  headers = dict((name.strip().lower(), value.strip())
+                 for (name, value) in (line.split(":", 1)
+                                       for line in lines[1:]))
+
+  length = int(headers.get("content-length", 0))
+  while len(body) < length:
+    body += sock.recv(4096)
+
+  return (lines[0], headers, body)
+
+
+class TestHttpServerKeepAlive(unittest.TestCase):
+  def setUp(self):
+    (self.srv_sock, self.cl_sock) = socket.socketpair()
+    self.cl_sock.settimeout(10)
+    self.handler = _PathHandler()
+
+  def tearDown(self):
+    self.cl_sock.close()
+
+  def _Start(self, server):
+    thread = threading.Thread(target=http.server.HttpServerRequestExecutor,
+                              args=(server, self.handler, self.srv_sock,
+                                    ("127.0.0.1", 1234)))
+    thread.daemon = True
+    thread.start()
+    return thread
+
+  def _Request(self, path, headers=""):
+    self.cl_sock.sendall("GET %s HTTP/1.1\r\nHost: localhost\r\n%s\r\n" %
+                         (path, headers))
+    return _ReadResponse(self.cl_sock)
+
+  def _CheckClosed(self, thread):
+    thread.join(10)
+    self.assertFalse(thread.isAlive())
+    self.assertEqual(self.cl_sock.recv(1), "")
+
+  def testKeepAlive(self):
+    thread = self._Start(_FakeServer(True))
+
+    for path in ["/a", "/b", "/missing", "/c"]:
+      (status, headers, body) = self._Request(path)
+      if path == "/missing":
+        self.assertTrue(" 404 " in status)
+        break
+      self.assertTrue(" 200 " in status)
+      self.assertEqual(body, path)
+      self.assertEqual(headers["connection"], "keep-alive")
+
+    # Errors close the connection
+    self.assertEqual(headers["connection"], "close")
+    self._CheckClosed(thread)
+    self.assertEqual(self.handler.finished,
+                     [("GET", 200), ("GET", 200), ("GET", 404)])
+
+  def testClientCloses(self):
+    thread = self._Start(_FakeServer(True))
+    (_, headers, _) = self._Request("/a")
+    self.assertEqual(headers["connection"], "keep-alive")
+    self.cl_sock.shutdown(socket.SHUT_WR)
+    thread.join(10)
+    self.assertFalse(thread.isAlive())
+    self.assertEqual(len(self.handler.finished), 1)
+
+  def testClientAsksToClose(self):
+    thread = self._Start(_FakeServer(True))
+    (_, headers, body) = self._Request("/a", headers="Connection: close\r\n")
+    self.assertEqual(body, "/a")
+    self.assertEqual(headers["connection"], "close")
+    self._CheckClosed(thread)
+
+  def testDisabled(self):
+    thread = self._Start(_FakeServer(False))
+    (_, headers, body) = self._Request("/a")
+    self.assertEqual(body, "/a")
+    self.assertEqual(headers["connection"], "close")
+    self._CheckClosed(thread)
+
+  def testOtherConnectionsWaiting(self):
+    server = _FakeServer(True)
+    thread = self._Start(server)
+    (_, headers, _) = self._Request("/a")
+    self.assertEqual(headers["connection"], "keep-alive")
+    server.waiting = True
+    self._CheckClosed(thread)
+
+  def testFinalize(self):
+    for (code, body, keep_alive, length) in [
+      (http.HTTP_OK, "", True, 0),
+      (http.HTTP_OK, "", False, None),
+      (http.HTTP_NOT_MODIFIED, "", True, None),
+      ]:
+      msg = http.HttpMessage()
+      msg.start_line = http.HttpServerToClientStartLine("HTTP/1.1", code, None)
+      msg.body = body
+      http.server.HttpResponder._Finalize({}, msg, keep_alive=keep_alive)
+      self.assertEqual(msg.headers.get(http.HTTP_CONTENT_LENGTH), length)
+
+
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
@@ -0,0 +1,196 @@
+#!/usr/bin/python
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for testing ganeti.impexpd.delta"""
+
+import os
+import unittest
+import tempfile
+import shutil
+from cStringIO import StringIO
+
+from ganeti import errors
+from ganeti.impexpd import delta
+
+import testutils
+
+
+_CHUNK_SIZE = 16
+
+
+def _MakeDelta(data, base=None, chunk_size=_CHUNK_SIZE):
+  dst = StringIO()
+  (size, changed) = delta.WriteDelta(StringIO(data), dst, base=base,
+                                     chunk_size=chunk_size)
+  return (dst.getvalue(), size, changed)
+
+
+class TestDelta(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def _Apply(self, stream, image_data="", base=None):
+    path = os.path.join(self.tmpdir, "image")
+    fh = open(path, "wb")
+    try:
+      fh.write(image_data)
+    finally:
+      fh.close()
+
+    fh = open(path, "r+b")
+    try:
+      manifest = delta.ApplyDelta(StringIO(stream), fh, base=base)
+    finally:
+      fh.close()
+
+    fh = open(path, "rb")
+    try:
+      return (fh.read(), manifest)
+    finally:
+      fh.close()
+
+  def testFull(self):
+    for data in ["", "x", "A" * _CHUNK_SIZE, "".join(map(chr, range(200)))]:
+      (stream, size, changed) = _MakeDelta(data)
+      self.assertEqual(size, len(data))
+      self.assertEqual(changed, (len(data) + _CHUNK_SIZE - 1) // _CHUNK_SIZE)
+      self.assertTrue(delta.GetDeltaBase(StringIO(stream)) is None)
+
+      (result, manifest) = self._Apply(stream)
+      self.assertEqual(result, data)
+      self.assertTrue(delta.CheckManifest(manifest))
+      self.assertEqual(manifest["size"], len(data))
+      self.assertEqual(manifest["chunk_size"], _CHUNK_SIZE)
+      self.assertEqual(len(manifest["checksums"]), changed)
+
+  def testIncremental(self):
+    data = "".join(chr(ord("a") + i) * _CHUNK_SIZE for i in range(8))
+    (_, base) = self._Apply(_MakeDelta(data)[0])
+
+    newdata = (data[:_CHUNK_SIZE * 2] + "X" * 3 +
+               data[_CHUNK_SIZE * 2 + 3:_CHUNK_SIZE * 7] + "Y")
+    (stream, size, changed) = _MakeDelta(newdata, base=base)
+    self.assertEqual(size, len(newdata))
+    self.assertEqual(changed, 2)
+    self.assertEqual(delta.GetDeltaBase(StringIO(stream)), base["id"])
+
+    (result, manifest) = self._Apply(stream, image_data=data, base=base)
+    self.assertEqual(result, newdata)
+    self.assertNotEqual(manifest["id"], base["id"])
+    self.assertEqual(manifest["checksums"],
+                     self._Apply(_MakeDelta(newdata)[0])[1]["checksums"])
+
+  def testUnchanged(self):
+    data = "Hello World" * 20
+    (_, base) = self._Apply(_MakeDelta(data)[0])
+    (stream, _, changed) = _MakeDelta(data, base=base)
+    self.assertEqual(changed, 0)
+
+    (result, _) = self._Apply(stream, image_data=data, base=base)
+    self.assertEqual(result, data)
+
+  def testGrow(self):
+    data = "a" * (_CHUNK_SIZE + 3)
+    (_, base) = self._Apply(_MakeDelta(data)[0])
+    newdata = data + "b" * (_CHUNK_SIZE * 2)
+    (stream, _, changed) = _MakeDelta(newdata, base=base)
+    self.assertEqual(changed, 3)
+    (result, _) = self._Apply(stream, image_data=data, base=base)
+    self.assertEqual(result, newdata)
+
+  def testDifferentChunkSize(self):
+    data = "a" * 100
+    (_, base) = self._Apply(_MakeDelta(data)[0])
+    (stream, _, changed) = _MakeDelta(data, base=base, chunk_size=32)
+    self.assertEqual(changed, 4)
+    self.assertTrue(delta.GetDeltaBase(StringIO(stream)) is None)
+
+  def testWrongBase(self):
+    data = "a" * 100
+    (_, base) = self._Apply(_MakeDelta(data)[0])
+    (stream, _, _) = _MakeDelta(data, base=base)
+
+    self.assertRaises(errors.GenericError, self._Apply, stream,
+                      image_data=data)
+
+    other = dict(base, id="other")
+    self.assertRaises(errors.GenericError, self._Apply, stream,
+                      image_data=data, base=other)
+
+  def testMissingChunks(self):
+    data = "a" * 100
+    (_, base) = self._Apply(_MakeDelta(data)[0])
+    (stream, _, _) = _MakeDelta(data, base=base)
+
+    # Applying a delta without base data must fail if chunks are missing
+    self.assertRaises(errors.GenericError, self._Apply, stream,
+                      image_data=data, base=dict(base, checksums=[]))
+
+  def testTruncated(self):
+    (stream, _, _) = _MakeDelta("a" * 100)
+    for length in [0, 5, len(stream) // 2, len(stream) - 1]:
+      self.assertRaises(errors.GenericError, self._Apply, stream[:length])
+
+  def testNotDelta(self):
+    self.assertRaises(errors.GenericError, delta.GetDeltaBase,
+                      StringIO("Some random data" * 10))
+
+  def testComputeManifest(self):
+    for data in ["", "x", "A" * _CHUNK_SIZE, "".join(map(chr, range(200)))]:
+      manifest = delta.ComputeManifest(StringIO(data), chunk_size=_CHUNK_SIZE)
+      self.assertTrue(delta.CheckManifest(manifest))
+      self.assertEqual(manifest["size"], len(data))
+
+      (_, applied) = self._Apply(_MakeDelta(data)[0])
+      self.assertEqual(manifest["checksums"], applied["checksums"])
+      self.assertNotEqual(manifest["id"], applied["id"])
+
+      # The manifest can be used as the base of an incremental export
+      (stream, _, changed) = _MakeDelta(data, base=manifest)
+      self.assertEqual(changed, 0)
+      (result, _) = self._Apply(stream, image_data=data, base=manifest)
+      self.assertEqual(result, data)
+
+  def testCheckManifest(self):
+    self.assertFalse(delta.CheckManifest(None))
+    self.assertFalse(delta.CheckManifest({}))
+    self.assertFalse(delta.CheckManifest({
+      "id": "x", "chunk_size": 0, "size": 0, "checksums": [],
+      }))
+    self.assertTrue(delta.CheckManifest({
+      "id": "x", "chunk_size": 16, "size": 0, "checksums": [],
+      }))
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
@@ -35,6 +35,7 @@ import sys
 import re
 import unittest
 import socket
+import select
 
 from ganeti import constants
 from ganeti import objects
@@ -62,6 +63,7 @@ class CmdBuilderConfig(objects.ConfigObject):
     "connect_retries",
     "cmd_prefix",
     "cmd_suffix",
+    "native_transfer",
     ]
 
 
@@ -210,6 +212,125 @@ class TestCommandBuilder(unittest.TestCase):
     self.assertRaises(errors.GenericError, builder.GetCommand)
 
 
+class TestNativeCommandBuilder(unittest.TestCase):
+  def _Build(self, mode, **kwargs):
+    opts = CmdBuilderConfig(host="localhost", port=1234,
+                            compress=constants.IEC_NONE,
+                            native_transfer=True, **kwargs)
+    return impexpd.CommandBuilder(mode, opts, 1, 2, 3, relay_fds=(14, 15))
+
+  def testExport(self):
+    for (prefix, suffix, io_cmd) in [
+      ("dd if=/dev/hda bs=1048576 |", None, "{ dd if=/dev/hda bs=1048576; }"),
+      (None, "< /some/file/name", "cat < /some/file/name"),
+      ]:
+      builder = self._Build(constants.IEM_EXPORT, cmd_prefix=prefix,
+                            cmd_suffix=suffix)
+      cmd = builder.GetCommand()
+      self.assertTrue(isinstance(cmd, list))
+      self.assertTrue("%s >&14 14>&- 15>&-" % io_cmd in cmd[-1])
+      self.assertTrue(" <&15 2>&1 14>&- 15>&-" in cmd[-1])
+      self.assertTrue("exec 14>&- 15>&-" in cmd[-1])
+      self.assertFalse(CheckCmdWord(cmd, "dd bs"))
+
+  def testImport(self):
+    for (suffix, io_cmd) in [
+      ("| dd of=/dev/null", "{ dd of=/dev/null; }"),
+      ("> /some/file/name", "cat > /some/file/name"),
+      ]:
+      builder = self._Build(constants.IEM_IMPORT, cmd_suffix=suffix)
+      cmd = builder.GetCommand()
+      self.assertTrue("%s <&14 14>&- 15>&-" % io_cmd in cmd[-1])
+      self.assertTrue(" >&15 2>&1 14>&- 15>&-" in cmd[-1])
+
+  def testUnsupported(self):
+    for (mode, prefix, suffix) in [
+      (constants.IEM_EXPORT, None, None),
+      (constants.IEM_EXPORT, "PrefixCommand|", "| dd of=/dev/null"),
+      (constants.IEM_IMPORT, "PrefixCommand|", None),
+      (constants.IEM_IMPORT, None, "< /some/file/name"),
+      ]:
+      builder = self._Build(mode, cmd_prefix=prefix, cmd_suffix=suffix)
+      self.assertRaises(errors.GenericError, builder.GetCommand)
+
+  def testCompression(self):
+    opts = CmdBuilderConfig(host="localhost", port=1234,
+                            compress=constants.IEC_GZIP,
+                            cmd_suffix="| dd of=/dev/null",
+                            native_transfer=True)
+    builder = impexpd.CommandBuilder(constants.IEM_IMPORT, opts, 1, 2, 3,
+                                     relay_fds=(14, 15))
+    self.assertRaises(errors.GenericError, builder.GetCommand)
+
+
+class TestDataRelay(unittest.TestCase):
+  def setUp(self):
+    (self.src_read, self.src_write) = os.pipe()
+    (self.dst_read, self.dst_write) = os.pipe()
+
+  def tearDown(self):
+    for fd in [self.src_write, self.dst_read]:
+      try:
+        os.close(fd)
+      except OSError:
+        pass
+
+  def _Run(self, relay):
+    while not relay.IsDone():
+      relay.Transfer()
+
+  def _Test(self, splice_fn):
+    data = "Hello World" * 1000
+
+    relay = impexpd.DataRelay(self.src_read, self.dst_write,
+                              preamble="M=magic", _splice_fn=splice_fn)
+    self.assertFalse(relay.IsDone())
+    self.assertEqual(relay.GetPollEvent(), (self.dst_write, select.POLLOUT))
+
+    os.write(self.src_write, data)
+    os.close(self.src_write)
+    self._Run(relay)
+
+    self.assertEqual(relay.transferred, len(data))
+    self.assertEqual(relay.GetPollEvent(), None)
+    self.assertEqual(utils.ReadFile("/dev/fd/%d" % self.dst_read),
+                     "M=magic" + data)
+
+  def testReadWrite(self):
+    self._Test(None)
+
+  def testSplice(self):
+    splice_fn = impexpd._LoadSplice()
+    if splice_fn is None:
+      self.skipTest("splice(2) not available")
+    self._Test(splice_fn)
+
+  def testExpect(self):
+    relay = impexpd.DataRelay(self.src_read, self.dst_write,
+                              expect="M=magic", _splice_fn=None)
+    os.write(self.src_write, "M=magicPayload")
+    os.close(self.src_write)
+    self._Run(relay)
+    self.assertEqual(relay.transferred, len("Payload"))
+    self.assertEqual(utils.ReadFile("/dev/fd/%d" % self.dst_read), "Payload")
+
+  def testExpectMismatch(self):
+    relay = impexpd.DataRelay(self.src_read, self.dst_write,
+                              expect="M=magic", _splice_fn=None)
+    os.write(self.src_write, "M=other")
+    self.assertRaises(errors.GenericError, self._Run, relay)
+    relay.Abort()
+    self.assertTrue(relay.IsDone())
+
+  def testExpectEof(self):
+    relay = impexpd.DataRelay(self.src_read, self.dst_write,
+                              expect="M=magic", _splice_fn=None)
+    os.write(self.src_write, "M=")
+    os.close(self.src_write)
+    self.assertRaises(errors.GenericError, self._Run, relay)
+    relay.Abort()
+
+
 class TestVerifyListening(unittest.TestCase):
   def test(self):
     self.assertEqual(impexpd._VerifyListening(socket.AF_INET,
@@ -0,0 +1,277 @@
+#!/usr/bin/python
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for testing ganeti.jqueue.zygote"""
+
+import os
+import shutil
+import signal
+import socket
+import stat
+import tempfile
+import unittest
+
+from ganeti.jqueue import zygote
+from ganeti.rpc import transport
+
+import testutils
+
+
+class _FakeLiveLock(object):
+  def __init__(self, name):
+    self._name = name
+
+  def GetPath(self):
+    return "/livelocks/%s" % self._name
+
+
+def _EchoMain(start_time=None):
+  """Job main function sending its start time and echoing its input.
+
+  """
+  os.write(1, "%s\n" % start_time)
+  while True:
+    data = os.read(0, 4096)
+    if not data:
+      break
+    os.write(1, data)
+
+
+def _FailingMain(start_time=None): # pylint: disable=W0613
+  raise SystemExit(3)
+
+
+def _ForkJobProcess(main_fn):
+  """Forks a process running L{zygote._RunJobProcess}.
+
+  @return: tuple containing the child's PID and the master's end of the
+    connection
+
+  """
+  (master, job) = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+
+  pid = os.fork()
+  if pid == 0:
+    master.close()
+    zygote._RunJobProcess(job, 123.0, signal.SIG_DFL,
+                          _livelock_cls=_FakeLiveLock, _main_fn=main_fn)
+
+  job.close()
+
+  return (pid, master)
+
+
+def _ExitCode(pid):
+  (_, status) = os.waitpid(pid, 0)
+  if not os.WIFEXITED(status):
+    return None
+  return os.WEXITSTATUS(status)
+
+
+def _ReadAll(sock):
+  data = []
+  while True:
+    chunk = sock.recv(4096)
+    if not chunk:
+      return "".join(data)
+    data.append(chunk)
+
+
+class TestRunJobProcess(unittest.TestCase):
+  def _Handshake(self, master, job_id):
+    trans = transport.FdTransport((os.dup(master.fileno()),
+                                   os.dup(master.fileno())))
+    try:
+      trans.Send(job_id)
+      pid = int(trans.Recv())
+      lock_path = trans.Recv()
+      trans.Send("")
+    finally:
+      trans.Close()
+
+    return (pid, lock_path)
+
+  def testProtocol(self):
+    (pid, master) = _ForkJobProcess(_EchoMain)
+    try:
+      (job_pid, lock_path) = self._Handshake(master, "17")
+      self.assertEqual(job_pid, pid)
+      self.assertEqual(lock_path, "/livelocks/job_000017")
+
+      # The job process continues using the connection as stdin/stdout
+      self.assertEqual(master.recv(4096), "123.0\n")
+      master.sendall("hello\n")
+      master.shutdown(socket.SHUT_WR)
+      self.assertEqual(_ReadAll(master), "hello\n")
+    finally:
+      master.close()
+
+    self.assertEqual(_ExitCode(pid), 0)
+
+  def testMainFailure(self):
+    (pid, master) = _ForkJobProcess(_FailingMain)
+    try:
+      self._Handshake(master, "1")
+    finally:
+      master.close()
+
+    self.assertEqual(_ExitCode(pid), 3)
+
+  def testInvalidJobId(self):
+    (pid, master) = _ForkJobProcess(_EchoMain)
+    try:
+      trans = transport.FdTransport((os.dup(master.fileno()),
+                                     os.dup(master.fileno())))
+      try:
+        trans.Send("not a number")
+      finally:
+        trans.Close()
+
+      # The job process exits without replying
+      self.assertEqual(_ReadAll(master), "")
+    finally:
+      master.close()
+
+    self.assertEqual(_ExitCode(pid), 1)
+
+  def testMasterDisconnects(self):
+    (pid, master) = _ForkJobProcess(_EchoMain)
+    master.close()
+
+    self.assertEqual(_ExitCode(pid), 1)
+
+
+def _GreetingJob(conn, start_time, sigchld_handler): # pylint: disable=W0613
+  """Replacement for L{zygote._RunJobProcess}.
+
+  """
+  try:
+    conn.sendall("job %s %s" % (os.getpid(), sigchld_handler))
+    conn.close()
+  finally:
+    os._exit(0) # pylint: disable=W0212
+
+
+class TestZygote(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.path = os.path.join(self.tmpdir, "zygote.sock")
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def _StartZygote(self):
+    """Forks a process serving connections on C{self.path}.
+
+    @return: tuple containing the zygote's PID and the write end of its
+      standard input
+
+    """
+    listener = zygote._Listen(self.path)
+    (stdin_read, stdin_write) = os.pipe()
+
+    pid = os.fork()
+    if pid == 0:
+      exit_code = 1
+      try:
+        os.close(stdin_write)
+        zygote._ServeForever(listener, signal.SIG_DFL, _stdin_fd=stdin_read,
+                             _run_fn=_GreetingJob)
+        exit_code = 0
+      finally:
+        os._exit(exit_code) # pylint: disable=W0212
+
+    listener.close()
+    os.close(stdin_read)
+
+    return (pid, stdin_write)
+
+  def _Connect(self):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+      sock.connect(self.path)
+      return _ReadAll(sock)
+    finally:
+      sock.close()
+
+  def testListenPermissions(self):
+    listener = zygote._Listen(self.path)
+    try:
+      mode = os.stat(self.path).st_mode
+      self.assertTrue(stat.S_ISSOCK(mode))
+      self.assertEqual(stat.S_IMODE(mode) & 077, 0)
+    finally:
+      listener.close()
+
+  def testServe(self):
+    (pid, stdin_write) = self._StartZygote()
+    try:
+      replies = [self._Connect() for _ in range(5)]
+    finally:
+      os.close(stdin_write)
+
+    # The zygote exits once its standard input is closed
+    self.assertEqual(_ExitCode(pid), 0)
+
+    self.assertEqual(len(replies), 5)
+    pids = set()
+    for reply in replies:
+      (word, job_pid, handler) = reply.split()
+      self.assertEqual(word, "job")
+      self.assertEqual(handler, str(signal.SIG_DFL))
+      pids.add(int(job_pid))
+
+    # Every connection is handled by a new process
+    self.assertEqual(len(pids), 5)
+    self.assertFalse(pid in pids)
+
+  def testRestart(self):
+    (pid, stdin_write) = self._StartZygote()
+    try:
+      self.assertTrue(self._Connect().startswith("job "))
+    finally:
+      os.close(stdin_write)
+    self.assertEqual(_ExitCode(pid), 0)
+
+    # A zygote which didn't clean up leaves its socket behind
+    self.assertTrue(os.path.exists(self.path))
+    self.assertRaises(socket.error, self._Connect)
+
+    # A new zygote replaces the stale socket
+    (pid, stdin_write) = self._StartZygote()
+    try:
+      self.assertTrue(self._Connect().startswith("job "))
+    finally:
+      os.close(stdin_write)
+    self.assertEqual(_ExitCode(pid), 0)
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
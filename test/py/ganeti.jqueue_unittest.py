@@ -112,6 +112,7 @@ class TestQueuedOpCode(unittest.TestCase):
       self.assert_(op.exec_timestamp is None)
       self.assert_(op.end_timestamp is None)
       self.assert_(op.result is None)
+      self.assertEqual(op.lock_stats, [])
       self.assertEqual(op.status, constants.OP_STATUS_QUEUED)
 
     op1 = jqueue._QueuedOpCode(opcodes.OpTestDelay())
@@ -134,6 +135,39 @@ class TestQueuedOpCode(unittest.TestCase):
     _Check(op2)
     self.assertEqual(op1.Serialize(), op2.Serialize())
 
+  def testLockStats(self):
+    op1 = jqueue._QueuedOpCode(opcodes.OpTestDelay())
+    op1.lock_stats.append({
+      "levels": ["node"],
+      "count": 2,
+      "requested": (1460000000, 0),
+      "granted": None,
+      "wait": 5.0,
+      "blockers": [123],
+      })
+    op2 = jqueue._QueuedOpCode.Restore(op1.Serialize())
+    self.assertEqual(op2.lock_stats, op1.lock_stats)
+    self.assertEqual(op1.Serialize(), op2.Serialize())
+
+    # Opcodes serialized by older versions don't have statistics
+    state = op1.Serialize()
+    del state["lock_stats"]
+    self.assertEqual(jqueue._QueuedOpCode.Restore(state).lock_stats, [])
+
+  def testPhaseStats(self):
+    op1 = jqueue._QueuedOpCode(opcodes.OpTestDelay())
+    self.assertEqual(op1.phase_stats.ToDict(), {})
+    op1.phase_stats.Add("exec", 2.5, 0.5)
+    op2 = jqueue._QueuedOpCode.Restore(op1.Serialize())
+    self.assertEqual(op2.phase_stats.ToDict(), op1.phase_stats.ToDict())
+    self.assertEqual(op1.Serialize(), op2.Serialize())
+
+    # Opcodes serialized by older versions don't have statistics
+    state = op1.Serialize()
+    del state["phase_stats"]
+    self.assertEqual(jqueue._QueuedOpCode.Restore(state).phase_stats.ToDict(),
+                     {})
+
 
 class TestQueuedJob(unittest.TestCase):
   def testNoOpCodes(self):
@@ -2002,6 +2036,166 @@ class TestJobDependencyManager(unittest.TestCase):
     self.assertEqual(result, self.jdm.ERROR)
     self.assertFalse(jdm.JobWaiting(job))
 
+  def testGetWaitedJobIds(self):
+    job = _IdOnlyFakeJob(5915)
+    other_job = _IdOnlyFakeJob(17)
+
+    self.assertEqual(self.jdm.GetWaitedJobIds(job), [])
+
+    for (waiting_job, dep_job_id) in [(job, "27"), (other_job, "9"),
+                                      (job, "8")]:
+      self._status.append((dep_job_id, constants.JOB_STATUS_RUNNING))
+      (result, _) = self.jdm.CheckAndRegister(waiting_job, dep_job_id, [])
+      self.assertEqual(result, self.jdm.WAIT)
+
+    self.assertEqual(self.jdm.GetWaitedJobIds(job), ["27", "8"])
+    self.assertEqual(self.jdm.GetWaitedJobIds(other_job), ["9"])
+
+    self._status.append(("8", constants.JOB_STATUS_SUCCESS))
+    (result, _) = self.jdm.CheckAndRegister(job, "8", [])
+    self.assertEqual(result, self.jdm.CONTINUE)
+    self.assertEqual(self.jdm.GetWaitedJobIds(job), ["27"])
+
+
+class TestCalcJobStatus(unittest.TestCase):
+  def test(self):
+    for (op_statuses, status) in [
+      ([], constants.JOB_STATUS_SUCCESS),
+      ([constants.OP_STATUS_SUCCESS, constants.OP_STATUS_QUEUED],
+       constants.JOB_STATUS_QUEUED),
+      ([constants.OP_STATUS_SUCCESS, constants.OP_STATUS_WAITING,
+        constants.OP_STATUS_QUEUED], constants.JOB_STATUS_WAITING),
+      ([constants.OP_STATUS_RUNNING, constants.OP_STATUS_QUEUED],
+       constants.JOB_STATUS_RUNNING),
+      ([constants.OP_STATUS_SUCCESS, constants.OP_STATUS_ERROR,
+        constants.OP_STATUS_ERROR], constants.JOB_STATUS_ERROR),
+      ([constants.OP_STATUS_CANCELING, constants.OP_STATUS_CANCELING],
+       constants.JOB_STATUS_CANCELING),
+      ([constants.OP_STATUS_CANCELED], constants.JOB_STATUS_CANCELED),
+      ]:
+      self.assertEqual(jqueue._CalcJobStatus(op_statuses), status)
+      self.assertEqual(jqueue._CalcJobStatus(iter(op_statuses)), status)
+
+
+class TestJobFileChangesWaiter(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.filename = utils.PathJoin(self.tmpdir, "job-1")
+    utils.WriteFile(self.filename, data="")
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def _Waiter(self):
+    waiter = jqueue._JobFileChangesWaiter([self.filename])
+    self.addCleanup(waiter.Close)
+    return waiter
+
+  def testTimeout(self):
+    self.assertFalse(self._Waiter().Wait(0.01))
+
+  def testReplaced(self):
+    waiter = self._Waiter()
+    utils.WriteFile(self.filename, data="changed")
+    self.assertTrue(waiter.Wait(10.0))
+    self.assertTrue(waiter.Wait(0))
+
+  def testArchived(self):
+    waiter = self._Waiter()
+    utils.RenameFile(self.filename, utils.PathJoin(self.tmpdir, "archived"))
+    self.assertTrue(waiter.Wait(10.0))
+
+  def testOtherFile(self):
+    waiter = self._Waiter()
+    utils.WriteFile(utils.PathJoin(self.tmpdir, "job-10"), data="")
+    self.assertFalse(waiter.Wait(0.1))
+
+  def testNonExistentDirectory(self):
+    self.assertRaises(errors.InotifyError, jqueue._JobFileChangesWaiter,
+                      [utils.PathJoin(self.tmpdir, "missing", "job-1")])
+
+
+class _FakeDepWaiter:
+  def __init__(self, filenames):
+    self.filenames = filenames
+    self.waited = []
+    self.closed = False
+
+  def Wait(self, timeout):
+    self.waited.append(timeout)
+    return True
+
+  def Close(self):
+    self.closed = True
+
+
+class _FakeWaitingDependencyManager:
+  def __init__(self, dep_job_ids):
+    self._dep_job_ids = dep_job_ids
+
+  def GetWaitedJobIds(self, _):
+    return self._dep_job_ids
+
+
+class TestWaitForJobDependencies(unittest.TestCase):
+  def setUp(self):
+    self.job = _IdOnlyFakeJob(3)
+    self.status = {}
+    self.waiters = []
+
+  def _NewQueue(self, dep_job_ids):
+    queue = object.__new__(jqueue.JobQueue)
+    queue.depmgr = _FakeWaitingDependencyManager(dep_job_ids)
+    queue._GetJobStatusForDependencies = self.status.__getitem__
+    return queue
+
+  def _NewWaiter(self, filenames):
+    waiter = _FakeDepWaiter(filenames)
+    self.waiters.append(waiter)
+    return waiter
+
+  def testNotWaiting(self):
+    queue = self._NewQueue([])
+    self.assertTrue(queue.WaitForJobDependencies(self.job, 1.0,
+                                                 _waiter_cls=NotImplemented))
+
+  def testWait(self):
+    queue = self._NewQueue([1, 2])
+    self.status.update({
+      1: constants.JOB_STATUS_RUNNING,
+      2: constants.JOB_STATUS_QUEUED,
+      })
+
+    self.assertTrue(queue.WaitForJobDependencies(self.job, 3.5,
+                                                 _waiter_cls=self._NewWaiter))
+    (waiter, ) = self.waiters
+    self.assertEqual(waiter.filenames, [jqueue.JobQueue._GetJobPath(1),
+                                        jqueue.JobQueue._GetJobPath(2)])
+    self.assertEqual(waiter.waited, [3.5])
+    self.assertTrue(waiter.closed)
+
+  def testFinishedBeforeWatching(self):
+    queue = self._NewQueue([1, 2])
+    self.status.update({
+      1: constants.JOB_STATUS_RUNNING,
+      2: constants.JOB_STATUS_SUCCESS,
+      })
+
+    self.assertTrue(queue.WaitForJobDependencies(self.job, 3.5,
+                                                 _waiter_cls=self._NewWaiter))
+    (waiter, ) = self.waiters
+    self.assertEqual(waiter.waited, [])
+    self.assertTrue(waiter.closed)
+
+  def testNoInotify(self):
+    queue = self._NewQueue([1])
+
+    def _Fail(_):
+      raise errors.InotifyError("no more watches")
+
+    self.assertFalse(queue.WaitForJobDependencies(self.job, 0.0,
+                                                  _waiter_cls=_Fail))
+
 
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
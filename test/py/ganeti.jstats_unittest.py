@@ -0,0 +1,178 @@
+#!/usr/bin/python
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for testing ganeti.jstats"""
+
+import unittest
+
+from ganeti import jstats
+
+import testutils
+
+
+class _FakeRusage(object):
+  def __init__(self, utime, stime, maxrss):
+    self.ru_utime = utime
+    self.ru_stime = stime
+    self.ru_maxrss = maxrss
+
+
+class _FakeClock(object):
+  def __init__(self):
+    self.time = 1000.0
+    self.cpu = 10.0
+    self.maxrss = 20000
+
+  def Time(self):
+    return self.time
+
+  def GetRusage(self, _):
+    return _FakeRusage(self.cpu, 0.0, self.maxrss)
+
+
+class TestPhaseStats(unittest.TestCase):
+  def setUp(self):
+    self.clock = _FakeClock()
+
+  def _NewStats(self, data=None):
+    return jstats.PhaseStats(data=data, _time_fn=self.clock.Time,
+                             _rusage_fn=self.clock.GetRusage)
+
+  def testEmpty(self):
+    self.assertEqual(self._NewStats().ToDict(), {})
+    self.assertEqual(self._NewStats(data={}).ToDict(), {})
+
+  def testAdd(self):
+    stats = self._NewStats()
+    stats.Add("rpc", 1.5, 0.25)
+    self.clock.maxrss = 15000
+    stats.Add("rpc", 0.5, 0.25)
+
+    self.assertEqual(stats.ToDict(), {
+      "rpc": {
+        jstats.STAT_COUNT: 2,
+        jstats.STAT_WALL: 2.0,
+        jstats.STAT_CPU: 0.5,
+        jstats.STAT_MAXRSS: 20000,
+        },
+      })
+
+  def testMeasure(self):
+    stats = self._NewStats()
+
+    with stats.Measure("exec"):
+      self.clock.time += 3.0
+      self.clock.cpu += 1.0
+      self.clock.maxrss = 30000
+
+    self.assertEqual(stats.ToDict(), {
+      "exec": {
+        jstats.STAT_COUNT: 1,
+        jstats.STAT_WALL: 3.0,
+        jstats.STAT_CPU: 1.0,
+        jstats.STAT_MAXRSS: 30000,
+        },
+      })
+
+  def testMeasureException(self):
+    stats = self._NewStats()
+
+    def _Fail():
+      with stats.Measure("check-prereq"):
+        self.clock.time += 2.0
+        raise ValueError()
+
+    self.assertRaises(ValueError, _Fail)
+    self.assertEqual(stats.ToDict()["check-prereq"][jstats.STAT_WALL], 2.0)
+
+  def testUpdate(self):
+    stats = self._NewStats()
+    stats.Add("startup", 1.0, 0.5)
+
+    other = self._NewStats()
+    other.Add("startup", 2.0, 0.5)
+    other.Add("context", 0.5, 0.25)
+
+    stats.Update(other)
+
+    result = stats.ToDict()
+    self.assertEqual(sorted(result.keys()), ["context", "startup"])
+    self.assertEqual(result["startup"][jstats.STAT_COUNT], 2)
+    self.assertEqual(result["startup"][jstats.STAT_WALL], 3.0)
+    self.assertEqual(result["context"], other.ToDict()["context"])
+
+  def testSerialization(self):
+    stats = self._NewStats()
+    stats.Add("job-write", 0.125, 0.0625)
+    data = stats.ToDict()
+
+    restored = self._NewStats(data=data)
+    self.assertEqual(restored.ToDict(), data)
+
+    # Modifying the restored copy must not change the original data
+    restored.Add("job-write", 1.0, 1.0)
+    self.assertEqual(data["job-write"][jstats.STAT_COUNT], 1)
+
+
+class TestCollector(unittest.TestCase):
+  def tearDown(self):
+    jstats.SetCollector(None)
+
+  def testNoCollector(self):
+    self.assertTrue(jstats.GetCollector() is None)
+
+    with jstats.Measure("rpc"):
+      pass
+
+    self.assertTrue(jstats.GetCollector() is None)
+
+  def testCollecting(self):
+    outer = jstats.PhaseStats()
+    inner = jstats.PhaseStats()
+
+    self.assertTrue(jstats.SetCollector(outer) is None)
+
+    with jstats.Measure("job-write"):
+      pass
+
+    with jstats.Collecting(inner):
+      self.assertTrue(jstats.GetCollector() is inner)
+      with jstats.Measure("exec"):
+        with jstats.Measure("rpc"):
+          pass
+
+    self.assertTrue(jstats.GetCollector() is outer)
+
+    self.assertEqual(outer.ToDict().keys(), ["job-write"])
+    self.assertEqual(sorted(inner.ToDict().keys()), ["exec", "rpc"])
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
@@ -30,7 +30,7 @@
 
 """Script for unittesting the luxi module.
 
-Currently empty (after all the tests moved to ganeti.rpc.client_unittest.py)."""
+Most tests moved to ganeti.rpc.client_unittest.py."""
 
 
 import unittest
@@ -38,6 +38,60 @@ import unittest
 from ganeti import constants
 from ganeti import errors
 from ganeti import luxi
+from ganeti import pathutils
 from ganeti import serializer
 
 import testutils
+
+
+class _FakePool(object):
+  def __init__(self):
+    self.address = "addr"
+    self.calls = []
+
+  def Call(self, method, args, version=None):
+    self.calls.append((method, args, version))
+    return "result"
+
+
+class TestPooledClient(unittest.TestCase):
+  def test(self):
+    pool = _FakePool()
+    cl = luxi.PooledClient(pool)
+    self.assertEqual(cl.QueryConfigValues(["serial_no"]), "result")
+    cl.Close()
+    self.assertEqual(cl.QueryTags(constants.TAG_CLUSTER, None), "result")
+    self.assertEqual(pool.calls, [
+      (luxi.REQ_QUERY_CONFIG_VALUES, (["serial_no"], ), constants.LUXI_VERSION),
+      (luxi.REQ_QUERY_TAGS, (constants.TAG_CLUSTER, None),
+       constants.LUXI_VERSION),
+      ])
+    self.assertRaises(errors.ProgrammerError, cl.CallMethod, "fn", "args")
+
+  def testDefaultAddress(self):
+    pool = luxi.ConnectionPool()
+    self.assertEqual(pool.address, pathutils.QUERY_SOCKET)
+
+
+class _QueryPool(_FakePool):
+  def Call(self, method, args, version=None):
+    _FakePool.Call(self, method, args, version=version)
+    return { "fields": [], "data": [], }
+
+
+class TestQuery(unittest.TestCase):
+  def test(self):
+    pool = _QueryPool()
+    cl = luxi.PooledClient(pool)
+    cl.Query(constants.QR_INSTANCE, ["name"], None)
+    cl.Query(constants.QR_NODE, ["mfree"], None, live_max_age=0)
+    self.assertEqual(pool.calls, [
+      (luxi.REQ_QUERY, (constants.QR_INSTANCE, ["name"], None),
+       constants.LUXI_VERSION),
+      (luxi.REQ_QUERY, (constants.QR_NODE, ["mfree"], None, 0),
+       constants.LUXI_VERSION),
+      ])
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
@@ -43,7 +43,7 @@ from ganeti.masterd.instance import \
   ImportExportTimeouts, _DiskImportExportBase, \
   ComputeRemoteExportHandshake, CheckRemoteExportHandshake, \
   ComputeRemoteImportDiskInfo, CheckRemoteExportDiskInfo, \
-  FormatProgress
+  FormatProgress, GetIntraClusterTransferOptions
 
 import testutils
 
@@ -79,6 +79,21 @@ class TestMisc(unittest.TestCase):
                       None, None, None, None, None, None, None)
 
 
+class TestIntraClusterTransferOptions(unittest.TestCase):
+  def testUncompressed(self):
+    opts = GetIntraClusterTransferOptions(constants.IEC_NONE, "magic")
+    self.assertTrue(opts.native_transfer)
+    self.assertEqual(opts.compress, constants.IEC_NONE)
+    self.assertEqual(opts.magic, "magic")
+    self.assertTrue(opts.key_name is None)
+    self.assertTrue(opts.ca_pem is None)
+
+  def testCompressed(self):
+    opts = GetIntraClusterTransferOptions(constants.IEC_GZIP, "magic")
+    self.assertFalse(opts.native_transfer)
+    self.assertEqual(opts.compress, constants.IEC_GZIP)
+
+
 class TestRieHandshake(unittest.TestCase):
   def test(self):
     cds = "cd-secret"
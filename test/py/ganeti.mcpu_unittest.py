@@ -212,6 +212,105 @@ class TestExecLU(unittest.TestCase):
         lu, locking.LEVEL_CLUSTER, self.calc_timeout)
 
 
+class _FakeWaitingClient(object):
+  def __init__(self, time_fn, grant_after):
+    self._time_fn = time_fn
+    self._grant_after = grant_after
+    self.waits = []
+
+  def WaitPendingRequest(self, _cid, timeout):
+    self.waits.append(timeout)
+    self._time_fn.Advance(timeout)
+    return self._time_fn() < self._grant_after
+
+
+class _FakeTime(object):
+  def __init__(self):
+    self._now = 0.0
+
+  def __call__(self):
+    return self._now
+
+  def Advance(self, seconds):
+    self._now += seconds
+
+
+class TestWaitForPendingRequest(unittest.TestCase):
+  def setUp(self):
+    self.proc = mcpu.Processor(mocks.FakeContext(), "ec_id")
+    self.time_fn = _FakeTime()
+
+  def testGrantedImmediately(self):
+    client = _FakeWaitingClient(self.time_fn, 0)
+    self.assertFalse(self.proc._WaitForPendingRequest(client, 10.0,
+                                                      _time_fn=self.time_fn))
+    self.assertEqual(client.waits, [10.0])
+
+  def testTimeout(self):
+    client = _FakeWaitingClient(self.time_fn, 1000)
+    self.assertTrue(self.proc._WaitForPendingRequest(client, 50.0,
+                                                     _time_fn=self.time_fn))
+    maxwait = constants.WCONFD_LOCK_WAIT_TIMEOUT
+    self.assertTrue(compat.all(0 < wait <= maxwait for wait in client.waits))
+    self.assertEqual(sum(client.waits), 50.0)
+
+  def testZeroTimeout(self):
+    client = _FakeWaitingClient(self.time_fn, 1000)
+    self.assertTrue(self.proc._WaitForPendingRequest(client, 0,
+                                                     _time_fn=self.time_fn))
+    self.assertEqual(client.waits, [0.0])
+
+  def testForever(self):
+    grant_after = 10 * constants.WCONFD_LOCK_WAIT_TIMEOUT + 1
+    client = _FakeWaitingClient(self.time_fn, grant_after)
+    self.assertFalse(self.proc._WaitForPendingRequest(client, None,
+                                                      _time_fn=self.time_fn))
+    self.assertEqual(len(client.waits), 11)
+
+
+class _LockWaitRecorder(mcpu.OpExecCbBase):
+  def __init__(self):
+    mcpu.OpExecCbBase.__init__(self)
+    self.stats = []
+
+  def RecordLockWait(self, stats):
+    self.stats.append(stats)
+
+
+class TestRecordLockWait(unittest.TestCase):
+  def setUp(self):
+    self.proc = mcpu.Processor(mocks.FakeContext(), "ec_id")
+    self.cbs = _LockWaitRecorder()
+    self.proc._cbs = self.cbs
+
+  def testGranted(self):
+    request = [["node/node1", "exclusive"], ["node/node2", "exclusive"],
+               ["node-res/node1", "exclusive"]]
+    self.proc._RecordLockWait(request, 100.0, False, [17, "watcher"],
+                              _time_fn=lambda: 102.5)
+    self.assertEqual(self.cbs.stats, [{
+      "levels": ["node", "node-res"],
+      "count": 3,
+      "requested": (100, 0),
+      "granted": (102, 500000),
+      "wait": 2.5,
+      "blockers": [17, "watcher"],
+      }])
+
+  def testTimeout(self):
+    self.proc._RecordLockWait([["instance/inst1", "shared"]], 10.0, True, [],
+                              _time_fn=lambda: 20.0)
+    (stats, ) = self.cbs.stats
+    self.assertEqual(stats["levels"], ["instance"])
+    self.assertTrue(stats["granted"] is None)
+    self.assertEqual(stats["wait"], 10.0)
+
+  def testNoCallbacks(self):
+    self.proc._cbs = None
+    self.proc._RecordLockWait([["cluster/BGL", "shared"]], 0.0, False, [])
+    self.assertFalse(self.cbs.stats)
+
+
 class TestSecretParams(unittest.TestCase):
   def testSecretParamsCheckNoError(self):
     op = opcodes.OpInstanceCreate(
@@ -1293,6 +1293,29 @@ class TestQueryFields(unittest.TestCase):
                          [(fdef2.name, fdef2.title) for fdef2 in fields])
 
 
+class TestNeedsLiveData(unittest.TestCase):
+  def testInstances(self):
+    self.assertFalse(query.NeedsLiveData(constants.QR_INSTANCE, []))
+    self.assertFalse(query.NeedsLiveData(constants.QR_INSTANCE,
+                                         ["name", "admin_state", "pnode"]))
+    self.assertTrue(query.NeedsLiveData(constants.QR_INSTANCE,
+                                        ["name", "oper_state"]))
+    self.assertTrue(query.NeedsLiveData(constants.QR_INSTANCE, ["console"]))
+    self.assertFalse(query.NeedsLiveData(constants.QR_INSTANCE,
+                                         ["name", "no_such_field"]))
+
+  def testNodes(self):
+    self.assertFalse(query.NeedsLiveData(constants.QR_NODE,
+                                         ["name", "offline", "pinst_cnt"]))
+    self.assertTrue(query.NeedsLiveData(constants.QR_NODE, ["mfree"]))
+    self.assertTrue(query.NeedsLiveData(constants.QR_NODE, ["powered"]))
+
+  def testConfigOnly(self):
+    for resource in [constants.QR_GROUP, constants.QR_NETWORK]:
+      fields = query.ALL_FIELDS[resource].keys()
+      self.assertFalse(query.NeedsLiveData(resource, fields))
+
+
 class TestQueryFilter(unittest.TestCase):
   def testRequestedNames(self):
     for (what, fielddefs) in query.ALL_FIELDS.items():
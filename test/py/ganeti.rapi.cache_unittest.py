@@ -0,0 +1,147 @@
+#!/usr/bin/python
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for testing ganeti.rapi.cache"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from ganeti import utils
+from ganeti.rapi import cache
+
+import testutils
+
+
+class TestComputeETag(unittest.TestCase):
+  def test(self):
+    etag = cache.ComputeETag("[1, 2]")
+    self.assertTrue(etag.startswith("\"") and etag.endswith("\""))
+    self.assertEqual(etag, cache.ComputeETag("[1, 2]"))
+    self.assertNotEqual(etag, cache.ComputeETag("[1, 3]"))
+
+
+class TestResultCache(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.now = 1000.0
+    self.calls = 0
+    self.cache = cache.ResultCache(self.tmpdir, ttl=5,
+                                   _time_fn=lambda: self.now)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def _Compute(self):
+    self.calls += 1
+    return "[%d]" % self.calls
+
+  def testReuse(self):
+    (etag, body) = self.cache.GetResult("/2/nodes", 3, self._Compute)
+    self.assertEqual(body, "[1]")
+    self.assertEqual(etag, cache.ComputeETag(body))
+    self.now += 4
+    self.assertEqual(self.cache.GetResult("/2/nodes", 3, self._Compute),
+                     (etag, body))
+    self.assertEqual(self.calls, 1)
+
+  def testExpiry(self):
+    self.cache.GetResult("/2/nodes", 3, self._Compute)
+    self.now += 5
+    (_, body) = self.cache.GetResult("/2/nodes", 3, self._Compute)
+    self.assertEqual(body, "[2]")
+
+  def testSerial(self):
+    self.cache.GetResult("/2/nodes", 3, self._Compute)
+    (_, body) = self.cache.GetResult("/2/nodes", 4, self._Compute)
+    self.assertEqual(body, "[2]")
+
+  def testKeys(self):
+    self.cache.GetResult("/2/nodes", 3, self._Compute)
+    (_, body) = self.cache.GetResult("/2/nodes?bulk=1", 3, self._Compute)
+    self.assertEqual(body, "[2]")
+
+  def testNotLive(self):
+    self.cache.GetResult("/2/nodes", 3, self._Compute, live=False)
+    self.now += 3600
+    (_, body) = self.cache.GetResult("/2/nodes", 3, self._Compute, live=False)
+    self.assertEqual(body, "[1]")
+    (_, body) = self.cache.GetResult("/2/nodes", 4, self._Compute, live=False)
+    self.assertEqual(body, "[2]")
+
+  def _NewCache(self):
+    return cache.ResultCache(self.tmpdir, ttl=5, _time_fn=lambda: self.now)
+
+  def testMemory(self):
+    (etag, body) = self.cache.GetResult("/2/nodes", 3, self._Compute)
+    for name in os.listdir(self.tmpdir):
+      os.unlink(os.path.join(self.tmpdir, name))
+    self.assertEqual(self.cache.GetResult("/2/nodes", 3, self._Compute),
+                     (etag, body))
+    self.assertEqual(self.calls, 1)
+
+  def testFiles(self):
+    (etag, body) = self.cache.GetResult("/2/nodes", 3, self._Compute)
+    self.now += 4
+    rcache = self._NewCache()
+    self.assertEqual(rcache.GetResult("/2/nodes", 3, self._Compute),
+                     (etag, body))
+    self.assertEqual(self.calls, 1)
+
+    # The entry keeps the time it was computed at
+    self.now += 1
+    (_, body) = rcache.GetResult("/2/nodes", 3, self._Compute)
+    self.assertEqual(body, "[2]")
+
+  def testCorruptEntry(self):
+    self.cache.GetResult("/2/nodes", 3, self._Compute)
+    for name in os.listdir(self.tmpdir):
+      if not name.endswith(".lock"):
+        utils.WriteFile(os.path.join(self.tmpdir, name), data="garbage")
+    (_, body) = self._NewCache().GetResult("/2/nodes", 3, self._Compute)
+    self.assertEqual(body, "[2]")
+
+  def testNoDirectory(self):
+    rcache = cache.ResultCache(os.path.join(self.tmpdir, "missing"))
+    (etag, body) = rcache.GetResult("/2/nodes", 3, self._Compute)
+    self.assertEqual(body, "[1]")
+    self.assertEqual(etag, cache.ComputeETag(body))
+
+  def testError(self):
+    def _Fail():
+      raise RuntimeError("query failed")
+    self.assertRaises(RuntimeError, self.cache.GetResult, "/2/nodes", 3, _Fail)
+    (_, body) = self.cache.GetResult("/2/nodes", 3, self._Compute)
+    self.assertEqual(body, "[1]")
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
@@ -190,6 +190,48 @@ class RapiMockTest(unittest.TestCase):
     self.failUnless(isinstance(rapi.GetLastHandler(), rlib2.R_version))
 
 
+class _FakeETagServer(object):
+  def __init__(self):
+    self.body = "[]"
+    self.requests = []
+
+  def FetchResponse(self, path, method, headers, request_body):
+    etag = "\"%s\"" % len(self.body)
+    condition = headers.get(http.HTTP_IF_NONE_MATCH)
+    self.requests.append((path, condition))
+
+    if condition == etag:
+      return (http.HttpNotModified.code, {http.HTTP_ETAG: etag}, "")
+
+    return (200, {http.HTTP_ETAG: etag}, self.body)
+
+
+class TestConditionalRequests(unittest.TestCase):
+  def setUp(self):
+    self.server = _FakeETagServer()
+    curl = rapi.testutils.FakeCurl(self.server)
+    self.client = client.GanetiRapiClient("master.example.com",
+                                          curl_factory=lambda: curl)
+
+  def test(self):
+    self.server.body = "[\"node1\"]"
+    self.assertEqual(self.client.GetNodes(bulk=True), ["node1"])
+    self.assertEqual(self.client.GetNodes(bulk=True), ["node1"])
+    self.server.body = "[\"node1\", \"node2\"]"
+    self.assertEqual(self.client.GetNodes(bulk=True), ["node1", "node2"])
+    self.assertEqual(self.server.requests, [
+      ("/2/nodes?bulk=1", None),
+      ("/2/nodes?bulk=1", "\"9\""),
+      ("/2/nodes?bulk=1", "\"9\""),
+      ])
+
+  def testDifferentResources(self):
+    self.assertEqual(self.client.GetNodes(bulk=True), [])
+    self.assertEqual(self.client.GetInstances(bulk=True), [])
+    self.assertEqual([condition for (_, condition) in self.server.requests],
+                     [None, None])
+
+
 def _FakeNoSslPycurlVersion():
   # Note: incomplete version tuple
   return (3, "7.16.0", 462848, "mysystem", 1581, None, 0)
@@ -455,6 +497,16 @@ class GanetiRapiClientTests(testutils.GanetiTestCase):
       self.assertEqual(features, self.client.GetFeatures())
       self.assertHandler(rlib2.R_2_features)
 
+  def testGetStatus(self):
+    status = {
+      "requests": 3,
+      "rate": 0.05,
+      "latency": { "p50": 0.01, },
+      }
+    self.rapi.AddResponse(serializer.DumpJson(status))
+    self.assertEqual(status, self.client.GetStatus())
+    self.assertHandler(rlib2.R_2_status)
+
   def testGetFeaturesNotFound(self):
     self.rapi.AddResponse(None, code=404)
     self.assertEqual([], self.client.GetFeatures())
@@ -496,6 +548,31 @@ class GanetiRapiClientTests(testutils.GanetiTestCase):
     self.assertHandler(rlib2.R_2_instances)
     self.assertBulk()
 
+  def testGetInstancesFieldsFilter(self):
+    self.rapi.AddResponse("[]")
+    self.assertEqual([], self.client.GetInstances(bulk=True,
+                                                  fields=["name", "pnode"],
+                                                  qfilter="admin_state"))
+    self.assertHandler(rlib2.R_2_instances)
+    self.assertBulk()
+    self.assertQuery("fields", ["name,pnode"])
+    self.assertQuery("filter", ["admin_state"])
+
+    self.rapi.AddResponse("[]")
+    self.assertEqual([], self.client.GetInstances())
+    self.assertQuery("fields", None)
+    self.assertQuery("filter", None)
+
+  def testGetNodesLiveMaxAge(self):
+    self.rapi.AddResponse("[]")
+    self.assertEqual([], self.client.GetNodes(bulk=True, live_max_age=0))
+    self.assertHandler(rlib2.R_2_nodes)
+    self.assertQuery("live_max_age", ["0"])
+
+    self.rapi.AddResponse("[]")
+    self.assertEqual([], self.client.GetNodes())
+    self.assertQuery("live_max_age", None)
+
   def testGetInstance(self):
     self.rapi.AddResponse("[]")
     self.assertEqual([], self.client.GetInstance("instance"))
@@ -536,6 +613,40 @@ class GanetiRapiClientTests(testutils.GanetiTestCase):
     self.assertEqual(resp, response)
     self.assertHandler(rlib2.R_2_instances_multi_alloc)
 
+  def testInstancesMultiOps(self):
+    for (name, handler_cls) in [
+        ("InstancesMultiStartup", rlib2.R_2_instances_multi_startup),
+        ("InstancesMultiShutdown", rlib2.R_2_instances_multi_shutdown),
+        ("InstancesMultiReboot", rlib2.R_2_instances_multi_reboot),
+        ("InstancesMultiMigrate", rlib2.R_2_instances_multi_migrate),
+        ("InstancesMultiModify", rlib2.R_2_instances_multi_modify),
+        ]:
+      response = [[True, "1001"], [False, "Job queue is full"]]
+      self.rapi.AddResponse(serializer.DumpJson(response))
+      fn = getattr(self.client, name)
+      result = fn(["inst1", {"instance_name": "inst2", "force": True}],
+                  max_concurrent=10, dry_run=True, reason="Maintenance",
+                  no_remember=True)
+      self.assertEqual(result, response)
+      self.assertHandler(handler_cls)
+      self.assertDryRun()
+      self.assertQuery("reason", ["Maintenance"])
+
+      data = serializer.LoadJson(self.rapi.GetLastRequestData())
+      self.assertEqual(data, {
+        "instances": ["inst1", {"instance_name": "inst2", "force": True}],
+        "max_concurrent": 10,
+        "no_remember": True,
+        })
+
+  def testInstancesMultiOpsNoLimit(self):
+    self.rapi.AddResponse(serializer.DumpJson([[True, "1002"]]))
+    self.client.InstancesMultiShutdown(["inst1"])
+    self.assertHandler(rlib2.R_2_instances_multi_shutdown)
+    self.assertQuery("dry-run", None)
+    data = serializer.LoadJson(self.rapi.GetLastRequestData())
+    self.assertEqual(data, { "instances": ["inst1"], })
+
   def testCreateInstanceOldVersion(self):
     # The old request format, version 0, is no longer supported
     self.rapi.AddResponse(None, code=404)
@@ -888,6 +999,27 @@ class GanetiRapiClientTests(testutils.GanetiTestCase):
     self.assertHandler(rlib2.R_2_jobs_id_wait)
     self.assertItems(["123"])
 
+  def testWaitForJobsChange(self):
+    expected = [{
+      "id": 124,
+      "job_info": ["running"],
+      "log_entries": [],
+      }]
+
+    self.rapi.AddResponse(serializer.DumpJson(expected))
+    result = self.client.WaitForJobsChange([(123, None, None),
+                                            (124, ["queued"], 3)],
+                                           ["status"])
+    self.assertEqualValues(expected, result)
+    self.assertHandler(rlib2.R_2_jobs_wait)
+    self.assertEqual(serializer.LoadJson(self.rapi.GetLastRequestData()), {
+      "fields": ["status"],
+      "jobs": [
+        {"id": 123, "previous_job_info": None, "previous_log_serial": None},
+        {"id": 124, "previous_job_info": ["queued"], "previous_log_serial": 3},
+        ],
+      })
+
   def testCancelJob(self):
     self.rapi.AddResponse("[true, \"Job 123 will be canceled\"]")
     self.assertEqual([True, "Job 123 will be canceled"],
@@ -42,6 +42,8 @@ from ganeti import opcodes
 from ganeti import compat
 from ganeti import ht
 from ganeti import http
+from ganeti import objects
+from ganeti import qlang
 from ganeti import query
 import ganeti.rpc.errors as rpcerr
 from ganeti import errors
@@ -81,6 +83,9 @@ class _FakeClient:
     self._jobs.append((job_id, ops))
     return job_id
 
+  def SubmitManyJobs(self, jobs):
+    return [(True, self.SubmitJob(ops)) for ops in jobs]
+
 
 class _FakeClientFactory:
   def __init__(self, cls):
@@ -1471,6 +1476,138 @@ class TestClusterInfo(unittest.TestCase):
     self.assertEqual(result, cl.cluster_info)
 
 
+class TestListQuery(unittest.TestCase):
+  class _QueryClient:
+    def __init__(self, address=None):
+      self.queries = []
+
+    def _Classic(self, names, fields, use_locking=False):
+      assert not names
+      self.queries.append((None, fields, None))
+      return [["%s%s" % (field, i) for field in fields] for i in range(2)]
+
+    QueryInstances = QueryNodes = QueryGroups = QueryNetworks = _Classic
+
+    def Query(self, what, fields, qfilter, live_max_age=None):
+      self.queries.append((what, fields, qfilter))
+      self.live_max_age = live_max_age
+      data = [[(constants.RS_NORMAL, "%s%s" % (field, i))
+               for field in fields] for i in range(2)]
+      # Live data is not available for the second item
+      if "oper_state" in fields:
+        data[1][fields.index("oper_state")] = (constants.RS_NODATA, None)
+      return objects.QueryResponse(fields=[], data=data)
+
+  def _Get(self, cls, query_args):
+    clfactory = _FakeClientFactory(self._QueryClient)
+    handler = _CreateHandler(cls, [], query_args, None, clfactory)
+    result = handler.GET()
+    cl = clfactory.GetNextClient()
+    self.assertRaises(IndexError, clfactory.GetNextClient)
+    return (result, cl.queries)
+
+  def testClassic(self):
+    (result, queries) = self._Get(rlib2.R_2_nodes, {
+      "bulk": ["1"],
+      })
+    self.assertEqual(queries, [(None, rlib2.N_FIELDS, None)])
+    self.assertEqual(len(result), 2)
+    self.assertEqual(sorted(result[0].keys()), sorted(rlib2.N_FIELDS))
+
+    (result, queries) = self._Get(rlib2.R_2_networks, {})
+    self.assertEqual(queries, [(None, ["name"], None)])
+    self.assertEqual([item["name"] for item in result], ["name0", "name1"])
+
+  def testFields(self):
+    (result, queries) = self._Get(rlib2.R_2_instances, {
+      "bulk": ["1"],
+      "fields": ["name,oper_state"],
+      })
+    self.assertEqual(queries, [
+      (constants.QR_INSTANCE, ["name", "oper_state"], None),
+      ])
+    self.assertEqual(result, [
+      { "name": "name0", "oper_state": "oper_state0", },
+      { "name": "name1", "oper_state": None, },
+      ])
+
+  def testFilter(self):
+    (result, queries) = self._Get(rlib2.R_2_groups, {
+      "filter": ["alloc_policy == \"preferred\" and node_cnt > 0"],
+      })
+    self.assertEqual(queries, [
+      (constants.QR_GROUP, ["name"],
+       [qlang.OP_AND,
+        [qlang.OP_EQUAL, "alloc_policy", "preferred"],
+        [qlang.OP_GT, "node_cnt", 0]]),
+      ])
+    self.assertEqual(result, [
+      { "name": "name0", "uri": "/2/groups/name0", },
+      { "name": "name1", "uri": "/2/groups/name1", },
+      ])
+
+  def testFieldsAndFilter(self):
+    (result, queries) = self._Get(rlib2.R_2_nodes, {
+      "bulk": ["1"],
+      "fields": ["name"],
+      "filter": ["offline"],
+      })
+    self.assertEqual(queries, [
+      (constants.QR_NODE, ["name"], [qlang.OP_TRUE, "offline"]),
+      ])
+    self.assertEqual(result, [{ "name": "name0", }, { "name": "name1", }])
+
+  def testLiveMaxAge(self):
+    clfactory = _FakeClientFactory(self._QueryClient)
+    handler = _CreateHandler(rlib2.R_2_instances, [], {
+      "bulk": ["1"],
+      "live_max_age": ["0"],
+      }, None, clfactory)
+    self.assertFalse(handler.useResultCache())
+    handler.GET()
+    cl = clfactory.GetNextClient()
+    self.assertEqual(cl.queries, [
+      (constants.QR_INSTANCE, rlib2.I_FIELDS, None),
+      ])
+    self.assertEqual(cl.live_max_age, 0)
+
+    handler = _CreateHandler(rlib2.R_2_instances, [], {
+      "live_max_age": ["%s" % constants.RAPI_CACHE_TTL],
+      }, None, clfactory)
+    self.assertTrue(handler.useResultCache())
+
+  def testInvalid(self):
+    for (cls, query_args) in [
+        (rlib2.R_2_instances, { "fields": ["name"], }),
+        (rlib2.R_2_instances, { "bulk": ["1"], "fields": ["console"], }),
+        (rlib2.R_2_instances, { "filter": ["console == \"x\""], }),
+        (rlib2.R_2_nodes, { "filter": ["not (offline or drained) and"], }),
+        (rlib2.R_2_nodes, { "live_max_age": ["soon"], }),
+        ]:
+      clfactory = _FakeClientFactory(self._QueryClient)
+      handler = _CreateHandler(cls, [], query_args, None, clfactory)
+      self.assertRaises(http.HttpBadRequest, handler.GET)
+      self.assertFalse(clfactory.GetNextClient().queries)
+
+  def testUsesLiveData(self):
+    for (cls, query_args, live) in [
+        (rlib2.R_2_instances, {}, False),
+        (rlib2.R_2_instances, { "bulk": ["1"], }, True),
+        (rlib2.R_2_instances, { "bulk": ["1"], "fields": ["name,pnode"], },
+         False),
+        (rlib2.R_2_instances, { "filter": ["oper_state"], }, True),
+        (rlib2.R_2_nodes, { "bulk": ["1"], }, True),
+        (rlib2.R_2_nodes, { "bulk": ["1"], "fields": ["name,offline"], },
+         False),
+        (rlib2.R_2_groups, { "bulk": ["1"], }, False),
+        (rlib2.R_2_networks, { "bulk": ["1"], }, False),
+        (rlib2.R_2_nodes_name, {}, True),
+        ]:
+      handler = _CreateHandler(cls, ["node1"], query_args, None,
+                               _FakeClientFactory(self._QueryClient))
+      self.assertEqual(handler.UsesLiveData(), live)
+
+
 class TestInstancesMultiAlloc(unittest.TestCase):
   def testInstanceUpdate(self):
     clfactory = _FakeClientFactory(_FakeClient)
@@ -1499,6 +1636,101 @@ class TestInstancesMultiAlloc(unittest.TestCase):
     ))
 
 
+class TestInstancesMultiOps(RAPITestCase):
+  def _Submit(self, rapi_cls, body_data, query_args=None):
+    handler = _CreateHandler(rapi_cls, [], query_args or {}, body_data,
+                             self._clfactory)
+    result = handler.POST()
+
+    cl = self._clfactory.GetNextClient()
+    self.assertNoNextClient()
+
+    ops = []
+    for (success, job_id) in result:
+      self.assertTrue(success)
+      (exp_job_id, (op, )) = cl.GetNextSubmittedJob()
+      self.assertEqual(job_id, exp_job_id)
+      ops.append(op)
+    self.assertRaises(IndexError, cl.GetNextSubmittedJob)
+
+    return ops
+
+  def testStartup(self):
+    ops = self._Submit(rlib2.R_2_instances_multi_startup, {
+      "instances": ["inst1", {"instance_name": "inst2", "force": False}],
+      "force": True,
+      }, query_args={
+        "dry-run": ["1"],
+        "reason": ["Maintenance"],
+      })
+
+    self.assertEqual([op.instance_name for op in ops], ["inst1", "inst2"])
+    self.assertEqual([op.force for op in ops], [True, False])
+    for op in ops:
+      self.assertTrue(isinstance(op, opcodes.OpInstanceStartup))
+      self.assertTrue(op.dry_run)
+      self.assertFalse(op.depends)
+      self.assertEqual(op.reason[0][1], "Maintenance")
+      self.assertEqual(op.reason[1][0],
+                       "%s:%s" % (constants.OPCODE_REASON_SRC_RLIB2,
+                                  "instances_multi_startup"))
+      self.assertEqual(op.reason[-1][0], constants.OPCODE_REASON_SRC_RLIB2)
+
+    # Every opcode has a reason trail of its own
+    self.assertEqual(len(ops[0].reason), 3)
+    self.assertFalse(ops[0].reason is ops[1].reason)
+
+  def testMaxConcurrent(self):
+    ops = self._Submit(rlib2.R_2_instances_multi_reboot, {
+      "instances": ["inst%s" % i for i in range(5)] +
+                   [{"instance_name": "inst5", "depends": [[123, []]]}],
+      "reboot_type": constants.INSTANCE_REBOOT_SOFT,
+      "max_concurrent": 2,
+      })
+
+    self.assertEqual([op.reboot_type for op in ops],
+                     6 * [constants.INSTANCE_REBOOT_SOFT])
+    self.assertFalse(ops[0].depends)
+    self.assertFalse(ops[1].depends)
+    for op in ops[2:5]:
+      self.assertEqual(op.depends, [[-2, list(constants.JOBS_FINALIZED)]])
+    self.assertEqual(ops[5].depends,
+                     [[123, []], [-2, list(constants.JOBS_FINALIZED)]])
+
+  def testModify(self):
+    ops = self._Submit(rlib2.R_2_instances_multi_modify, {
+      "instances": [
+        "inst1",
+        {"instance_name": "inst2", "custom_beparams": {"vcpus": 4}},
+        ],
+      "hvparams": {constants.HV_USB_DEVICES: "0000:01 0000:02"},
+      })
+
+    for op in ops:
+      self.assertTrue(isinstance(op, opcodes.OpInstanceSetParams))
+      self.assertEqual(op.hvparams,
+                       {constants.HV_USB_DEVICES: "0000:01,0000:02"})
+    self.assertFalse(ops[0].beparams)
+    self.assertEqual(ops[1].beparams, {"vcpus": 4})
+
+  def testInvalid(self):
+    for (rapi_cls, body) in [
+        (rlib2.R_2_instances_multi_shutdown, {}),
+        (rlib2.R_2_instances_multi_shutdown, {"instances": "inst1"}),
+        (rlib2.R_2_instances_multi_shutdown, {"instances": [123]}),
+        (rlib2.R_2_instances_multi_shutdown, {"instances": [{}]}),
+        (rlib2.R_2_instances_multi_migrate,
+         {"instances": ["inst1"], "max_concurrent": 0}),
+        (rlib2.R_2_instances_multi_migrate,
+         {"instances": ["inst1"], "max_concurrent": "many"}),
+        (rlib2.R_2_instances_multi_migrate,
+         {"instances": ["inst1"], "no_such_param": True}),
+        ]:
+      handler = _CreateHandler(rapi_cls, [], {}, body, self._clfactory)
+      self.assertRaises(http.HttpBadRequest, handler.POST)
+      self.assertNoNextClient()
+
+
 class TestPermissions(unittest.TestCase):
   def testEquality(self):
     self.assertEqual(rlib2.R_2_query.GET_ACCESS, rlib2.R_2_query.PUT_ACCESS)
@@ -0,0 +1,122 @@
+#!/usr/bin/python
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for testing ganeti.rapi.stats"""
+
+import unittest
+
+from ganeti.rapi import stats
+
+import testutils
+
+
+class _FakeClock(object):
+  def __init__(self):
+    self.time = 1000.0
+
+  def Time(self):
+    return self.time
+
+
+class TestPercentile(unittest.TestCase):
+  def test(self):
+    values = range(1, 101)
+    self.assertEqual(stats._Percentile(values, 0), 1)
+    self.assertEqual(stats._Percentile(values, 50), 51)
+    self.assertEqual(stats._Percentile(values, 99), 99)
+    self.assertEqual(stats._Percentile(values, 100), 100)
+    self.assertEqual(stats._Percentile([7], 90), 7)
+
+
+class TestRequestStats(unittest.TestCase):
+  def setUp(self):
+    self.clock = _FakeClock()
+    self.stats = stats.RequestStats(_time_fn=self.clock.Time)
+
+  def testEmpty(self):
+    self.clock.time += 10.0
+    self.assertEqual(self.stats.ToDict(), {
+      "uptime": 10.0,
+      "requests": 0,
+      "methods": {},
+      "status": {},
+      "rate": 0.0,
+      "latency": {},
+      })
+
+  def testRecord(self):
+    self.stats.Record("GET", 200, 0.5)
+    self.stats.Record("GET", 304, 0.25)
+    self.stats.Record("PUT", 200, 1.0)
+    self.stats.Record("GET", 404, 0.25)
+    self.clock.time += 2.0
+
+    result = self.stats.ToDict()
+    self.assertEqual(result["uptime"], 2.0)
+    self.assertEqual(result["requests"], 4)
+    self.assertEqual(result["methods"], { "GET": 3, "PUT": 1, })
+    self.assertEqual(result["status"], { "2xx": 2, "3xx": 1, "4xx": 1, })
+    self.assertEqual(result["rate"], 2.0)
+    self.assertEqual(result["latency"], {
+      "average": 0.5,
+      "max": 1.0,
+      "p50": 0.5,
+      "p90": 1.0,
+      "p99": 1.0,
+      })
+
+  def testRate(self):
+    for _ in range(30):
+      self.stats.Record("GET", 200, 0.1)
+    self.clock.time += 100.0
+    for _ in range(60):
+      self.stats.Record("GET", 200, 0.1)
+
+    # Only requests within the last minute are taken into account
+    result = self.stats.ToDict()
+    self.assertEqual(result["requests"], 90)
+    self.assertEqual(result["rate"], 1.0)
+
+  def testWindow(self):
+    for _ in range(stats._WINDOW_SIZE):
+      self.stats.Record("GET", 200, 0.25)
+    self.clock.time += 10.0
+    for _ in range(stats._WINDOW_SIZE):
+      self.stats.Record("GET", 200, 0.5)
+
+    # Old requests are dropped from the latency figures, but still counted
+    result = self.stats.ToDict()
+    self.assertEqual(result["requests"], 2 * stats._WINDOW_SIZE)
+    self.assertEqual(result["latency"]["average"], 0.5)
+    self.assertEqual(result["rate"], stats._WINDOW_SIZE)
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
@@ -170,6 +170,10 @@ class TestInputTestClient(unittest.TestCase):
     result = self.cl.WaitForJobChange("1", ["id"], None, None)
     self.assertTrue(result is NotImplemented)
 
+  def testWaitForJobsChange(self):
+    result = self.cl.WaitForJobsChange([("1", None, None)], ["id"])
+    self.assertTrue(result is NotImplemented)
+
   def testGetFilters(self):
     self.assertTrue(self.cl.GetFilters() is NotImplemented)
 
@@ -31,12 +31,15 @@
 """Script for unittesting the RPC client module"""
 
 
+import collections
+import threading
 import unittest
 
 from ganeti import constants
 from ganeti import errors
 from ganeti import serializer
 from ganeti.rpc import client
+from ganeti.rpc import errors as rpcerr
 
 import testutils
 
@@ -124,6 +127,24 @@ class TextRPCParsing(testutils.GanetiTestCase):
 
     self.assertEqual(client.ParseResponse(msg), (True, "Hello World", 19991234))
 
+  def testParseResponseWithId(self):
+    msg = serializer.DumpJson({
+      client.KEY_SUCCESS: True,
+      client.KEY_RESULT: "Hello World",
+      client.KEY_ID: 17,
+      })
+
+    self.assertEqual(client.ParseResponseWithId(msg),
+                     (17, True, "Hello World", None))
+    self.assertEqual(client.ParseResponse(msg), (True, "Hello World", None))
+
+    msg = client.FormatResponse(False, "error")
+    self.assertEqual(client.ParseResponseWithId(msg),
+                     (None, False, "error", None))
+
+    self.assertRaises(client.ProtocolError, client.ParseResponseWithId,
+                      serializer.DumpJson({ client.KEY_ID: 1, }))
+
   def testFormatResponse(self):
     for success, result in [(False, "error"), (True, "abc"),
                             (True, { "a": 123, "b": None, })]:
@@ -151,6 +172,14 @@ class TextRPCParsing(testutils.GanetiTestCase):
                                client.KEY_VERSION: version,
                              })
 
+  def testFormatResponseWithId(self):
+    msg = client.FormatResponse(True, "abc", request_id=3)
+    self.assertEqualValues(serializer.LoadJson(msg),
+                           { client.KEY_SUCCESS: True,
+                             client.KEY_RESULT: "abc",
+                             client.KEY_ID: 3,
+                           })
+
   def testFormatRequest(self):
     for method, args in [("a", []), ("b", [1, 2, 3])]:
       msg = client.FormatRequest(method, args)
@@ -176,6 +205,17 @@ class TextRPCParsing(testutils.GanetiTestCase):
                                client.KEY_VERSION: version,
                              })
 
+  def testFormatRequestWithId(self):
+    for method, args, request_id in [("fn1", [], 0), ("fn2", [1, 2, 3], 9)]:
+      msg = client.FormatRequest(method, args, request_id=request_id)
+      msgdata = serializer.LoadJson(msg)
+      self.assert_(client.KEY_VERSION not in msgdata)
+      self.assertEqualValues(msgdata,
+                             { client.KEY_METHOD: method,
+                               client.KEY_ARGS: args,
+                               client.KEY_ID: request_id,
+                             })
+
 
 class TestCallRPCMethod(unittest.TestCase):
   MY_LUXI_VERSION = 1234
@@ -258,5 +298,235 @@ class TestCallRPCMethod(unittest.TestCase):
                       version=self.MY_LUXI_VERSION)
 
 
+class _FakeMultiplexTransport(object):
+  """Transport whose responses are sent by the test.
+
+  """
+  def __init__(self, address, timeouts=None, allow_non_master=None):
+    self.address = address
+    self.requests = []
+    self.closed = False
+    self._cond = threading.Condition()
+    self._msgs = collections.deque()
+
+  def Send(self, msg):
+    self._cond.acquire()
+    try:
+      self.requests.append(serializer.LoadJson(msg))
+      self._cond.notifyAll()
+    finally:
+      self._cond.release()
+
+  def Recv(self):
+    self._cond.acquire()
+    try:
+      while not self._msgs:
+        self._cond.wait()
+      msg = self._msgs.popleft()
+    finally:
+      self._cond.release()
+    if isinstance(msg, Exception):
+      raise msg
+    return msg
+
+  def Close(self):
+    self.closed = True
+
+  def WaitForRequests(self, count):
+    self._cond.acquire()
+    try:
+      while len(self.requests) < count:
+        self._cond.wait()
+      return self.requests[:count]
+    finally:
+      self._cond.release()
+
+  def Reply(self, msg):
+    self._cond.acquire()
+    try:
+      self._msgs.append(msg)
+      self._cond.notifyAll()
+    finally:
+      self._cond.release()
+
+
+class _CallThread(threading.Thread):
+  def __init__(self, conn, method, args):
+    threading.Thread.__init__(self)
+    self.daemon = True
+    self._conn = conn
+    self._method = method
+    self._args = args
+    self.result = None
+    self.error = None
+
+  def run(self):
+    try:
+      self.result = self._conn.Call(self._method, self._args)
+    except Exception, err: # pylint: disable=W0703
+      self.error = err
+
+
+class TestMultiplexedConnection(unittest.TestCase):
+  def _StartCalls(self, conn, count):
+    threads = [_CallThread(conn, "fn%s" % i, [i]) for i in range(count)]
+    for thread in threads:
+      thread.start()
+    return threads
+
+  def _JoinAll(self, threads):
+    for thread in threads:
+      thread.join(10)
+      self.assertFalse(thread.isAlive())
+
+  def testOutOfOrder(self):
+    conn = client.MultiplexedConnection("addr",
+                                        transport=_FakeMultiplexTransport)
+    transport = conn._transport
+    threads = self._StartCalls(conn, 10)
+    requests = transport.WaitForRequests(10)
+
+    self.assertEqual(len(set(req[client.KEY_ID] for req in requests)), 10)
+    self.assertEqual(conn.GetPendingCount(), 10)
+
+    # Answer in the reverse order, using the arguments as the result
+    for req in reversed(requests):
+      transport.Reply(client.FormatResponse(True, req[client.KEY_ARGS],
+                                            request_id=req[client.KEY_ID]))
+
+    self._JoinAll(threads)
+    for (i, thread) in enumerate(threads):
+      self.assertEqual(thread.error, None)
+      self.assertEqual(thread.result, [i])
+    self.assertEqual(conn.GetPendingCount(), 0)
+    self.assertTrue(conn.IsUsable())
+
+  def testErrorResult(self):
+    conn = client.MultiplexedConnection("addr",
+                                        transport=_FakeMultiplexTransport)
+    transport = conn._transport
+    (thread, ) = self._StartCalls(conn, 1)
+    (req, ) = transport.WaitForRequests(1)
+    err = errors.OpPrereqError("Test")
+    transport.Reply(client.FormatResponse(False, errors.EncodeException(err),
+                                          request_id=req[client.KEY_ID]))
+    self._JoinAll([thread])
+    self.assertTrue(isinstance(thread.error, errors.OpPrereqError))
+    self.assertTrue(conn.IsUsable())
+
+  def testConnectionClosed(self):
+    conn = client.MultiplexedConnection("addr",
+                                        transport=_FakeMultiplexTransport)
+    transport = conn._transport
+    threads = self._StartCalls(conn, 5)
+    transport.WaitForRequests(5)
+    transport.Reply(rpcerr.ConnectionClosedError("Closed"))
+
+    self._JoinAll(threads)
+    for thread in threads:
+      self.assertTrue(isinstance(thread.error, rpcerr.ConnectionClosedError))
+    self.assertFalse(conn.IsUsable())
+    self.assertTrue(transport.closed)
+    self.assertRaises(rpcerr.ConnectionClosedError, conn.Call, "fn", [])
+
+  def testTimeout(self):
+    conn = client.MultiplexedConnection("addr",
+                                        transport=_FakeMultiplexTransport)
+    transport = conn._transport
+    threads = self._StartCalls(conn, 2)
+    requests = transport.WaitForRequests(2)
+
+    # Only the reading call gives up
+    transport.Reply(rpcerr.TimeoutError("Timeout"))
+    for req in requests:
+      transport.Reply(client.FormatResponse(True, req[client.KEY_ARGS],
+                                            request_id=req[client.KEY_ID]))
+
+    self._JoinAll(threads)
+    errs = [thread.error for thread in threads if thread.error]
+    self.assertEqual(len(errs), 1)
+    self.assertTrue(isinstance(errs[0], rpcerr.TimeoutError))
+    self.assertTrue(conn.IsUsable())
+    self.assertEqual(conn.GetPendingCount(), 0)
+
+
+class _FakeConnection(object):
+  def __init__(self, address, timeouts=None, transport=None,
+               allow_non_master=None):
+    self.address = address
+    self.pending = 0
+    self.usable = True
+    self.calls = []
+    self.fail = None
+
+  def IsUsable(self):
+    return self.usable
+
+  def GetPendingCount(self):
+    return self.pending
+
+  def Call(self, method, args, version=None):
+    if self.fail:
+      self.usable = False
+      raise self.fail
+    self.calls.append((method, args, version))
+    return len(self.calls)
+
+  def Close(self):
+    self.usable = False
+
+
+class TestConnectionPool(unittest.TestCase):
+  def _GetPool(self, size):
+    return client.ConnectionPool("addr", size=size,
+                                 _connection_cls=_FakeConnection)
+
+  def testReuseIdle(self):
+    pool = self._GetPool(3)
+    for _ in range(5):
+      pool.Call("fn", [])
+    self.assertEqual(len(pool._connections), 1)
+    self.assertEqual(len(pool._connections[0].calls), 5)
+
+  def testGrowAndMultiplex(self):
+    pool = self._GetPool(2)
+    first = pool._GetConnection()
+    first.pending = 3
+    second = pool._GetConnection()
+    self.assertFalse(first is second)
+    second.pending = 1
+    # The pool is full, the least busy connection is used
+    self.assertTrue(pool._GetConnection() is second)
+    self.assertEqual(len(pool._connections), 2)
+
+  def testReplaceBroken(self):
+    pool = self._GetPool(1)
+    broken = pool._GetConnection()
+    broken.fail = rpcerr.ConnectionClosedError("Closed")
+    self.assertEqual(pool.Call("fn", ["a"], version=5), 1)
+    self.assertFalse(broken.IsUsable())
+    (conn, ) = pool._connections
+    self.assertFalse(conn is broken)
+    self.assertEqual(conn.calls, [("fn", ["a"], 5)])
+
+  def testOtherErrors(self):
+    pool = self._GetPool(1)
+    pool._GetConnection().fail = errors.OpPrereqError("Test")
+    self.assertRaises(errors.OpPrereqError, pool.Call, "fn", [])
+
+  def testFork(self):
+    pool = self._GetPool(1)
+    conn = pool._GetConnection()
+    pool._pid = -1
+    self.assertFalse(pool._GetConnection() is conn)
+
+  def testClose(self):
+    pool = self._GetPool(2)
+    conn = pool._GetConnection()
+    pool.Close()
+    self.assertFalse(conn.IsUsable())
+    self.assertEqual(pool._connections, [])
+
+
 if __name__ == "__main__":
   testutils.GanetiTestProgram()
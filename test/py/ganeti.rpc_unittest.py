@@ -35,6 +35,8 @@ import sys
 import unittest
 import random
 import tempfile
+import zlib
+from cStringIO import StringIO
 
 from ganeti import constants
 from ganeti import compat
@@ -342,6 +344,88 @@ class TestRpcProcessor(unittest.TestCase):
     self.assertEqual(http_proc.reqcount, 1)
 
 
+class TestRequestCompression(unittest.TestCase):
+  def setUp(self):
+    self.requests = []
+
+  def _Respond(self, codings, req):
+    self.requests.append((req.headers, req.post_data))
+
+    req.success = True
+    req.resp_status_code = http.HTTP_OK
+    req.resp_body = serializer.DumpJson((True, None))
+    if codings is not None:
+      req.resp_headers = http.ParseHeaders(StringIO(
+        "%s: %s\r\n\r\n" % (http.HTTP_ACCEPT_ENCODING, codings)))
+    else:
+      # Older node daemon
+      req.resp_headers = http.ParseHeaders(StringIO("\r\n"))
+
+  def _GetEncoding(self, headers):
+    for header in headers:
+      (name, _, value) = header.partition(":")
+      if name.strip().lower() == http.HTTP_CONTENT_ENCODING.lower():
+        return value.strip()
+    return None
+
+  def testEncodeRequestBody(self):
+    small = "x" * (constants.RPC_COMPRESS_MIN_SIZE - 1)
+    large = "x" * constants.RPC_COMPRESS_MIN_SIZE
+
+    for codings in [None, frozenset(), frozenset(["gzip"])]:
+      for data in [small, large]:
+        (headers, body) = rpc._EncodeRequestBody(data, codings)
+        self.assertEqual(body, data)
+        self.assertTrue(self._GetEncoding(headers) is None)
+
+    codings = frozenset([constants.RPC_CONTENT_ENCODING])
+
+    (headers, body) = rpc._EncodeRequestBody(small, codings)
+    self.assertEqual(body, small)
+    self.assertTrue(self._GetEncoding(headers) is None)
+
+    (headers, body) = rpc._EncodeRequestBody(large, codings)
+    self.assertEqual(self._GetEncoding(headers),
+                     constants.RPC_CONTENT_ENCODING)
+    self.assertTrue(len(body) < len(large))
+    self.assertEqual(zlib.decompress(body), large)
+
+  def _Test(self, codings, expect_compression):
+    resolver = rpc._StaticResolver(["192.0.2.77"])
+    http_proc = _FakeRequestProcessor(compat.partial(self._Respond, codings))
+    proc = rpc._RpcProcessor(resolver, 24094)
+    body = serializer.DumpJson(range(constants.RPC_COMPRESS_MIN_SIZE))
+
+    for _ in range(3):
+      result = proc(["node77.example.com"], "test", {
+        "node77.example.com": body,
+        }, 60, NotImplemented, _req_process_fn=http_proc)
+      self.assertFalse(result["node77.example.com"].fail_msg)
+
+    # The first request must never be compressed
+    (headers, data) = self.requests.pop(0)
+    self.assertTrue(self._GetEncoding(headers) is None)
+    self.assertEqual(data, body)
+
+    for (headers, data) in self.requests:
+      if expect_compression:
+        self.assertEqual(self._GetEncoding(headers),
+                         constants.RPC_CONTENT_ENCODING)
+        self.assertEqual(zlib.decompress(data), body)
+      else:
+        self.assertTrue(self._GetEncoding(headers) is None)
+        self.assertEqual(data, body)
+
+  def testNegotiated(self):
+    self._Test(constants.RPC_CONTENT_ENCODING, True)
+
+  def testOldNode(self):
+    self._Test(None, False)
+
+  def testOtherCoding(self):
+    self._Test("gzip", False)
+
+
 class TestSsconfResolver(unittest.TestCase):
   def testSsconfLookup(self):
     addr_list = ["192.0.2.%d" % n for n in range(0, 255, 13)]
@@ -720,6 +804,144 @@ class TestRpcClientBase(unittest.TestCase):
         self.assertFalse(res.fail_msg)
 
 
+class _BatchTestClient(rpc._RpcClientBase):
+  """RPC client with wrappers written like the generated ones.
+
+  """
+  _SUM_DEF = ("test_sum", rpc_defs.MULTI, None, constants.RPC_TMO_NORMAL, [
+    ("nums", None, NotImplemented),
+    ], None, None, NotImplemented)
+
+  _ECHO_DEF = ("test_echo", rpc_defs.SINGLE, None, constants.RPC_TMO_FAST, [
+    ("text", None, NotImplemented),
+    ], None, None, NotImplemented)
+
+  def call_test_sum(self, node_list, nums, _def=_SUM_DEF):
+    return self._Call(_def, node_list, [nums])
+
+  def call_test_echo(self, node, text, _def=_ECHO_DEF):
+    return (self._Call(_def, [node], [text])[node])
+
+
+class TestRpcBatch(unittest.TestCase):
+  def setUp(self):
+    self.nodes = ["node%s.example.com" % i for i in range(5)]
+    self.proc_calls = []
+
+  def _Resolve(self, hosts, _):
+    return [(host, "192.0.2.%s" % self.nodes.index(host), host)
+            for host in hosts]
+
+  def _ProcessRequests(self, reqs, lock_monitor_cb=None):
+    self.proc_calls.append([req.path for req in reqs])
+
+    for req in reqs:
+      args = serializer.LoadJson(req.post_data)
+      if req.path == "/test_sum":
+        data = sum(args[0])
+      else:
+        self.assertEqual(req.path, "/test_echo")
+        data = args[0]
+
+      req.success = True
+      req.resp_status_code = http.HTTP_OK
+      req.resp_body = serializer.DumpJson((True, data))
+
+  def _GetClient(self):
+    return _BatchTestClient(self._Resolve, NotImplemented,
+                            _req_process_fn=self._ProcessRequests)
+
+  def testDirectCalls(self):
+    client = self._GetClient()
+    result = client.call_test_sum(self.nodes, [1, 2, 3])
+    self.assertEqual(sorted(result.keys()), sorted(self.nodes))
+    self.assertTrue(compat.all(res.payload == 6 for res in result.values()))
+    self.assertEqual(client.call_test_echo(self.nodes[0], "x").payload, "x")
+    self.assertEqual(len(self.proc_calls), 2)
+
+  def testConcurrent(self):
+    batch = self._GetClient().Batch()
+
+    sum_fut = batch.call_test_sum(self.nodes, [5, 7])
+    echo_futs = [(node, batch.call_test_echo(node, "Hello %s" % node))
+                 for node in self.nodes[:3]]
+
+    self.assertFalse(sum_fut.Done())
+    self.assertFalse(compat.any(fut.Done() for (_, fut) in echo_futs))
+    self.assertFalse(self.proc_calls)
+
+    batch.Run()
+
+    # All requests must have been sent at once
+    self.assertEqual(len(self.proc_calls), 1)
+    self.assertEqual(sorted(self.proc_calls[0]),
+                     sorted(["/test_sum"] * len(self.nodes) +
+                            ["/test_echo"] * 3))
+
+    self.assertTrue(sum_fut.Done())
+    result = sum_fut.GetResult()
+    self.assertEqual(sorted(result.keys()), sorted(self.nodes))
+    for (node, res) in result.items():
+      self.assertFalse(res.fail_msg)
+      self.assertEqual(res.node, node)
+      self.assertEqual(res.payload, 12)
+
+    for (node, fut) in echo_futs:
+      self.assertTrue(fut.Done())
+      res = fut.GetResult()
+      self.assertTrue(isinstance(res, rpc.RpcResult))
+      self.assertEqual(res.payload, "Hello %s" % node)
+
+    # Running again without new calls must not send anything
+    batch.Run()
+    self.assertEqual(len(self.proc_calls), 1)
+
+  def testImplicitRun(self):
+    batch = self._GetClient().Batch()
+
+    first = batch.call_test_echo(self.nodes[0], "first")
+    second = batch.call_test_sum(self.nodes[1:], [])
+
+    self.assertEqual(first.GetResult().payload, "first")
+    self.assertTrue(second.Done())
+    self.assertEqual(len(self.proc_calls), 1)
+
+    # Batches can be reused after running
+    third = batch.call_test_echo(self.nodes[2], "third")
+    self.assertFalse(third.Done())
+    self.assertEqual(third.GetResult().payload, "third")
+    self.assertEqual(len(self.proc_calls), 2)
+
+  def testPostProc(self):
+    def _PostProc(res):
+      res.payload *= 2
+      return res
+
+    class _PostProcClient(_BatchTestClient):
+      def call_test_double(self, node_list, nums,
+                           _def=("test_sum", rpc_defs.MULTI, None,
+                                 constants.RPC_TMO_NORMAL,
+                                 [("nums", None, NotImplemented)],
+                                 None, _PostProc, NotImplemented)):
+        return self._Call(_def, node_list, [nums])
+
+    client = _PostProcClient(self._Resolve, NotImplemented,
+                             _req_process_fn=self._ProcessRequests)
+    batch = client.Batch()
+    fut = batch.call_test_double(self.nodes, [1, 2])
+    self.assertTrue(compat.all(res.payload == 6
+                               for res in fut.GetResult().values()))
+
+  def testNoCalls(self):
+    self._GetClient().Batch().Run()
+    self.assertFalse(self.proc_calls)
+
+  def testUnknownAttribute(self):
+    batch = self._GetClient().Batch()
+    self.assertRaises(AttributeError, getattr, batch, "call_nonexistent")
+    self.assertRaises(AttributeError, getattr, batch, "_Foo")
+
+
 class _FakeConfigForRpcRunner:
   GetAllNodesInfo = NotImplemented
 
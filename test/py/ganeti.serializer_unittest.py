@@ -128,6 +128,74 @@ class TestSerializer(testutils.GanetiTestCase):
                       serializer.DumpJson(tdata), "mykey")
 
 
+class TestEngines(testutils.GanetiTestCase):
+  def setUp(self):
+    testutils.GanetiTestCase.setUp(self)
+    self._engine_name = serializer.GetEngineName()
+
+  def tearDown(self):
+    serializer.SetEngine(self._engine_name)
+    testutils.GanetiTestCase.tearDown(self)
+
+  def testDefault(self):
+    names = serializer.GetEngineNames()
+    self.assertTrue("json" in names)
+    self.assertTrue(self._engine_name in names)
+
+  def testUnknown(self):
+    self.assertRaises(errors.ProgrammerError, serializer.SetEngine,
+                      "does-not-exist")
+    self.assertEqual(serializer.GetEngineName(), self._engine_name)
+
+  def testDefaultIsSimplejson(self):
+    self.assertEqual(self._engine_name, "simplejson")
+
+  def testConsistency(self):
+    data = {
+      "name": "inst1.example.com",
+      "numbers": [0, -1, 2 ** 40, 1.5, 1e-7],
+      "flags": [True, False, None],
+      "text": "Hello\nWorld\t\"quoted\" \\ \xc3\xa4".decode("utf-8"),
+      "osparams_private": serializer.PrivateDict({"password": "secret"}),
+      "nested": {"a": [{"b": ["c", {}]}, []]},
+      }
+
+    outputs = []
+
+    for name in serializer.GetEngineNames():
+      serializer.SetEngine(name)
+      self.assertEqual(serializer.GetEngineName(), name)
+
+      public = serializer.DumpJson(data)
+      self.assertTrue(public.endswith("\n"))
+      self.assertFalse("secret" in public)
+
+      private = \
+        serializer.DumpJson(data,
+                            private_encoder=serializer.EncodeWithPrivateFields)
+      self.assertTrue("secret" in private)
+
+      loaded = serializer.LoadJson(private)
+      self.assertEqual(loaded["name"], "inst1.example.com")
+      self.assertEqual(loaded["numbers"], data["numbers"])
+      self.assertEqual(loaded["text"], data["text"])
+      self.assertTrue(isinstance(loaded["osparams_private"],
+                                 serializer.PrivateDict))
+      self.assertEqual(loaded["osparams_private"].GetPrivate("password"),
+                       "secret")
+
+      outputs.append((public, private))
+
+    # All engines must produce the same documents
+    self.assertEqual(len(set(outputs)), 1)
+
+  def testInvalid(self):
+    for name in serializer.GetEngineNames():
+      serializer.SetEngine(name)
+      for txt in ["", "{", "[1, 2", "x"]:
+        self.assertRaises(ValueError, serializer.LoadJson, txt)
+
+
 class TestLoadAndVerifyJson(unittest.TestCase):
   def testNoJson(self):
     self.assertRaises(errors.ParseError, serializer.LoadAndVerifyJson,
@@ -50,6 +50,7 @@ from ganeti.rapi.auth.basic_auth import BasicAuthenticator
 from ganeti.rapi.auth import users_file
 import ganeti.rapi.testutils
 import ganeti.rapi.rlib2
+import ganeti.rapi.stats
 import ganeti.http.auth
 
 import testutils
@@ -62,9 +63,9 @@ class TestRemoteApiHandler(unittest.TestCase):
 
   def _Test(self, method, path, headers, reqbody,
             user_fn=NotImplemented, luxi_client=NotImplemented,
-            reqauth=False):
+            reqauth=False, request_stats=None):
     rm = rapi.testutils._RapiMock(BasicAuthenticator(user_fn), luxi_client,
-                                  reqauth=reqauth)
+                                  reqauth=reqauth, request_stats=request_stats)
 
     (resp_code, resp_headers, resp_body) = \
       rm.FetchResponse(path, method, http.ParseHeaders(StringIO(headers)),
@@ -101,6 +102,28 @@ class TestRemoteApiHandler(unittest.TestCase):
     self.assertEqual(code, http.HTTP_OK)
     self.assertEqual(set(data), set(rapi.rlib2.ALL_FEATURES))
 
+  def testStatusNotCollected(self):
+    (code, _, _) = self._Test(http.HTTP_GET, "/2/status", "", None)
+    self.assertEqual(code, http.HttpNotFound.code)
+
+  def testStatus(self):
+    request_stats = rapi.stats.RequestStats()
+    request_stats.Record(http.HTTP_GET, http.HTTP_OK, 0.5)
+
+    (code, _, data) = self._Test(http.HTTP_GET, "/2/status", "", None,
+                                 request_stats=request_stats)
+    self.assertEqual(code, http.HTTP_OK)
+    self.assertEqual(data["requests"], 1)
+    self.assertEqual(data["methods"], {http.HTTP_GET: 1})
+
+  def testRequestFinished(self):
+    request_stats = rapi.stats.RequestStats()
+    rm = rapi.testutils._RapiMock(BasicAuthenticator(NotImplemented),
+                                  NotImplemented,
+                                  request_stats=request_stats)
+    rm.handler.RequestFinished(http.HTTP_PUT, http.HTTP_OK, 0.25)
+    self.assertEqual(request_stats.ToDict()["methods"], {http.HTTP_PUT: 1})
+
   def testPutInstances(self):
     (code, _, data) = self._Test(http.HTTP_PUT, "/2/instances", "", None)
     self.assertEqual(code, http.HttpNotImplemented.code)
@@ -262,6 +285,44 @@ class TestRemoteApiHandler(unittest.TestCase):
         else:
           self.assertEqual(code, http.HttpNotImplemented.code)
 
+  def testConditionalGet(self):
+    (code, headers, data) = self._Test(http.HTTP_GET, "/2/groups", "", None,
+                                       luxi_client=_FakeLuxiClientForGroups)
+    self.assertEqual(code, http.HTTP_OK)
+    self.assertEqual([group["name"] for group in data], ["g1", "g2"])
+    etag = headers[http.HTTP_ETAG]
+    self.assertTrue(etag.startswith("\"") and etag.endswith("\""))
+
+    for (value, expected) in [
+      (etag, http.HttpNotModified.code),
+      ("W/%s, \"other\"" % etag, http.HttpNotModified.code),
+      ("*", http.HttpNotModified.code),
+      ("\"other\"", http.HTTP_OK),
+      ]:
+      req_headers = rapi.testutils._FormatHeaders([
+        "%s: %s" % (http.HTTP_IF_NONE_MATCH, value),
+        ])
+      (code, headers, _) = self._Test(http.HTTP_GET, "/2/groups", req_headers,
+                                      None,
+                                      luxi_client=_FakeLuxiClientForGroups)
+      self.assertEqual(code, expected)
+      self.assertEqual(headers[http.HTTP_ETAG], etag)
+
+    # Not cacheable
+    (code, headers, _) = self._Test(http.HTTP_GET, "/2/features", "", None)
+    self.assertEqual(code, http.HTTP_OK)
+    self.assertFalse(http.HTTP_ETAG in headers)
+
+
+class _FakeLuxiClientForGroups:
+  def __init__(self, *args, **kwargs):
+    pass
+
+  def QueryGroups(self, names, fields, use_locking):
+    assert not (names or use_locking)
+    assert fields == ["name"]
+    return [["g2"], ["g1"]]
+
 
 class _FakeLuxiClientForQuery:
   def __init__(self, *args, **kwargs):
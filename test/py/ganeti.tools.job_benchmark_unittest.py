@@ -0,0 +1,205 @@
+#!/usr/bin/python
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for testing ganeti.tools.job_benchmark"""
+
+import random
+import unittest
+
+from ganeti import constants
+from ganeti import errors
+from ganeti import serializer
+from ganeti.tools import job_benchmark
+
+import testutils
+
+
+def _MakeJob(status=constants.JOB_STATUS_SUCCESS, received=100.0,
+             start=101.0, end=104.0, ops=None, phasestats=None,
+             opphasestats=None):
+  """Returns job fields as queried by the benchmark.
+
+  """
+  if ops is None:
+    ops = [(101.5, 102.0, 104.0)]
+  if opphasestats is None:
+    opphasestats = [{} for _ in ops]
+
+  def _Ts(value):
+    return (int(value), int(round((value - int(value)) * 1000000)))
+
+  return {
+    "id": 1,
+    "status": status,
+    "received_ts": _Ts(received),
+    "start_ts": _Ts(start),
+    "end_ts": _Ts(end),
+    "opstart": [_Ts(opstart) for (opstart, _, _) in ops],
+    "opexec": [_Ts(opexec) for (_, opexec, _) in ops],
+    "opend": [_Ts(opend) for (_, _, opend) in ops],
+    "phasestats": phasestats,
+    "opphasestats": opphasestats,
+    }
+
+
+def _Stats(count, wall):
+  return {"count": count, "wall": wall, "cpu": 0.0, "maxrss": 0}
+
+
+class TestParseMix(unittest.TestCase):
+  def test(self):
+    self.assertEqual(job_benchmark.ParseMix("start=2, stop=1,query=0"),
+                     {"start": 2, "stop": 1, "query": 0})
+
+  def testInvalid(self):
+    for value in ["", "start", "start=x", "start=-1", "reboot=1",
+                  "start=1,start=2", "start=0,stop=0"]:
+      self.assertRaises(errors.ParameterError, job_benchmark.ParseMix, value)
+
+
+class TestChooseKinds(unittest.TestCase):
+  def testRepeatable(self):
+    mix = job_benchmark.ParseMix("start=1,stop=1,migrate=1")
+    kinds = job_benchmark.ChooseKinds(mix, 50, random.Random(1))
+    self.assertEqual(len(kinds), 50)
+    self.assertEqual(set(kinds), set(["start", "stop", "migrate"]))
+    self.assertEqual(job_benchmark.ChooseKinds(mix, 50, random.Random(1)),
+                     kinds)
+
+  def testZeroWeight(self):
+    mix = job_benchmark.ParseMix("start=1,stop=0")
+    self.assertEqual(job_benchmark.ChooseKinds(mix, 10, random.Random(0)),
+                     ["start"] * 10)
+
+
+class TestPercentile(unittest.TestCase):
+  def test(self):
+    values = range(1, 101)
+    self.assertEqual(job_benchmark.Percentile(values, 0), 1)
+    self.assertEqual(job_benchmark.Percentile(values, 50), 51)
+    self.assertEqual(job_benchmark.Percentile(values, 99), 99)
+    self.assertEqual(job_benchmark.Percentile(values, 100), 100)
+    self.assertEqual(job_benchmark.Percentile([7], 99), 7)
+
+
+class TestGetJobPhases(unittest.TestCase):
+  def test(self):
+    job = _MakeJob(ops=[(101.0, 101.5, 102.0), (102.0, 103.0, 104.0)],
+                   phasestats={"startup": _Stats(1, 0.25)},
+                   opphasestats=[{"exec": _Stats(1, 0.5)},
+                                 {"exec": _Stats(1, 1.0),
+                                  "config-write": _Stats(2, 0.125)}])
+    phases = job_benchmark.GetJobPhases(job)
+    self.assertEqual(sorted(phases.keys()),
+                     ["config-write", "exec", "locking", "queued", "running",
+                      "startup", "total"])
+    self.assertAlmostEqual(phases["total"], 4.0)
+    self.assertAlmostEqual(phases["queued"], 1.0)
+    self.assertAlmostEqual(phases["locking"], 1.5)
+    self.assertAlmostEqual(phases["running"], 1.5)
+    self.assertAlmostEqual(phases["exec"], 1.5)
+    self.assertAlmostEqual(phases["startup"], 0.25)
+
+  def testUnfinished(self):
+    job = _MakeJob(ops=[])
+    job["end_ts"] = None
+    job["opstart"] = job["opexec"] = job["opend"] = None
+    job["opphasestats"] = None
+    self.assertEqual(job_benchmark.GetJobPhases(job), {"queued": 1.0})
+
+
+class TestBuildReport(unittest.TestCase):
+  def _Build(self, duration=10.0, config_size=1000, end=104.0):
+    jobs = [
+      ("start", _MakeJob(end=end, opphasestats=[{
+        "config-read": _Stats(2, 0.1),
+        "config-write": _Stats(1, 0.1),
+        }])),
+      ("start", _MakeJob(end=end + 1)),
+      ("stop", _MakeJob(status=constants.JOB_STATUS_ERROR, end=end,
+                        phasestats={"config-read": _Stats(1, 0.1)})),
+      ]
+    setup = job_benchmark.SummarizeThroughput([], 0)
+    return job_benchmark.BuildReport({"jobs": 3}, setup, jobs, duration,
+                                     config_size)
+
+  def test(self):
+    report = self._Build()
+    self.assertEqual(report["version"], job_benchmark.RESULT_VERSION)
+    self.assertEqual(report["throughput"], {
+      "jobs": 3,
+      "failed": 1,
+      "duration": 10.0,
+      "jobs_per_second": 0.3,
+      })
+    self.assertEqual(report["config"], {
+      "size": 1000,
+      "reads": 3,
+      "writes": 1,
+      "bytes": 4000,
+      })
+    self.assertEqual(sorted(report["kinds"].keys()), ["start", "stop"])
+    self.assertEqual(report["kinds"]["start"]["jobs"], 2)
+    self.assertEqual(report["kinds"]["stop"]["failed"], 1)
+    self.assertEqual(report["kinds"]["start"]["latency"]["total"],
+                     {"p50": 5.0, "p99": 5.0})
+    self.assertEqual(report["latency"]["total"], {"p50": 4.0, "p99": 5.0})
+
+  def testUnknownConfigSize(self):
+    self.assertEqual(self._Build(config_size=None)["config"]["bytes"], None)
+
+  def testSerializable(self):
+    report = self._Build()
+    text = job_benchmark.FormatReport(report)
+    self.assertEqual(serializer.LoadJson(text), report)
+    self.assertEqual(text, job_benchmark.FormatReport(report))
+
+  def testCompare(self):
+    baseline = self._Build()
+    self.assertEqual(job_benchmark.CompareReports(baseline, baseline, 10), [])
+
+    slower = self._Build(duration=20.0, end=110.0)
+    regressions = job_benchmark.CompareReports(baseline, slower, 10)
+    self.assertEqual(len(regressions), 5)
+    self.assertEqual(job_benchmark.CompareReports(baseline, slower, 1000), [])
+
+    bigger = self._Build(config_size=2000)
+    self.assertEqual(len(job_benchmark.CompareReports(baseline, bigger, 10)),
+                     1)
+
+  def testCompareVersion(self):
+    baseline = self._Build()
+    baseline["version"] = job_benchmark.RESULT_VERSION + 1
+    self.assertRaises(errors.ParameterError, job_benchmark.CompareReports,
+                      baseline, self._Build(), 10)
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
@@ -0,0 +1,92 @@
+#!/usr/bin/python
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for testing ganeti.utils.lazy"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from ganeti import utils
+
+import testutils
+
+
+class TestLazyModule(unittest.TestCase):
+  _NAME = "ganeti_lazy_unittest_dummy"
+
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    utils.WriteFile(os.path.join(self.tmpdir, "%s.py" % self._NAME),
+                    data="VALUE = 42\n\ndef Double(x):\n  return 2 * x\n")
+    sys.path.insert(0, self.tmpdir)
+
+  def tearDown(self):
+    sys.path.remove(self.tmpdir)
+    sys.modules.pop(self._NAME, None)
+    shutil.rmtree(self.tmpdir)
+
+  def testImportOnFirstUse(self):
+    proxy = utils.LazyModule(self._NAME)
+    self.assertFalse(self._NAME in sys.modules)
+    self.assertTrue(self._NAME in repr(proxy))
+    self.assertFalse(self._NAME in sys.modules)
+
+    self.assertEqual(proxy.VALUE, 42)
+    self.assertTrue(self._NAME in sys.modules)
+    self.assertEqual(proxy.Double(3), 6)
+    self.assertTrue(proxy.Double is sys.modules[self._NAME].Double)
+
+  def testModifyAttributes(self):
+    proxy = utils.LazyModule(self._NAME)
+
+    proxy.VALUE = 1
+    proxy.Other = "x"
+    module = sys.modules[self._NAME]
+    self.assertEqual(module.VALUE, 1)
+    self.assertEqual(module.Other, "x")
+
+    del proxy.Other
+    self.assertFalse(hasattr(module, "Other"))
+    self.assertFalse(hasattr(proxy, "Other"))
+
+  def testMissingAttribute(self):
+    proxy = utils.LazyModule(self._NAME)
+    self.assertRaises(AttributeError, getattr, proxy, "DoesNotExist")
+
+  def testMissingModule(self):
+    proxy = utils.LazyModule("%s_missing" % self._NAME)
+    self.assertRaises(ImportError, getattr, proxy, "VALUE")
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
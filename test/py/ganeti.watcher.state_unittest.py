@@ -0,0 +1,240 @@
+#!/usr/bin/python
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for testing ganeti.watcher.state"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from ganeti import errors
+from ganeti import serializer
+from ganeti import utils
+from ganeti.watcher import state
+
+import testutils
+
+
+def _Record(section, name, value):
+  return serializer.Dump([section, name, value])
+
+
+class TestParseState(unittest.TestCase):
+  def testEmpty(self):
+    self.assertEqual(state._ParseState(""), ({}, None))
+
+  def testSnapshot(self):
+    data = {
+      "instance": {"inst1": {"restart_count": 2}},
+      "node": {"node1": {"bootid": "abc"}},
+      }
+    self.assertEqual(state._ParseState(serializer.Dump(data)), (data, 0))
+
+  def testRecords(self):
+    content = (serializer.Dump({"instance": {"inst1": {"restart_count": 1}}}) +
+               _Record("instance", "inst2", {"restart_count": 3}) +
+               _Record("instance", "inst1", None) +
+               _Record("node", "node1", {"bootid": "abc"}) +
+               _Record("node", "node2", None))
+    self.assertEqual(state._ParseState(content), ({
+      "instance": {"inst2": {"restart_count": 3}},
+      "node": {"node1": {"bootid": "abc"}},
+      }, 4))
+
+  def testNoDict(self):
+    self.assertRaises(errors.ParseError, state._ParseState,
+                      serializer.Dump(["instance"]))
+
+  def testTornRecord(self):
+    content = (serializer.Dump({}) +
+               _Record("instance", "inst1", {"restart_count": 1}) +
+               _Record("instance", "inst2", {"restart_count": 1})[:-5])
+    self.assertEqual(state._ParseState(content),
+                     ({"instance": {"inst1": {"restart_count": 1}}}, None))
+
+  def testUnterminatedRecord(self):
+    # The last record is complete, but a record appended to it would end up
+    # on the same line
+    content = (serializer.Dump({}) +
+               _Record("instance", "inst1", {"restart_count": 1}).rstrip())
+    self.assertEqual(state._ParseState(content),
+                     ({"instance": {"inst1": {"restart_count": 1}}}, None))
+
+  def testUnterminatedSnapshot(self):
+    self.assertEqual(state._ParseState(serializer.Dump({}).rstrip()),
+                     ({}, None))
+
+  def testBrokenRecord(self):
+    content = (serializer.Dump({}) + "garbage\n" +
+               _Record("instance", "inst1", None))
+    self.assertRaises(ValueError, state._ParseState, content)
+
+
+class TestWatcherState(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.path = utils.PathJoin(self.tmpdir, "state")
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def _Open(self):
+    return state.WatcherState(state.OpenStateFile(self.path))
+
+  def _Lines(self):
+    return utils.ReadFile(self.path).splitlines()
+
+  def testNewFile(self):
+    ws = self._Open()
+    ws.SetNodeBootID("node1", "boot1")
+    ws.Save(self.path)
+    ws.Close()
+
+    self.assertEqual(len(self._Lines()), 1)
+
+    ws = self._Open()
+    self.assertEqual(ws.GetNodeBootID("node1"), "boot1")
+    ws.Close()
+
+  def testAppend(self):
+    ws = self._Open()
+    ws.SetNodeBootID("node1", "boot1")
+    ws.Save(self.path)
+    ws.Close()
+
+    ws = self._Open()
+    ws.RecordRestartAttempt("inst1")
+    ws.SetNodeBootID("node1", "boot2")
+    ws.Save(self.path)
+    ws.Close()
+
+    lines = self._Lines()
+    self.assertEqual(len(lines), 3)
+    self.assertEqual(serializer.Load(lines[1])[:2], ["instance", "inst1"])
+    self.assertEqual(serializer.Load(lines[2]),
+                     ["node", "node1", {"bootid": "boot2"}])
+
+    ws = self._Open()
+    self.assertEqual(ws.GetNodeBootID("node1"), "boot2")
+    self.assertEqual(ws.NumberOfRestartAttempts("inst1"), 1)
+    ws.RemoveInstance("inst1")
+    ws.Save(self.path)
+    ws.Close()
+
+    self.assertEqual(serializer.Load(self._Lines()[-1]),
+                     ["instance", "inst1", None])
+
+    ws = self._Open()
+    self.assertEqual(ws.NumberOfRestartAttempts("inst1"), 0)
+    ws.Close()
+
+  def testUnchanged(self):
+    ws = self._Open()
+    ws.SetNodeBootID("node1", "boot1")
+    ws.Save(self.path)
+    ws.Close()
+    content = utils.ReadFile(self.path)
+
+    ws = self._Open()
+    ws.SetNodeBootID("node1", "boot1")
+    ws.Close()
+
+    ws = self._Open()
+    ws.Save(self.path)
+    ws.Close()
+
+    self.assertEqual(utils.ReadFile(self.path), content)
+
+  def testCompaction(self):
+    ws = self._Open()
+    ws.SetNodeBootID("node1", "boot0")
+    ws.Save(self.path)
+    ws.Close()
+
+    for i in range(1, state.COMPACT_MIN_RECORDS + 1):
+      ws = self._Open()
+      ws.SetNodeBootID("node1", "boot%d" % i)
+      ws.Save(self.path)
+      ws.Close()
+      self.assertEqual(len(self._Lines()), i + 1)
+
+    # One more record than allowed makes the file be rewritten
+    ws = self._Open()
+    ws.SetNodeBootID("node1", "last")
+    ws.Save(self.path)
+    ws.Close()
+
+    self.assertEqual(self._Lines(), [serializer.Dump({
+      "instance": {},
+      "node": {"node1": {"bootid": "last"}},
+      }).rstrip()])
+
+  def testTruncatedRecord(self):
+    ws = self._Open()
+    ws.SetNodeBootID("node1", "boot1")
+    ws.Save(self.path)
+    ws.Close()
+
+    # Simulate an interrupted append
+    utils.WriteFile(self.path,
+                    data=(utils.ReadFile(self.path) +
+                          _Record("node", "node2", {"bootid": "x"})[:-1]))
+
+    ws = self._Open()
+    self.assertEqual(ws.GetNodeBootID("node2"), "x")
+    ws.SetNodeBootID("node3", "boot3")
+    ws.Save(self.path)
+    ws.Close()
+
+    # A snapshot was written instead of appending to the unterminated line
+    self.assertEqual(len(self._Lines()), 1)
+
+    ws = self._Open()
+    self.assertEqual(ws.GetNodeBootID("node1"), "boot1")
+    self.assertEqual(ws.GetNodeBootID("node2"), "x")
+    self.assertEqual(ws.GetNodeBootID("node3"), "boot3")
+    ws.Close()
+
+  def testInvalidFile(self):
+    utils.WriteFile(self.path, data="garbage\n")
+
+    ws = self._Open()
+    self.assertEqual(ws.GetNodeBootID("node1"), None)
+    ws.SetNodeBootID("node1", "boot1")
+    ws.Save(self.path)
+    ws.Close()
+
+    self.assertEqual(len(self._Lines()), 1)
+    self.assertTrue(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
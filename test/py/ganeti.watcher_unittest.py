@@ -0,0 +1,487 @@
+#!/usr/bin/python
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for testing ganeti.watcher"""
+
+import shutil
+import tempfile
+import unittest
+
+from ganeti import cli
+from ganeti import constants
+from ganeti import errors
+from ganeti import pathutils
+from ganeti import utils
+from ganeti import watcher
+from ganeti.watcher import state
+
+import testutils
+
+
+_GROUP1 = "a4b1e2a6-8e0c-4b2d-9a8e-0d3d5a0e4f11"
+_GROUP2 = "c7d2f3b8-1a2b-4c3d-8e4f-5a6b7c8d9e22"
+
+
+class _QueryResponse(object):
+  def __init__(self, rows):
+    self.data = [[(constants.RS_NORMAL, value) for value in row]
+                 for row in rows]
+
+
+class _FakeLuxiClient(object):
+  """Fake LUXI client recording submitted jobs.
+
+  Jobs are run by the fake L{cli.PollJob} installed by L{_WatcherTestCase}.
+
+  """
+  def __init__(self):
+    self.submitted = []
+    self.submit_calls = 0
+    self.archived = []
+    self.rows = {}
+    self._next_id = 100
+    # Job results by job ID; exceptions are raised when polling the job
+    self.results = {}
+    # Functions returning the result of a job from its opcodes
+    self.result_fn = lambda ops: [None for _ in ops]
+    # Jobs which are rejected when submitted, by index in a submission
+    self.reject = set()
+
+  def SubmitManyJobs(self, jobs):
+    self.submit_calls += 1
+    result = []
+    for (idx, ops) in enumerate(jobs):
+      if idx in self.reject:
+        result.append((False, "Job rejected"))
+        continue
+      job_id = self._next_id
+      self._next_id += 1
+      self.submitted.append((job_id, ops))
+      self.results[job_id] = self.result_fn(ops)
+      result.append((True, job_id))
+    return result
+
+  def SubmitJob(self, ops):
+    ((_, job_id), ) = self.SubmitManyJobs([ops])
+    return job_id
+
+  def Query(self, what, fields, qfilter):
+    return _QueryResponse(self.rows.get(what, []))
+
+  def ArchiveJob(self, job_id):
+    self.archived.append(job_id)
+
+  def PollJob(self, job_id, cl=None, feedback_fn=None):
+    assert cl is self
+    result = self.results[job_id]
+    if isinstance(result, Exception):
+      raise result
+    return result
+
+  def SubmittedOpIds(self):
+    return [[op.OP_ID for op in ops] for (_, ops) in self.submitted]
+
+
+class _WatcherTestCase(unittest.TestCase):
+  def setUp(self):
+    self.cl = _FakeLuxiClient()
+    self.tmpdir = tempfile.mkdtemp()
+
+    self._patches = [
+      testutils.patch_object(cli, "PollJob", self.cl.PollJob),
+      ]
+    for patcher in self._patches:
+      patcher.start()
+
+  def tearDown(self):
+    for patcher in self._patches:
+      patcher.stop()
+    shutil.rmtree(self.tmpdir)
+
+  def _OpenState(self, name="state"):
+    path = utils.PathJoin(self.tmpdir, name)
+    return (path, state.WatcherState(state.OpenStateFile(path)))
+
+
+def _Instance(name, status, disk_template=constants.DT_PLAIN, snodes=None,
+              disks_active=True, config_state=constants.ADMINST_UP):
+  return watcher.Instance(name, status, config_state, constants.ADMIN_SOURCE,
+                          disks_active, snodes or [], disk_template)
+
+
+def _GetStrict(submitted):
+  return [ops[0].is_strict for (_, ops) in submitted]
+
+
+class TestJobSubmitter(_WatcherTestCase):
+  def setUp(self):
+    _WatcherTestCase.setUp(self)
+    self.calls = []
+
+  def _SubmitOpCode(self, op, cl=None):
+    assert cl is self.cl
+    self.calls.append(op)
+    if op == "fail":
+      raise errors.OpExecError("Job failed")
+    return [None]
+
+  def test(self):
+    events = []
+    jobs = watcher._JobSubmitter(self.cl)
+
+    patcher = testutils.patch_object(cli, "SubmitOpCode", self._SubmitOpCode)
+    patcher.start()
+    try:
+      self.assertTrue(jobs.Submit("op", "doing something",
+                                  success_fn=lambda: events.append("ok"),
+                                  failure_fn=lambda: events.append("error")))
+      self.assertFalse(jobs.Submit("fail", "failing",
+                                   success_fn=lambda: events.append("ok"),
+                                   failure_fn=lambda: events.append("error")))
+      self.assertTrue(jobs.Submit("op", "without callbacks"))
+    finally:
+      patcher.stop()
+
+    # Every job is run immediately
+    self.assertEqual(self.calls, ["op", "fail", "op"])
+    self.assertEqual(events, ["ok", "error"])
+
+
+class TestJobBatch(_WatcherTestCase):
+  def testEmpty(self):
+    self.assertEqual(watcher._JobBatch(self.cl).Finish(), [])
+    self.assertEqual(self.cl.submit_calls, 0)
+
+  def test(self):
+    events = []
+    jobs = watcher._JobBatch(self.cl)
+
+    for name in ["inst1", "inst2", "inst3"]:
+      self.assertTrue(jobs.Submit(_Instance(name, "").RestartOp(),
+                                  "restarting %s" % name,
+                                  success_fn=lambda n=name: events.append(n)))
+    jobs.SubmitJob([watcher._ActivateDisksOp("inst4"),
+                    watcher._ActivateDisksOp("inst5")], "activating disks")
+
+    # Nothing is submitted before the batch is finished
+    self.assertEqual(self.cl.submit_calls, 0)
+    self.assertEqual(events, [])
+
+    results = jobs.Finish()
+
+    # All jobs are submitted at once
+    self.assertEqual(self.cl.submit_calls, 1)
+    self.assertEqual(self.cl.SubmittedOpIds(), [
+      [watcher.opcodes.OpInstanceStartup.OP_ID],
+      [watcher.opcodes.OpInstanceStartup.OP_ID],
+      [watcher.opcodes.OpInstanceStartup.OP_ID],
+      [watcher.opcodes.OpInstanceActivateDisks.OP_ID,
+       watcher.opcodes.OpInstanceActivateDisks.OP_ID],
+      ])
+    self.assertEqual(results, [
+      (100, [None]),
+      (101, [None]),
+      (102, [None]),
+      (103, [None, None]),
+      ])
+    self.assertEqual(events, ["inst1", "inst2", "inst3"])
+
+    # The batch can be reused
+    self.assertEqual(jobs.Finish(), [])
+    self.assertEqual(self.cl.submit_calls, 1)
+
+  def testFailures(self):
+    events = []
+    jobs = watcher._JobBatch(self.cl)
+
+    for name in ["rejected", "failed", "succeeded"]:
+      jobs.Submit(_Instance(name, "").RestartOp(), "restarting %s" % name,
+                  success_fn=lambda n=name: events.append(("ok", n)),
+                  failure_fn=lambda n=name: events.append(("error", n)))
+
+    self.cl.reject = set([0])
+    self.cl.result_fn = \
+      lambda ops: (errors.OpExecError("Failed")
+                   if ops[0].instance_name == "failed" else [None])
+
+    self.assertEqual(jobs.Finish(), [
+      (None, None),
+      (100, None),
+      (101, [None]),
+      ])
+    self.assertEqual(events, [
+      ("error", "rejected"),
+      ("error", "failed"),
+      ("ok", "succeeded"),
+      ])
+
+
+class TestCheckInstances(_WatcherTestCase):
+  def test(self):
+    (_, notepad) = self._OpenState()
+    jobs = watcher._JobBatch(self.cl)
+
+    instances = dict((inst.name, inst) for inst in [
+      _Instance("down", constants.INSTST_ERRORDOWN),
+      _Instance("running", constants.INSTST_RUNNING),
+      _Instance("userdown", constants.INSTST_USERDOWN),
+      ])
+
+    started = watcher._CheckInstances(jobs, notepad, instances, set())
+    self.assertEqual(started, set(["down"]))
+    self.assertEqual(notepad.NumberOfRestartAttempts("down"), 1)
+
+    self.cl.result_fn = \
+      lambda ops: (errors.OpExecError("Failed")
+                   if ops[0].OP_ID == watcher.opcodes.OpInstanceShutdown.OP_ID
+                   else [None])
+    jobs.Finish()
+
+    self.assertEqual(sorted(self.cl.SubmittedOpIds()), sorted([
+      [watcher.opcodes.OpInstanceStartup.OP_ID],
+      [watcher.opcodes.OpInstanceShutdown.OP_ID],
+      ]))
+
+    # The failed cleanup is recorded once the batch finished
+    self.assertEqual(notepad.NumberOfCleanupAttempts("userdown"), 1)
+    notepad.Close()
+
+  def testLockedAndExhausted(self):
+    (_, notepad) = self._OpenState()
+    jobs = watcher._JobBatch(self.cl)
+
+    for _ in range(watcher.MAXTRIES + 1):
+      notepad.RecordRestartAttempt("down")
+
+    instances = dict((inst.name, inst) for inst in [
+      _Instance("down", constants.INSTST_ERRORDOWN),
+      _Instance("userdown", constants.INSTST_USERDOWN),
+      ])
+
+    self.assertEqual(watcher._CheckInstances(jobs, notepad, instances,
+                                             set(["userdown"])),
+                     set())
+    self.assertEqual(jobs.Finish(), [])
+    notepad.Close()
+
+
+class TestVerifyDisksBatch(_WatcherTestCase):
+  def _Groups(self):
+    nodes = {
+      "node1": watcher.Node("node1", "boot1", False, set()),
+      "node2": watcher.Node("node2", "boot2", True, set()),
+      }
+    instances = {
+      "inst1": _Instance("inst1", constants.INSTST_RUNNING),
+      "inst2": _Instance("inst2", constants.INSTST_RUNNING,
+                         snodes=["node2"]),
+      }
+    return {
+      _GROUP1: (nodes, instances),
+      _GROUP2: (dict(nodes), dict(instances)),
+      }
+
+  @staticmethod
+  def _Result(offline):
+    return lambda ops: [({}, offline, {}) for _ in ops]
+
+  def test(self):
+    self.cl.result_fn = self._Result(["inst1", "inst2", "unknown"])
+
+    watcher._VerifyDisksBatch(self.cl, self._Groups(), True)
+
+    # One submission for verifying the disks of both groups, one for
+    # activating their disks
+    self.assertEqual(self.cl.submit_calls, 2)
+    self.assertEqual(self.cl.SubmittedOpIds(), [
+      [watcher.opcodes.OpGroupVerifyDisks.OP_ID],
+      [watcher.opcodes.OpGroupVerifyDisks.OP_ID],
+      [watcher.opcodes.OpInstanceActivateDisks.OP_ID],
+      [watcher.opcodes.OpInstanceActivateDisks.OP_ID],
+      ])
+    self.assertEqual([ops[0].group_name
+                      for (_, ops) in self.cl.submitted[:2]],
+                     [_GROUP1, _GROUP2])
+    self.assertEqual(_GetStrict(self.cl.submitted[:2]), [True, True])
+
+    # Instances with offline secondaries or not found are skipped
+    self.assertEqual([ops[0].instance_name
+                      for (_, ops) in self.cl.submitted[2:]],
+                     ["inst1", "inst1"])
+    self.assertEqual(self.cl.archived, [100, 101])
+
+  def testNothingOffline(self):
+    self.cl.result_fn = self._Result([])
+
+    watcher._VerifyDisksBatch(self.cl, self._Groups(), False)
+
+    self.assertEqual(self.cl.submit_calls, 1)
+    self.assertEqual(len(self.cl.submitted), 2)
+    self.assertEqual(self.cl.archived, [100, 101])
+
+  def testPendingAndFailed(self):
+    # A verify job for the first group is still running
+    self.cl.rows[constants.QR_JOB] = [
+      [10, ["GROUP_VERIFY_DISKS(%s)" % _GROUP1]],
+      [11, ["INSTANCE_STARTUP(inst1)"]],
+      ]
+    self.cl.result_fn = lambda ops: errors.OpExecError("Failed")
+
+    watcher._VerifyDisksBatch(self.cl, self._Groups(), True)
+
+    self.assertEqual([ops[0].group_name for (_, ops) in self.cl.submitted],
+                     [_GROUP2])
+    # Failed jobs are neither archived nor followed by disk activation
+    self.assertEqual(self.cl.submit_calls, 1)
+    self.assertEqual(self.cl.archived, [])
+
+
+class _Options(object):
+  def __init__(self, no_verify_disks=True, no_strict=False):
+    self.no_verify_disks = no_verify_disks
+    self.no_strict = no_strict
+
+
+class TestSingleProcessWatcher(_WatcherTestCase):
+  def setUp(self):
+    _WatcherTestCase.setUp(self)
+
+    for (name, value) in [
+        ("WATCHER_GROUP_STATE_FILE", "state-%s"),
+        ("WATCHER_GROUP_INSTANCE_STATUS_FILE", "status-%s"),
+        ("INSTANCE_STATUS_FILE", "status"),
+        ]:
+      patcher = testutils.patch_object(pathutils, name,
+                                       utils.PathJoin(self.tmpdir, value))
+      patcher.start()
+      self._patches.append(patcher)
+
+    patcher = testutils.patch_object(watcher, "_LoadKnownGroups",
+                                     lambda: [_GROUP1, _GROUP2])
+    patcher.start()
+    self._patches.append(patcher)
+
+    def _InstanceRow(name, status, group):
+      return [name, status, constants.ADMINST_UP, constants.ADMIN_SOURCE,
+              True, [], group, [], constants.DT_PLAIN]
+
+    self.cl.rows = {
+      constants.QR_LOCK: [["instance/locked", "exclusive"]],
+      constants.QR_INSTANCE: [
+        _InstanceRow("inst1", constants.INSTST_ERRORDOWN, _GROUP1),
+        _InstanceRow("inst2", constants.INSTST_RUNNING, _GROUP1),
+        _InstanceRow("inst3", constants.INSTST_ERRORDOWN, _GROUP2),
+        _InstanceRow("other", constants.INSTST_ERRORDOWN, "unknown"),
+        ],
+      constants.QR_NODE: [
+        ["node1", "boot1", False, _GROUP1],
+        ["node2", "boot2", False, _GROUP2],
+        ],
+      }
+
+  def _ReadState(self, group):
+    path = pathutils.WATCHER_GROUP_STATE_FILE % group
+    notepad = state.WatcherState(state.OpenStateFile(path))
+    try:
+      return (notepad.NumberOfRestartAttempts("inst1"),
+              notepad.NumberOfRestartAttempts("inst3"),
+              notepad.GetNodeBootID("node1"),
+              notepad.GetNodeBootID("node2"))
+    finally:
+      notepad.Close()
+
+  def test(self):
+    watcher._SingleProcessWatcher(self.cl, _Options())
+
+    # The instances of both groups are restarted with a single submission
+    self.assertEqual(self.cl.submit_calls, 1)
+    self.assertEqual(sorted(ops[0].instance_name
+                            for (_, ops) in self.cl.submitted),
+                     ["inst1", "inst3"])
+
+    self.assertEqual(self._ReadState(_GROUP1), (1, 0, "boot1", None))
+    self.assertEqual(self._ReadState(_GROUP2), (0, 1, None, "boot2"))
+
+    self.assertEqual(sorted(utils.ReadFile(pathutils.INSTANCE_STATUS_FILE)
+                            .splitlines()),
+                     ["inst1 %s" % constants.INSTST_ERRORDOWN,
+                      "inst2 %s" % constants.INSTST_RUNNING,
+                      "inst3 %s" % constants.INSTST_ERRORDOWN])
+
+  def testVerifyDisks(self):
+    self.cl.result_fn = \
+      lambda ops: [({}, [], {})
+                   if op.OP_ID == watcher.opcodes.OpGroupVerifyDisks.OP_ID
+                   else None
+                   for op in ops]
+
+    watcher._SingleProcessWatcher(self.cl, _Options(no_verify_disks=False,
+                                                    no_strict=True))
+
+    self.assertEqual(self.cl.submit_calls, 2)
+    verify = [ops[0] for (_, ops) in self.cl.submitted[2:]]
+    self.assertEqual([op.group_name for op in verify], [_GROUP1, _GROUP2])
+    self.assertEqual(_GetStrict(self.cl.submitted[2:]), [False, False])
+
+  def testFailedJobs(self):
+    self.cl.result_fn = lambda ops: errors.OpExecError("Failed")
+
+    watcher._SingleProcessWatcher(self.cl, _Options())
+
+    # Restart attempts are recorded even if the jobs failed
+    self.assertEqual(self._ReadState(_GROUP1), (1, 0, "boot1", None))
+    self.assertEqual(self._ReadState(_GROUP2), (0, 1, None, "boot2"))
+
+  def testGroupLocked(self):
+    path = pathutils.WATCHER_GROUP_STATE_FILE % _GROUP2
+    other = state.OpenStateFile(path)
+    try:
+      # Another watcher handles the second group
+      patcher = testutils.patch_object(state, "OpenStateFile",
+                                       self._OpenUnlessLocked(path))
+      patcher.start()
+      try:
+        watcher._SingleProcessWatcher(self.cl, _Options())
+      finally:
+        patcher.stop()
+    finally:
+      other.close()
+
+    self.assertEqual([ops[0].instance_name for (_, ops) in self.cl.submitted],
+                     ["inst1"])
+
+  @staticmethod
+  def _OpenUnlessLocked(locked_path):
+    fn = state.OpenStateFile
+    return lambda path: (None if path == locked_path else fn(path))
+
+
+if __name__ == "__main__":
+  testutils.GanetiTestProgram()
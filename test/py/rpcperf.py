@@ -0,0 +1,253 @@
+#!/usr/bin/python
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for comparing RPC body encodings
+
+Measures the size and the encoding/decoding time of typical RPC request and
+response bodies when sent as plain JSON, as JSON compressed with the HTTP
+content coding used between master and node daemon, and as JSON compressed
+and encoded in base64 as done for file uploads.
+
+"""
+
+import base64
+import optparse
+import random
+import time
+import zlib
+
+from ganeti import constants
+from ganeti import serializer
+
+
+def ParseOptions():
+  """Parses the command line options.
+
+  In case of command line errors, it will show the usage and exit the
+  program.
+
+  @return: the options in a tuple
+
+  """
+  parser = optparse.OptionParser()
+  parser.add_option("-n", dest="instance_count", default=300, type="int",
+                    help="Number of instances on the node", metavar="NUM")
+  parser.add_option("-r", dest="repetitions", default=20, type="int",
+                    help="Number of repetitions per measurement",
+                    metavar="NUM")
+
+  (opts, args) = parser.parse_args()
+
+  if opts.instance_count < 1:
+    parser.error("Number of instances must be at least 1")
+
+  if opts.repetitions < 1:
+    parser.error("Number of repetitions must be at least 1")
+
+  return (opts, args)
+
+
+def _MakeInstanceDict(rnd, idx):
+  """Builds an instance dictionary as sent by C{instance_start}.
+
+  """
+  hvparams = dict(("hv_param_%02d" % i, rnd.choice([True, False, None, 0,
+                                                    "/usr/lib/xen/boot",
+                                                    "paravirtual", "ide"]))
+                  for i in range(60))
+
+  return {
+    "name": "instance%05d.example.com" % idx,
+    "uuid": "%08x-1f2e-4d3c-8b7a-%012x" % (idx, rnd.getrandbits(48)),
+    "primary_node": "%08x-node-uuid" % rnd.getrandbits(32),
+    "os": "debootstrap+default",
+    "hypervisor": "kvm",
+    "hvparams": hvparams,
+    "beparams": {
+      "maxmem": 4096,
+      "minmem": 2048,
+      "vcpus": 2,
+      "auto_balance": True,
+      "always_failover": False,
+      "spindle_use": 1,
+      },
+    "osparams": {
+      "dhcp": "yes",
+      "mirror": "http://deb.debian.org/debian",
+      },
+    "admin_state": "up",
+    "nics": [{
+      "mac": "aa:00:00:%02x:%02x:%02x" % (rnd.getrandbits(8),
+                                          rnd.getrandbits(8),
+                                          rnd.getrandbits(8)),
+      "ip": None,
+      "nicparams": {"mode": "bridged", "link": "br0", "vlan": ""},
+      "uuid": "%032x" % rnd.getrandbits(128),
+      } for _ in range(2)],
+    "disks": ["%032x" % rnd.getrandbits(128) for _ in range(2)],
+    "disk_template": "drbd",
+    "network_port": 11000 + idx,
+    "ctime": 1450000000.0 + idx,
+    "mtime": 1460000000.0 + idx,
+    "serial_no": rnd.randint(1, 100),
+    "tags": [],
+    }
+
+
+def _MakeNodeVerifyResult(rnd, instances):
+  """Builds a result of C{node_verify} as returned by a node.
+
+  """
+  lvs = {}
+  for inst in instances:
+    for disk in inst["disks"]:
+      for suffix in ["data", "meta"]:
+        lvs["xenvg/%s.disk_%s" % (disk, suffix)] = \
+          ("%0.2f" % rnd.uniform(128, 102400), False, True)
+
+  return (True, {
+    constants.NV_FILELIST: dict(("/var/lib/ganeti/file%02d" % i,
+                                 "%040x" % rnd.getrandbits(160))
+                                for i in range(20)),
+    constants.NV_LVLIST: lvs,
+    constants.NV_INSTANCELIST: [inst["name"] for inst in instances],
+    constants.NV_VERSION: (constants.PROTOCOL_VERSION,
+                           constants.RELEASE_VERSION),
+    constants.NV_HVINFO: {
+      "memory_total": 262144,
+      "memory_free": 65536,
+      "cpu_total": 48,
+      "cpu_nodes": 2,
+      "cpu_sockets": 2,
+      },
+    constants.NV_TIME: (int(time.time()), 0),
+    })
+
+
+def _MakeAllInstancesInfoResult(rnd, instances):
+  """Builds a result of C{all_instances_info} as returned by a node.
+
+  """
+  return (True, dict((inst["name"], {
+    "memory": inst["beparams"]["maxmem"],
+    "vcpus": inst["beparams"]["vcpus"],
+    "state": "running",
+    "time": rnd.uniform(1, 1e6),
+    }) for inst in instances))
+
+
+def _EncodeJson(data):
+  return data
+
+
+def _DecodeJson(data):
+  return data
+
+
+def _EncodeDeflate(data):
+  return zlib.compress(data, constants.RPC_COMPRESS_LEVEL)
+
+
+def _DecodeDeflate(data):
+  return zlib.decompress(data)
+
+
+def _EncodeBase64(data):
+  return base64.b64encode(zlib.compress(data, 3))
+
+
+def _DecodeBase64(data):
+  return zlib.decompress(base64.b64decode(data))
+
+
+#: Encodings to compare, applied to the serialized JSON data
+_ENCODINGS = [
+  ("json", _EncodeJson, _DecodeJson),
+  ("json+%s" % constants.RPC_CONTENT_ENCODING, _EncodeDeflate,
+   _DecodeDeflate),
+  ("json+zlib+base64", _EncodeBase64, _DecodeBase64),
+  ]
+
+
+def _Measure(fn, repetitions):
+  """Returns the best time in milliseconds for running a function.
+
+  """
+  best = None
+
+  for _ in range(repetitions):
+    start = time.time()
+    fn()
+    duration = time.time() - start
+
+    if best is None or duration < best:
+      best = duration
+
+  return 1000.0 * best
+
+
+def main():
+  (opts, _) = ParseOptions()
+
+  # Seeded random generator for reproducible payloads
+  rnd = random.Random(18231)
+
+  instances = [_MakeInstanceDict(rnd, i) for i in range(opts.instance_count)]
+
+  payloads = [
+    ("instance_start request", instances[0]),
+    ("node_verify response", _MakeNodeVerifyResult(rnd, instances)),
+    ("all_instances_info response",
+     _MakeAllInstancesInfoResult(rnd, instances)),
+    ]
+
+  print "%-28s %-18s %10s %8s %10s %10s" % \
+    ("Payload", "Encoding", "Bytes", "Ratio", "Encode/ms", "Decode/ms")
+
+  for (name, payload) in payloads:
+    for (encname, encode_fn, decode_fn) in _ENCODINGS:
+      text = serializer.DumpJson(payload)
+      encoded = encode_fn(text)
+
+      assert serializer.LoadJson(decode_fn(encoded)) == \
+        serializer.LoadJson(text)
+
+      encode_time = _Measure(lambda: encode_fn(serializer.DumpJson(payload)),
+                             opts.repetitions)
+      decode_time = _Measure(lambda: serializer.LoadJson(decode_fn(encoded)),
+                             opts.repetitions)
+
+      print "%-28s %-18s %10d %7.1f%% %10.3f %10.3f" % \
+        (name, encname, len(encoded), 100.0 * len(encoded) / len(text),
+         encode_time, decode_time)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,267 @@
+#!/usr/bin/python
+#
+
+# Copyright (C) 2016 Google Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are
+# met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+# notice, this list of conditions and the following disclaimer in the
+# documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS
+# IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED
+# TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR
+# PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+# CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL,
+# EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO,
+# PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR
+# PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF
+# LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING
+# NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""Script for comparing the available JSON engines
+
+Measures the time needed to serialize and parse typical Ganeti documents,
+such as the cluster configuration, a job file and a query response, with
+every JSON engine supported by L{ganeti.serializer}.
+
+"""
+
+import optparse
+import random
+import time
+
+from ganeti import serializer
+
+
+def ParseOptions():
+  """Parses the command line options.
+
+  In case of command line errors, it will show the usage and exit the
+  program.
+
+  @return: the options in a tuple
+
+  """
+  parser = optparse.OptionParser()
+  parser.add_option("-n", dest="instance_count", default=5000, type="int",
+                    help="Number of instances in the configuration",
+                    metavar="NUM")
+  parser.add_option("-r", dest="repetitions", default=5, type="int",
+                    help="Number of repetitions per measurement",
+                    metavar="NUM")
+
+  (opts, args) = parser.parse_args()
+
+  if opts.instance_count < 1:
+    parser.error("Number of instances must be at least 1")
+
+  if opts.repetitions < 1:
+    parser.error("Number of repetitions must be at least 1")
+
+  return (opts, args)
+
+
+def _MakeInstance(rnd, idx):
+  """Builds an instance as stored in the configuration.
+
+  """
+  return {
+    "name": "instance%05d.example.com" % idx,
+    "uuid": "%08x-1f2e-4d3c-8b7a-%012x" % (idx, rnd.getrandbits(48)),
+    "primary_node": "%08x-node-uuid" % rnd.getrandbits(32),
+    "os": "debootstrap+default",
+    "hypervisor": "kvm",
+    "hvparams": {},
+    "beparams": {
+      "maxmem": 4096,
+      "minmem": 2048,
+      "vcpus": 2,
+      },
+    "osparams": {
+      "dhcp": "yes",
+      },
+    "osparams_private": serializer.PrivateDict({
+      "root_password": "%016x" % rnd.getrandbits(64),
+      }),
+    "admin_state": "up",
+    "admin_state_source": "admin",
+    "nics": [{
+      "mac": "aa:00:00:%02x:%02x:%02x" % (rnd.getrandbits(8),
+                                          rnd.getrandbits(8),
+                                          rnd.getrandbits(8)),
+      "ip": None,
+      "nicparams": {"mode": "bridged", "link": "br0", "vlan": ""},
+      "uuid": "%032x" % rnd.getrandbits(128),
+      }],
+    "disks": ["%032x" % rnd.getrandbits(128) for _ in range(2)],
+    "disks_active": True,
+    "network_port": 11000 + idx,
+    "ctime": 1450000000.0 + idx,
+    "mtime": 1460000000.0 + rnd.uniform(0, 1e6),
+    "serial_no": rnd.randint(1, 100),
+    "tags": [],
+    }
+
+
+def _MakeDisk(rnd, uuid):
+  """Builds a disk as stored in the configuration.
+
+  """
+  return {
+    "uuid": uuid,
+    "dev_type": "plain",
+    "logical_id": ["xenvg", "%s.disk0" % uuid],
+    "size": rnd.choice([1024, 10240, 102400]),
+    "mode": "rw",
+    "params": {},
+    "spindles": None,
+    "iv_name": "disk/0",
+    "serial_no": 1,
+    "ctime": 1450000000.0,
+    "mtime": 1450000000.0,
+    }
+
+
+def _MakeConfig(rnd, count):
+  """Builds a cluster configuration with the given number of instances.
+
+  """
+  instances = [_MakeInstance(rnd, i) for i in range(count)]
+
+  return {
+    "version": 2180000,
+    "serial_no": 12345,
+    "cluster": {
+      "cluster_name": "cluster.example.com",
+      "enabled_hypervisors": ["kvm"],
+      },
+    "instances": dict((inst["uuid"], inst) for inst in instances),
+    "disks": dict((uuid, _MakeDisk(rnd, uuid))
+                  for inst in instances
+                  for uuid in inst["disks"]),
+    "nodes": dict(("%08x-node-uuid" % i, {
+      "name": "node%03d.example.com" % i,
+      "primary_ip": "192.0.2.%d" % (i % 250 + 1),
+      "secondary_ip": "198.51.100.%d" % (i % 250 + 1),
+      "master_candidate": i < 10,
+      "offline": False,
+      "drained": False,
+      }) for i in range(max(1, count // 40))),
+    }
+
+
+def _MakeJob(rnd, count):
+  """Builds a job file with a large log.
+
+  """
+  return {
+    "id": 123456,
+    "ops": [{
+      "input": {"OP_ID": "OP_CLUSTER_VERIFY_GROUP", "group_name": "default"},
+      "status": "success",
+      "result": [True, "%064x" % rnd.getrandbits(256)],
+      "log": [[i, [1460000000, i], "message",
+               "Verifying instance instance%05d.example.com" % i]
+              for i in range(count)],
+      "start_timestamp": [1460000000, 0],
+      "exec_timestamp": [1460000000, 1],
+      "end_timestamp": [1460000100, 0],
+      "priority": 0,
+      }],
+    "received_timestamp": [1460000000, 0],
+    "start_timestamp": [1460000000, 0],
+    "end_timestamp": [1460000100, 0],
+    }
+
+
+def _MakeQueryResponse(rnd, count):
+  """Builds the response to an instance query.
+
+  """
+  return {
+    "fields": [{"name": name, "title": name.title(), "kind": "other",
+                "doc": name}
+               for name in ["name", "status", "pnode", "oper_ram"]],
+    "data": [[[0, "instance%05d.example.com" % i],
+              [0, rnd.choice(["running", "ADMIN_down", "ERROR_down"])],
+              [0, "node%03d.example.com" % rnd.randint(0, 99)],
+              [0, rnd.choice([1024, 2048, 4096])]]
+             for i in range(count)],
+    }
+
+
+def _Measure(fn, repetitions):
+  """Returns the best time in milliseconds for running a function.
+
+  """
+  best = None
+
+  for _ in range(repetitions):
+    start = time.time()
+    fn()
+    duration = time.time() - start
+
+    if best is None or duration < best:
+      best = duration
+
+  return 1000.0 * best
+
+
+def main():
+  (opts, _) = ParseOptions()
+
+  # Seeded random generator for reproducible payloads
+  rnd = random.Random(18232)
+
+  payloads = [
+    ("configuration", _MakeConfig(rnd, opts.instance_count),
+     serializer.EncodeWithPrivateFields),
+    ("job file", _MakeJob(rnd, opts.instance_count), None),
+    ("query response", _MakeQueryResponse(rnd, opts.instance_count), None),
+    ]
+
+  default_engine = serializer.GetEngineName()
+
+  print "Default engine: %s" % default_engine
+  print "%-16s %-12s %10s %10s %10s" % ("Payload", "Engine", "Bytes",
+                                        "Dump/ms", "Load/ms")
+
+  try:
+    for (name, payload, private_encoder) in payloads:
+      reference = None
+
+      for engine in serializer.GetEngineNames():
+        serializer.SetEngine(engine)
+
+        text = serializer.DumpJson(payload, private_encoder=private_encoder)
+
+        if reference is None:
+          reference = text
+        else:
+          assert text == reference, \
+            "Engine %s produced different output" % engine
+
+        dump_time = _Measure(lambda: serializer.DumpJson(payload,
+                                                         private_encoder),
+                             opts.repetitions)
+        load_time = _Measure(lambda: serializer.LoadJson(text),
+                             opts.repetitions)
+
+        print "%-16s %-12s %10d %10.3f %10.3f" % \
+          (name, engine, len(text), dump_time, load_time)
+  finally:
+    serializer.SetEngine(default_engine)
+
+
+if __name__ == "__main__":
+  main()